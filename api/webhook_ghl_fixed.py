@@ -17,6 +17,8 @@ import httpx
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+from app.utils.outbound_queue import DeadLetterStore, OutboundDispatcher, OutboundMessage
+
 # Load environment variables
 load_dotenv()
 
@@ -36,12 +38,13 @@ GHL_API_URL = "https://services.leadconnectorhq.com"
 # Initialize async clients
 http_client: Optional[httpx.AsyncClient] = None
 ghl_client: Optional[httpx.AsyncClient] = None
+outbound: Optional[OutboundDispatcher] = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle"""
-    global http_client, ghl_client
+    global http_client, ghl_client, outbound
     http_client = httpx.AsyncClient(timeout=30.0)
     ghl_client = httpx.AsyncClient(
         base_url=GHL_API_URL,
@@ -51,8 +54,17 @@ async def lifespan(app: FastAPI):
         },
         timeout=30.0
     )
+    outbound = OutboundDispatcher(
+        send=post_message_part,
+        max_attempts=int(os.getenv("OUTBOUND_MAX_ATTEMPTS", "4")),
+        backoff=float(os.getenv("OUTBOUND_RETRY_BACKOFF", "1.0")),
+        max_concurrency=int(os.getenv("OUTBOUND_MAX_CONCURRENCY", "50")),
+        dead_letters=DeadLetterStore(os.getenv("OUTBOUND_DEAD_LETTER_PATH", "logs/outbound_dead_letters.jsonl"))
+    )
     logger.info("Webhook server started")
     yield
+    # Deliver what's still queued before the GHL client goes away
+    await outbound.drain(timeout=10.0)
     await http_client.aclose()
     await ghl_client.aclose()
     logger.info("Webhook server stopped")
@@ -66,60 +78,39 @@ app = FastAPI(
 )
 
 
+async def post_message_part(message: OutboundMessage) -> Optional[Dict[str, Any]]:
+    """Deliver one queued message part to GoHighLevel"""
+    payload = {
+        "type": message.message_type,
+        "contactId": message.contact_id,
+        "message": message.body
+    }
+    response = await ghl_client.post("/conversations/messages", json=payload)
+    if response.status_code not in [200, 201]:
+        logger.error(f"Failed to send message to GHL: {response.status_code} - {response.text}")
+        return None
+    return response.json()
+
+
 async def send_message_to_ghl(
     contact_id: str,
     message: str,
-    conversation_id: Optional[str] = None
+    conversation_id: Optional[str] = None,
+    turn_id: Optional[str] = None
 ) -> bool:
-    """Send message back to GoHighLevel via API"""
+    """
+    Queue a message for GoHighLevel; parts are delivered in order by the outbound dispatcher
+
+    turn_id (the inbound messageId) makes a redelivered webhook's reply a duplicate;
+    without it the message is always sent
+    """
     try:
-        # Split long messages
-        messages = []
-        if len(message) > 300:
-            words = message.split()
-            current = []
-            current_length = 0
-            
-            for word in words:
-                if current_length + len(word) + 1 > 300:
-                    messages.append(' '.join(current))
-                    current = [word]
-                    current_length = len(word)
-                else:
-                    current.append(word)
-                    current_length += len(word) + 1
-            
-            if current:
-                messages.append(' '.join(current))
-        else:
-            messages = [message]
-        
-        # Send each message part
-        for msg_part in messages:
-            payload = {
-                "type": "WhatsApp",
-                "contactId": contact_id,
-                "message": msg_part
-            }
-            
-            response = await ghl_client.post(
-                "/conversations/messages",
-                json=payload
-            )
-            
-            if response.status_code not in [200, 201]:
-                logger.error(f"Failed to send message to GHL: {response.status_code} - {response.text}")
-                return False
-            
-            # Small delay between messages if multiple
-            if len(messages) > 1:
-                await asyncio.sleep(0.5)
-        
-        logger.info(f"Successfully sent message to contact {contact_id}")
+        queued = outbound.enqueue(contact_id, message, "WhatsApp", turn_id=turn_id)
+        logger.info(f"Queued {len(queued)} message part(s) for contact {contact_id}")
         return True
         
     except Exception as e:
-        logger.error(f"Error sending message to GHL: {str(e)}", exc_info=True)
+        logger.error(f"Error queueing message for GHL: {str(e)}", exc_info=True)
         return False
 
 
@@ -128,7 +119,8 @@ async def process_message_async(
     conversation_id: str,
     location_id: str,
     message_body: str,
-    contact_data: Dict[str, Any]
+    contact_data: Dict[str, Any],
+    message_id: Optional[str] = None
 ):
     """Process message asynchronously and send response"""
     try:
@@ -143,7 +135,7 @@ async def process_message_async(
             "contact_id": contact_id,
             "conversation_id": conversation_id,
             "location_id": location_id,
-            "contact_name": f"{contact_data.get('firstName', '')} {contact_data.get('lastName', '')}"strip(),
+            "contact_name": f"{contact_data.get('firstName', '')} {contact_data.get('lastName', '')}".strip(),
             "email": contact_data.get("email", ""),
             "phone": contact_data.get("phone", ""),
             "thread_id": thread_id
@@ -186,12 +178,13 @@ async def process_message_async(
         
         # Send response back to GHL
         if ai_response:
-            await send_message_to_ghl(contact_id, ai_response, conversation_id)
+            await send_message_to_ghl(contact_id, ai_response, conversation_id, message_id)
         else:
             await send_message_to_ghl(
                 contact_id, 
                 "Lo siento, no pude procesar tu mensaje. Por favor intenta de nuevo.",
-                conversation_id
+                conversation_id,
+                message_id
             )
             
     except Exception as e:
@@ -199,7 +192,8 @@ async def process_message_async(
         await send_message_to_ghl(
             contact_id,
             "Disculpa, estoy teniendo problemas técnicos. Por favor intenta más tarde.",
-            conversation_id
+            conversation_id,
+            message_id
         )
 
 
@@ -209,7 +203,8 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "webhook-handler-fixed",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now().isoformat(),
+        "outbound": outbound.stats() if outbound else None
     }
 
 
@@ -255,7 +250,8 @@ async def handle_webhook(
             conversation_id,
             location_id,
             message_body,
-            contact_data
+            contact_data,
+            payload.get("messageId") or message_data.get("id")
         )
         
         # Return immediate acknowledgment
@@ -5,6 +5,7 @@ Handles incoming webhooks and routes to LangGraph
 """
 import os
 import json
+import time
 import logging
 from datetime import datetime
 from typing import Dict, Any, Optional
@@ -17,6 +18,9 @@ import httpx
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+from app.utils.job_queue import DurableJobQueue, Job, JobWorkerPool
+from app.utils.webhook_dedup import DedupKey, RedisDedupStore, WebhookDeduplicator
+
 # Load environment variables
 load_dotenv()
 
@@ -29,9 +33,32 @@ logger = logging.getLogger(__name__)
 
 # Configuration
 LANGGRAPH_URL = os.getenv("LANGGRAPH_URL", "http://localhost:2024")
+# Latency budget of a turn once a worker picks it up, passed to the graph in the run config
+TURN_DEADLINE_SECONDS = float(os.getenv("TURN_DEADLINE_SECONDS", "30"))
 WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+REDIS_URL = os.getenv("REDIS_URL")
+
+# GHL redelivers on timeouts - drop deliveries of a message we already took
+WEBHOOK_DEDUP_ENABLED = os.getenv("WEBHOOK_DEDUP_ENABLED", "true").lower() != "false"
+deduplicator = WebhookDeduplicator(
+    ttl=float(os.getenv("WEBHOOK_DEDUP_TTL", "86400")),
+    weak_ttl=float(os.getenv("WEBHOOK_DEDUP_WEAK_TTL", "120")),
+    max_entries=int(os.getenv("WEBHOOK_DEDUP_MAX_ENTRIES", "10000")),
+    shared=RedisDedupStore(REDIS_URL) if os.getenv("WEBHOOK_DEDUP_BACKEND") == "redis" and REDIS_URL else None
+)
+
+# Fast ack: ingress commits the webhook to a local SQLite queue and answers
+# right away; a worker pool runs LangGraph. Off = process inline as before
+WEBHOOK_FAST_ACK = os.getenv("WEBHOOK_FAST_ACK", "true").lower() != "false"
+job_queue = DurableJobQueue(
+    os.getenv("WEBHOOK_JOB_DB", "data/webhook_jobs.db"),
+    max_attempts=int(os.getenv("WEBHOOK_JOB_MAX_ATTEMPTS", "5")),
+    lease_seconds=float(os.getenv("WEBHOOK_JOB_LEASE_SECONDS", "300")),
+    backoff=float(os.getenv("WEBHOOK_JOB_BACKOFF", "2.0"))
+) if WEBHOOK_FAST_ACK else None
+worker_pool: Optional[JobWorkerPool] = None
 
 # Initialize async client
 http_client: Optional[httpx.AsyncClient] = None
@@ -40,10 +67,21 @@ http_client: Optional[httpx.AsyncClient] = None
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle"""
-    global http_client
+    global http_client, worker_pool
     http_client = httpx.AsyncClient(timeout=30.0)
+    if job_queue is not None:
+        worker_pool = JobWorkerPool(
+            job_queue,
+            run_job,
+            workers=int(os.getenv("WEBHOOK_WORKERS", "4")),
+            on_dead=release_dead_job
+        )
+        await worker_pool.start()
     logger.info("Webhook server started")
     yield
+    if worker_pool is not None:
+        # Unfinished jobs stay in the queue and run after the next start
+        await worker_pool.stop()
     await http_client.aclose()
     logger.info("Webhook server stopped")
 
@@ -66,30 +104,6 @@ class WebhookPayload(BaseModel):
     contact: Dict[str, Any]
 
 
-class ConversationManager:
-    """Manages conversation history with database"""
-    
-    @staticmethod
-    async def load_conversation_history(contact_id: str, conversation_id: str) -> list:
-        """Load conversation history from database"""
-        # TODO: Implement Supabase query
-        # For now, return empty list - in production, load from database
-        logger.info(f"Loading history for conversation {conversation_id}")
-        return []
-    
-    @staticmethod
-    async def save_conversation_history(
-        contact_id: str, 
-        conversation_id: str, 
-        messages: list,
-        metadata: Dict[str, Any]
-    ):
-        """Save conversation history to database"""
-        # TODO: Implement Supabase insert/update
-        logger.info(f"Saving history for conversation {conversation_id}")
-        pass
-
-
 async def send_to_langgraph(
     messages: list,
     contact_id: str,
@@ -97,7 +111,13 @@ async def send_to_langgraph(
     location_id: str,
     contact_data: Dict[str, Any]
 ) -> Dict[str, Any]:
-    """Send conversation to LangGraph and get response"""
+    """
+    Send conversation to LangGraph and get response
+    
+    "run_started" in the result tells whether LangGraph accepted the run - after
+    that the turn may already have replied, so a failure must not be retried
+    """
+    run_started = False
     try:
         # Create thread ID from conversation ID for consistency
         thread_id = f"thread-{conversation_id}"
@@ -138,15 +158,23 @@ async def send_to_langgraph(
         lead_score = 0
         ai_response = ""
         
+        run = {
+            "assistant_id": "agent",
+            "input": input_data,
+            "stream_mode": "updates"
+        }
+        if TURN_DEADLINE_SECONDS > 0:
+            # Read back by every node, tool and GHL / LLM call (app/utils/deadline.py)
+            run["config"] = {"configurable": {"turn_deadline": time.time() + TURN_DEADLINE_SECONDS}}
+        
         async with http_client.stream(
             "POST",
             f"{LANGGRAPH_URL}/threads/{thread_id}/runs/stream",
-            json={
-                "assistant_id": "agent",
-                "input": input_data,
-                "stream_mode": "updates"
-            }
+            json=run
         ) as response:
+            if response.status_code >= 400:
+                raise RuntimeError(f"LangGraph rejected the run: HTTP {response.status_code}")
+            run_started = True
             async for line in response.aiter_lines():
                 if line:
                     try:
@@ -181,7 +209,8 @@ async def send_to_langgraph(
             "message": ai_response or "Lo siento, no pude procesar tu mensaje. Por favor intenta de nuevo.",
             "agent": current_agent,
             "lead_score": lead_score,
-            "thread_id": thread_id
+            "thread_id": thread_id,
+            "run_started": True
         }
         
     except Exception as e:
@@ -189,26 +218,83 @@ async def send_to_langgraph(
         return {
             "success": False,
             "message": "Disculpa, estoy teniendo problemas técnicos. Por favor intenta más tarde.",
-            "error": str(e)
+            "error": str(e),
+            "run_started": run_started
         }
 
 
+async def process_inbound_message(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one inbound message through LangGraph and save the history"""
+    contact_id = payload.get("contactId", "")
+    conversation_id = payload.get("conversationId", "")
+    location_id = payload.get("locationId", "")
+    message_body = payload.get("message", {}).get("body", "").strip()
+    contact_data = payload.get("contact", {})
+    
+    logger.info(f"Processing message from {contact_id}: {message_body[:50]}...")
+    
+    # Only the new message - the thread's checkpoint already holds the rest,
+    # and the agents' conversation archive is kept inside the graph
+    result = await send_to_langgraph(
+        messages=[{"role": "human", "content": message_body}],
+        contact_id=contact_id,
+        conversation_id=conversation_id,
+        location_id=location_id,
+        contact_data=contact_data
+    )
+    
+    return result
+
+
+async def run_job(job: Job):
+    """Worker pool handler - raising leaves the job in the queue for a retry"""
+    result = await process_inbound_message(job.payload["webhook"])
+    if not result["success"]:
+        error = result.get("error") or "LangGraph run failed"
+        if not result.get("run_started"):
+            raise RuntimeError(error)  # nothing ran - safe to try again
+        # The turn may have sent (or queued) its reply and appended the message
+        # to the thread already - running it again would do both twice
+        logger.error(f"Job {job.id} failed after its LangGraph run started, not retried: {error}")
+        return
+    logger.info(f"Processed job {job.id} for {job.ordering_key} "
+                f"({(datetime.now().timestamp() - job.enqueued_at):.1f}s after ingress)")
+
+
+async def release_dead_job(job: Job):
+    """A job out of retries was never processed - let a redelivery through"""
+    key = job.payload.get("dedup_key")
+    if key:
+        await deduplicator.release(DedupKey(**key))
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
         "service": "webhook-handler",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now().isoformat(),
+        "duplicates_skipped": deduplicator.duplicates,
+        "queue": worker_pool.stats() if worker_pool else None
     }
 
 
+@app.get("/queue/stats")
+async def queue_stats():
+    """Job queue depth, age and throughput"""
+    if worker_pool is None:
+        raise HTTPException(status_code=404, detail="Fast ack is disabled")
+    return worker_pool.stats()
+
+
 @app.post("/webhook")
 async def handle_webhook(
     request: Request,
     background_tasks: BackgroundTasks
 ):
     """Handle incoming GoHighLevel webhooks"""
+    dedup_key = None
     try:
         # Verify webhook secret if configured
         if WEBHOOK_SECRET:
@@ -231,9 +317,7 @@ async def handle_webhook(
         # Extract data
         contact_id = payload.get("contactId", "")
         conversation_id = payload.get("conversationId", "")
-        location_id = payload.get("locationId", "")
         message_data = payload.get("message", {})
-        contact_data = payload.get("contact", {})
         
         # Get message content
         message_body = message_data.get("body", "").strip()
@@ -243,48 +327,36 @@ async def handle_webhook(
                 status_code=400
             )
         
-        logger.info(f"Processing message from {contact_id}: {message_body[:50]}...")
-        
-        # Load conversation history
-        conversation_history = await ConversationManager.load_conversation_history(
-            contact_id, conversation_id
-        )
+        # Redeliveries stop here, before the history load and the LangGraph run
+        if WEBHOOK_DEDUP_ENABLED:
+            dedup_key = await deduplicator.claim(payload)
+            if dedup_key is None:
+                return JSONResponse(
+                    content={"success": True, "duplicate": True},
+                    status_code=200
+                )
         
-        # Add new message to history
-        conversation_history.append({
-            "role": "human",
-            "content": message_body
-        })
-        
-        # Send to LangGraph
-        result = await send_to_langgraph(
-            messages=conversation_history,
-            contact_id=contact_id,
-            conversation_id=conversation_id,
-            location_id=location_id,
-            contact_data=contact_data
-        )
-        
-        # Add AI response to history
-        if result["success"] and result["message"]:
-            conversation_history.append({
-                "role": "ai",
-                "content": result["message"]
-            })
-            
-            # Save updated history in background
-            background_tasks.add_task(
-                ConversationManager.save_conversation_history,
-                contact_id,
-                conversation_id,
-                conversation_history,
+        if job_queue is not None:
+            # Commit and acknowledge; one conversation's messages run in order
+            job_id = job_queue.enqueue(
                 {
-                    "agent": result.get("agent"),
-                    "lead_score": result.get("lead_score"),
-                    "thread_id": result.get("thread_id")
-                }
+                    "webhook": payload,
+                    "dedup_key": vars(dedup_key) if dedup_key else None
+                },
+                ordering_key=conversation_id or contact_id
+            )
+            worker_pool.notify()
+            return JSONResponse(
+                content={"success": True, "queued": True, "job_id": job_id},
+                status_code=200
             )
         
+        result = await process_inbound_message(payload)
+        
+        if not result["success"] and dedup_key is not None:
+            # Not processed - a redelivery may try again
+            await deduplicator.release(dedup_key)
+        
         # Prepare response with custom field updates
         response_data = {
             "success": result["success"],
@@ -304,6 +376,8 @@ async def handle_webhook(
         
     except Exception as e:
         logger.error(f"Webhook error: {str(e)}", exc_info=True)
+        if dedup_key is not None:
+            await deduplicator.release(dedup_key)
         return JSONResponse(
             content={
                 "success": False,
@@ -323,7 +397,8 @@ async def root():
         "status": "running",
         "endpoints": {
             "webhook": "/webhook",
-            "health": "/health"
+            "health": "/health",
+            "queue": "/queue/stats"
         }
     }
 
@@ -3,8 +3,43 @@ Base Agent Utilities - Low Risk Consolidation
 Only contains truly duplicate code shared by ALL agents
 """
 from typing import Dict, Any, List, Optional, Tuple
+from langchain_core.messages import AIMessage
 from app.utils.simple_logger import get_logger
 
+# Lead scores each agent handles
+AGENT_SCORE_RANGES = {"maria": (0, 4), "carlos": (5, 7), "sofia": (8, 10)}
+
+# The router's booking rule: from this score, a lead with an email asking for an appointment is Sofia's
+BOOKING_READY_MIN_SCORE = 7
+
+# Sent while the LLM is unavailable (circuit open) - no model call needed.
+# Nothing replays the turn once the circuit closes, so it asks the customer to
+# write again instead of promising a follow-up
+FALLBACK_REPLY = (
+    "¡Gracias por tu mensaje! En este momento estamos teniendo una demora técnica. "
+    "¿Nos escribes de nuevo en unos minutos?"
+)
+
+
+def is_booking_ready(lead_score: int, extracted_data: Dict[str, Any], intent: str) -> bool:
+    """Score 7+ with an email and appointment intent - booked by Sofia before reaching 8"""
+    return (lead_score >= BOOKING_READY_MIN_SCORE and bool(extracted_data.get("email"))
+            and intent == "appointment_interest")
+
+
+def score_range(agent: str, booking_ready: bool = False) -> Tuple[int, int]:
+    """
+    Scores the agent handles this turn: AGENT_SCORE_RANGES, with Sofia taking
+    over from Carlos at BOOKING_READY_MIN_SCORE when the router found the lead
+    ready to book (state["booking_ready"])
+    """
+    low, high = AGENT_SCORE_RANGES[agent]
+    if booking_ready and agent == "sofia":
+        low = min(low, BOOKING_READY_MIN_SCORE)
+    elif booking_ready and agent == "carlos":
+        high = min(high, BOOKING_READY_MIN_SCORE - 1)
+    return low, high
+
 
 def get_current_message(messages: List[Any]) -> str:
     """
@@ -22,29 +57,39 @@ def check_score_boundaries(
     min_score: int, 
     max_score: int,
     agent_name: str,
-    logger: Any
+    logger: Any,
+    routing_attempts: int = 0
 ) -> Optional[Dict[str, Any]]:
     """
     Check if lead score is within agent's range
-    Returns escalation response if out of bounds
+    Returns escalation response if out of bounds - the workflow hands the turn
+    straight to the right agent (see escalation.py). Once the turn has used its
+    max_escalation_hops the agent answers anyway, so a turn can't loop
     """
+    if min_score <= lead_score <= max_score:
+        return None
+    from app.config import get_settings
+    if routing_attempts >= get_settings().max_escalation_hops:
+        logger.warning(f"Score {lead_score} outside {agent_name}'s range, but the turn is out of "
+                       f"escalation hops ({routing_attempts}) - answering anyway")
+        return None
     if lead_score < min_score:
         logger.info(f"Score {lead_score} too low for {agent_name} (handles {min_score}-{max_score})")
         return {
-            "needs_rerouting": True,
+            "needs_escalation": True,
             "escalation_reason": "wrong_agent",
             "escalation_details": f"Score {lead_score} too low for {agent_name}",
-            "current_agent": agent_name.lower()
-        }
-    elif lead_score > max_score:
-        logger.info(f"Score {lead_score} too high for {agent_name} (handles {min_score}-{max_score})")
-        return {
-            "needs_rerouting": True,
-            "escalation_reason": "needs_next_agent", 
-            "escalation_details": f"Score {lead_score} ready for next agent",
-            "current_agent": agent_name.lower()
+            "current_agent": agent_name.lower(),
+            "routing_attempts": routing_attempts + 1
         }
-    return None
+    logger.info(f"Score {lead_score} too high for {agent_name} (handles {min_score}-{max_score})")
+    return {
+        "needs_escalation": True,
+        "escalation_reason": "needs_next_agent", 
+        "escalation_details": f"Score {lead_score} ready for next agent",
+        "current_agent": agent_name.lower(),
+        "routing_attempts": routing_attempts + 1
+    }
 
 
 def extract_data_status(extracted_data: Dict[str, Any]) -> Dict[str, bool]:
@@ -69,7 +114,21 @@ def create_error_response(agent_name: str, error: Exception, state: Dict[str, An
     return {
         "error": str(error),
         "current_agent": agent_name.lower(),
-        "messages": state.get("messages", [])
+        "messages": state.get("messages", []),
+        "needs_escalation": False
+    }
+
+
+def create_fallback_response(agent_name: str, error: Exception) -> Dict[str, Any]:
+    """
+    Answer with FALLBACK_REPLY when a dependency's circuit is open
+    The reply carries the agent's name, so the responder sends it like any other
+    """
+    get_logger(agent_name.lower()).warning(f"{agent_name} answering with the fallback reply: {error}")
+    return {
+        "messages": [AIMessage(content=FALLBACK_REPLY, name=agent_name.lower())],
+        "current_agent": agent_name.lower(),
+        "needs_escalation": False
     }
 
 
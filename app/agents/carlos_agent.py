@@ -13,13 +13,19 @@ from app.tools.agent_tools import (
     save_important_context,
     track_lead_progress
 )
+from app.utils import deadline
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.deadline import TurnDeadlineExceeded
 from app.utils.simple_logger import get_logger
+from app.config import get_settings
 from app.utils.model_factory import create_openai_model
 from app.agents.base_agent import (
     get_current_message,
     check_score_boundaries,
     extract_data_status,
-    create_error_response
+    create_error_response,
+    create_fallback_response,
+    score_range
 )
 from app.state.message_manager import MessageManager
 from app.utils.langsmith_debug import debug_node, log_to_langsmith, debugger
@@ -246,7 +252,7 @@ Remember: Be SPECIFIC about {service_focus} benefits - don't be generic!"""
 
 def create_carlos_agent_fixed():
     """Create fixed Carlos agent that uses templates"""
-    model = create_openai_model(temperature=0.3)
+    model = create_openai_model(temperature=0.3, task="carlos")
     
     tools = [
         get_contact_details_with_task,
@@ -279,18 +285,24 @@ async def carlos_node(state: Dict[str, Any]) -> Dict[str, Any]:
         extracted_data = state.get("extracted_data", {})
         
         # Route checks using base function
-        boundary_check = check_score_boundaries(lead_score, 5, 7, "Carlos", logger)
+        routing_attempts = state.get("routing_attempts", 0)
+        boundary_check = check_score_boundaries(lead_score, *score_range("carlos", state.get("booking_ready", False)),
+                                                "Carlos", logger, routing_attempts)
         if boundary_check:
             # Special case: if score is 8+ AND has email, needs appointment
             if lead_score >= 8 and extracted_data.get("email"):
                 return {
-                    "needs_rerouting": True,
+                    "needs_escalation": True,
                     "escalation_reason": "needs_appointment",
                     "escalation_details": "Ready for appointment booking",
-                    "current_agent": "carlos"
+                    "current_agent": "carlos",
+                    "routing_attempts": routing_attempts + 1
                 }
             return boundary_check
         
+        # Not enough of the turn left for an agent run - fallback reply
+        deadline.check(get_settings().turn_deadline_llm_seconds)
+        
         # Create and run agent
         agent = create_carlos_agent_fixed()
         result = await agent.ainvoke(state)
@@ -309,9 +321,13 @@ async def carlos_node(state: Dict[str, Any]) -> Dict[str, Any]:
         # Update state
         return {
             "messages": new_messages,  # Only new messages
-            "current_agent": "carlos"
+            "current_agent": "carlos",
+            "needs_escalation": False
         }
         
+    except (CircuitOpenError, TurnDeadlineExceeded) as e:
+        return create_fallback_response("Carlos", e)
+        
     except Exception as e:
         logger.error(f"Carlos error: {str(e)}", exc_info=True)
         return create_error_response("carlos", e, state)
@@ -0,0 +1,93 @@
+"""
+Escalation Routing
+Re-routes a turn between agents from the analysis the smart router already
+put in state, instead of sending it back through the router
+
+- The router's pick is checked against the agents' score ranges before any
+  agent runs (route_from_smart_router), so an out-of-range agent isn't run
+  just to bounce the turn
+- An agent raising needs_escalation goes straight to the agent that owns
+  the lead score (or Sofia for needs_appointment) - no second router pass,
+  no second analysis LLM call on the same customer message
+- routing_attempts counts the hops of a turn; past max_escalation_hops the
+  turn ends at the responder, and out-of-range agents answer anyway once the
+  cap is reached (check_score_boundaries), so a turn can't loop
+- get_escalation_stats() counts the router LLM calls and super-steps saved
+"""
+import threading
+from typing import Any, Dict, Optional
+
+from app.agents.base_agent import AGENT_SCORE_RANGES, score_range
+from app.utils.simple_logger import get_logger
+
+logger = get_logger("escalation")
+
+
+def agent_for_score(lead_score: int, booking_ready: bool = False) -> str:
+    """The agent whose score range holds lead_score (see score_range for booking_ready)"""
+    for agent in AGENT_SCORE_RANGES:
+        low, high = score_range(agent, booking_ready)
+        if low <= lead_score <= high:
+            return agent
+    return "sofia" if lead_score > 10 else "maria"
+
+
+def reroute(state: Dict[str, Any]) -> Optional[str]:
+    """Next agent for an escalated turn, None when no other agent should take it"""
+    current = state.get("current_agent")
+    if state.get("escalation_reason") == "needs_appointment":
+        target = "sofia"
+    else:
+        target = agent_for_score(state.get("lead_score", 0), state.get("booking_ready", False))
+    return None if target == current else target
+
+
+class EscalationStats:
+    """Counters of escalations handled without a router pass"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {
+            "escalations": 0,
+            "rerouted": 0,
+            "boundary_hops_skipped": 0,
+            "loops_capped": 0,
+            "router_llm_calls_saved": 0,
+            "super_steps_saved": 0,
+        }
+
+    def _add(self, **counts: int) -> None:
+        with self._lock:
+            for name, count in counts.items():
+                self.counters[name] += count
+
+    def rerouted(self) -> None:
+        # agent -> smart_router -> agent became agent -> agent
+        self._add(escalations=1, rerouted=1, router_llm_calls_saved=1, super_steps_saved=1)
+
+    def boundary_skipped(self) -> None:
+        # The out-of-range agent's node and the router pass after it
+        self._add(boundary_hops_skipped=1, router_llm_calls_saved=1, super_steps_saved=2)
+
+    def capped(self) -> None:
+        self._add(escalations=1, loops_capped=1)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+
+_stats = EscalationStats()
+
+
+def get_escalation_stats() -> EscalationStats:
+    return _stats
+
+
+# Export
+__all__ = [
+    "EscalationStats",
+    "agent_for_score",
+    "get_escalation_stats",
+    "reroute",
+]
@@ -13,14 +13,19 @@ from app.tools.agent_tools import (
     save_important_context,
     track_lead_progress
 )
+from app.utils import deadline
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.deadline import TurnDeadlineExceeded
 from app.utils.simple_logger import get_logger
 from app.config import get_settings
 from app.utils.model_factory import create_openai_model
 from app.agents.base_agent import (
+    AGENT_SCORE_RANGES,
     get_current_message,
     check_score_boundaries,
     extract_data_status,
     create_error_response,
+    create_fallback_response,
     get_base_contact_info
 )
 from app.state.message_manager import MessageManager
@@ -281,12 +286,16 @@ async def maria_node(state: Dict[str, Any]) -> Union[Command, Dict[str, Any]]:
         
         # Check if Maria should handle this
         lead_score = state.get("lead_score", 0)
-        boundary_check = check_score_boundaries(lead_score, 0, 4, "Maria", logger)
+        boundary_check = check_score_boundaries(lead_score, *AGENT_SCORE_RANGES["maria"], "Maria", logger,
+                                                state.get("routing_attempts", 0))
         if boundary_check:
             return boundary_check
         
+        # Not enough of the turn left for an agent run - fallback reply
+        deadline.check(get_settings().turn_deadline_llm_seconds)
+        
         # Create agent with memory-aware prompt
-        model = create_openai_model(temperature=0.0)
+        model = create_openai_model(temperature=0.0, task="maria")
         tools = [
             get_contact_details_with_task,
             escalate_to_router,
@@ -344,9 +353,13 @@ async def maria_node(state: Dict[str, Any]) -> Union[Command, Dict[str, Any]]:
         # Return only new messages
         return {
             "messages": new_messages,
-            "current_agent": "maria"
+            "current_agent": "maria",
+            "needs_escalation": False
         }
         
+    except (CircuitOpenError, TurnDeadlineExceeded) as e:
+        return create_fallback_response("Maria", e)
+        
     except Exception as e:
         logger.error(f"Error in Maria memory-aware: {str(e)}", exc_info=True)
         return create_error_response("maria", e, state)
\ No newline at end of file
@@ -4,14 +4,33 @@ Simplified Receptionist - Only loads from GHL, no checkpoint messages
 from typing import Dict, Any, List
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 from app.utils.simple_logger import get_logger
+from app.config import get_settings
 from app.tools.ghl_client import GHLClient
+from app.state.conversation_archive import from_ghl, get_conversation_archive, to_langchain
 from app.state.message_manager import MessageManager
-from app.utils.debug_helpers import log_state_transition, validate_state
+from app.utils.debug_helpers import log_state_transition, validate_state, should_instrument
 from app.utils.langsmith_debug import debug_node, log_to_langsmith, debugger
 
 logger = get_logger("receptionist")
 
 
+def _ghl_to_messages(ghl_messages: List[Any]) -> List[BaseMessage]:
+    """GHL uses 'direction'/'body' rather than 'role'/'content'"""
+    messages = []
+    for msg in ghl_messages:
+        if isinstance(msg, dict):
+            direction = msg.get("direction", "")
+            content = msg.get("body", "")
+            if direction == "outbound":
+                messages.append(AIMessage(content=content))
+            else:
+                # inbound, or unknown - treat as human message
+                messages.append(HumanMessage(content=content))
+        else:
+            messages.append(msg)
+    return messages
+
+
 @debug_node("receptionist")
 async def receptionist_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -20,8 +39,10 @@ async def receptionist_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     logger.info("=== SIMPLE RECEPTIONIST STARTING ===")
     
-    # Log input state for debugging
-    log_state_transition(state, "receptionist", "input")
+    # Per-turn instrumentation is sampled; compiled out under python -O
+    instrument = __debug__ and should_instrument()
+    if instrument:
+        log_state_transition(state, "receptionist", "input")
     
     try:
         # Extract info from state
@@ -57,14 +78,21 @@ async def receptionist_node(state: Dict[str, Any]) -> Dict[str, Any]:
         # Initialize GHL client
         ghl_client = GHLClient()
         
-        # Load conversation history from GHL ONLY
         messages = []
         
+        # Recent history from the local archive while it's fresh, GHL otherwise
+        archive = get_conversation_archive() if get_settings().conversation_archive_enabled and conversation_id else None
+        from_archive = archive is not None and archive.is_fresh(conversation_id)
+        if from_archive:
+            messages = to_langchain(archive.recent(conversation_id))
+            logger.info(f"Loaded {len(messages)} messages from the conversation archive")
+        
         # Try to load conversation history
-        logger.info(f"Attempting to load conversation history for contact: {contact_id}")
+        if not from_archive:
+            logger.info(f"Attempting to load conversation history for contact: {contact_id}")
         
         # First, try with conversation_id if provided
-        if conversation_id:
+        if conversation_id and not from_archive:
             logger.info(f"Using conversation_id: {conversation_id}")
             log_to_langsmith({
                 "action": "loading_conversation",
@@ -84,23 +112,9 @@ async def receptionist_node(state: Dict[str, Any]) -> Dict[str, Any]:
                 }, "ghl_api_result")
                 
                 # Convert to LangChain messages
-                for msg in ghl_messages:
-                    if isinstance(msg, dict):
-                        # GHL uses 'direction' not 'role'
-                        direction = msg.get("direction", "")
-                        # GHL uses 'body' not 'content'
-                        content = msg.get("body", "")
-                        
-                        # Convert direction to role
-                        if direction == "inbound":
-                            messages.append(HumanMessage(content=content))
-                        elif direction == "outbound":
-                            messages.append(AIMessage(content=content))
-                        else:
-                            # Fallback - treat as human message
-                            messages.append(HumanMessage(content=content))
-                    else:
-                        messages.append(msg)
+                messages = _ghl_to_messages(ghl_messages)
+                if archive is not None:
+                    archive.import_history(conversation_id, contact_id, from_ghl(ghl_messages, conversation_id))
                 
                 logger.info(f"Loaded {len(messages)} messages from GHL")
                 debugger.log_message_flow(messages, "ghl_messages_loaded")
@@ -116,7 +130,7 @@ async def receptionist_node(state: Dict[str, Any]) -> Dict[str, Any]:
                 messages = []
         
         # If no conversation_id or failed, try loading by contact_id
-        if not messages and contact_id:
+        if not messages and contact_id and not from_archive:
             logger.info(f"Trying to load conversations by contact_id: {contact_id}")
             try:
                 # Get all conversations for this contact
@@ -133,23 +147,7 @@ async def receptionist_node(state: Dict[str, Any]) -> Dict[str, Any]:
                     ghl_messages = await ghl_client.get_conversation_messages(conv_id)
                     
                     # Convert to LangChain messages
-                    for msg in ghl_messages:
-                        if isinstance(msg, dict):
-                            # GHL uses 'direction' not 'role'
-                            direction = msg.get("direction", "")
-                            # GHL uses 'body' not 'content'
-                            content = msg.get("body", "")
-                            
-                            # Convert direction to role
-                            if direction == "inbound":
-                                messages.append(HumanMessage(content=content))
-                            elif direction == "outbound":
-                                messages.append(AIMessage(content=content))
-                            else:
-                                # Fallback - treat as human message
-                                messages.append(HumanMessage(content=content))
-                        else:
-                            messages.append(msg)
+                    messages = _ghl_to_messages(ghl_messages)
                     
                     logger.info(f"Loaded {len(messages)} messages from conversation")
                 else:
@@ -184,6 +182,9 @@ async def receptionist_node(state: Dict[str, Any]) -> Dict[str, Any]:
                 }
             ))
             logger.info("Added current message to history")
+            if archive is not None:
+                archive.record(conversation_id, "human", current_message, contact_id=contact_id,
+                               message_id=webhook_data.get("messageId"))
         
         # Get contact info
         contact_info = None
@@ -228,13 +229,12 @@ async def receptionist_node(state: Dict[str, Any]) -> Dict[str, Any]:
             "thread_message_count": len(messages)
         }
         
-        # Log output state for debugging
-        log_state_transition(result, "receptionist", "output")
-        
-        # Validate output state
-        validation = validate_state(result, "receptionist")
-        if not validation["valid"]:
-            logger.warning(f"Output validation issues: {validation['issues']}")
+        # Log and validate output state for debugging
+        if instrument:
+            log_state_transition(result, "receptionist", "output")
+            validation = validate_state(result, "receptionist")
+            if not validation["valid"]:
+                logger.warning(f"Output validation issues: {validation['issues']}")
         
         return result
         
@@ -4,7 +4,10 @@ Production-ready responder agent
 """
 from typing import Dict, Any, Optional
 from langchain_core.messages import AIMessage, BaseMessage
+from app.config import get_settings
 from app.tools.ghl_client import ghl_client
+from app.state.conversation_archive import get_conversation_archive
+from app.utils.outbound_queue import get_outbound_dispatcher
 from app.utils.simple_logger import get_logger
 from app.utils.langsmith_debug import debug_node, log_to_langsmith
 
@@ -61,6 +64,14 @@ def find_agent_response(messages: list[BaseMessage], current_agent: str) -> Opti
     return None
 
 
+def archive_reply(state: Dict[str, Any], agent_response: str) -> None:
+    """Append the sent reply to the local conversation archive"""
+    conversation_id = state.get("conversation_id")
+    if conversation_id and get_settings().conversation_archive_enabled:
+        get_conversation_archive().record(conversation_id, "ai", agent_response,
+                                          contact_id=state.get("contact_id", ""), source="agent")
+
+
 @debug_node("responder")
 async def responder_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -107,6 +118,28 @@ async def responder_node(state: Dict[str, Any]) -> Dict[str, Any]:
         webhook_data = state.get("webhook_data", {})
         message_type = webhook_data.get("type", "WhatsApp")
         
+        # Hand the message to the outbound queue - the turn ends once it's enqueued
+        if get_settings().outbound_queue_enabled:
+            # Same turn -> same idempotency keys, so a retried turn isn't sent twice
+            turn_id = f"{state.get('thread_id') or contact_id}:{len(messages)}"
+            queued = get_outbound_dispatcher().enqueue(contact_id, agent_response, message_type, turn_id=turn_id)
+            logger.info(f"Queued {len(queued)} message part(s): {agent_response[:50]}...")
+            archive_reply(state, agent_response)
+            log_to_langsmith({
+                "action": "message_queued",
+                "contact_id": contact_id,
+                "agent": current_agent,
+                "message_length": len(agent_response),
+                "parts": len(queued)
+            }, "responder_success")
+            # Not sent yet - the outbound worker delivers it (and retries) after the turn
+            return {
+                "message_sent": False,
+                "message_queued": True,
+                "last_sent_message": agent_response,
+                "final_response": agent_response
+            }
+        
         # Send the message
         logger.info(f"Sending message: {agent_response[:50]}...")
         
@@ -119,6 +152,7 @@ async def responder_node(state: Dict[str, Any]) -> Dict[str, Any]:
             
             if result:
                 logger.info("✅ Message sent successfully")
+                archive_reply(state, agent_response)
                 log_to_langsmith({
                     "action": "message_sent",
                     "contact_id": contact_id,
@@ -4,6 +4,11 @@ Tracks scores, reasons, and updates GHL with notes at each step
 """
 from typing import Dict, Any, List, Tuple
 from langchain_core.messages import BaseMessage
+from app.agents.base_agent import is_booking_ready
+from app.config import get_settings
+from app.utils import deadline
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.deadline import TurnDeadlineExceeded
 from app.utils.simple_logger import get_logger
 from app.utils.model_factory import create_openai_model
 # GHL client will be initialized when needed
@@ -18,7 +23,7 @@ class SmartRouter:
     """Combined intelligence analyzer and router with tracking"""
     
     def __init__(self):
-        self.model = create_openai_model(temperature=0.0)
+        self.model = create_openai_model(temperature=0.0, task="router")
     
     async def analyze_and_route(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -51,7 +56,9 @@ class SmartRouter:
                 }, "routing_fallback")
                 return self._create_routing_response("maria", 0, "No new message to analyze", state)
             
-            # Analyze the message for lead scoring and data extraction
+            # Analyze the message for lead scoring and data extraction (if the turn has time for it)
+            settings = get_settings()
+            deadline.check(settings.turn_deadline_llm_seconds)
             analysis = await self._analyze_message(current_message, messages, state)
             
             # Log analysis results to LangSmith
@@ -91,8 +98,10 @@ class SmartRouter:
                 routing_decision["routing_reason"]
             )
             
-            # Update GHL with notes if there are changes
-            if contact_id and (score_change_note or routing_change_note):
+            # Update GHL with notes if there are changes - optional, skipped when the turn runs late
+            if not deadline.has_budget(settings.turn_deadline_optional_seconds):
+                logger.info("Skipping GHL notes - turn deadline close")
+            elif contact_id and (score_change_note or routing_change_note):
                 await self._update_ghl_notes(
                     contact_id,
                     score_change_note,
@@ -111,6 +120,7 @@ class SmartRouter:
             return {
                 # Routing info
                 "next_agent": routing_decision["next_agent"],
+                "booking_ready": is_booking_ready(new_score, analysis["extracted_data"], analysis["intent"]),
                 "agent_task": routing_decision["agent_task"],
                 "routing_reason": routing_decision["routing_reason"],
                 
@@ -137,9 +147,18 @@ class SmartRouter:
                 
                 # Flags
                 "router_complete": True,
-                "needs_escalation": new_score >= 8
+                # Cleared on every routing pass; an agent raising it hands the turn to the next agent
+                "needs_escalation": False,
+                "routing_attempts": 0
             }
             
+        except (CircuitOpenError, TurnDeadlineExceeded) as e:
+            # LLM down or no time left - keep the last score and let that agent answer (with its fallback reply)
+            previous_score = state.get("lead_score", 0)
+            routing = self._determine_routing(previous_score, {"extracted_data": state.get("extracted_data", {}), "intent": ""})
+            logger.warning(f"Smart router skipped analysis: {e}")
+            return self._create_routing_response(routing["next_agent"], previous_score, f"Sin análisis: {e}", state)
+            
         except Exception as e:
             logger.error(f"Smart router error: {str(e)}", exc_info=True)
             return self._create_routing_response("maria", 0, f"Router error: {str(e)}", state)
@@ -327,9 +346,8 @@ Provide response as JSON:
         
         # Check for appointment readiness
         has_email = bool(analysis["extracted_data"].get("email"))
-        shows_high_interest = analysis["intent"] == "appointment_interest"
         
-        if score >= 8 or (score >= 7 and has_email and shows_high_interest):
+        if score >= 8 or is_booking_ready(score, analysis["extracted_data"], analysis["intent"]):
             return {
                 "next_agent": "sofia",
                 "agent_task": "Cliente calificado para agendar demo",
@@ -420,8 +438,11 @@ Provide response as JSON:
             "agent_task": "Atender al cliente",
             "routing_reason": reason,
             "lead_score": score,
+            "booking_ready": False,
             "router_complete": True,
-            "score_history": state.get("score_history", [])
+            "score_history": state.get("score_history", []),
+            "needs_escalation": False,
+            "routing_attempts": 0
         }
     
     def _get_timestamp(self) -> str:
@@ -430,15 +451,22 @@ Provide response as JSON:
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
-# Create singleton instance
-smart_router = SmartRouter()
+# Singleton, created on first use - building the model imports the LLM client
+_smart_router = None
+
+
+def get_smart_router() -> SmartRouter:
+    global _smart_router
+    if _smart_router is None:
+        _smart_router = SmartRouter()
+    return _smart_router
 
 
 @debug_node("smart_router")
 async def smart_router_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """Smart router node for workflow"""
-    return await smart_router.analyze_and_route(state)
+    return await get_smart_router().analyze_and_route(state)
 
 
 # Export
-__all__ = ["smart_router_node", "SmartRouter"]
\ No newline at end of file
+__all__ = ["smart_router_node", "SmartRouter", "get_smart_router"]
\ No newline at end of file
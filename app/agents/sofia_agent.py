@@ -13,13 +13,20 @@ from app.tools.agent_tools import (
     escalate_to_router,
     track_lead_progress
 )
+from app.tools.calendar_availability import get_calendar_availability
+from app.utils import deadline
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.deadline import TurnDeadlineExceeded
 from app.utils.simple_logger import get_logger
+from app.config import get_settings
 from app.utils.model_factory import create_openai_model
 from app.agents.base_agent import (
     get_current_message,
     check_score_boundaries,
     extract_data_status,
-    create_error_response
+    create_error_response,
+    create_fallback_response,
+    score_range
 )
 from app.state.message_manager import MessageManager
 from app.utils.langsmith_debug import debug_node, log_to_langsmith, debugger
@@ -245,7 +252,7 @@ Remember: They need {demo_focus} - CLOSE THAT SPECIFIC DEMO!"""
 
 def create_sofia_agent_fixed():
     """Create fixed Sofia agent that follows rules"""
-    model = create_openai_model(temperature=0.3)
+    model = create_openai_model(temperature=0.3, task="sofia")
     
     tools = [
         get_contact_details_with_task,
@@ -275,15 +282,23 @@ async def sofia_node(state: Dict[str, Any]) -> Dict[str, Any]:
     try:
         # Check if we should even be here
         lead_score = state.get("lead_score", 0)
-        # Sofia only handles score 8-10
-        boundary_check = check_score_boundaries(lead_score, 8, 10, "Sofia", logger)
+        # Sofia handles score 8-10, or 7 when the lead is ready to book
+        min_score, max_score = score_range("sofia", state.get("booking_ready", False))
+        boundary_check = check_score_boundaries(lead_score, min_score, max_score, "Sofia", logger,
+                                                state.get("routing_attempts", 0))
         if boundary_check:
-            # Override the reason for scores below 8
-            if lead_score < 8:
+            # Override the reason for scores below her range
+            if lead_score < min_score:
                 boundary_check["escalation_reason"] = "needs_qualification"
                 boundary_check["escalation_details"] = f"Lead score too low ({lead_score}/10)"
             return boundary_check
         
+        # Not enough of the turn left for an agent run - fallback reply
+        deadline.check(get_settings().turn_deadline_llm_seconds)
+        
+        # Warm the free slots cache while the model decides whether to book
+        get_calendar_availability().prefetch()
+        
         # Create and run agent
         agent = create_sofia_agent_fixed()
         result = await agent.ainvoke(state)
@@ -304,16 +319,21 @@ async def sofia_node(state: Dict[str, Any]) -> Dict[str, Any]:
             "messages": new_messages,  # Only new messages
             "appointment_status": result.get("appointment_status"),
             "appointment_id": result.get("appointment_id"),
-            "current_agent": "sofia"
+            "current_agent": "sofia",
+            "needs_escalation": False
         }
         
+    except (CircuitOpenError, TurnDeadlineExceeded) as e:
+        return create_fallback_response("Sofia", e)
+        
     except Exception as e:
         logger.error(f"Sofia error: {str(e)}", exc_info=True)
         error_response = create_error_response("sofia", e, state)
         # Sofia adds rerouting on errors
         error_response.update({
-            "needs_rerouting": True,
-            "escalation_reason": "error"
+            "needs_escalation": True,
+            "escalation_reason": "error",
+            "routing_attempts": state.get("routing_attempts", 0) + 1
         })
         return error_response
 
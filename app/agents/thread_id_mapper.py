@@ -6,9 +6,8 @@ Also handles message deduplication for LangGraph Cloud invocations
 from typing import Dict, Any, Optional
 from app.utils.simple_logger import get_logger
 from app.state.message_manager import MessageManager
-from app.utils.debug_helpers import log_state_transition, validate_state
+from app.utils.debug_helpers import log_state_transition, validate_state, should_instrument
 from app.utils.langsmith_debug import debug_node, log_to_langsmith, debug_state
-import copy
 
 logger = get_logger("thread_id_mapper")
 
@@ -23,8 +22,10 @@ async def thread_id_mapper_node(state: Dict[str, Any]) -> Dict[str, Any]:
     logger.info("=== ENHANCED THREAD ID MAPPER STARTING ===")
     logger.info(f"State keys: {list(state.keys())}")
     
-    # Log input state for debugging
-    log_state_transition(state, "thread_mapper", "input")
+    # Per-turn instrumentation is sampled; compiled out under python -O
+    instrument = __debug__ and should_instrument()
+    if instrument:
+        log_state_transition(state, "thread_mapper", "input")
     
     # Check for LangGraph Cloud pre-population issue
     messages = state.get("messages", [])
@@ -59,9 +60,10 @@ async def thread_id_mapper_node(state: Dict[str, Any]) -> Dict[str, Any]:
             # We'll let receptionist handle this by using MessageManager
     
     # Validate input state
-    validation = validate_state(state, "thread_mapper_input")
-    if not validation["valid"]:
-        logger.warning(f"Input validation issues: {validation['issues']}")
+    if instrument:
+        validation = validate_state(state, "thread_mapper_input")
+        if not validation["valid"]:
+            logger.warning(f"Input validation issues: {validation['issues']}")
     
     # Extract identifiers from various possible locations
     contact_id = (
@@ -111,41 +113,24 @@ async def thread_id_mapper_node(state: Dict[str, Any]) -> Dict[str, Any]:
     # Preserve original thread_id
     original_thread_id = state.get("thread_id", "no-original-thread-id")
     
-    # Create updated state
-    updated_state = copy.deepcopy(state)  # Deep copy to avoid mutations
-    
-    # Update thread IDs in state
-    updated_state["thread_id"] = new_thread_id
-    updated_state["mapped_thread_id"] = new_thread_id
-    updated_state["original_thread_id"] = original_thread_id
-    
-    # Ensure identifiers are in state
-    if contact_id:
-        updated_state["contact_id"] = contact_id
-    if conversation_id:
-        updated_state["conversation_id"] = conversation_id
-    
-    # CRITICAL: Attempt to override checkpoint configuration
+    # Build only the fields we return. The state is read, never copied:
+    # deep-copying it cost O(history) per turn just to rewrite a few strings
+    existing_config = state.get("__config__")
     config_updated = False
-    if "__config__" in updated_state:
-        # Deep copy the config to avoid mutations
-        updated_state["__config__"] = copy.deepcopy(updated_state["__config__"])
-        
-        # Ensure configurable exists
-        if "configurable" not in updated_state["__config__"]:
-            updated_state["__config__"]["configurable"] = {}
-        
-        # Override the thread_id in config
-        old_config_thread = updated_state["__config__"]["configurable"].get("thread_id", "none")
-        updated_state["__config__"]["configurable"]["thread_id"] = new_thread_id
+    if existing_config is not None:
+        # Shallow copies of the two levels we touch - nothing else is mutated
+        configurable = dict(existing_config.get("configurable") or {})
+        old_config_thread = configurable.get("thread_id", "none")
+        configurable["thread_id"] = new_thread_id
+        new_config = {**existing_config, "configurable": configurable}
         config_updated = True
         
         logger.info(f"✅ CRITICAL: Overrode config thread_id: {old_config_thread} → {new_thread_id}")
-        logger.info(f"Updated config: {updated_state['__config__']['configurable']}")
+        logger.info(f"Updated config: {configurable}")
     else:
         logger.warning("⚠️ No __config__ found in state - cannot override checkpoint config")
         # Try to inject config
-        updated_state["__config__"] = {
+        new_config = {
             "configurable": {
                 "thread_id": new_thread_id
             }
@@ -171,11 +156,12 @@ async def thread_id_mapper_node(state: Dict[str, Any]) -> Dict[str, Any]:
         "original_thread_id": original_thread_id,
         "contact_id": contact_id,
         "conversation_id": conversation_id,
-        "__config__": updated_state.get("__config__")
+        "__config__": new_config
     }
     
     # Log output for debugging
-    log_state_transition(result, "thread_mapper", "output")
+    if instrument:
+        log_state_transition(result, "thread_mapper", "output")
     
     return result
 
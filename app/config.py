@@ -52,9 +52,79 @@ class Settings(BaseSettings):
         default="ghl-langgraph-migration",
         env="LANGCHAIN_PROJECT"
     )
-    
+
+    # Trace export (debug metadata is shipped in batches off the request path)
+    trace_export_sink: str = Field(default="langsmith", env="TRACE_EXPORT_SINK")  # langsmith, jsonl, null
+    trace_export_path: str = Field(default="logs/trace_events.jsonl", env="TRACE_EXPORT_PATH")
+    trace_export_queue_size: int = Field(default=2000, env="TRACE_EXPORT_QUEUE_SIZE")
+    trace_export_batch_size: int = Field(default=100, env="TRACE_EXPORT_BATCH_SIZE")
+    trace_export_flush_interval: float = Field(default=1.0, env="TRACE_EXPORT_FLUSH_INTERVAL")  # seconds
+
+    # Per-turn state instrumentation (log_state_transition / validate_state)
+    debug_instrumentation: str = Field(default="sampled", env="DEBUG_INSTRUMENTATION")  # off, sampled, full
+    debug_sample_rate: float = Field(default=0.05, env="DEBUG_SAMPLE_RATE")
+
+    # Checkpointed history drops provider metadata from older, already-sent messages
+    checkpoint_strip_sent_metadata: bool = Field(default=True, env="CHECKPOINT_STRIP_SENT_METADATA")
+
+    # LLM backend: live OpenAI, or recorded responses keyed by prompt hash (benchmarks, offline tests)
+    llm_backend: str = Field(default="openai", env="LLM_BACKEND")  # openai, record, replay
+    llm_cassette_path: str = Field(default="benchmarks/fixtures/llm_cassette.jsonl", env="LLM_CASSETTE_PATH")
+    llm_replay_latency_ms: float = Field(default=0.0, env="LLM_REPLAY_LATENCY_MS")  # before the first token
+    llm_replay_tokens_per_sec: float = Field(default=0.0, env="LLM_REPLAY_TOKENS_PER_SEC")  # 0 = instant
+
+    # Calendar free slots cache (see app/tools/calendar_availability.py)
+    calendar_cache_ttl: float = Field(default=120.0, env="CALENDAR_CACHE_TTL")  # seconds an index may be served
+    calendar_refresh_after: float = Field(default=30.0, env="CALENDAR_REFRESH_AFTER")  # refreshed in the background after this
+    calendar_horizon_days: int = Field(default=7, env="CALENDAR_HORIZON_DAYS")
+
+    # Outbound send queue (see app/utils/outbound_queue.py)
+    outbound_queue_enabled: bool = Field(default=True, env="OUTBOUND_QUEUE_ENABLED")  # False = responder sends inline
+    outbound_max_attempts: int = Field(default=4, env="OUTBOUND_MAX_ATTEMPTS")
+    outbound_retry_backoff: float = Field(default=1.0, env="OUTBOUND_RETRY_BACKOFF")  # seconds, doubled per retry
+    outbound_max_concurrency: int = Field(default=50, env="OUTBOUND_MAX_CONCURRENCY")  # contacts sending at once
+    outbound_dead_letter_path: str = Field(default="logs/outbound_dead_letters.jsonl", env="OUTBOUND_DEAD_LETTER_PATH")
+
+    # Startup warmup (see app/utils/warmup.py) - readiness waits for it
+    warmup_enabled: bool = Field(default=True, env="WARMUP_ENABLED")
+    warmup_network: bool = Field(default=True, env="WARMUP_NETWORK")  # DNS + TLS to GHL and OpenAI
+    warmup_timeout: float = Field(default=20.0, env="WARMUP_TIMEOUT")  # seconds per step
+    warmup_preload_conversations: int = Field(default=200, env="WARMUP_PRELOAD_CONVERSATIONS")  # 0 = off
+
+    # Per-turn latency budget (see app/utils/deadline.py)
+    turn_deadline_seconds: float = Field(default=30.0, env="TURN_DEADLINE_SECONDS")  # ingress to reply, 0 = off
+    turn_deadline_llm_seconds: float = Field(default=4.0, env="TURN_DEADLINE_LLM_SECONDS")  # less left = fallback reply
+    turn_deadline_optional_seconds: float = Field(default=10.0, env="TURN_DEADLINE_OPTIONAL_SECONDS")  # less left = skip notes
+    turn_deadline_min_write_timeout: float = Field(default=5.0, env="TURN_DEADLINE_MIN_WRITE_TIMEOUT")  # seconds, GHL writes
+
+    # Circuit breakers for OpenAI and GHL (see app/utils/circuit_breaker.py)
+    circuit_breaker_failure_threshold: int = Field(default=5, env="CIRCUIT_BREAKER_FAILURE_THRESHOLD")  # consecutive failures, 0 = off
+    circuit_breaker_reset_timeout: float = Field(default=30.0, env="CIRCUIT_BREAKER_RESET_TIMEOUT")  # seconds open before a probe
+    circuit_breaker_half_open_max: int = Field(default=1, env="CIRCUIT_BREAKER_HALF_OPEN_MAX")  # probe calls at a time
+    deferred_side_effects_path: str = Field(default="data/deferred_side_effects.db", env="DEFERRED_SIDE_EFFECTS_PATH")
+    deferred_side_effects_max_attempts: int = Field(default=10, env="DEFERRED_SIDE_EFFECTS_MAX_ATTEMPTS")
+
+    # Local conversation archive (see app/state/conversation_archive.py)
+    conversation_archive_enabled: bool = Field(default=True, env="CONVERSATION_ARCHIVE_ENABLED")  # False = GHL every turn
+    conversation_archive_path: str = Field(default="data/conversations.db", env="CONVERSATION_ARCHIVE_PATH")
+    conversation_archive_max_age: float = Field(default=900.0, env="CONVERSATION_ARCHIVE_MAX_AGE")  # seconds after a GHL sync
+    conversation_archive_recent_limit: int = Field(default=50, env="CONVERSATION_ARCHIVE_RECENT_LIMIT")  # messages per conversation
+
+    # Inbound webhook de-duplication (see app/utils/webhook_dedup.py)
+    webhook_dedup_enabled: bool = Field(default=True, env="WEBHOOK_DEDUP_ENABLED")
+    webhook_dedup_ttl: float = Field(default=86400.0, env="WEBHOOK_DEDUP_TTL")  # seconds, messageId/timestamp keys
+    webhook_dedup_weak_ttl: float = Field(default=120.0, env="WEBHOOK_DEDUP_WEAK_TTL")  # seconds, body-only keys
+    webhook_dedup_max_entries: int = Field(default=10000, env="WEBHOOK_DEDUP_MAX_ENTRIES")
+    webhook_dedup_backend: str = Field(default="memory", env="WEBHOOK_DEDUP_BACKEND")  # memory, redis (uses REDIS_URL)
+
     # Redis (optional for message batching)
     redis_url: Optional[str] = Field(default=None, env="REDIS_URL")
+
+    # Checkpointer (see app/state/redis_checkpointer.py)
+    checkpointer_backend: str = Field(default="memory", env="CHECKPOINTER_BACKEND")  # memory, redis (uses REDIS_URL)
+    checkpoint_ttl: int = Field(default=604800, env="CHECKPOINT_TTL")  # seconds an idle thread is kept (memory or Redis)
+    thread_lease_ttl: float = Field(default=30.0, env="THREAD_LEASE_TTL")  # seconds, renewed while a turn runs
+    thread_lease_wait: float = Field(default=60.0, env="THREAD_LEASE_WAIT")  # seconds to wait for a busy thread
     
     # Custom Field IDs
     lead_score_field_id: str = Field(
@@ -97,6 +167,7 @@ class Settings(BaseSettings):
     # Agent Configuration
     cold_lead_threshold: int = Field(default=4, env="COLD_LEAD_THRESHOLD")
     warm_lead_threshold: int = Field(default=7, env="WARM_LEAD_THRESHOLD")
+    max_escalation_hops: int = Field(default=2, env="MAX_ESCALATION_HOPS")  # agent-to-agent re-routes per turn (see app/agents/escalation.py)
     
     # Enhanced Features Configuration
     enable_streaming: bool = Field(default=True, env="ENABLE_STREAMING")
@@ -107,6 +178,18 @@ class Settings(BaseSettings):
     
     # Model Configuration
     openai_model: str = Field(default="gpt-4-turbo", env="OPENAI_MODEL")
+    # Per-task model tiers with p95 fallback (see app/utils/model_tiers.py)
+    model_tiering_enabled: bool = Field(default=True, env="MODEL_TIERING_ENABLED")  # False = openai_model everywhere
+    model_tiers: str = Field(default="", env="MODEL_TIERS")  # JSON merged over DEFAULT_TASK_PROFILES
+    model_tier_window: int = Field(default=200, env="MODEL_TIER_WINDOW")  # latest calls per task and model
+    model_tier_min_samples: int = Field(default=20, env="MODEL_TIER_MIN_SAMPLES")
+    model_tier_cooldown: float = Field(default=300.0, env="MODEL_TIER_COOLDOWN")  # seconds before a demoted model is retried
+    # Hedged LLM requests (see app/utils/hedging.py) - opt-in
+    llm_hedging_enabled: bool = Field(default=False, env="LLM_HEDGING_ENABLED")
+    llm_hedge_percentile: float = Field(default=0.9, env="LLM_HEDGE_PERCENTILE")  # hedge calls slower than this
+    llm_hedge_budget: float = Field(default=0.05, env="LLM_HEDGE_BUDGET")  # hedges per call
+    llm_hedge_min_samples: int = Field(default=20, env="LLM_HEDGE_MIN_SAMPLES")
+    llm_hedge_min_delay_ms: float = Field(default=200.0, env="LLM_HEDGE_MIN_DELAY_MS")
     streaming_enabled: bool = Field(default=True, env="STREAMING_ENABLED")
     max_tokens_per_message: int = Field(default=4000, env="MAX_TOKENS_PER_MESSAGE")
     
@@ -2,12 +2,15 @@
 LangGraph API Server Entry Point
 This file is loaded by LangGraph deployment
 """
-from app.workflow import workflow
+from app.workflow import get_workflow
 
-# Export workflow for LangGraph API
-graph = workflow
 
-# Also export as 'agent' which is what langgraph.json references
-agent = workflow
+def __getattr__(name: str):
+    # Export workflow for LangGraph API - as 'graph', and as 'agent' which is
+    # what langgraph.json references. Compiled on first access
+    if name in ("graph", "agent", "workflow"):
+        return get_workflow()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-__all__ = ["graph", "agent", "workflow"]
\ No newline at end of file
+
+__all__ = ["graph", "agent", "workflow"]
@@ -1,4 +1,9 @@
 """State module - exports state definitions"""
+from app.state.message_channel import AppendOnlyMessages
+from app.state.message_record import MessageRecord
+from app.state.checkpointer import ContentAddressedSaver
+from app.state.redis_checkpointer import RedisSaver
+from app.state.conversation_archive import ConversationArchive
 
-# Empty for now since we define ProductionState directly in workflow.py
-__all__ = []
\ No newline at end of file
+# ProductionState itself is defined in workflow.py
+__all__ = ["AppendOnlyMessages", "MessageRecord", "ContentAddressedSaver", "RedisSaver", "ConversationArchive"]
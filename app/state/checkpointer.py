@@ -0,0 +1,350 @@
+"""
+Content-Addressed Checkpoint Saver
+In-memory saver that stores each message record once per thread instead of
+re-serializing the full history on every super-step
+
+- Channel blobs are written only for channels whose version changed
+- The messages channel (chunks of record tuples from AppendOnlyMessages) is
+  stored as digests into a per-thread record store
+- Threads idle for longer than ttl are dropped, like the TTL on RedisSaver
+  keys, and the decoded-record caches are kept for the most recently used
+  threads only
+"""
+import hashlib
+import random
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+
+from app.state.message_channel import CHUNK_SIZE
+
+Typed = Tuple[str, bytes]  # serde.dumps_typed output
+Known = Dict[int, Tuple[Any, bytes]]  # id(obj) -> (obj, digest); the object is kept so its id stays valid
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class _ThreadStore:
+    """Everything stored for one thread"""
+
+    __slots__ = ("checkpoints", "blobs", "writes", "message_blobs", "chunk_index", "used")
+
+    def __init__(self):
+        # checkpoint_ns -> checkpoint_id -> (checkpoint, metadata, parent checkpoint_id)
+        self.checkpoints: Dict[str, Dict[str, Tuple[Typed, Typed, Optional[str]]]] = defaultdict(dict)
+        # (checkpoint_ns, channel, version) -> value
+        self.blobs: Dict[Tuple[str, str, Any], Typed] = {}
+        # (checkpoint_ns, checkpoint_id) -> (task_id, idx) -> (task_id, channel, value, task_path)
+        self.writes: Dict[Tuple[str, str], Dict[Tuple[str, int], Tuple[str, str, Typed, str]]] = defaultdict(dict)
+        # digest -> serialized record
+        self.message_blobs: Dict[bytes, Typed] = {}
+        # chunk digest -> member digests of a full chunk
+        self.chunk_index: Dict[bytes, List[bytes]] = {}
+        self.used = time.monotonic()
+
+
+class ContentAddressedSaver(BaseCheckpointSaver[str]):
+    """
+    In-memory LangGraph checkpointer with a per-thread content-addressed message store
+
+    The messages channel changes on every super-step. Its value is stored as
+    digests: each record is serialized (msgpack, via the default
+    JsonPlusSerializer) and hashed once, then looked up by identity on every
+    later checkpoint. Full chunks are addressed by a single digest over their
+    members, so a checkpoint references ~n/CHUNK_SIZE chunks plus the open
+    tail. Other channels are stored as plain serialized values.
+
+    Args:
+        ttl: Seconds an idle thread is kept (None keeps threads until deleted)
+        max_cached_threads: Threads whose encoded / decoded records are kept
+            for reuse; older ones are re-serialized on their next checkpoint
+    """
+
+    def __init__(self, ttl: Optional[float] = 7 * 86400, max_cached_threads: int = 1000, serde: Any = None):
+        super().__init__(serde=serde)
+        self.ttl = ttl
+        self.max_cached_threads = max_cached_threads
+        # thread_id -> stored thread, least recently used first
+        self.threads: "OrderedDict[str, _ThreadStore]" = OrderedDict()
+        # thread_id -> (known records and full chunks, digest -> decoded record)
+        self._caches: "OrderedDict[str, Tuple[Known, Dict[bytes, Any]]]" = OrderedDict()
+        self.stats = {"records_serialized": 0, "records_reused": 0, "threads_expired": 0}
+
+    # ---- threads ----
+    def _thread(self, thread_id: str, create: bool = False) -> Optional[_ThreadStore]:
+        now = time.monotonic()
+        self._expire(now)
+        store = self.threads.get(thread_id)
+        if store is None:
+            if not create:
+                return None
+            store = self.threads[thread_id] = _ThreadStore()
+        store.used = now
+        self.threads.move_to_end(thread_id)
+        return store
+
+    def _expire(self, now: float) -> None:
+        if self.ttl is None:
+            return
+        while self.threads:
+            thread_id, store = next(iter(self.threads.items()))
+            if now - store.used < self.ttl:
+                return
+            self.delete_thread(thread_id)
+            self.stats["threads_expired"] += 1
+
+    def _cache(self, thread_id: str) -> Tuple[Known, Dict[bytes, Any]]:
+        cache = self._caches.get(thread_id)
+        if cache is None:
+            cache = self._caches[thread_id] = ({}, {})
+            while len(self._caches) > self.max_cached_threads:
+                self._caches.popitem(last=False)
+        self._caches.move_to_end(thread_id)
+        return cache
+
+    # ---- encoding ----
+    def _record_digest(self, store: _ThreadStore, known: Known, record: Any) -> bytes:
+        hit = known.get(id(record))
+        if hit is not None and hit[0] is record:
+            self.stats["records_reused"] += 1
+            return hit[1]
+
+        typed = self.serde.dumps_typed(record)
+        digest = _digest(typed[1])
+        store.message_blobs.setdefault(digest, typed)
+        known[id(record)] = (record, digest)
+        self.stats["records_serialized"] += 1
+        return digest
+
+    def _chunk_digest(self, store: _ThreadStore, known: Known, chunk: Any) -> bytes:
+        hit = known.get(id(chunk))
+        if hit is not None and hit[0] is chunk:
+            return hit[1]
+
+        members = [self._record_digest(store, known, record) for record in chunk]
+        digest = _digest(b"".join(members))
+        store.chunk_index.setdefault(digest, members)
+        known[id(chunk)] = (chunk, digest)
+        return digest
+
+    def _encode_channel(self, thread_id: str, store: _ThreadStore, value: Any) -> Any:
+        if not (isinstance(value, dict) and "chunks" in value):
+            return value
+        known, _ = self._cache(thread_id)
+        full, tail = [], []
+        for chunk in value["chunks"]:
+            if len(chunk) == CHUNK_SIZE:
+                full.append(self._chunk_digest(store, known, chunk))
+            else:
+                tail = [self._record_digest(store, known, record) for record in chunk]
+        return {"chunk_refs": full, "tail_refs": tail}
+
+    def _load_record(self, store: _ThreadStore, cache: Tuple[Known, Dict[bytes, Any]], digest: bytes) -> Any:
+        known, records = cache
+        record = records.get(digest)
+        if record is None:
+            record = records[digest] = self.serde.loads_typed(store.message_blobs[digest])
+            known[id(record)] = (record, digest)
+        return record
+
+    def _decode_channel(self, thread_id: str, store: _ThreadStore, value: Any) -> Any:
+        if not (isinstance(value, dict) and "chunk_refs" in value):
+            return value
+        cache = self._cache(thread_id)
+        chunks = [
+            [self._load_record(store, cache, digest) for digest in store.chunk_index[chunk_digest]]
+            for chunk_digest in value["chunk_refs"]
+        ]
+        if value["tail_refs"]:
+            chunks.append([self._load_record(store, cache, digest) for digest in value["tail_refs"]])
+        return {"chunks": chunks}
+
+    # ---- reads ----
+    def _tuple(self, thread_id: str, store: _ThreadStore, checkpoint_ns: str, checkpoint_id: str) -> CheckpointTuple:
+        saved, metadata, parent = store.checkpoints[checkpoint_ns][checkpoint_id]
+        checkpoint: Checkpoint = self.serde.loads_typed(saved)
+        values: Dict[str, Any] = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            blob = store.blobs.get((checkpoint_ns, channel, version))
+            if blob is not None and blob[0] != "empty":
+                values[channel] = self._decode_channel(thread_id, store, self.serde.loads_typed(blob))
+        writes = store.writes.get((checkpoint_ns, checkpoint_id), {})
+
+        def cfg(cid: str) -> RunnableConfig:
+            return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": cid}}
+
+        return CheckpointTuple(
+            config=cfg(checkpoint_id),
+            checkpoint={**checkpoint, "channel_values": values},
+            metadata=self.serde.loads_typed(metadata),
+            parent_config=cfg(parent) if parent else None,
+            pending_writes=[
+                (writes[key][0], writes[key][1], self.serde.loads_typed(writes[key][2]))
+                for key in sorted(writes, key=lambda key: writes_sort_key(writes[key][3], *key))
+            ],
+        )
+
+    @staticmethod
+    def _matches(metadata: CheckpointMetadata, filter: Optional[Dict[str, Any]]) -> bool:
+        return not filter or all(metadata.get(k) == v for k, v in filter.items())
+
+    # ---- BaseCheckpointSaver: sync ----
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        store = self._thread(thread_id)
+        checkpoints = store.checkpoints.get(checkpoint_ns) if store else None
+        if not checkpoints:
+            return None
+        checkpoint_id = get_checkpoint_id(config) or max(checkpoints)
+        if checkpoint_id not in checkpoints:
+            return None
+        return self._tuple(thread_id, store, checkpoint_ns, checkpoint_id)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        if config:
+            thread_id = config["configurable"]["thread_id"]
+            store = self._thread(thread_id)
+            stores = [(thread_id, store)] if store else []
+        else:
+            self._expire(time.monotonic())
+            stores = list(self.threads.items())
+        checkpoint_ns = config["configurable"].get("checkpoint_ns") if config else None
+        only = get_checkpoint_id(config) if config else None
+        before_id = get_checkpoint_id(before) if before else None
+        for thread_id, store in stores:
+            for ns, checkpoints in list(store.checkpoints.items()):
+                if checkpoint_ns is not None and ns != checkpoint_ns:
+                    continue
+                for checkpoint_id in sorted(checkpoints, reverse=True):
+                    if (only and checkpoint_id != only) or (before_id and checkpoint_id >= before_id):
+                        continue
+                    if not self._matches(self.serde.loads_typed(checkpoints[checkpoint_id][1]), filter):
+                        continue
+                    if limit is not None:
+                        if limit <= 0:
+                            return
+                        limit -= 1
+                    yield self._tuple(thread_id, store, ns, checkpoint_id)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        store = self._thread(thread_id, create=True)
+        c = checkpoint.copy()
+        values: Dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+        for channel, version in new_versions.items():
+            store.blobs[(checkpoint_ns, channel, version)] = (
+                self.serde.dumps_typed(self._encode_channel(thread_id, store, values[channel]))
+                if channel in values else ("empty", b"")
+            )
+        store.checkpoints[checkpoint_ns][checkpoint["id"]] = (
+            self.serde.dumps_typed(c),
+            self.serde.dumps_typed(get_checkpoint_metadata(config, metadata)),
+            config["configurable"].get("checkpoint_id"),
+        )
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        store = self._thread(config["configurable"]["thread_id"], create=True)
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        stored = store.writes[(checkpoint_ns, config["configurable"]["checkpoint_id"])]
+        for idx, (channel, value) in enumerate(writes):
+            key = (task_id, WRITES_IDX_MAP.get(channel, idx))
+            # Regular writes are kept from the first attempt, special ones (errors, interrupts) replaced
+            if key[1] >= 0 and key in stored:
+                continue
+            stored[key] = (task_id, channel, self.serde.dumps_typed(value), task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.threads.pop(thread_id, None)
+        self._caches.pop(thread_id, None)
+
+    # ---- BaseCheckpointSaver: async (everything is in memory) ----
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for found in self.list(config, filter=filter, before=before, limit=limit):
+            yield found
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+# Export
+__all__ = ["ContentAddressedSaver"]
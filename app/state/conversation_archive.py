@@ -0,0 +1,386 @@
+"""
+Local Conversation Archive
+Keeps each conversation's messages locally so the receptionist doesn't have
+to fetch the full history from GHL on every turn
+
+- Append-only: messages are only ever added. A sync from GHL appends the
+  full GHL history as a new epoch and reads only look at the latest epoch,
+  so nothing is rewritten and replies sent through GHL by a human still show
+  up after the next sync
+- Reads of recent history come from an in-process LRU of conversations;
+  misses are one indexed query on (conversation, epoch, time)
+- Writes are batched: record() returns immediately and a background task
+  flushes pending messages in one transaction
+- A conversation is fresh for archive_max_age seconds after its last GHL
+  sync; after that the caller reloads from GHL and imports the result
+
+Backends implement write/read/close; SQLiteArchiveBackend (WAL) is the default.
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Protocol, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from app.utils.simple_logger import get_logger
+
+logger = get_logger("conversation_archive")
+
+
+@dataclass
+class ArchivedMessage:
+    """One message of a conversation"""
+    conversation_id: str
+    role: str  # human, ai
+    content: str
+    created_at: float = field(default_factory=time.time)
+    contact_id: str = ""
+    message_id: Optional[str] = None
+    source: str = "webhook"  # webhook, agent, ghl
+    epoch: int = 0
+
+
+@dataclass
+class ConversationMeta:
+    """Where a conversation's current epoch starts and when it was last synced with GHL"""
+    conversation_id: str
+    contact_id: str = ""
+    epoch: int = 0
+    synced_at: Optional[float] = None
+    updated_at: float = field(default_factory=time.time)
+
+
+class ArchiveBackend(Protocol):
+    def write(self, messages: List[ArchivedMessage], conversations: List[ConversationMeta]) -> None: ...
+
+    def read(self, conversation_id: str, limit: int, since: Optional[float] = None
+             ) -> Tuple[Optional[ConversationMeta], List[ArchivedMessage]]: ...
+
+    def recent_conversations(self, limit: int) -> List[str]: ...
+
+    def close(self) -> None: ...
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    conversation_id TEXT NOT NULL,
+    epoch INTEGER NOT NULL,
+    contact_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    message_id TEXT,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_by_conversation ON messages (conversation_id, epoch, created_at);
+CREATE TABLE IF NOT EXISTS conversations (
+    conversation_id TEXT PRIMARY KEY,
+    contact_id TEXT NOT NULL,
+    epoch INTEGER NOT NULL,
+    synced_at REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS conversations_by_activity ON conversations (updated_at);
+"""
+
+
+class SQLiteArchiveBackend:
+    """SQLite file in WAL mode - readers don't block the background writer"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def write(self, messages: List[ArchivedMessage], conversations: List[ConversationMeta]) -> None:
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    "INSERT INTO messages (conversation_id, epoch, contact_id, role, content, created_at, message_id, source) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(m.conversation_id, m.epoch, m.contact_id, m.role, m.content, m.created_at, m.message_id, m.source)
+                     for m in messages],
+                )
+                self._db.executemany(
+                    "INSERT INTO conversations (conversation_id, contact_id, epoch, synced_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (conversation_id) DO UPDATE SET contact_id = excluded.contact_id, epoch = excluded.epoch, "
+                    "synced_at = excluded.synced_at, updated_at = excluded.updated_at",
+                    [(c.conversation_id, c.contact_id, c.epoch, c.synced_at, c.updated_at) for c in conversations],
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def read(self, conversation_id: str, limit: int, since: Optional[float] = None
+             ) -> Tuple[Optional[ConversationMeta], List[ArchivedMessage]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT contact_id, epoch, synced_at, updated_at FROM conversations WHERE conversation_id = ?",
+                (conversation_id,),
+            ).fetchone()
+            if row is None:
+                return None, []
+            meta = ConversationMeta(conversation_id, row[0], row[1], row[2], row[3])
+            rows = self._db.execute(
+                "SELECT role, content, created_at, contact_id, message_id, source FROM messages "
+                "WHERE conversation_id = ? AND epoch = ? AND created_at >= ? "
+                "ORDER BY created_at DESC, seq DESC LIMIT ?",
+                (conversation_id, meta.epoch, since or 0.0, limit),
+            ).fetchall()
+        messages = [
+            ArchivedMessage(conversation_id, r[0], r[1], r[2], r[3], r[4], r[5], meta.epoch)
+            for r in reversed(rows)
+        ]
+        return meta, messages
+
+    def recent_conversations(self, limit: int) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT conversation_id FROM conversations ORDER BY updated_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class _Cached:
+    def __init__(self, meta: ConversationMeta, messages: List[ArchivedMessage], limit: int):
+        self.meta = meta
+        self.messages: Deque[ArchivedMessage] = deque(messages, maxlen=limit)
+
+
+class ConversationArchive:
+    """
+    Recent history per conversation, cached in process and persisted in batches
+
+    Args:
+        backend: Storage (SQLiteArchiveBackend by default)
+        max_age: Seconds after a GHL sync that the archive is trusted
+        cache_messages: Recent messages kept in memory per conversation
+        cache_conversations: Conversations kept in memory
+        flush_interval: Seconds the background writer waits to batch writes
+    """
+
+    def __init__(
+        self,
+        backend: ArchiveBackend,
+        max_age: float = 900.0,
+        cache_messages: int = 50,
+        cache_conversations: int = 5000,
+        flush_interval: float = 0.2,
+    ):
+        self.backend = backend
+        self.max_age = max_age
+        self.cache_messages = cache_messages
+        self.cache_conversations = cache_conversations
+        self.flush_interval = flush_interval
+        self._cache: "OrderedDict[str, _Cached]" = OrderedDict()
+        self._pending: List[ArchivedMessage] = []
+        self._pending_meta: Dict[str, ConversationMeta] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "misses": 0, "flushes": 0, "written": 0}
+
+    # ---- reads ----
+    def _conversation(self, conversation_id: str) -> Optional[_Cached]:
+        cached = self._cache.get(conversation_id)
+        if cached is not None:
+            self._cache.move_to_end(conversation_id)
+            self.stats["hits"] += 1
+            return cached
+        self.stats["misses"] += 1
+        meta, messages = self.backend.read(conversation_id, self.cache_messages)
+        if meta is None:
+            return None
+        # Not flushed yet means not in the backend's answer either
+        messages += [m for m in self._pending if m.conversation_id == conversation_id and m.epoch == meta.epoch]
+        return self._remember(_Cached(meta, messages, self.cache_messages))
+
+    def _remember(self, cached: _Cached) -> _Cached:
+        self._cache[cached.meta.conversation_id] = cached
+        self._cache.move_to_end(cached.meta.conversation_id)
+        while len(self._cache) > self.cache_conversations:
+            self._cache.popitem(last=False)
+        return cached
+
+    def is_fresh(self, conversation_id: str) -> bool:
+        """True if the archive was synced with GHL within max_age"""
+        cached = self._conversation(conversation_id)
+        return bool(cached and cached.meta.synced_at and time.time() - cached.meta.synced_at < self.max_age)
+
+    def recent(self, conversation_id: str, limit: Optional[int] = None) -> List[ArchivedMessage]:
+        """Latest messages of the conversation, oldest first"""
+        cached = self._conversation(conversation_id)
+        if cached is None:
+            return []
+        messages = list(cached.messages)
+        return messages[-limit:] if limit else messages
+
+    def history(self, conversation_id: str, since: Optional[float] = None, limit: int = 1000) -> List[ArchivedMessage]:
+        """Older or time-bounded history straight from the backend (includes flushed writes only)"""
+        return self.backend.read(conversation_id, limit, since)[1]
+
+    def read_recent(self, limit: int) -> List[Tuple[ConversationMeta, List[ArchivedMessage]]]:
+        """Backend reads for the most recently active conversations; leaves the cache alone, so it can run in a thread"""
+        loaded = []
+        for conversation_id in self.backend.recent_conversations(min(limit, self.cache_conversations)):
+            meta, messages = self.backend.read(conversation_id, self.cache_messages)
+            if meta is not None:
+                loaded.append((meta, messages))
+        return loaded
+
+    def fill(self, loaded: List[Tuple[ConversationMeta, List[ArchivedMessage]]]) -> int:
+        """Cache what read_recent returned; conversations cached in the meantime keep their newer state"""
+        filled = 0
+        for meta, messages in loaded:
+            if meta.conversation_id in self._cache:
+                continue
+            messages += [m for m in self._pending if m.conversation_id == meta.conversation_id and m.epoch == meta.epoch]
+            self._remember(_Cached(meta, messages, self.cache_messages))
+            filled += 1
+        return filled
+
+    def preload(self, limit: int) -> int:
+        """Load the most recently active conversations into the cache (warmup)"""
+        return self.fill(self.read_recent(limit))
+
+    # ---- writes ----
+    def record(self, conversation_id: str, role: str, content: str, contact_id: str = "",
+               message_id: Optional[str] = None, source: str = "webhook") -> ArchivedMessage:
+        """Append a message to the current epoch; persisted by the background writer"""
+        cached = self._conversation(conversation_id) or self._remember(
+            _Cached(ConversationMeta(conversation_id, contact_id), [], self.cache_messages))
+        message = ArchivedMessage(conversation_id, role, content, contact_id=contact_id or cached.meta.contact_id,
+                                  message_id=message_id, source=source, epoch=cached.meta.epoch)
+        cached.messages.append(message)
+        cached.meta.updated_at = message.created_at
+        self._enqueue([message], cached.meta)
+        return message
+
+    def import_history(self, conversation_id: str, contact_id: str, messages: List[ArchivedMessage]) -> None:
+        """Start a new epoch from a full GHL history and mark the conversation synced"""
+        cached = self._conversation(conversation_id)
+        meta = ConversationMeta(conversation_id, contact_id, (cached.meta.epoch + 1) if cached else 1, synced_at=time.time())
+        messages = sorted(messages, key=lambda m: m.created_at)
+        for message in messages:
+            message.conversation_id, message.epoch = conversation_id, meta.epoch
+            message.contact_id = message.contact_id or contact_id
+        self._remember(_Cached(meta, messages[-self.cache_messages:], self.cache_messages))
+        self._enqueue(messages, meta)
+
+    def _enqueue(self, messages: List[ArchivedMessage], meta: ConversationMeta) -> None:
+        self._pending.extend(messages)
+        self._pending_meta[meta.conversation_id] = meta
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_sync()  # No event loop (scripts) - write through
+            return
+        if self._flusher is None or self._flusher.done() or self._flusher.get_loop() is not loop:
+            self._flusher = loop.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    def _take(self) -> Tuple[List[ArchivedMessage], List[ConversationMeta]]:
+        messages, self._pending = self._pending, []
+        metas, self._pending_meta = list(self._pending_meta.values()), {}
+        return messages, metas
+
+    def _write(self, messages: List[ArchivedMessage], metas: List[ConversationMeta]) -> None:
+        if not messages and not metas:
+            return
+        self.backend.write(messages, metas)
+        self.stats["flushes"] += 1
+        self.stats["written"] += len(messages)
+
+    async def flush(self) -> None:
+        """Write pending messages now (in a worker thread)"""
+        messages, metas = self._take()
+        try:
+            await asyncio.to_thread(self._write, messages, metas)
+        except Exception as e:
+            logger.error(f"Archive flush of {len(messages)} messages failed: {e}")
+            # Keep them for the next flush, in order
+            self._pending[:0] = messages
+            for meta in metas:
+                self._pending_meta.setdefault(meta.conversation_id, meta)
+
+    def flush_sync(self) -> None:
+        self._write(*self._take())
+
+    async def close(self) -> None:
+        await self.flush()
+        self.backend.close()
+
+
+def to_langchain(messages: List[ArchivedMessage]) -> List[BaseMessage]:
+    return [HumanMessage(content=m.content) if m.role == "human" else AIMessage(content=m.content) for m in messages]
+
+
+def from_ghl(ghl_messages: List[Dict[str, Any]], conversation_id: str = "") -> List[ArchivedMessage]:
+    """GHL /conversations/{id}/messages entries as archive messages"""
+    archived = []
+    for index, msg in enumerate(ghl_messages):
+        if not isinstance(msg, dict):
+            continue
+        created = msg.get("dateAdded")
+        try:
+            created_at = datetime.fromisoformat(str(created).replace("Z", "+00:00")).timestamp()
+        except (TypeError, ValueError):
+            created_at = time.time() - (len(ghl_messages) - index) * 1e-3  # keep order
+        archived.append(ArchivedMessage(
+            conversation_id=conversation_id,
+            role="ai" if msg.get("direction") == "outbound" else "human",
+            content=msg.get("body", ""),
+            created_at=created_at,
+            contact_id=msg.get("contactId", ""),
+            message_id=msg.get("id"),
+            source="ghl",
+        ))
+    return archived
+
+
+_archive: Optional[ConversationArchive] = None
+
+
+def get_conversation_archive() -> ConversationArchive:
+    """Process-wide archive from settings, created on first use"""
+    global _archive
+    if _archive is None:
+        from app.config import get_settings
+        settings = get_settings()
+        _archive = ConversationArchive(
+            SQLiteArchiveBackend(settings.conversation_archive_path),
+            max_age=settings.conversation_archive_max_age,
+            cache_messages=settings.conversation_archive_recent_limit,
+        )
+    return _archive
+
+
+# Export
+__all__ = [
+    "ArchiveBackend",
+    "ArchivedMessage",
+    "ConversationArchive",
+    "ConversationMeta",
+    "SQLiteArchiveBackend",
+    "from_ghl",
+    "get_conversation_archive",
+    "to_langchain",
+]
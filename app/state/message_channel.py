@@ -0,0 +1,142 @@
+"""
+Append-Only Message Channel
+Replaces the `lambda x, y: x + y` reducer, which rebuilt the whole history
+list on every node write
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage
+from langgraph.channels.base import MISSING, BaseChannel
+
+from app.state.message_record import compact_messages, expand_messages
+
+# Messages per frozen checkpoint chunk
+CHUNK_SIZE = 64
+
+
+@lru_cache()
+def _strip_sent_metadata() -> bool:
+    from app.config import get_settings
+    return get_settings().checkpoint_strip_sent_metadata
+
+
+class AppendOnlyMessages(BaseChannel[List[BaseMessage], Any, Dict[str, Any]]):
+    """
+    Message channel with O(1) amortized appends and chunked snapshots.
+
+    The value nodes read is a plain list (so `create_react_agent`,
+    `add_messages` and slicing keep working) that is extended in place.
+    Treat it as read-only - return new messages from nodes instead.
+
+    Checkpoints are chunks of compact record tuples (see message_record).
+    Each message is encoded once and the record objects are reused by every
+    later snapshot, which lets ContentAddressedSaver store each one once.
+    Full chunks of CHUNK_SIZE are older history that was already sent, so
+    provider metadata is stripped from them unless
+    CHECKPOINT_STRIP_SENT_METADATA is off.
+
+    Usage:
+        messages: Annotated[List[BaseMessage], AppendOnlyMessages]
+    """
+
+    __slots__ = ("value", "_frozen", "_tail", "_shared")
+
+    def __init__(self, typ: Any = list):
+        super().__init__(typ)
+        self.value: List[BaseMessage] = []
+        self._frozen: List[Tuple[Any, ...]] = []  # Encoded full chunks
+        self._tail: List[Any] = []  # Encoded records of the open chunk, stable across snapshots
+        self._shared = False  # Buffer is also referenced by a copy()
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, AppendOnlyMessages)
+
+    @property
+    def ValueType(self) -> Any:
+        return self.typ
+
+    @property
+    def UpdateType(self) -> Any:
+        return self.typ
+
+    def copy(self) -> "AppendOnlyMessages":
+        """Copy-on-write: both channels share the buffer until one appends"""
+        twin = self.__class__(self.typ)
+        twin.key = self.key
+        twin.value = self.value
+        twin._frozen = self._frozen
+        twin._tail = self._tail
+        twin._shared = self._shared = True
+        return twin
+
+    def from_checkpoint(self, checkpoint: Any) -> "AppendOnlyMessages":
+        channel = self.__class__(self.typ)
+        channel.key = self.key
+        if isinstance(checkpoint, dict) and "chunks" in checkpoint:
+            for chunk in checkpoint["chunks"]:
+                channel.value.extend(expand_messages(chunk))
+            channel._reuse_records(checkpoint["chunks"])
+        elif checkpoint is not MISSING and checkpoint:
+            # Checkpoints written by the old list reducer
+            channel.value.extend(checkpoint)
+        return channel
+
+    def update(self, values: Sequence[Any]) -> bool:
+        if not values:
+            return False
+        if self._shared:
+            self.value = list(self.value)
+            self._frozen = list(self._frozen)
+            self._tail = list(self._tail)
+            self._shared = False
+        for value in values:
+            if isinstance(value, (list, tuple)):
+                self.value.extend(value)
+            elif value is not None:
+                self.value.append(value)
+        return True
+
+    def get(self) -> List[BaseMessage]:
+        return self.value
+
+    def is_available(self) -> bool:
+        return True
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """Snapshot reusing encoded records; only messages added since the last one are encoded"""
+        frozen, tail = self._frozen, self._tail
+        start = len(frozen) * CHUNK_SIZE
+        encoded = start + len(tail)
+        if encoded < len(self.value):
+            tail.extend(compact_messages(self.value[encoded:]))
+        while len(tail) >= CHUNK_SIZE:
+            frozen.append(self._freeze(self.value[start:start + CHUNK_SIZE], tail[:CHUNK_SIZE]))
+            del tail[:CHUNK_SIZE]
+            start += CHUNK_SIZE
+        chunks: List[Tuple[Any, ...]] = list(frozen)
+        if tail:
+            chunks.append(tuple(tail))
+        return {"chunks": chunks}
+
+    @staticmethod
+    def _freeze(messages: List[BaseMessage], records: List[Any]) -> Tuple[Any, ...]:
+        """Encode a full chunk for good, keeping record objects that stripping doesn't change"""
+        if not _strip_sent_metadata():
+            return tuple(records)
+        stripped = compact_messages(messages, strip_metadata=True)
+        return tuple(old if tuple(old) == new else new for old, new in zip(records, stripped))
+
+    def _reuse_records(self, chunks: List[Any]) -> None:
+        """Keep restored record objects so the next snapshot doesn't re-encode history"""
+        if any(isinstance(record, BaseMessage) for chunk in chunks for record in chunk):
+            return  # Older checkpoint format - encode lazily instead
+        for chunk in chunks:
+            if len(chunk) == CHUNK_SIZE and not self._tail:
+                self._frozen.append(tuple(chunk))
+            else:
+                self._tail.extend(chunk)
+
+
+# Export
+__all__ = ["AppendOnlyMessages", "CHUNK_SIZE"]
@@ -15,7 +15,7 @@ class MessageManager:
         """
         Replace current messages with new messages in a way that works with append reducer
         
-        Since LangGraph uses `lambda x, y: x + y` for messages, we can't replace directly.
+        Since the messages channel is append-only (AppendOnlyMessages), we can't replace directly.
         Instead, we return only the NEW messages that aren't already in the state.
         """
         # Convert messages to comparable format
@@ -0,0 +1,174 @@
+"""
+Compact Message Records - checkpoint representation of conversation history
+
+LangChain messages carry a lot per object (pydantic model, additional_kwargs,
+response_metadata, usage_metadata, repeated agent names). History stored in
+checkpoints only needs role, content, name, id and tool call data, so it is
+kept as MessageRecord and turned back into LangChain messages when a thread
+is restored for the agents.
+
+Kept: content, name, id, additional_kwargs, tool_calls, invalid_tool_calls,
+tool_call_id and ToolMessage status / artifact, plus response and usage
+metadata unless stripped. Other message types (chat, function) come back
+as HumanMessage without their type-specific fields.
+"""
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+
+# Keys OpenAI puts in additional_kwargs that duplicate or only describe the
+# provider response. Our own keys (message_id, timestamp, source, contact_id)
+# are always kept.
+PROVIDER_KWARGS = ("tool_calls", "function_call", "refusal", "parsed")
+
+_MESSAGE_CLASSES = {
+    "human": HumanMessage,
+    "ai": AIMessage,
+    "system": SystemMessage,
+    "tool": ToolMessage,
+}
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else value
+
+
+class MessageRecord:
+    """
+    Slotted record for one message in checkpointed history.
+
+    Roles and agent names are interned, so a 1k-message thread holds one copy
+    of "ai" and "maria" instead of one per message.
+    """
+
+    __slots__ = ("role", "content", "name", "id", "extra")
+
+    def __init__(
+        self,
+        role: str,
+        content: Any,
+        name: Optional[str] = None,
+        id: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ):
+        self.role = _intern(role)
+        self.content = content
+        self.name = _intern(name)
+        self.id = id
+        self.extra = extra or None  # tool_calls, tool_call_id, tool status / artifact, kwargs, metadata
+
+    @classmethod
+    def from_message(cls, msg: BaseMessage, strip_metadata: bool = False) -> "MessageRecord":
+        """
+        Build a record from a LangChain message
+
+        Args:
+            msg: Message to compact
+            strip_metadata: Drop provider response data (response_metadata,
+                usage_metadata, raw OpenAI kwargs). Use for messages that were
+                already sent - nothing reads those fields afterwards.
+        """
+        extra: Dict[str, Any] = {}
+
+        kwargs = msg.additional_kwargs
+        if kwargs and strip_metadata:
+            kwargs = {k: v for k, v in kwargs.items() if k not in PROVIDER_KWARGS}
+        if kwargs:
+            extra["kwargs"] = kwargs
+
+        tool_calls = getattr(msg, "tool_calls", None)
+        if tool_calls:
+            extra["tool_calls"] = tool_calls
+        invalid_tool_calls = getattr(msg, "invalid_tool_calls", None)
+        if invalid_tool_calls:
+            extra["invalid_tool_calls"] = invalid_tool_calls
+        tool_call_id = getattr(msg, "tool_call_id", None)
+        if tool_call_id:
+            extra["tool_call_id"] = tool_call_id
+        if isinstance(msg, ToolMessage):
+            if msg.status != "success":
+                extra["status"] = msg.status
+            if msg.artifact is not None:
+                extra["artifact"] = msg.artifact
+
+        if not strip_metadata:
+            if msg.response_metadata:
+                extra["response_metadata"] = msg.response_metadata
+            usage = getattr(msg, "usage_metadata", None)
+            if usage:
+                extra["usage_metadata"] = usage
+
+        return cls(msg.type, msg.content, msg.name, msg.id, extra)
+
+    def to_message(self) -> BaseMessage:
+        """Rebuild the LangChain message"""
+        extra = self.extra or {}
+        fields: Dict[str, Any] = {"content": self.content}
+        if self.name:
+            fields["name"] = self.name
+        if self.id:
+            fields["id"] = self.id
+        if "kwargs" in extra:
+            fields["additional_kwargs"] = extra["kwargs"]
+        if "response_metadata" in extra:
+            fields["response_metadata"] = extra["response_metadata"]
+        if self.role == "ai":
+            if "tool_calls" in extra:
+                fields["tool_calls"] = extra["tool_calls"]
+            if "invalid_tool_calls" in extra:
+                fields["invalid_tool_calls"] = extra["invalid_tool_calls"]
+            if "usage_metadata" in extra:
+                fields["usage_metadata"] = extra["usage_metadata"]
+        elif self.role == "tool":
+            fields["tool_call_id"] = extra.get("tool_call_id", "")
+            for key in ("status", "artifact"):
+                if key in extra:
+                    fields[key] = extra[key]
+
+        message_class = _MESSAGE_CLASSES.get(self.role)
+        if message_class is None:
+            # Unknown roles (chat, function) fall back to a human message
+            return HumanMessage(**fields)
+        return message_class(**fields)
+
+    def to_tuple(self) -> Tuple[Any, ...]:
+        """Serializer-friendly form: plain tuple of primitives"""
+        if self.extra:
+            return (self.role, self.content, self.name, self.id, self.extra)
+        return (self.role, self.content, self.name, self.id)
+
+    @classmethod
+    def from_tuple(cls, data: Any) -> "MessageRecord":
+        return cls(*data)
+
+    def __repr__(self) -> str:
+        return f"MessageRecord(role={self.role!r}, name={self.name!r}, content={str(self.content)[:40]!r})"
+
+
+def compact_messages(messages: List[BaseMessage], strip_metadata: bool = False) -> List[Tuple[Any, ...]]:
+    """Encode messages as record tuples for a checkpoint"""
+    return [MessageRecord.from_message(msg, strip_metadata).to_tuple() for msg in messages]
+
+
+def expand_messages(records: List[Any]) -> List[BaseMessage]:
+    """Decode record tuples back to LangChain messages (messages pass through)"""
+    return [
+        record if isinstance(record, BaseMessage) else MessageRecord.from_tuple(record).to_message()
+        for record in records
+    ]
+
+
+# Export
+__all__ = [
+    "MessageRecord",
+    "PROVIDER_KWARGS",
+    "compact_messages",
+    "expand_messages",
+]
@@ -0,0 +1,572 @@
+"""
+Redis Checkpoint Saver
+Checkpoints in Redis so a conversation survives restarts and can be served by
+any worker, with a per-thread lease so only one worker runs a thread at a time
+
+- One round-trip per super-step: task writes (put_writes) are buffered and go
+  out in the same MULTI/EXEC pipeline as the checkpoint that follows them
+- Compact: channel blobs are written only for channels whose version
+  changed, large blobs are zlib-compressed, and full message chunks (see
+  AppendOnlyMessages) are stored once per thread and referenced by digest
+- Every write refreshes a TTL on the thread's keys, so idle threads expire
+- Keys share a {thread_id} hash tag, so a thread lives on one cluster slot
+
+Buffered writes are flushed before any read of their thread; a crash before
+the next checkpoint loses them and those tasks run again on resume, as with
+any write LangGraph had not persisted yet.
+"""
+import asyncio
+import hashlib
+import random
+import struct
+import time
+import uuid
+import zlib
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+
+from app.state.message_channel import CHUNK_SIZE
+from app.utils.simple_logger import get_logger
+
+logger = get_logger("redis_checkpointer")
+
+Op = Tuple[str, tuple, Dict[str, Any]]  # Redis command, args, kwargs
+
+# Delete / extend a lease only if we still hold it
+RELEASE_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end
+return 0
+"""
+RENEW_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) end
+return 0
+"""
+
+
+class LeaseTimeout(Exception):
+    """Another worker held the thread for longer than we were willing to wait"""
+
+
+def _frame(*parts: bytes) -> bytes:
+    return b"".join(struct.pack(">I", len(p)) + p for p in parts)
+
+
+def _unframe(data: bytes) -> List[bytes]:
+    parts, offset = [], 0
+    while offset < len(data):
+        (size,) = struct.unpack_from(">I", data, offset)
+        offset += 4
+        parts.append(data[offset:offset + size])
+        offset += size
+    return parts
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class RedisSaver(BaseCheckpointSaver[str]):
+    """
+    LangGraph checkpointer backed by Redis
+
+    Args:
+        url: Redis URL
+        ttl: Seconds an idle thread is kept
+        prefix: Key prefix
+        compress_min: Blobs at least this large (bytes) are zlib-compressed
+        pipeline_writes: False writes each put_writes immediately (one
+            round-trip per task, for comparison)
+        client / aclient: Pre-built sync / asyncio Redis clients
+    """
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        ttl: int = 7 * 86400,
+        prefix: str = "ckpt:",
+        compress_min: int = 1024,
+        pipeline_writes: bool = True,
+        client: Any = None,
+        aclient: Any = None,
+        serde: Any = None,
+    ):
+        super().__init__(serde=serde)
+        self.url = url
+        self.ttl = ttl
+        self.prefix = prefix
+        self.compress_min = compress_min
+        self.pipeline_writes = pipeline_writes
+        self._client = client
+        self._aclient = aclient
+        self._aclient_given = aclient is not None
+        self._aclient_loop: Optional[asyncio.AbstractEventLoop] = None
+        # thread_id -> buffered put_writes operations
+        self._pending: Dict[str, List[Op]] = defaultdict(list)
+        # thread_id -> id(chunk) -> (chunk, digest) and digest -> decoded chunk,
+        # for the most recently used threads
+        self._chunks: "OrderedDict[str, Tuple[Dict[int, Tuple[Any, str]], Dict[str, Any]]]" = OrderedDict()
+        self.max_cached_threads = 1000
+        self.stats = {"round_trips": 0, "bytes_written": 0, "chunks_written": 0, "chunks_reused": 0}
+
+    # ---- clients ----
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            import redis  # Optional dependency, only needed for this backend
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    @property
+    def aclient(self) -> Any:
+        # redis.asyncio connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        if not self._aclient_given and self._aclient_loop is not loop:
+            import redis.asyncio as aredis
+            self._aclient = aredis.Redis.from_url(self.url)
+            self._aclient_loop = loop
+        return self._aclient
+
+    # ---- keys ----
+    def _key(self, thread_id: str, *parts: str) -> str:
+        return ":".join([f"{self.prefix}{{{thread_id}}}", *parts])
+
+    def _thread_keys(self, thread_id: str, checkpoint_ns: str) -> List[str]:
+        return [
+            self._key(thread_id, "index", checkpoint_ns),
+            self._key(thread_id, "cp", checkpoint_ns),
+            self._key(thread_id, "blobs"),
+            self._key(thread_id, "chunks"),
+        ]
+
+    # ---- encoding ----
+    def _wrap(self, typed: Tuple[str, bytes]) -> bytes:
+        type_, data = typed
+        if len(data) >= self.compress_min:
+            return b"z" + _frame(type_.encode(), zlib.compress(data, 1))
+        return b"r" + _frame(type_.encode(), data)
+
+    def _unwrap(self, raw: bytes) -> Tuple[str, bytes]:
+        type_, data = _unframe(raw[1:])
+        return type_.decode(), zlib.decompress(data) if raw[:1] == b"z" else data
+
+    def _dump(self, value: Any) -> bytes:
+        return self._wrap(self.serde.dumps_typed(value))
+
+    def _load(self, raw: bytes) -> Any:
+        return self.serde.loads_typed(self._unwrap(raw))
+
+    def _chunk_cache(self, thread_id: str) -> Tuple[Dict[int, Tuple[Any, str]], Dict[str, Any]]:
+        cache = self._chunks.get(thread_id)
+        if cache is None:
+            cache = self._chunks[thread_id] = ({}, {})
+            while len(self._chunks) > self.max_cached_threads:
+                self._chunks.popitem(last=False)
+        self._chunks.move_to_end(thread_id)
+        return cache
+
+    def _encode_channel(self, thread_id: str, value: Any, ops: List[Op]) -> bytes:
+        if not (isinstance(value, dict) and "chunks" in value):
+            return self._dump(value)
+        known, _ = self._chunk_cache(thread_id)
+        refs, tail = [], []
+        for chunk in value["chunks"]:
+            if len(chunk) != CHUNK_SIZE:
+                tail = list(chunk)
+                continue
+            hit = known.get(id(chunk))
+            if hit is not None and hit[0] is chunk:
+                self.stats["chunks_reused"] += 1
+                refs.append(hit[1])
+                continue
+            blob = self._dump(list(chunk))
+            digest = _digest(blob)
+            self.stats["bytes_written"] += len(blob)
+            known[id(chunk)] = (chunk, digest)
+            ops.append(("hsetnx", (self._key(thread_id, "chunks"), digest, blob), {}))
+            self.stats["chunks_written"] += 1
+            refs.append(digest)
+        return self._dump({"chunk_refs": refs, "tail": tail})
+
+    # ---- write operations ----
+    def _put_ops(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> Tuple[List[Op], RunnableConfig]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        values: Dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+
+        ops: List[Op] = []
+        blobs = {}
+        for channel, version in new_versions.items():
+            field = f"{checkpoint_ns}|{channel}|{version}"
+            blobs[field] = self._encode_channel(thread_id, values[channel], ops) if channel in values else b""
+        if blobs:
+            ops.append(("hset", (self._key(thread_id, "blobs"),), {"mapping": blobs}))
+            self.stats["bytes_written"] += sum(len(b) for b in blobs.values())
+        record = _frame(
+            self._dump(c),
+            self._dump(get_checkpoint_metadata(config, metadata)),
+            (config["configurable"].get("checkpoint_id") or "").encode(),
+        )
+        self.stats["bytes_written"] += len(record)
+        ops.append(("hset", (self._key(thread_id, "cp", checkpoint_ns), checkpoint["id"], record), {}))
+        ops.append(("zadd", (self._key(thread_id, "index", checkpoint_ns), {checkpoint["id"]: 0}), {}))
+        for key in self._thread_keys(thread_id, checkpoint_ns):
+            ops.append(("expire", (key, self.ttl), {}))
+        return ops, {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def _writes_ops(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str) -> List[Op]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        key = self._key(thread_id, "writes", checkpoint_ns, config["configurable"]["checkpoint_id"])
+        ops: List[Op] = []
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            field = f"{task_id}|{idx}"
+            entry = _frame(task_id.encode(), channel.encode(), self._dump(value), task_path.encode(), str(idx).encode())
+            # Regular writes are kept from the first attempt, special ones (errors, interrupts) replaced
+            self.stats["bytes_written"] += len(entry)
+            ops.append(("hsetnx" if idx >= 0 else "hset", (key, field, entry), {}))
+        ops.append(("expire", (key, self.ttl), {}))
+        return ops
+
+    def _take_pending(self, thread_id: str) -> List[Op]:
+        return self._pending.pop(thread_id, [])
+
+    def _execute(self, ops: List[Op]) -> None:
+        if not ops:
+            return
+        pipe = self.client.pipeline(transaction=True)
+        for name, args, kwargs in ops:
+            getattr(pipe, name)(*args, **kwargs)
+        pipe.execute()
+        self.stats["round_trips"] += 1
+
+    async def _aexecute(self, ops: List[Op]) -> None:
+        if not ops:
+            return
+        pipe = self.aclient.pipeline(transaction=True)
+        for name, args, kwargs in ops:
+            getattr(pipe, name)(*args, **kwargs)
+        await pipe.execute()
+        self.stats["round_trips"] += 1
+
+    # ---- reads ----
+    def _decode_channel(self, thread_id: str, value: Any, chunks: Dict[str, bytes]) -> Any:
+        if not (isinstance(value, dict) and "chunk_refs" in value):
+            return value
+        known, decoded = self._chunk_cache(thread_id)
+        loaded = []
+        for digest in value["chunk_refs"]:
+            chunk = decoded.get(digest)
+            if chunk is None:
+                # A tuple, so AppendOnlyMessages keeps this very object as a frozen chunk
+                chunk = decoded[digest] = tuple(self._load(chunks[digest]))
+                known[id(chunk)] = (chunk, digest)
+            loaded.append(chunk)
+        if value["tail"]:
+            loaded.append(value["tail"])
+        return {"chunks": loaded}
+
+    def _pending_writes(self, writes: Dict[bytes, bytes]) -> List[Tuple[str, str, Any]]:
+        entries = []
+        for entry in writes.values():
+            task_id, channel, value, task_path, idx = _unframe(entry)
+            entries.append((task_id.decode(), channel.decode(), value, task_path.decode(), int(idx)))
+        entries.sort(key=lambda w: writes_sort_key(w[3], w[0], w[4]))
+        return [(task_id, channel, self._load(value)) for task_id, channel, value, _, _ in entries]
+
+    def _fetch(self, thread_id: str, checkpoint_ns: str, checkpoint_id: Optional[str]):
+        """
+        Read one checkpoint in at most four round-trips (latest id, record and
+        writes, blobs, uncached chunks). A generator yielding the commands of
+        each round-trip, so the sync and async paths share it
+        """
+        if checkpoint_id is None:
+            (ids,) = yield [("zrange", (self._key(thread_id, "index", checkpoint_ns), -1, -1))]
+            if not ids:
+                return None
+            checkpoint_id = ids[0].decode()
+        record, writes = yield [
+            ("hget", (self._key(thread_id, "cp", checkpoint_ns), checkpoint_id)),
+            ("hgetall", (self._key(thread_id, "writes", checkpoint_ns, checkpoint_id),)),
+        ]
+        if record is None:
+            return None
+        c_raw, m_raw, parent = _unframe(record)
+        checkpoint: Checkpoint = self._load(c_raw)
+
+        versions = checkpoint["channel_versions"]
+        values: Dict[str, Any] = {}
+        if versions:
+            fields = [f"{checkpoint_ns}|{channel}|{version}" for channel, version in versions.items()]
+            (raw,) = yield [("hmget", (self._key(thread_id, "blobs"), fields))]
+            values = {channel: self._load(blob) for channel, blob in zip(versions, raw) if blob}
+        _, decoded = self._chunk_cache(thread_id)
+        missing = [
+            digest for value in values.values() if isinstance(value, dict) and "chunk_refs" in value
+            for digest in value["chunk_refs"] if digest not in decoded
+        ]
+        chunks: Dict[str, bytes] = {}
+        if missing:
+            (loaded,) = yield [("hmget", (self._key(thread_id, "chunks"), missing))]
+            chunks = dict(zip(missing, loaded))
+
+        def cfg(cid: str) -> RunnableConfig:
+            return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": cid}}
+
+        return CheckpointTuple(
+            config=cfg(checkpoint_id),
+            checkpoint={
+                **checkpoint,
+                "channel_values": {k: self._decode_channel(thread_id, v, chunks) for k, v in values.items()},
+            },
+            metadata=self._load(m_raw),
+            parent_config=cfg(parent.decode()) if parent else None,
+            pending_writes=self._pending_writes(writes),
+        )
+
+    def _read(self, steps) -> Any:
+        results = None
+        try:
+            while True:
+                ops = steps.send(results)
+                pipe = self.client.pipeline(transaction=False)
+                for name, args in ops:
+                    getattr(pipe, name)(*args)
+                results = pipe.execute()
+                self.stats["round_trips"] += 1
+        except StopIteration as done:
+            return done.value
+
+    async def _aread(self, steps) -> Any:
+        results = None
+        try:
+            while True:
+                ops = steps.send(results)
+                pipe = self.aclient.pipeline(transaction=False)
+                for name, args in ops:
+                    getattr(pipe, name)(*args)
+                results = await pipe.execute()
+                self.stats["round_trips"] += 1
+        except StopIteration as done:
+            return done.value
+
+    def _list_ids(self, config: Optional[RunnableConfig], before: Optional[RunnableConfig]) -> Tuple[str, str, str, str]:
+        if not config:
+            raise ValueError("RedisSaver.list needs a thread_id in the config")
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        before_id = get_checkpoint_id(before) if before else None
+        return thread_id, checkpoint_ns, "(" + before_id if before_id else "+", get_checkpoint_id(config) or ""
+
+    @staticmethod
+    def _matches(metadata: CheckpointMetadata, filter: Optional[Dict[str, Any]]) -> bool:
+        return not filter or all(metadata.get(k) == v for k, v in filter.items())
+
+    # ---- BaseCheckpointSaver: sync ----
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        self._execute(self._take_pending(thread_id))
+        return self._read(self._fetch(thread_id, config["configurable"].get("checkpoint_ns", ""),
+                                      get_checkpoint_id(config)))
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        thread_id, checkpoint_ns, upper, only = self._list_ids(config, before)
+        self._execute(self._take_pending(thread_id))
+        ids = [only] if only else [
+            i.decode() for i in self.client.zrevrangebylex(self._key(thread_id, "index", checkpoint_ns), upper, "-")
+        ]
+        for checkpoint_id in ids:
+            if limit is not None and limit <= 0:
+                return
+            found = self._read(self._fetch(thread_id, checkpoint_ns, checkpoint_id))
+            if found is None or not self._matches(found.metadata, filter):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield found
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        ops, next_config = self._put_ops(config, checkpoint, metadata, new_versions)
+        self._execute(self._take_pending(config["configurable"]["thread_id"]) + ops)
+        return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        ops = self._writes_ops(config, writes, task_id, task_path)
+        if self.pipeline_writes:
+            self._pending[config["configurable"]["thread_id"]].extend(ops)
+        else:
+            self._execute(ops)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._pending.pop(thread_id, None)
+        self._chunks.pop(thread_id, None)
+        keys = list(self.client.scan_iter(match=self._key(thread_id, "*")))
+        if keys:
+            self.client.delete(*keys)
+
+    def flush(self) -> None:
+        """Write every buffered put_writes now"""
+        for thread_id in list(self._pending):
+            self._execute(self._take_pending(thread_id))
+
+    # ---- BaseCheckpointSaver: async ----
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        await self._aexecute(self._take_pending(thread_id))
+        return await self._aread(self._fetch(thread_id, config["configurable"].get("checkpoint_ns", ""),
+                                             get_checkpoint_id(config)))
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        thread_id, checkpoint_ns, upper, only = self._list_ids(config, before)
+        await self._aexecute(self._take_pending(thread_id))
+        ids = [only] if only else [
+            i.decode() for i in await self.aclient.zrevrangebylex(self._key(thread_id, "index", checkpoint_ns), upper, "-")
+        ]
+        for checkpoint_id in ids:
+            if limit is not None and limit <= 0:
+                return
+            found = await self._aread(self._fetch(thread_id, checkpoint_ns, checkpoint_id))
+            if found is None or not self._matches(found.metadata, filter):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield found
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        ops, next_config = self._put_ops(config, checkpoint, metadata, new_versions)
+        await self._aexecute(self._take_pending(config["configurable"]["thread_id"]) + ops)
+        return next_config
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        ops = self._writes_ops(config, writes, task_id, task_path)
+        if self.pipeline_writes:
+            self._pending[config["configurable"]["thread_id"]].extend(ops)
+        else:
+            await self._aexecute(ops)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self._pending.pop(thread_id, None)
+        self._chunks.pop(thread_id, None)
+        keys = [key async for key in self.aclient.scan_iter(match=self._key(thread_id, "*"))]
+        if keys:
+            await self.aclient.delete(*keys)
+
+    async def aflush(self) -> None:
+        for thread_id in list(self._pending):
+            await self._aexecute(self._take_pending(thread_id))
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # ---- per-thread lease ----
+    @asynccontextmanager
+    async def lease(self, thread_id: str, ttl: float = 30.0, wait: float = 60.0) -> AsyncIterator[str]:
+        """
+        Hold a thread exclusively while running it
+
+        The lease expires after ttl seconds unless renewed; it is renewed in
+        the background every ttl/3 while held, so a crashed worker blocks the
+        thread for at most ttl
+
+        Raises:
+            LeaseTimeout: The thread stayed taken for `wait` seconds
+        """
+        client = self.aclient
+        key = self._key(thread_id, "lease")
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + wait
+        delay = 0.01
+        while not await client.set(key, token, nx=True, px=int(ttl * 1000)):
+            if time.monotonic() >= deadline:
+                raise LeaseTimeout(f"Thread {thread_id} is held by another worker")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+        async def renew() -> None:
+            while True:
+                await asyncio.sleep(ttl / 3)
+                if not await client.eval(RENEW_LEASE, 1, key, token, int(ttl * 1000)):
+                    logger.warning(f"Lost lease on thread {thread_id}")
+                    return
+
+        renewer = asyncio.create_task(renew())
+        try:
+            yield token
+        finally:
+            renewer.cancel()
+            await client.eval(RELEASE_LEASE, 1, key, token)
+
+
+# Export
+__all__ = ["LeaseTimeout", "RedisSaver"]
@@ -19,6 +19,7 @@ from app.tools.calendar_slots import (
     parse_spanish_datetime,
     find_matching_slot
 )
+from app.tools.calendar_availability import CalendarAvailability, get_calendar_availability
 from app.tools.ghl_streaming import HumanLikeResponder, send_human_like_response
 
 __all__ = [
@@ -40,5 +41,7 @@ __all__ = [
     "generate_available_slots",
     "format_slots_for_customer",
     "parse_spanish_datetime",
-    "find_matching_slot"
+    "find_matching_slot",
+    "CalendarAvailability",
+    "get_calendar_availability"
 ]
\ No newline at end of file
@@ -175,22 +175,31 @@ async def book_appointment_with_instructions(
             find_matching_slot,
             format_slot_for_spanish
         )
+        from app.tools.calendar_availability import get_calendar_availability
         from app.config import get_settings
         settings = get_settings()
+        availability = get_calendar_availability()
         
         # Parse customer's preferred time
         preferred_time = parse_spanish_datetime(appointment_request)
         
-        # Generate available slots
-        available_slots = generate_available_slots(
-            num_slots=5,
-            start_hour=9,
-            end_hour=18,
-            timezone="America/New_York"
-        )
+        # Closest free slot from the cached calendar index
+        if preferred_time:
+            selected_slot = await availability.closest_slot(preferred_time)
+        else:
+            next_slots = await availability.next_slots(limit=1)
+            selected_slot = next_slots[0] if next_slots else None
         
-        # Find best matching slot
-        selected_slot = find_matching_slot(available_slots, appointment_request)
+        if not selected_slot and not await availability.slots():
+            # Calendar unreachable or empty - offer the standard business-hours slots
+            logger.warning("No calendar availability from GHL, using generated slots")
+            available_slots = generate_available_slots(
+                num_slots=5,
+                start_hour=9,
+                end_hour=18,
+                timezone="America/New_York"
+            )
+            selected_slot = find_matching_slot(available_slots, appointment_request)
         
         if not selected_slot:
             logger.warning("No available slots found")
@@ -222,6 +231,8 @@ async def book_appointment_with_instructions(
         result = await ghl_client.create_appointment(appointment_data)
         
         if result and result.get("id"):
+            availability.mark_booked(selected_slot["startTime"])
+            
             # Success! Add confirmation note
             formatted_time = format_slot_for_spanish(selected_slot)
             confirmation_note = f"✅ DEMO CONFIRMADA: {formatted_time} | ID: {result['id']}"
@@ -244,6 +255,9 @@ async def book_appointment_with_instructions(
                 "status": "confirmed"
             }
         else:
+            # GHL may have rejected a slot our cache still listed
+            availability.invalidate()
+            
             # Fallback: Save as note if API fails
             note = f"[CITA SOLICITADA] {appointment_request} - Confirmar manualmente"
             await ghl_client.add_contact_note(contact_id, note)
@@ -0,0 +1,214 @@
+"""
+Availability Grid - multi-calendar free/busy as NumPy bit arrays
+
+Each calendar is a row of booleans over a fixed time grid (15 minutes by
+default) starting at `origin`; True means free. Several weeks of several
+reps' calendars are a small (calendars x cells) matrix, so combining and
+searching them is array arithmetic instead of scanning slot dicts:
+
+- union / intersection: any rep free / every calendar free (rep + room)
+- fits: cells where a meeting of a given length starts on free time,
+  via a cumulative sum over the row
+- earliest / closest: first N fitting starts after T, or the nearest one
+  to a requested time - a binary search over the fitting start cells,
+  which are computed once per query shape and kept until the bits change
+
+Results are slot dicts in the calendar_slots shape (startTime, endTime,
+available) plus the calendars free for them.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pytz
+
+DEFAULT_GRANULARITY = 15  # minutes per cell
+
+
+class AvailabilityGrid:
+    """
+    Free/busy bitmap for a set of calendars
+
+    Args:
+        calendar_ids: One row per calendar
+        origin: Start of the first cell (naive times are read in `timezone`)
+        days: Grid length
+        granularity: Minutes per cell
+        timezone: Calendar timezone
+    """
+
+    def __init__(
+        self,
+        calendar_ids: Sequence[str],
+        origin: datetime,
+        days: int = 7,
+        granularity: int = DEFAULT_GRANULARITY,
+        timezone: str = "America/New_York",
+    ):
+        self.tz = pytz.timezone(timezone)
+        self.calendar_ids = list(calendar_ids)
+        self._rows = {calendar_id: i for i, calendar_id in enumerate(self.calendar_ids)}
+        self.granularity = granularity
+        self.cell = timedelta(minutes=granularity)
+        self.origin = self._aware(origin)
+        self.bits = np.zeros((len(self.calendar_ids), days * 24 * 60 // granularity), dtype=bool)
+        self._start_cache: Dict[tuple, np.ndarray] = {}  # search key -> sorted start cells, until bits change
+
+    @classmethod
+    def from_slots(
+        cls,
+        slots_by_calendar: Dict[str, Iterable[Dict[str, Any]]],
+        origin: datetime,
+        days: int = 7,
+        granularity: int = DEFAULT_GRANULARITY,
+        timezone: str = "America/New_York",
+    ) -> "AvailabilityGrid":
+        """Grid from free slot dicts (startTime/endTime) per calendar"""
+        grid = cls(list(slots_by_calendar), origin, days, granularity, timezone)
+        for calendar_id, slots in slots_by_calendar.items():
+            for slot in slots:
+                grid.set(calendar_id, slot["startTime"], slot["endTime"], free=True)
+        return grid
+
+    # ---- time <-> cell ----
+    def _aware(self, value: datetime) -> datetime:
+        return self.tz.localize(value) if value.tzinfo is None else value
+
+    @property
+    def cells(self) -> int:
+        return self.bits.shape[1]
+
+    def cell_of(self, when: datetime) -> int:
+        """Cell containing `when` (clipped to the grid)"""
+        offset = (self._aware(when) - self.origin) // self.cell
+        return int(min(max(offset, 0), self.cells))
+
+    def _ceil_cell(self, when: datetime) -> int:
+        delta = self._aware(when) - self.origin
+        offset = -(-delta // self.cell)
+        return int(min(max(offset, 0), self.cells))
+
+    def time_of(self, cell: int) -> datetime:
+        return (self.origin + cell * self.cell).astimezone(self.tz)
+
+    def _cells_for(self, duration: timedelta) -> int:
+        return max(1, -(-duration // self.cell))
+
+    # ---- updates ----
+    def set(self, calendar_id: str, start: datetime, end: datetime, free: bool) -> None:
+        """Mark [start, end) free or busy; partially covered cells count as busy"""
+        if free:
+            first, last = self._ceil_cell(start), self.cell_of(end)
+        else:
+            first, last = self.cell_of(start), self._ceil_cell(end)
+        if first < last:
+            self.bits[self._rows[calendar_id], first:last] = free
+            self._start_cache.clear()
+
+    def book(self, calendar_id: str, start: datetime, duration: timedelta) -> None:
+        self.set(calendar_id, start, start + duration, free=False)
+
+    # ---- combining ----
+    def union(self, calendar_ids: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Cells where at least one of the calendars is free"""
+        return self._select(calendar_ids).any(axis=0)
+
+    def intersection(self, calendar_ids: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Cells where all of the calendars are free"""
+        return self._select(calendar_ids).all(axis=0)
+
+    def _select(self, calendar_ids: Optional[Sequence[str]]) -> np.ndarray:
+        if calendar_ids is None:
+            return self.bits
+        return self.bits[[self._rows[calendar_id] for calendar_id in calendar_ids]]
+
+    # ---- searching ----
+    def fits(self, duration: timedelta, bits: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Cells where `duration` of free time starts, for each row of `bits`
+        (defaults to the whole grid). Out-of-grid tails never fit.
+        """
+        bits = self.bits if bits is None else bits
+        width = self._cells_for(duration)
+        shape = bits.shape[:-1] + (1,)
+        counts = np.concatenate([np.zeros(shape, dtype=np.int32), np.cumsum(bits, axis=-1, dtype=np.int32)], axis=-1)
+        window = counts[..., width:] - counts[..., :-width]
+        fit = np.zeros(bits.shape, dtype=bool)
+        fit[..., :window.shape[-1]] = window == width
+        return fit
+
+    def _starts(self, duration: timedelta, mode: str, calendar_ids: Optional[Sequence[str]], step: Optional[timedelta]) -> np.ndarray:
+        """
+        Sorted fitting start cells: 'any' = some calendar fits alone, 'all' =
+        all calendars fit together. Cached until the bits change, so repeated
+        searches are a binary search over this array.
+        """
+        key = (self._cells_for(duration), mode, None if calendar_ids is None else tuple(calendar_ids),
+               None if step is None else self._cells_for(step))
+        cells = self._start_cache.get(key)
+        if cells is not None:
+            return cells
+        if mode == "all":
+            starts = self.fits(duration, self.intersection(calendar_ids))
+        elif mode == "any":
+            starts = self.fits(duration, self._select(calendar_ids)).any(axis=0)
+        else:
+            raise ValueError(f"mode must be 'any' or 'all', not {mode!r}")
+        if step is not None:
+            # Only offer starts on a step boundary from the origin (e.g. on the hour)
+            starts[np.arange(self.cells) % key[3] != 0] = False
+        cells = self._start_cache[key] = np.flatnonzero(starts)
+        return cells
+
+    def _slot(self, cell: int, duration: timedelta, calendar_ids: Optional[Sequence[str]]) -> Dict[str, Any]:
+        window = self.bits[:, cell:cell + self._cells_for(duration)]
+        if calendar_ids is not None:
+            window = window[[self._rows[calendar_id] for calendar_id in calendar_ids]]
+        free = window.all(axis=1)
+        names = self.calendar_ids if calendar_ids is None else list(calendar_ids)
+        start = self.time_of(cell)
+        return {
+            "startTime": start,
+            "endTime": start + duration,
+            "available": True,
+            "calendarIds": [name for name, ok in zip(names, free) if ok],
+        }
+
+    def earliest(
+        self,
+        n: int,
+        after: datetime,
+        duration: timedelta = timedelta(hours=1),
+        mode: str = "any",
+        calendar_ids: Optional[Sequence[str]] = None,
+        step: Optional[timedelta] = None,
+    ) -> List[Dict[str, Any]]:
+        """The first `n` slots of `duration` starting at or after `after`"""
+        cells = self._starts(duration, mode, calendar_ids, step)
+        i = int(np.searchsorted(cells, self._ceil_cell(after)))
+        return [self._slot(int(cell), duration, calendar_ids) for cell in cells[i:i + n]]
+
+    def closest(
+        self,
+        when: datetime,
+        duration: timedelta = timedelta(hours=1),
+        mode: str = "any",
+        calendar_ids: Optional[Sequence[str]] = None,
+        step: Optional[timedelta] = None,
+        not_before: Optional[datetime] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """The slot starting nearest to `when` (earlier one on ties)"""
+        cells = self._starts(duration, mode, calendar_ids, step)
+        if not_before is not None:
+            cells = cells[int(np.searchsorted(cells, self._ceil_cell(not_before))):]
+        if not cells.size:
+            return None
+        target = (self._aware(when) - self.origin) / self.cell
+        i = int(np.searchsorted(cells, target))
+        candidates = cells[max(i - 1, 0):i + 1]
+        best = candidates[np.argmin(np.abs(candidates - target))]
+        return self._slot(int(best), duration, calendar_ids)
+
+
+# Export
+__all__ = ["AvailabilityGrid", "DEFAULT_GRANULARITY"]
@@ -0,0 +1,260 @@
+"""
+Calendar Availability Service - cached free slots with closest-slot lookup
+
+GHL free slots are fetched once per calendar and kept for a short TTL in a
+sorted index, so matching a customer's requested time is a binary search
+instead of an API call plus a linear scan on every booking attempt.
+
+- Refresh ahead: past calendar_refresh_after seconds a cached index is still
+  served while a background task fetches a new one; past calendar_cache_ttl
+  the caller waits for the fetch. Concurrent callers share one fetch.
+- prefetch() warms a calendar before it's needed (Sofia starts it while her
+  model is still thinking).
+- Our own bookings are removed from the index right away; a failed booking
+  drops the index so the next lookup sees GHL's current state.
+- A failed fetch is never cached: the previous index keeps being served (an
+  empty, uncached one if there is none) and the next lookup fetches again.
+"""
+import asyncio
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import pytz
+
+from app.utils import deadline
+from app.utils.deadline import TurnDeadlineExceeded
+from app.utils.simple_logger import get_logger
+
+logger = get_logger("calendar_availability")
+
+Fetcher = Callable[[str, datetime, datetime, str], Awaitable[List[Dict[str, Any]]]]
+
+
+class CalendarFetchError(Exception):
+    """GHL didn't return the calendar's free slots"""
+
+
+@dataclass
+class SlotIndex:
+    """Free slots of one calendar, sorted by start time"""
+
+    timezone: str = "America/New_York"
+    fetched_at: float = field(default_factory=time.monotonic)
+    _starts: List[float] = field(default_factory=list)  # epoch seconds, sorted
+    _slots: Dict[float, Dict[str, Any]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, slots: List[Dict[str, Any]], timezone: str = "America/New_York") -> "SlotIndex":
+        index = cls(timezone=timezone)
+        for slot in slots:
+            start = index._aware(slot["startTime"])
+            key = start.timestamp()
+            index._slots[key] = {**slot, "startTime": start, "endTime": index._aware(slot["endTime"])}
+        index._starts = sorted(index._slots)
+        return index
+
+    def _aware(self, value: datetime) -> datetime:
+        """GHL returns offsets, the simulator and generated slots may not - read naive times as calendar local"""
+        if value.tzinfo is None:
+            return pytz.timezone(self.timezone).localize(value)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def slots(self) -> List[Dict[str, Any]]:
+        return [self._slots[key] for key in self._starts]
+
+    def closest(self, when: datetime, max_distance: Optional[timedelta] = None) -> Optional[Dict[str, Any]]:
+        """Free slot starting nearest to `when` (earlier one on ties), O(log n)"""
+        if not self._starts:
+            return None
+        target = self._aware(when).timestamp()
+        i = bisect_left(self._starts, target)
+        best = min(self._starts[max(i - 1, 0):i + 1], key=lambda key: (abs(key - target), key))
+        if max_distance is not None and abs(best - target) > max_distance.total_seconds():
+            return None
+        return self._slots[best]
+
+    def after(self, when: datetime, limit: int = 3) -> List[Dict[str, Any]]:
+        """The first `limit` free slots starting at or after `when`"""
+        i = bisect_left(self._starts, self._aware(when).timestamp())
+        return [self._slots[key] for key in self._starts[i:i + limit]]
+
+    def remove(self, start: datetime) -> bool:
+        key = self._aware(start).timestamp()
+        i = bisect_left(self._starts, key)
+        if i < len(self._starts) and self._starts[i] == key:
+            del self._starts[i]
+            del self._slots[key]
+            return True
+        return False
+
+    def add(self, slot: Dict[str, Any]) -> None:
+        start = self._aware(slot["startTime"])
+        key = start.timestamp()
+        if key not in self._slots:
+            insort(self._starts, key)
+        self._slots[key] = {**slot, "startTime": start, "endTime": self._aware(slot["endTime"])}
+
+
+class CalendarAvailability:
+    """
+    Per-calendar free slot cache
+
+    Args:
+        fetch: Coroutine (calendar_id, start, end, timezone) -> slots, raising
+            when they can't be fetched; defaults to GHLClient.get_free_slots
+        ttl: Seconds an index may be served at all
+        refresh_after: Seconds after which a served index is refreshed in the background
+        horizon_days: How far ahead to fetch
+    """
+
+    def __init__(
+        self,
+        fetch: Optional[Fetcher] = None,
+        ttl: Optional[float] = None,
+        refresh_after: Optional[float] = None,
+        horizon_days: Optional[int] = None,
+        timezone: str = "America/New_York",
+    ):
+        from app.config import get_settings
+        settings = get_settings()
+        self._fetch = fetch or self._fetch_from_ghl
+        self.ttl = settings.calendar_cache_ttl if ttl is None else ttl
+        self.refresh_after = settings.calendar_refresh_after if refresh_after is None else refresh_after
+        self.horizon_days = settings.calendar_horizon_days if horizon_days is None else horizon_days
+        self.timezone = timezone
+        self.default_calendar_id = settings.ghl_calendar_id
+        self._indexes: Dict[str, SlotIndex] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._booked: Dict[str, Dict[datetime, float]] = {}  # calendar -> our bookings -> when
+        self.fetches = 0
+        self.hits = 0
+
+    @staticmethod
+    async def _fetch_from_ghl(calendar_id: str, start: datetime, end: datetime, timezone: str) -> List[Dict[str, Any]]:
+        from app.tools.ghl_client import GHLClient
+        client = GHLClient()
+        client.calendar_id = calendar_id
+        slots = await client.get_free_slots(start, end, timezone)
+        if slots is None:
+            raise CalendarFetchError(f"GHL free slots of calendar {calendar_id} unavailable")
+        return slots
+
+    async def _refresh(self, calendar_id: str) -> SlotIndex:
+        window_start = datetime.now()
+        slots = await self._fetch(calendar_id, window_start, window_start + timedelta(days=self.horizon_days), self.timezone)
+        self.fetches += 1
+        index = SlotIndex.build(slots, self.timezone)
+        # A fetch that started before one of our bookings may still list its slot
+        booked = self._booked.get(calendar_id, {})
+        for booked_start, at in list(booked.items()):
+            if time.monotonic() - at > self.ttl:
+                del booked[booked_start]
+            else:
+                index.remove(booked_start)
+        self._indexes[calendar_id] = index
+        logger.info(f"Calendar {calendar_id}: {len(index)} free slots cached")
+        return index
+
+    def _start_refresh(self, calendar_id: str) -> asyncio.Task:
+        """One fetch per calendar at a time; later callers join it"""
+        task = self._inflight.get(calendar_id)
+        if task is None or task.done():
+            # Shared by later turns too - not cut short by this turn's deadline
+            task = asyncio.create_task(self._refresh(calendar_id), context=deadline.detached_context())
+            task.add_done_callback(lambda t, cid=calendar_id: self._done(cid, t))
+            self._inflight[calendar_id] = task
+        return task
+
+    def _done(self, calendar_id: str, task: asyncio.Task) -> None:
+        if self._inflight.get(calendar_id) is task:
+            del self._inflight[calendar_id]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Calendar {calendar_id} refresh failed: {task.exception()}")
+
+    async def index(self, calendar_id: Optional[str] = None) -> SlotIndex:
+        calendar_id = calendar_id or self.default_calendar_id
+        index = self._indexes.get(calendar_id)
+        if index is not None and index.age < self.ttl:
+            self.hits += 1
+            if index.age >= self.refresh_after:
+                self._start_refresh(calendar_id)
+            return index
+        try:
+            return await deadline.bounded(asyncio.shield(self._start_refresh(calendar_id)))
+        except TurnDeadlineExceeded:
+            raise
+        except Exception as e:
+            # Don't let a GHL blip hide every slot: keep what we had, and fetch again next time
+            if index is not None:
+                logger.warning(f"Calendar {calendar_id} refresh failed ({e}), serving the previous index")
+                return index
+            logger.warning(f"Calendar {calendar_id} unavailable ({e}), no slots to serve")
+            return SlotIndex(timezone=self.timezone)
+
+    def prefetch(self, calendar_id: Optional[str] = None) -> None:
+        """Warm a calendar in the background unless a fresh index is cached"""
+        calendar_id = calendar_id or self.default_calendar_id
+        index = self._indexes.get(calendar_id)
+        if index is None or index.age >= self.refresh_after:
+            self._start_refresh(calendar_id)
+
+    async def slots(self, calendar_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        return (await self.index(calendar_id)).slots()
+
+    async def closest_slot(
+        self, when: datetime, calendar_id: Optional[str] = None, max_distance: Optional[timedelta] = None
+    ) -> Optional[Dict[str, Any]]:
+        return (await self.index(calendar_id)).closest(when, max_distance)
+
+    async def next_slots(
+        self, limit: int = 3, after: Optional[datetime] = None, calendar_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        return (await self.index(calendar_id)).after(after or datetime.now(pytz.timezone(self.timezone)), limit)
+
+    async def grid(self, calendar_ids: Sequence[str], days: Optional[int] = None, granularity: int = 15):
+        """AvailabilityGrid over several calendars' cached slots, from now"""
+        from app.tools.availability_grid import AvailabilityGrid
+        indexes = await asyncio.gather(*(self.index(calendar_id) for calendar_id in calendar_ids))
+        origin = datetime.now(pytz.timezone(self.timezone)).replace(second=0, microsecond=0)
+        origin -= timedelta(minutes=origin.minute % granularity)
+        return AvailabilityGrid.from_slots(
+            {calendar_id: index.slots() for calendar_id, index in zip(calendar_ids, indexes)},
+            origin, days or self.horizon_days, granularity, self.timezone,
+        )
+
+    def mark_booked(self, start: datetime, calendar_id: Optional[str] = None) -> None:
+        """Our own booking took this slot"""
+        calendar_id = calendar_id or self.default_calendar_id
+        self._booked.setdefault(calendar_id, {})[start] = time.monotonic()
+        index = self._indexes.get(calendar_id)
+        if index is not None:
+            index.remove(start)
+
+    def invalidate(self, calendar_id: Optional[str] = None) -> None:
+        """Drop cached slots (e.g. GHL rejected a booking we thought was free)"""
+        self._indexes.pop(calendar_id or self.default_calendar_id, None)
+
+
+_availability: Optional[CalendarAvailability] = None
+
+
+def get_calendar_availability() -> CalendarAvailability:
+    """Process-wide availability cache, created on first use"""
+    global _availability
+    if _availability is None:
+        _availability = CalendarAvailability()
+    return _availability
+
+
+# Export
+__all__ = ["CalendarAvailability", "CalendarFetchError", "SlotIndex", "get_calendar_availability"]
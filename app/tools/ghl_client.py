@@ -3,10 +3,13 @@ GoHighLevel API Client
 Production-ready client with all necessary methods
 """
 import httpx
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 import asyncio
 from app.config import get_settings, get_ghl_headers
+from app.utils import deadline
+from app.utils.circuit_breaker import get_breaker, get_deferred_queue
+from app.utils.outbound_queue import split_message
 from app.utils.simple_logger import get_logger
 
 logger = get_logger("ghl_client")
@@ -15,6 +18,31 @@ logger = get_logger("ghl_client")
 class GHLClient:
     """Simplified GHL API client with only production-used methods"""
     
+    # Optional httpx transport for every client (local stand-ins, benchmarks).
+    # None means real network access.
+    transport: Optional[httpx.AsyncBaseTransport] = None
+    
+    # One connection pool per event loop, shared by every client - keeps TLS
+    # sessions to GHL alive between calls (and lets warmup open them)
+    _pool: Optional[httpx.AsyncClient] = None
+    _pool_owner: tuple = (None, None)
+    
+    @classmethod
+    def pool(cls) -> httpx.AsyncClient:
+        """Shared httpx client for the running event loop and current transport"""
+        loop = asyncio.get_running_loop()
+        owner_loop, owner_transport = cls._pool_owner
+        if cls._pool is None or cls._pool.is_closed or owner_loop is not loop or owner_transport is not cls.transport:
+            cls._pool = httpx.AsyncClient(transport=cls.transport)
+            cls._pool_owner = (loop, cls.transport)
+        return cls._pool
+    
+    @classmethod
+    async def close_pool(cls) -> None:
+        if cls._pool is not None:
+            await cls._pool.aclose()
+            cls._pool = None
+    
     def __init__(self):
         self.settings = get_settings()
         self.base_url = self.settings.ghl_api_base_url
@@ -29,10 +57,15 @@ class GHLClient:
         endpoint: str,
         json: Optional[Dict] = None,
         params: Optional[Dict] = None,
-        timeout: int = 30
+        timeout: int = 30,
+        deferrable: bool = True,
+        max_retries: int = 3
     ) -> Optional[Dict]:
         """
-        Generic API caller with retry logic
+        Generic API caller with retry logic, behind the shared "ghl" circuit breaker
+        
+        While the breaker is open nothing is sent: reads return None right away
+        and writes are deferred (see replay_deferred) and return {"deferred": True}
         
         Args:
             method: HTTP method (GET, POST, PUT, DELETE)
@@ -40,70 +73,170 @@ class GHLClient:
             json: Request body data
             params: Query parameters
             timeout: Request timeout in seconds
+            deferrable: False for writes that must not be replayed later
+                (bookings - the slot may be gone by then); they fail with None
+            max_retries: Attempts while the breaker is closed (1 when the
+                caller retries itself)
             
         Returns:
             Response data or None if error
         """
+        breaker = get_breaker("ghl")
+        if not breaker.allow():
+            return self._while_open(method, endpoint, json, params, deferrable)
+        
+        # A probe of a half-open breaker gets one attempt, not the retry schedule
+        max_retries = max_retries if breaker.state == "closed" else 1
+        try:
+            result, outage = await self._request(method, endpoint, json, params, timeout, max_retries)
+        except BaseException:
+            breaker.release()  # cancelled
+            raise
+        if outage:
+            breaker.record_failure()
+        elif breaker.record_success():
+            GHLClient.schedule_replay()
+        return result
+    
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        json: Optional[Dict],
+        params: Optional[Dict],
+        timeout: int,
+        max_retries: int
+    ) -> Tuple[Optional[Dict], bool]:
+        """
+        The HTTP call with retries; returns (data or None, whether GHL looked down)
+        
+        Inside a turn the timeout and the retry pauses come out of the turn's
+        budget (see deadline.py); writes always get a minimum timeout so the
+        reply still goes out
+        """
         url = f"{self.base_url}{endpoint}"
-        max_retries = 3
         retry_delay = 1
+        floor = 0.0 if method == "GET" else self.settings.turn_deadline_min_write_timeout
         
         for attempt in range(max_retries):
+            attempt_timeout = deadline.timeout(timeout, floor=floor)
+            if attempt_timeout <= 0:
+                logger.warning(f"Turn deadline reached - giving up {method} {endpoint}")
+                return None, False
             try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.request(
-                        method=method,
-                        url=url,
-                        headers=self.headers,
-                        json=json,
-                        params=params,
-                        timeout=timeout
-                    )
-                    
-                    # Log the request
-                    logger.info(
-                        f"GHL API: {method} {endpoint} - Status: {response.status_code}"
-                    )
-                    
-                    # Handle success
-                    if response.status_code in [200, 201]:
-                        return response.json()
-                    
-                    # Handle rate limit
-                    elif response.status_code == 429:
-                        retry_after = int(response.headers.get("Retry-After", "60"))
-                        logger.warning(f"Rate limited. Waiting {retry_after}s...")
-                        await asyncio.sleep(retry_after)
-                        continue
-                    
-                    # Handle auth errors (don't retry)
-                    elif response.status_code in [401, 403]:
-                        logger.error(f"Auth error: {response.status_code} - {response.text}")
-                        return None
-                    
-                    # Handle server errors (retry)
-                    elif response.status_code >= 500:
-                        logger.warning(f"Server error: {response.status_code}. Retrying...")
-                        await asyncio.sleep(retry_delay * (attempt + 1))
-                        continue
+                response = await self.pool().request(
+                    method=method,
+                    url=url,
+                    headers=self.headers,
+                    json=json,
+                    params=params,
+                    timeout=attempt_timeout
+                )
+                
+                # Log the request
+                logger.info(
+                    f"GHL API: {method} {endpoint} - Status: {response.status_code}"
+                )
+                
+                # Handle success
+                if response.status_code in [200, 201]:
+                    return response.json(), False
+                
+                # Handle rate limit
+                elif response.status_code == 429:
+                    retry_after = int(response.headers.get("Retry-After", "60"))
+                    logger.warning(f"Rate limited. Waiting {retry_after}s...")
+                    if not await deadline.pause(retry_after):
+                        logger.warning(f"Rate limited past the turn deadline - giving up {method} {endpoint}")
+                        return None, False
+                    continue
+                
+                # Handle auth errors (don't retry)
+                elif response.status_code in [401, 403]:
+                    logger.error(f"Auth error: {response.status_code} - {response.text}")
+                    return None, False
+                
+                # Handle server errors (retry)
+                elif response.status_code >= 500:
+                    logger.warning(f"Server error: {response.status_code}. Retrying...")
+                    if attempt < max_retries - 1 and not await deadline.pause(retry_delay * (attempt + 1)):
+                        break
+                    continue
+                
+                # Other errors
+                else:
+                    logger.error(f"API error: {response.status_code} - {response.text}")
+                    return None, False
                     
-                    # Other errors
-                    else:
-                        logger.error(f"API error: {response.status_code} - {response.text}")
-                        return None
-                        
             except httpx.TimeoutException:
                 logger.warning(f"Timeout on attempt {attempt + 1}/{max_retries}")
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(retry_delay * (attempt + 1))
+                if attempt < max_retries - 1 and await deadline.pause(retry_delay * (attempt + 1)):
                     continue
-                return None
+                # A timeout the turn deadline shortened says nothing about GHL's health
+                return None, attempt_timeout >= timeout
                 
             except Exception as e:
                 logger.error(f"API request failed: {str(e)}")
-                return None
+                return None, isinstance(e, httpx.TransportError)
         
-        return None
+        return None, True
+    
+    def _while_open(
+        self, method: str, endpoint: str, json: Optional[Dict], params: Optional[Dict], deferrable: bool = True
+    ) -> Optional[Dict]:
+        """Short-circuit a call while the GHL breaker is open"""
+        if method == "GET" or not deferrable:
+            logger.warning(f"GHL circuit open - skipping {method} {endpoint}")
+            return None
+        # Writes of a contact keep their order when replayed
+        contact_id = (json or {}).get("contactId") or endpoint
+        job_id = get_deferred_queue().enqueue(
+            {"method": method, "endpoint": endpoint, "json": json, "params": params},
+            ordering_key=contact_id,
+            kind="ghl"
+        )
+        logger.warning(f"GHL circuit open - deferred {method} {endpoint} (job {job_id})")
+        return {"deferred": True, "job_id": job_id}
+    
+    _replay_task: Optional[asyncio.Task] = None
+    
+    @classmethod
+    def schedule_replay(cls) -> None:
+        """Replay deferred writes in the background (GHL is back); a replay in progress is reused"""
+        if cls._replay_task is None or cls._replay_task.done():
+            # Not part of the turn that noticed the recovery - no deadline
+            cls._replay_task = asyncio.get_running_loop().create_task(
+                cls.replay_deferred(), context=deadline.detached_context()
+            )
+    
+    @classmethod
+    async def replay_deferred(cls) -> int:
+        """
+        Send the writes deferred while the breaker was open, oldest first
+        Stops when the breaker opens again; what's left waits for the next recovery
+        """
+        queue, client, sent = get_deferred_queue(), cls(), 0
+        while (job := queue.claim()) is not None:
+            if not get_breaker("ghl").allow():
+                queue.fail(job, "GHL circuit open")
+                break
+            payload = job.payload
+            result, outage = await client._request(
+                payload["method"], payload["endpoint"], payload.get("json"), payload.get("params"), 30, 3
+            )
+            if outage:
+                get_breaker("ghl").record_failure()
+                queue.fail(job, "GHL unavailable")
+                break
+            get_breaker("ghl").record_success()
+            if result is None:
+                # GHL answered but refused it (4xx) - sending it again won't help
+                logger.error(f"Deferred {payload['method']} {payload['endpoint']} rejected by GHL, dropped")
+            queue.complete(job)
+            sent += 1
+        if sent:
+            logger.info(f"Replayed {sent} deferred GHL call(s)")
+        return sent
     
     # Contact Methods
     async def get_contact(self, contact_id: str) -> Optional[Dict]:
@@ -144,40 +277,31 @@ class GHLClient:
         results = []
         
         for msg in messages:
-            data = {
-                "type": message_type,
-                "contactId": contact_id,
-                "message": msg
-            }
-            result = await self.api_call("POST", "/conversations/messages", json=data)
+            result = await self.send_message_chunk(contact_id, msg, message_type)
             if result:
                 results.append(result)
-                logger.info(f"Message sent: {msg[:50]}...")
-            else:
-                logger.error("Failed to send message")
                 
         return results[0] if results else None
     
+    async def send_message_chunk(
+        self, contact_id: str, message: str, message_type: str = "WhatsApp", max_retries: int = 3
+    ) -> Optional[Dict]:
+        """Send one already-split message part"""
+        data = {
+            "type": message_type,
+            "contactId": contact_id,
+            "message": message
+        }
+        result = await self.api_call("POST", "/conversations/messages", json=data, max_retries=max_retries)
+        if result:
+            logger.info(f"Message sent: {message[:50]}...")
+        else:
+            logger.error("Failed to send message")
+        return result
+    
     def _split_message(self, message: str, max_length: int = 300) -> List[str]:
         """Split message into chunks"""
-        if len(message) <= max_length:
-            return [message]
-            
-        chunks = []
-        current = ""
-        
-        for sentence in message.split(". "):
-            if len(current) + len(sentence) + 2 <= max_length:
-                current += sentence + ". "
-            else:
-                if current:
-                    chunks.append(current.strip())
-                current = sentence + ". "
-                
-        if current:
-            chunks.append(current.strip())
-            
-        return chunks
+        return split_message(message, max_length)
     
     # Conversation Methods
     async def get_conversation_history(self, contact_id: str) -> List[Dict[str, Any]]:
@@ -238,6 +362,12 @@ class GHLClient:
         self, start_date: datetime = None, end_date: datetime = None, timezone: str = "America/New_York"
     ) -> List[Dict[str, Any]]:
         """Check calendar availability"""
+        return await self.get_free_slots(start_date, end_date, timezone) or []
+    
+    async def get_free_slots(
+        self, start_date: datetime = None, end_date: datetime = None, timezone: str = "America/New_York"
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Free slots of the calendar; None when GHL didn't answer (vs. [] for a full calendar)"""
         if not start_date:
             start_date = datetime.now()
         if not end_date:
@@ -252,7 +382,7 @@ class GHLClient:
         result = await self.api_call("GET", f"/calendars/{self.calendar_id}/free-slots", params=params)
         
         # Parse GHL's dict format into list of slots
-        if result and isinstance(result, dict):
+        if isinstance(result, dict):
             slots = []
             for date_key, date_data in result.items():
                 if date_key == "traceId":
@@ -267,7 +397,7 @@ class GHLClient:
                             "available": True
                         })
             return slots
-        return []
+        return None
     
     async def create_appointment(
         self, contact_id: str, start_time: datetime, end_time: datetime, 
@@ -289,7 +419,7 @@ class GHLClient:
             "meetingLocationType": "gmeet"
         }
         
-        result = await self.api_call("POST", "/calendars/events/appointments", json=data)
+        result = await self.api_call("POST", "/calendars/events/appointments", json=data, deferrable=False)
         if result:
             logger.info(f"✅ Appointment created for {contact_id}")
         else:
@@ -345,9 +475,10 @@ class GHLClient:
                 - notes: Optional notes
                 
         Returns:
-            API response with appointment ID or None if error
+            API response with appointment ID or None if error (also while
+            the GHL circuit is open - a booking is never deferred)
         """
-        return await self.api_call("POST", "/appointments", json=appointment_data)
+        return await self.api_call("POST", "/appointments", json=appointment_data, deferrable=False)
     
     async def get_calendar_slots(self, calendar_id: str, start_date: str, end_date: str) -> Optional[Dict]:
         """Get available calendar slots"""
@@ -7,6 +7,7 @@ import time
 from typing import Dict, Optional, List, Any
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from app.tools.ghl_client import ghl_client
+from app.utils import deadline
 from app.utils.simple_logger import get_logger
 
 logger = get_logger("ghl_streaming")
@@ -65,8 +66,8 @@ class HumanLikeResponder:
         Returns:
             GHL response or None
         """
-        # Calculate natural delay
-        delay = self.calculate_typing_delay(message)
+        # Calculate natural delay - never more than the turn has left
+        delay = deadline.timeout(self.calculate_typing_delay(message))
         
         logger.info(f"🤔 Thinking for {delay:.1f}s before responding...")
         
@@ -122,7 +123,7 @@ class HumanLikeResponder:
                 )
             else:
                 # Subsequent messages have shorter delays (like continuing a thought)
-                delay = self.calculate_typing_delay(message) * 0.6
+                delay = deadline.timeout(self.calculate_typing_delay(message) * 0.6)
                 logger.info(f"⏳ Brief pause ({delay:.1f}s) before next part...")
                 await asyncio.sleep(delay)
                 
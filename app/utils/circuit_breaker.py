@@ -0,0 +1,326 @@
+"""
+Circuit Breakers
+Stops a turn from waiting out timeouts and retries against a dependency that
+is already known to be down (OpenAI, GHL)
+
+- One breaker per dependency, shared by the whole process: after
+  circuit_breaker_failure_threshold consecutive failed calls it opens and
+  calls fail at once with CircuitOpenError
+- After circuit_breaker_reset_timeout seconds it goes half-open and lets
+  circuit_breaker_half_open_max probe calls through; a probe that succeeds
+  closes it, one that fails opens it again
+- While "openai" is open, agents answer with a pre-rendered fallback reply
+  (base_agent.FALLBACK_REPLY) asking the customer to write again - the turn
+  itself is not replayed. While "ghl" is open, reads return None and
+  writes go to the deferred side effects queue, replayed once it closes
+  (GHLClient.replay_deferred) - except bookings, which fail instead
+
+Only outages count as failures - timeouts, connection errors, 429 and 5xx;
+a 400 is the caller's problem, not the dependency's.
+CIRCUIT_BREAKER_FAILURE_THRESHOLD=0 turns the breakers off.
+"""
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+
+from app.utils import deadline
+from app.utils.deadline import TurnDeadlineExceeded
+from app.utils.message_utils import as_generation_chunk
+from app.utils.simple_logger import get_logger
+
+logger = get_logger("circuit_breaker")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit open, next probe in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one dependency
+
+    Args:
+        name: Dependency it guards (openai, ghl)
+        failure_threshold: Consecutive failures that open it (0 = never opens)
+        reset_timeout: Seconds open before probe calls are let through
+        half_open_max: Probe calls in flight at a time while half-open
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_max: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+            logger.info(f"Circuit {self.name} half-open - letting probe calls through")
+        return self._state
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (a True while half-open takes a probe slot)"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED or (state == HALF_OPEN and self._probes < self.half_open_max):
+                if state == HALF_OPEN:
+                    self._probes += 1
+                self.counters["calls"] += 1
+                return True
+            self.counters["rejected"] += 1
+            return False
+
+    def check(self) -> None:
+        """allow(), raising CircuitOpenError when it's refused"""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_in())
+
+    def record_success(self) -> bool:
+        """A call went through; returns True when this closed the breaker"""
+        with self._lock:
+            recovered = self._state == HALF_OPEN
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+        if recovered:
+            logger.info(f"Circuit {self.name} closed - dependency recovered")
+        return recovered
+
+    def release(self) -> None:
+        """A call was abandoned (cancelled) before it told anything about the dependency"""
+        with self._lock:
+            self._probes = max(0, self._probes - 1)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.counters["failures"] += 1
+            self._failures += 1
+            tripped = self._state == HALF_OPEN or (
+                self.failure_threshold > 0 and self._state == CLOSED and self._failures >= self.failure_threshold
+            )
+            if tripped:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self.counters["opened"] += 1
+        if tripped:
+            logger.error(f"Circuit {self.name} open after {self._failures} failure(s) - "
+                         f"failing fast for {self.reset_timeout:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "retry_in_s": round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1)
+                if state == OPEN else 0.0,
+                **self.counters,
+            }
+
+
+def _is_unreachable(error: BaseException) -> bool:
+    """Timeouts and connection errors - of the stdlib, httpx, or the OpenAI client"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    import httpx
+    if isinstance(error, (httpx.TimeoutException, httpx.NetworkError)):
+        return True
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(error, openai.APIConnectionError)  # APITimeoutError included
+
+
+def is_outage(error: BaseException) -> bool:
+    """Whether an exception means the dependency is down (vs. a bad request or a bad answer)"""
+    if isinstance(error, (CircuitOpenError, TurnDeadlineExceeded)):
+        return False
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return _is_unreachable(error)
+
+
+class BreakerChatModel(BaseChatModel):
+    """
+    Chat model that fails fast while its dependency's breaker is open, and
+    whose async calls are bounded by the turn deadline (see deadline.py)
+
+    Args:
+        inner: Model that actually answers
+        breaker: Breaker of the model's provider
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: Any
+    breaker: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "circuit_breaker"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "BreakerChatModel":
+        return self.model_copy(update={"inner": self.inner.bind_tools(tools, **kwargs)})
+
+    def _record(self, error: Optional[BaseException]) -> None:
+        if error is not None and is_outage(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()  # a rejected request still means the provider is up
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self.breaker.check()
+        try:
+            message = self.inner.invoke(messages, stop=stop, **kwargs)
+        except Exception as e:
+            self._record(e)
+            raise
+        except BaseException:
+            self.breaker.release()  # cancelled
+            raise
+        self._record(None)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self.breaker.check()
+        try:
+            # Inside a turn the call gets what's left of its budget, not the client's 30s x retries
+            message = await deadline.bounded(self.inner.ainvoke(messages, stop=stop, **kwargs))
+        except TurnDeadlineExceeded:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            self._record(e)
+            raise
+        except BaseException:
+            self.breaker.release()  # cancelled
+            raise
+        self._record(None)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        self.breaker.check()
+        try:
+            for chunk in self.inner.stream(messages, stop=stop, **kwargs):
+                generation = as_generation_chunk(chunk)
+                if run_manager:
+                    run_manager.on_llm_new_token(generation.text, chunk=generation)
+                yield generation
+        except Exception as e:
+            self._record(e)
+            raise
+        except BaseException:
+            self.breaker.release()  # cancelled, or the caller stopped reading
+            raise
+        self._record(None)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        self.breaker.check()
+        stream = self.inner.astream(messages, stop=stop, **kwargs).__aiter__()
+        try:
+            while True:
+                try:
+                    # Every chunk has to arrive within what's left of the turn
+                    chunk = await deadline.bounded(stream.__anext__())
+                except StopAsyncIteration:
+                    break
+                generation = as_generation_chunk(chunk)
+                if run_manager:
+                    await run_manager.on_llm_new_token(generation.text, chunk=generation)
+                yield generation
+        except TurnDeadlineExceeded:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            self._record(e)
+            raise
+        except BaseException:
+            self.breaker.release()  # cancelled, or the caller stopped reading
+            raise
+        self._record(None)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_deferred = None
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker of a dependency, from settings"""
+    with _breakers_lock:
+        if name not in _breakers:
+            from app.config import get_settings
+            settings = get_settings()
+            _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=settings.circuit_breaker_failure_threshold,
+                reset_timeout=settings.circuit_breaker_reset_timeout,
+                half_open_max=settings.circuit_breaker_half_open_max,
+            )
+        return _breakers[name]
+
+
+def breaker_stats() -> Dict[str, Any]:
+    return {name: breaker.stats() for name, breaker in list(_breakers.items())}
+
+
+def guarded(model: BaseChatModel, name: str = "openai") -> BreakerChatModel:
+    return BreakerChatModel(inner=model, breaker=get_breaker(name))
+
+
+def get_deferred_queue():
+    """Durable queue of side effects (GHL writes) held back while a breaker was open"""
+    global _deferred
+    if _deferred is None:
+        from app.config import get_settings
+        from app.utils.job_queue import DurableJobQueue
+        settings = get_settings()
+        _deferred = DurableJobQueue(settings.deferred_side_effects_path, max_attempts=settings.deferred_side_effects_max_attempts)
+    return _deferred
+
+
+# Export
+__all__ = [
+    "BreakerChatModel",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "breaker_stats",
+    "get_breaker",
+    "get_deferred_queue",
+    "guarded",
+    "is_outage",
+]
@@ -0,0 +1,127 @@
+"""
+Turn Deadline
+One latency budget for the whole turn, instead of a 30s timeout (plus
+retries) per GHL and LLM call
+
+- run_workflow or ingress puts the turn's deadline (epoch seconds) in the
+  run config: config["configurable"]["turn_deadline"], see deadline_config()
+- Code running inside the graph - nodes, tools, GHL calls, LLM calls - reads
+  it back from the current runnable config with remaining(); timeouts are
+  capped at what's left and retries stop once the budget is spent
+- Nodes degrade instead of overrunning: below turn_deadline_optional_seconds
+  optional work (router GHL notes) is skipped, below turn_deadline_llm_seconds
+  the router keeps the last score and agents send the fallback reply
+- The reply is still sent: GHL writes get turn_deadline_min_write_timeout
+  even past the deadline
+
+Background work started during a turn (outbound sends, cache refreshes) runs
+in detached_context() so it isn't cut short by the turn's budget.
+TURN_DEADLINE_SECONDS=0 turns it off.
+"""
+import asyncio
+import contextvars
+import time
+from typing import Any, Awaitable, Dict, Optional
+
+from langchain_core.runnables.config import var_child_runnable_config
+
+DEADLINE_KEY = "turn_deadline"
+
+
+class TurnDeadlineExceeded(TimeoutError):
+    """The turn's latency budget ran out (or is too low for the next step)"""
+
+
+def new_deadline(budget: Optional[float] = None) -> Optional[float]:
+    """Deadline of a turn starting now - TURN_DEADLINE_SECONDS unless budget is given; None when off"""
+    if budget is None:
+        from app.config import get_settings
+        budget = get_settings().turn_deadline_seconds
+    return time.time() + budget if budget and budget > 0 else None
+
+
+def deadline_config(config: Optional[Dict[str, Any]] = None, deadline: Optional[float] = None) -> Dict[str, Any]:
+    """Run config carrying the turn deadline (a new one from settings unless given)"""
+    config = dict(config or {})
+    deadline = deadline if deadline is not None else new_deadline()
+    if deadline is not None:
+        config["configurable"] = {**config.get("configurable", {}), DEADLINE_KEY: deadline}
+    return config
+
+
+def current_deadline() -> Optional[float]:
+    config = var_child_runnable_config.get()
+    return (config or {}).get("configurable", {}).get(DEADLINE_KEY)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current turn; None outside a turn or when there's no deadline"""
+    deadline = current_deadline()
+    return None if deadline is None else deadline - time.time()
+
+
+def has_budget(seconds: float) -> bool:
+    left = remaining()
+    return left is None or left >= seconds
+
+
+def check(seconds: float = 0.0) -> None:
+    """Raise TurnDeadlineExceeded when less than seconds of the turn are left"""
+    left = remaining()
+    if left is not None and left < seconds:
+        raise TurnDeadlineExceeded(f"{max(left, 0.0):.1f}s left in the turn, {seconds:.1f}s needed")
+
+
+def timeout(default: float, floor: float = 0.0) -> float:
+    """default capped at the time left in the turn, but never below floor (0 = nothing left)"""
+    left = remaining()
+    if left is None:
+        return default
+    return max(min(default, left), floor, 0.0)
+
+
+async def pause(seconds: float) -> bool:
+    """Sleep unless that would overrun the deadline; False when it wasn't taken"""
+    if not has_budget(seconds):
+        return False
+    await asyncio.sleep(seconds)
+    return True
+
+
+async def bounded(awaitable: Awaitable[Any]) -> Any:
+    """Await within the time left in the turn; TurnDeadlineExceeded when it runs out"""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise TurnDeadlineExceeded("turn deadline already passed")
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except asyncio.TimeoutError:
+        raise TurnDeadlineExceeded(f"call cut off by the turn deadline after {left:.1f}s") from None
+
+
+def detached_context() -> contextvars.Context:
+    """Copy of the current context without the turn's run config (for create_task(context=...))"""
+    context = contextvars.copy_context()
+    context.run(var_child_runnable_config.set, None)
+    return context
+
+
+# Export
+__all__ = [
+    "DEADLINE_KEY",
+    "TurnDeadlineExceeded",
+    "bounded",
+    "check",
+    "current_deadline",
+    "deadline_config",
+    "detached_context",
+    "has_budget",
+    "new_deadline",
+    "pause",
+    "remaining",
+    "timeout",
+]
@@ -1,13 +1,108 @@
 """
 Debug Helpers - Tools for faster debugging of LangGraph applications
+
+Per-turn instrumentation (log_state_transition / validate_state) is gated by
+DEBUG_INSTRUMENTATION: "full" runs it on every turn, "sampled" on a fraction
+of turns (DEBUG_SAMPLE_RATE) and "off" never. Nodes decide once per call with
+`__debug__ and should_instrument()` - a runtime check; under `python -O`
+__debug__ is False, so they skip it without drawing a sample.
+
+Output goes through configure_debug_logging()'s queue listener at INFO,
+independent of the root logger's level. The graph configures it when it's
+first built (get_workflow), the local webhook server at startup.
 """
 import json
-from typing import Dict, Any, List
+import logging
+import logging.handlers
+import queue
+import random
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from app.utils.simple_logger import get_logger
 
 logger = get_logger("debug_helpers")
 
+# High-volume state dumps go through stdlib logging so formatting is lazy
+# (%-style args) and emission happens on a QueueListener thread
+debug_log = logging.getLogger("app.debug_helpers")
+
+INSTRUMENTATION_MODES = ("off", "sampled", "full")
+
+_instrumentation_override: Optional[Tuple[str, float]] = None
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+
+@lru_cache()
+def _configured_instrumentation() -> Tuple[str, float]:
+    """Read instrumentation mode and sample rate from settings once"""
+    from app.config import get_settings
+    settings = get_settings()
+    mode = settings.debug_instrumentation.lower()
+    if mode not in INSTRUMENTATION_MODES:
+        logger.warning(f"Unknown DEBUG_INSTRUMENTATION '{mode}', using 'sampled'")
+        mode = "sampled"
+    return mode, settings.debug_sample_rate
+
+
+def set_instrumentation_mode(mode: Optional[str], sample_rate: float = 1.0) -> None:
+    """
+    Override the configured instrumentation mode (benchmarks, tests, local debugging).
+    Pass None to go back to the settings value.
+    """
+    global _instrumentation_override
+    if mode is not None and mode not in INSTRUMENTATION_MODES:
+        raise ValueError(f"mode must be one of {INSTRUMENTATION_MODES}, got {mode!r}")
+    _instrumentation_override = (mode, sample_rate) if mode else None
+
+
+def should_instrument() -> bool:
+    """
+    Decide whether this turn pays for state instrumentation.
+    Call once per node invocation and reuse the answer for input and output.
+    """
+    mode, sample_rate = _instrumentation_override or _configured_instrumentation()
+    if mode == "full":
+        return True
+    if mode == "off":
+        return False
+    return random.random() < sample_rate
+
+
+def configure_debug_logging(level: int = logging.INFO) -> logging.handlers.QueueListener:
+    """
+    Route debug_helpers output through a QueueHandler so formatting and I/O
+    happen on a background thread instead of inside async nodes.
+    Safe to call more than once.
+    """
+    global _queue_listener
+    if _queue_listener is not None:
+        return _queue_listener
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    target = logging.StreamHandler()
+    target.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s"))
+
+    debug_log.addHandler(logging.handlers.QueueHandler(log_queue))
+    debug_log.setLevel(level)
+    debug_log.propagate = False
+
+    _queue_listener = logging.handlers.QueueListener(log_queue, target)
+    _queue_listener.start()
+
+    import atexit
+    atexit.register(_queue_listener.stop)
+    return _queue_listener
+
+
+def _message_content(msg: Any) -> str:
+    if isinstance(msg, dict):
+        return msg.get('content', '')
+    if hasattr(msg, 'content'):
+        return msg.content
+    return str(msg)
+
 
 def validate_state(state: Dict[str, Any], node_name: str) -> Dict[str, Any]:
     """
@@ -25,51 +120,47 @@ def validate_state(state: Dict[str, Any], node_name: str) -> Dict[str, Any]:
     messages = state.get('messages', [])
     results["metrics"]["message_count"] = len(messages)
     
-    # Check for duplicates
+    # Single pass: collect contents, check message shape and count errors
     contents = []
-    for msg in messages:
-        if isinstance(msg, dict):
-            content = msg.get('content', '')
-        elif hasattr(msg, 'content'):
+    shape_issues = []
+    error_count = 0
+    for i, msg in enumerate(messages):
+        if isinstance(msg, BaseMessage):
             content = msg.content
+        elif isinstance(msg, dict):
+            content = msg.get('content', '')
+            if not msg.get('type') and not msg.get('role'):
+                shape_issues.append(f"Message {i} missing type/role: {msg}")
         else:
-            content = str(msg)
+            content = _message_content(msg)
+            shape_issues.append(f"Message {i} is not BaseMessage or dict: {type(msg)}")
         contents.append(content)
+        if "Error" in content:
+            error_count += 1
     
-    unique_contents = set(contents)
-    duplicates = len(contents) - len(unique_contents)
+    duplicates = len(contents) - len(set(contents))
     results["metrics"]["duplicates"] = duplicates
     
     if duplicates > 0:
         results["valid"] = False
         results["issues"].append(f"Found {duplicates} duplicate messages")
         
-        # Find which messages are duplicated
-        from collections import Counter
-        content_counts = Counter(contents)
-        for content, count in content_counts.items():
+        # Only pay for the Counter when there is something to report
+        for content, count in Counter(contents).items():
             if count > 1:
                 results["issues"].append(f"Message '{content[:50]}...' appears {count} times")
     
-    # Check message types
-    for i, msg in enumerate(messages):
-        if isinstance(msg, dict):
-            if not msg.get('type') and not msg.get('role'):
-                results["issues"].append(f"Message {i} missing type/role: {msg}")
-                results["valid"] = False
-        elif not isinstance(msg, BaseMessage):
-            results["issues"].append(f"Message {i} is not BaseMessage or dict: {type(msg)}")
-            results["valid"] = False
+    if shape_issues:
+        results["valid"] = False
+        results["issues"].extend(shape_issues)
     
-    # Check for error messages
-    error_count = sum(1 for c in contents if "Error" in c)
     if error_count > 0:
         results["metrics"]["error_messages"] = error_count
         results["issues"].append(f"Found {error_count} error messages")
     
     # Log validation results
     if not results["valid"]:
-        logger.warning(f"State validation failed for {node_name}: {results['issues']}")
+        debug_log.warning("State validation failed for %s: %s", node_name, results["issues"])
     
     return results
 
@@ -83,43 +174,52 @@ def log_state_transition(state: Dict[str, Any], node_name: str, phase: str = "in
         node_name: Name of the node
         phase: "input" or "output"
     """
-    logger.info(f"=== {node_name.upper()} - {phase.upper()} ===")
+    if not debug_log.isEnabledFor(logging.INFO):
+        return
     
-    # Basic metrics
+    header = f"{node_name.upper()} - {phase.upper()}"
     messages = state.get('messages', [])
-    logger.info(f"Messages: {len(messages)}")
-    logger.info(f"Thread ID: {state.get('thread_id', 'None')}")
-    logger.info(f"Contact ID: {state.get('contact_id', 'None')}")
+    debug_log.info("=== %s ===", header)
+    debug_log.info("Messages: %d", len(messages))
+    debug_log.info("Thread ID: %s", state.get('thread_id', 'None'))
+    debug_log.info("Contact ID: %s", state.get('contact_id', 'None'))
     
     # Message details
     if messages:
-        logger.info("Message breakdown:")
-        human_msgs = sum(1 for m in messages if isinstance(m, HumanMessage) or (isinstance(m, dict) and m.get('role') == 'human'))
-        ai_msgs = sum(1 for m in messages if isinstance(m, AIMessage) or (isinstance(m, dict) and m.get('role') == 'ai'))
-        logger.info(f"  Human messages: {human_msgs}")
-        logger.info(f"  AI messages: {ai_msgs}")
-        logger.info(f"  Other: {len(messages) - human_msgs - ai_msgs}")
+        human_msgs = ai_msgs = 0
+        for m in messages:
+            if isinstance(m, HumanMessage):
+                human_msgs += 1
+            elif isinstance(m, AIMessage):
+                ai_msgs += 1
+            elif isinstance(m, dict):
+                role = m.get('role')
+                if role == 'human':
+                    human_msgs += 1
+                elif role == 'ai':
+                    ai_msgs += 1
+        debug_log.info("Message breakdown:")
+        debug_log.info("  Human messages: %d", human_msgs)
+        debug_log.info("  AI messages: %d", ai_msgs)
+        debug_log.info("  Other: %d", len(messages) - human_msgs - ai_msgs)
         
         # Last few messages
-        logger.info("Last 3 messages:")
+        debug_log.info("Last 3 messages:")
         for msg in messages[-3:]:
             if isinstance(msg, dict):
-                content = msg.get('content', '')[:100]
                 msg_type = msg.get('role', msg.get('type', 'unknown'))
             elif hasattr(msg, 'content'):
-                content = str(msg.content)[:100]
                 msg_type = msg.__class__.__name__
             else:
-                content = str(msg)[:100]
                 msg_type = type(msg).__name__
-            logger.info(f"  [{msg_type}] {content}...")
+            debug_log.info("  [%s] %.100s...", msg_type, _message_content(msg))
     
     # Other state keys
     other_keys = [k for k in state.keys() if k not in ['messages', 'thread_id', 'contact_id']]
     if other_keys:
-        logger.info(f"Other state keys: {other_keys[:5]}...")  # Show first 5
+        debug_log.info("Other state keys: %s...", other_keys[:5])  # Show first 5
     
-    logger.info(f"=== END {node_name.upper()} - {phase.upper()} ===\n")
+    debug_log.info("=== END %s ===\n", header)
 
 
 def analyze_message_accumulation(states: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -189,22 +289,19 @@ def create_debug_wrapper(node_func):
     async def wrapper(state: Dict[str, Any]) -> Dict[str, Any]:
         node_name = node_func.__name__
         start_time = time.time()
+        instrument = __debug__ and should_instrument()
         
-        # Log input
-        log_state_transition(state, node_name, "input")
-        
-        # Validate input
-        input_validation = validate_state(state, node_name)
+        if instrument:
+            log_state_transition(state, node_name, "input")
+            validate_state(state, node_name)
         
         try:
             # Call original function
             result = await node_func(state)
             
-            # Log output
-            log_state_transition(result, node_name, "output")
-            
-            # Validate output
-            output_validation = validate_state(result, node_name)
+            if instrument:
+                log_state_transition(result, node_name, "output")
+                validate_state(result, node_name)
             
             # Performance metrics
             duration = time.time() - start_time
@@ -0,0 +1,200 @@
+"""
+Hedged LLM Requests
+Cuts the tail of LLM latency: when a call hasn't answered by the task's
+recent p90 (llm_hedge_percentile), an identical second request is sent and
+whichever answers first is used; the other is cancelled
+
+- Latency windows are per key (task:model), so a slow agent model doesn't
+  set the hedge delay of the router
+- No hedging until a key has llm_hedge_min_samples calls, and never sooner
+  than llm_hedge_min_delay_ms
+- Hedges are capped by a budget: each call earns llm_hedge_budget of a
+  hedge (5% of calls by default, bursts up to HEDGE_BURST), so a slow
+  provider doesn't get twice the traffic
+- Counters (get_hedger().stats()) show how often hedges fired and won
+
+Opt-in with LLM_HEDGING_ENABLED=true; async calls only (sync calls and
+streams pass through).
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+
+from app.utils.message_utils import as_generation_chunk
+from app.utils.simple_logger import get_logger
+
+logger = get_logger("hedging")
+
+HEDGE_BURST = 10.0
+
+
+class Hedger:
+    """
+    Hedge delays per key, the hedge budget and the counters
+
+    Args:
+        percentile: Latency percentile of a key after which a call is hedged
+        budget: Hedges allowed per call (0.05 = one hedge per 20 calls)
+        min_samples: Calls a key needs before it's hedged
+        min_delay_ms: Floor for the hedge delay
+        window: Latest latencies kept per key
+    """
+
+    def __init__(self, percentile: float = 0.9, budget: float = 0.05, min_samples: int = 20,
+                 min_delay_ms: float = 200.0, window: int = 200):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay_ms = min_delay_ms
+        self.window = window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._tokens = 1.0
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "hedged": 0, "hedge_won": 0, "primary_won": 0, "over_budget": 0}
+
+    def delay(self, key: str) -> Optional[float]:
+        """Seconds to wait before hedging a call of key, None if it isn't hedged"""
+        with self._lock:
+            self.counters["calls"] += 1
+            self._tokens = min(HEDGE_BURST, self._tokens + self.budget)
+            samples = self._latencies.get(key)
+            if not samples or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        cutoff = ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+        return max(cutoff, self.min_delay_ms) / 1000
+
+    def acquire(self) -> bool:
+        """Take a hedge from the budget"""
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self.counters["hedged"] += 1
+                return True
+            self.counters["over_budget"] += 1
+            return False
+
+    def record(self, key: str, latency_ms: float, hedged: bool = False, hedge_won: bool = False) -> None:
+        with self._lock:
+            if key not in self._latencies:
+                self._latencies[key] = deque(maxlen=self.window)
+            self._latencies[key].append(latency_ms)
+            if hedged:
+                self.counters["hedge_won" if hedge_won else "primary_won"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        counters["hedge_rate"] = round(counters["hedged"] / counters["calls"], 4) if counters["calls"] else 0.0
+        counters["hedge_win_rate"] = round(counters["hedge_won"] / counters["hedged"], 4) if counters["hedged"] else 0.0
+        return counters
+
+
+class HedgedChatModel(BaseChatModel):
+    """
+    Chat model that sends a second, identical request when the first is slow
+
+    Args:
+        inner: Model that actually answers
+        key: Latency window to use (task:model)
+        hedger: Shared delays, budget and counters
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: Any
+    key: str
+    hedger: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "HedgedChatModel":
+        return self.model_copy(update={"inner": self.inner.bind_tools(tools, **kwargs)})
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        message = self.inner.invoke(messages, stop=stop, **kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        start = time.perf_counter()
+        delay = self.hedger.delay(self.key)
+        primary = asyncio.ensure_future(self.inner.ainvoke(messages, stop=stop, **kwargs))
+        hedge = None
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                if not done and self.hedger.acquire():
+                    hedge = asyncio.ensure_future(self.inner.ainvoke(messages, stop=stop, **kwargs))
+            message, winner = await self._first_answer([task for task in (primary, hedge) if task])
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+        latency_ms = (time.perf_counter() - start) * 1e3
+        self.hedger.record(self.key, latency_ms, hedged=hedge is not None, hedge_won=winner is hedge)
+        if winner is hedge:
+            logger.info(f"Hedge won for {self.key} after {delay * 1000:.0f}ms ({latency_ms:.0f}ms total)")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for chunk in self.inner.stream(messages, stop=stop, **kwargs):
+            generation = as_generation_chunk(chunk)
+            if run_manager:
+                run_manager.on_llm_new_token(generation.text, chunk=generation)
+            yield generation
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        # A stream that has started can't be swapped for a faster one - not hedged
+        async for chunk in self.inner.astream(messages, stop=stop, **kwargs):
+            generation = as_generation_chunk(chunk)
+            if run_manager:
+                await run_manager.on_llm_new_token(generation.text, chunk=generation)
+            yield generation
+
+    @staticmethod
+    async def _first_answer(tasks: List[asyncio.Future]):
+        """Result of the first request that succeeds; the first error if they all fail"""
+        pending, error = set(tasks), None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            errors = [task.exception() for task in done]  # retrieved even when the other one wins
+            for task, task_error in zip(done, errors):
+                if task_error is None:
+                    return task.result(), task
+            error = error or errors[0]
+        raise error
+
+
+_hedger: Optional[Hedger] = None
+
+
+def get_hedger() -> Hedger:
+    global _hedger
+    if _hedger is None:
+        from app.config import get_settings
+        settings = get_settings()
+        _hedger = Hedger(
+            percentile=settings.llm_hedge_percentile,
+            budget=settings.llm_hedge_budget,
+            min_samples=settings.llm_hedge_min_samples,
+            min_delay_ms=settings.llm_hedge_min_delay_ms,
+        )
+    return _hedger
+
+
+def hedged(model: BaseChatModel, key: str) -> HedgedChatModel:
+    return HedgedChatModel(inner=model, key=key, hedger=get_hedger())
+
+
+# Export
+__all__ = ["HedgedChatModel", "Hedger", "get_hedger", "hedged"]
@@ -0,0 +1,333 @@
+"""
+Durable Job Queue
+Lets webhook ingress answer GHL in milliseconds: the payload is committed to
+a local SQLite database (WAL mode) and a pool of async workers processes it
+afterwards
+
+- Jobs survive crashes: a job is only removed once its handler succeeds. A
+  worker holds a lease on the job it runs and renews it while the handler
+  runs; jobs whose lease expired, or whose owning process is gone, are
+  picked up again. Owners are "pid:boot token", so a restarted container
+  that got the same pid back doesn't mistake the previous run's jobs for its
+  own.
+- A worker only completes, fails or renews its own claim (owner and attempt
+  number), so a worker that lost its lease can't undo the one that took over.
+- Failures are retried with exponential backoff up to max_attempts, then kept
+  as 'dead' for inspection.
+- Jobs with the same ordering key (a conversation) run one at a time, in
+  arrival order; different keys run in parallel.
+- stats() reports depth, in-flight, dead and the age of the oldest job.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.utils.simple_logger import get_logger
+
+logger = get_logger("job_queue")
+
+# Tells this run of the process apart from an earlier one with the same pid
+BOOT_TOKEN = uuid.uuid4().hex[:12]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    ordering_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',  -- queued, running, dead
+    attempts INTEGER NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    lease_until REAL,
+    owner TEXT,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS jobs_ordering ON jobs (ordering_key, id);
+"""
+
+# Oldest ready job whose conversation has no earlier unfinished job
+CLAIM = """
+UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = :lease, owner = :owner
+WHERE id = (
+    SELECT j.id FROM jobs j
+    WHERE ((j.status = 'queued' AND j.available_at <= :now) OR (j.status = 'running' AND j.lease_until < :now))
+      AND NOT EXISTS (
+          SELECT 1 FROM jobs k
+          WHERE k.ordering_key = j.ordering_key AND k.id < j.id AND k.status IN ('queued', 'running')
+      )
+    ORDER BY j.id LIMIT 1
+)
+RETURNING id, kind, ordering_key, payload, attempts, enqueued_at
+"""
+
+# Rows still held by this claim - the job wasn't taken over after its lease expired
+CLAIMED = "id = :id AND owner = :owner AND attempts = :attempts AND status = 'running'"
+
+
+@dataclass
+class Job:
+    """A claimed job"""
+    id: int
+    kind: str
+    ordering_key: str
+    payload: Dict[str, Any]
+    attempts: int
+    enqueued_at: float
+
+
+class DurableJobQueue:
+    """
+    SQLite-backed job queue
+
+    Args:
+        path: Database file (created with its directory)
+        max_attempts: Runs per job before it is marked dead
+        lease_seconds: How long a claimed job stays with its worker before
+            another may take it over
+        backoff: Seconds before the first retry, doubled on each further one
+    """
+
+    def __init__(self, path: str, max_attempts: int = 5, lease_seconds: float = 300.0, backoff: float = 2.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.backoff = backoff
+        self.owner = f"{os.getpid()}:{BOOT_TOKEN}"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # Commits survive a process crash; only an OS crash can lose the last ones
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.executescript(SCHEMA)
+
+    def enqueue(self, payload: Dict[str, Any], ordering_key: str = "", kind: str = "webhook") -> int:
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO jobs (kind, ordering_key, payload, enqueued_at, available_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, ordering_key, json.dumps(payload, ensure_ascii=False), now, now),
+            )
+            return cursor.lastrowid
+
+    def claim(self) -> Optional[Job]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(CLAIM, {"now": now, "lease": now + self.lease_seconds, "owner": self.owner}).fetchone()
+        if row is None:
+            return None
+        return Job(id=row[0], kind=row[1], ordering_key=row[2], payload=json.loads(row[3]),
+                   attempts=row[4], enqueued_at=row[5])
+
+    def _claimed(self, job: Job) -> Dict[str, Any]:
+        return {"id": job.id, "owner": self.owner, "attempts": job.attempts}
+
+    def renew(self, job: Job) -> bool:
+        """Extend the lease of a running job; False if it was taken over"""
+        with self._lock:
+            return self._db.execute(
+                f"UPDATE jobs SET lease_until = :lease WHERE {CLAIMED}",
+                {**self._claimed(job), "lease": time.time() + self.lease_seconds},
+            ).rowcount == 1
+
+    def complete(self, job: Job) -> bool:
+        """Remove a finished job; False if another worker took it over meanwhile"""
+        with self._lock:
+            done = self._db.execute(f"DELETE FROM jobs WHERE {CLAIMED}", self._claimed(job)).rowcount == 1
+        if not done:
+            logger.warning(f"Job {job.id} finished after its lease was taken over (attempt {job.attempts})")
+        return done
+
+    def fail(self, job: Job, error: str) -> bool:
+        """Schedule a retry; returns False once the job is dead (a taken-over job is left alone)"""
+        dead = job.attempts >= self.max_attempts
+        with self._lock:
+            if dead:
+                updated = self._db.execute(
+                    f"UPDATE jobs SET status = 'dead', lease_until = NULL, last_error = :error WHERE {CLAIMED}",
+                    {**self._claimed(job), "error": error},
+                ).rowcount
+            else:
+                retry_at = time.time() + self.backoff * 2 ** (job.attempts - 1)
+                updated = self._db.execute(
+                    f"UPDATE jobs SET status = 'queued', available_at = :retry_at, lease_until = NULL, last_error = :error "
+                    f"WHERE {CLAIMED}",
+                    {**self._claimed(job), "retry_at": retry_at, "error": error},
+                ).rowcount
+        if not updated:
+            logger.warning(f"Job {job.id} failed after its lease was taken over (attempt {job.attempts})")
+            return True
+        return not dead
+
+    def recover(self) -> int:
+        """Requeue jobs left running by processes that no longer exist (call on startup)"""
+        with self._lock:
+            owners = [row[0] for row in self._db.execute("SELECT DISTINCT owner FROM jobs WHERE status = 'running'")]
+            orphaned = [owner for owner in owners if not _process_alive(owner)]
+            recovered = 0
+            for owner in orphaned:
+                recovered += self._db.execute(
+                    "UPDATE jobs SET status = 'queued', available_at = ?, lease_until = NULL WHERE status = 'running' AND owner = ?",
+                    (time.time(), owner),
+                ).rowcount
+        if recovered:
+            logger.warning(f"Recovered {recovered} job(s) interrupted by a crash")
+        return recovered
+
+    def dead_jobs(self, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, kind, ordering_key, payload, attempts, last_error FROM jobs WHERE status = 'dead' ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {"id": r[0], "kind": r[1], "ordering_key": r[2], "payload": json.loads(r[3]), "attempts": r[4], "last_error": r[5]}
+            for r in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = self._db.execute("SELECT MIN(enqueued_at) FROM jobs WHERE status != 'dead'").fetchone()[0]
+        return {
+            "depth": counts.get("queued", 0),
+            "in_flight": counts.get("running", 0),
+            "dead": counts.get("dead", 0),
+            "oldest_age_seconds": round(now - oldest, 3) if oldest else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _process_alive(owner: Optional[str]) -> bool:
+    pid, _, token = (owner or "").partition(":")
+    if pid == str(os.getpid()):
+        return token == BOOT_TOKEN  # same pid, earlier boot: gone
+    try:
+        os.kill(int(pid), 0)
+    except (TypeError, ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True  # Exists, owned by someone else
+    return True
+
+
+Handler = Callable[[Job], Awaitable[None]]
+
+
+class JobWorkerPool:
+    """
+    Async workers draining a DurableJobQueue
+
+    Args:
+        queue: The queue
+        handler: Coroutine processing one job; raising means failure
+        workers: Jobs processed at the same time
+        poll_interval: Seconds between checks when idle (retries and jobs
+            enqueued by other processes are found this way)
+        on_dead: Called with a job that ran out of attempts
+    """
+
+    def __init__(
+        self,
+        queue: DurableJobQueue,
+        handler: Handler,
+        workers: int = 4,
+        poll_interval: float = 0.5,
+        on_dead: Optional[Callable[[Job], Awaitable[None]]] = None,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.on_dead = on_dead
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+        self.processed = 0
+        self.failed = 0
+        self.wait_ms: List[float] = []  # enqueue -> start, last 1000 jobs
+
+    def notify(self) -> None:
+        """Wake idle workers after an enqueue in this process"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        self.queue.recover()
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work(i)) for i in range(self.workers)]
+        logger.info(f"Started {self.workers} job workers")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Let running jobs finish (up to timeout); unfinished ones are picked up after restart"""
+        self._stopping = True
+        self.notify()
+        done, pending = await asyncio.wait(self._tasks, timeout=timeout) if self._tasks else (set(), set())
+        for task in pending:
+            task.cancel()
+        self._tasks = []
+
+    async def _work(self, index: int) -> None:
+        while not self._stopping:
+            job = self.queue.claim()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self.wait_ms = self.wait_ms[-999:] + [(time.time() - job.enqueued_at) * 1000]
+            heartbeat = asyncio.create_task(self._heartbeat(job))
+            try:
+                await self.handler(job)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Job {job.id} failed (attempt {job.attempts}): {e}", exc_info=True)
+                if not self.queue.fail(job, str(e)) and self.on_dead is not None:
+                    await self.on_dead(job)
+                continue
+            finally:
+                heartbeat.cancel()
+            if self.queue.complete(job):
+                self.processed += 1
+            # An earlier job of a conversation finishing may unblock its next one
+            self.notify()
+
+    async def _heartbeat(self, job: Job) -> None:
+        """Renew the job's lease every third of it while the handler runs"""
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            if not self.queue.renew(job):
+                logger.warning(f"Lost the lease on job {job.id}")
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        ordered = sorted(self.wait_ms)
+        return {
+            **self.queue.stats(),
+            "workers": self.workers,
+            "processed": self.processed,
+            "failed_attempts": self.failed,
+            "queue_wait_ms_p50": round(ordered[len(ordered) // 2], 1) if ordered else 0.0,
+            "queue_wait_ms_p95": round(ordered[int(len(ordered) * 0.95)], 1) if ordered else 0.0,
+        }
+
+
+# Export
+__all__ = ["DurableJobQueue", "Job", "JobWorkerPool"]
@@ -8,7 +8,6 @@ import json
 from datetime import datetime
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
 from langchain_core.callbacks import CallbackManagerForLLMRun
-from langsmith import Client
 try:
     from langsmith import traceable
 except ImportError:
@@ -24,12 +23,11 @@ except ImportError:
         return None
 import structlog
 from app.utils.simple_logger import get_logger
+from app.utils.trace_exporter import EventPriority, TraceEvent, get_trace_exporter
+from app.utils.debug_helpers import should_instrument
 
 logger = get_logger("langsmith_debug")
 
-# Initialize LangSmith client
-langsmith_client = Client()
-
 
 class LangSmithDebugger:
     """Comprehensive debugger that sends everything to LangSmith"""
@@ -45,24 +43,25 @@ class LangSmithDebugger:
             return str(msg)
     
     @staticmethod
-    def log_metadata(metadata: Dict[str, Any], name: str = "debug_info"):
-        """Add metadata to current LangSmith run"""
+    def log_metadata(
+        metadata: Dict[str, Any],
+        name: str = "debug_info",
+        priority: EventPriority = EventPriority.NORMAL
+    ):
+        """
+        Queue metadata for the current LangSmith run.
+        Only the run tree lookup happens here - shipping is done in batches
+        by the background trace exporter so it never delays a customer turn.
+        """
         try:
-            run_tree = get_current_run_tree()
-            if run_tree:
-                # Use the correct API for adding metadata
-                if hasattr(run_tree, 'add_metadata'):
-                    run_tree.add_metadata({name: metadata})
-                elif hasattr(run_tree, 'metadata'):
-                    # Fallback: directly update metadata if available
-                    if run_tree.metadata is None:
-                        run_tree.metadata = {}
-                    run_tree.metadata[name] = metadata
-                else:
-                    # If neither method is available, just log locally
-                    logger.debug(f"LangSmith metadata ({name}): {metadata}")
+            get_trace_exporter().submit(TraceEvent(
+                name=name,
+                metadata=metadata,
+                priority=priority,
+                run_tree=get_current_run_tree()
+            ))
         except Exception as e:
-            logger.error(f"Failed to log metadata to LangSmith: {e}")
+            logger.error(f"Failed to queue metadata for LangSmith: {e}")
     
     @staticmethod
     def log_state_snapshot(state: Dict[str, Any], phase: str = "unknown"):
@@ -96,7 +95,7 @@ class LangSmithDebugger:
             snapshot["message_types"] = message_types
             
             # Log to LangSmith
-            LangSmithDebugger.log_metadata(snapshot, f"state_snapshot_{phase}")
+            LangSmithDebugger.log_metadata(snapshot, f"state_snapshot_{phase}", EventPriority.LOW)
             
         except Exception as e:
             logger.error(f"Failed to log state snapshot: {e}")
@@ -123,10 +122,13 @@ class LangSmithDebugger:
                     "thread_id": state.get("thread_id"),
                     "contact_id": state.get("contact_id"),
                 }
-                LangSmithDebugger.log_metadata(entry_metadata, f"{node_name}_entry")
+                LangSmithDebugger.log_metadata(entry_metadata, f"{node_name}_entry", EventPriority.LOW)
+                
+                # Full state snapshots are the expensive part - sample them per turn
+                snapshots = include_state_snapshots and __debug__ and should_instrument()
                 
                 # Log state snapshot on entry
-                if include_state_snapshots:
+                if snapshots:
                     LangSmithDebugger.log_state_snapshot(state, f"{node_name}_entry")
                 
                 # Execute the node
@@ -141,7 +143,7 @@ class LangSmithDebugger:
                         "output_keys": list(result.keys()) if result else [],
                         "success": True,
                     }
-                    LangSmithDebugger.log_metadata(exit_metadata, f"{node_name}_exit")
+                    LangSmithDebugger.log_metadata(exit_metadata, f"{node_name}_exit", EventPriority.LOW)
                     
                     # Log state changes
                     if result:
@@ -149,10 +151,10 @@ class LangSmithDebugger:
                             "messages_added": len(result.get("messages", [])),
                             "state_updates": {k: v for k, v in result.items() if k != "messages"},
                         }
-                        LangSmithDebugger.log_metadata(changes, f"{node_name}_changes")
+                        LangSmithDebugger.log_metadata(changes, f"{node_name}_changes", EventPriority.LOW)
                     
                     # Log state snapshot on exit
-                    if include_state_snapshots and result:
+                    if snapshots and result:
                         merged_state = {**state, **result}
                         LangSmithDebugger.log_state_snapshot(merged_state, f"{node_name}_exit")
                     
@@ -168,7 +170,7 @@ class LangSmithDebugger:
                         "error_message": str(e),
                         "success": False,
                     }
-                    LangSmithDebugger.log_metadata(error_metadata, f"{node_name}_error")
+                    LangSmithDebugger.log_metadata(error_metadata, f"{node_name}_error", EventPriority.HIGH)
                     raise
             
             @wraps(func)
@@ -189,9 +191,10 @@ class LangSmithDebugger:
                     "thread_id": state.get("thread_id"),
                     "contact_id": state.get("contact_id"),
                 }
-                LangSmithDebugger.log_metadata(entry_metadata, f"{node_name}_entry")
+                LangSmithDebugger.log_metadata(entry_metadata, f"{node_name}_entry", EventPriority.LOW)
                 
-                if include_state_snapshots:
+                snapshots = include_state_snapshots and __debug__ and should_instrument()
+                if snapshots:
                     LangSmithDebugger.log_state_snapshot(state, f"{node_name}_entry")
                 
                 try:
@@ -204,16 +207,16 @@ class LangSmithDebugger:
                         "output_keys": list(result.keys()) if result else [],
                         "success": True,
                     }
-                    LangSmithDebugger.log_metadata(exit_metadata, f"{node_name}_exit")
+                    LangSmithDebugger.log_metadata(exit_metadata, f"{node_name}_exit", EventPriority.LOW)
                     
                     if result:
                         changes = {
                             "messages_added": len(result.get("messages", [])),
                             "state_updates": {k: v for k, v in result.items() if k != "messages"},
                         }
-                        LangSmithDebugger.log_metadata(changes, f"{node_name}_changes")
+                        LangSmithDebugger.log_metadata(changes, f"{node_name}_changes", EventPriority.LOW)
                     
-                    if include_state_snapshots and result:
+                    if snapshots and result:
                         merged_state = {**state, **result}
                         LangSmithDebugger.log_state_snapshot(merged_state, f"{node_name}_exit")
                     
@@ -228,7 +231,7 @@ class LangSmithDebugger:
                         "error_message": str(e),
                         "success": False,
                     }
-                    LangSmithDebugger.log_metadata(error_metadata, f"{node_name}_error")
+                    LangSmithDebugger.log_metadata(error_metadata, f"{node_name}_error", EventPriority.HIGH)
                     raise
             
             # Return appropriate wrapper based on function type
@@ -251,7 +254,11 @@ class LangSmithDebugger:
             "success": error is None,
             "error": str(error) if error else None,
         }
-        LangSmithDebugger.log_metadata(tool_metadata, f"tool_{tool_name}")
+        LangSmithDebugger.log_metadata(
+            tool_metadata,
+            f"tool_{tool_name}",
+            EventPriority.HIGH if error else EventPriority.NORMAL
+        )
     
     @staticmethod
     def log_routing_decision(from_agent: str, to_agent: str, reason: str, score: int):
@@ -290,7 +297,7 @@ class LangSmithDebugger:
             }
             message_analysis["last_5_messages"].append(msg_info)
         
-        LangSmithDebugger.log_metadata(message_analysis, f"message_flow_{phase}")
+        LangSmithDebugger.log_metadata(message_analysis, f"message_flow_{phase}", EventPriority.LOW)
     
     @staticmethod
     def create_traceable_tool(tool_func: Callable, tool_name: str):
@@ -305,7 +312,7 @@ class LangSmithDebugger:
             LangSmithDebugger.log_metadata({
                 "args": str(args)[:500],
                 "kwargs": str(kwargs)[:500],
-            }, f"tool_{tool_name}_inputs")
+            }, f"tool_{tool_name}_inputs", EventPriority.LOW)
             
             try:
                 result = tool_func(*args, **kwargs)
@@ -339,9 +346,18 @@ def debug_node(node_name: str):
     return debugger.create_debug_wrapper(node_name)
 
 
-def log_to_langsmith(metadata: Dict[str, Any], name: str = "custom_debug"):
-    """Quick function to log any metadata to LangSmith"""
-    debugger.log_metadata(metadata, name)
+def log_to_langsmith(
+    metadata: Dict[str, Any],
+    name: str = "custom_debug",
+    priority: Optional[EventPriority] = None
+):
+    """
+    Quick function to log any metadata to LangSmith.
+    Events whose name mentions an error are kept at HIGH priority by default.
+    """
+    if priority is None:
+        priority = EventPriority.HIGH if "error" in name else EventPriority.NORMAL
+    debugger.log_metadata(metadata, name, priority)
 
 
 def debug_state(state: Dict[str, Any], context: str = ""):
@@ -351,6 +367,7 @@ def debug_state(state: Dict[str, Any], context: str = ""):
 
 # Export
 __all__ = [
+    "EventPriority",
     "LangSmithDebugger",
     "debugger",
     "debug_node",
@@ -2,7 +2,8 @@
 Message utility functions
 """
 from typing import List, Dict, Any
-from langchain_core.messages import BaseMessage
+from langchain_core.messages import AIMessageChunk, BaseMessage, BaseMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
 
 def get_trimmed_messages(messages: List[BaseMessage], config_name: str = "default") -> List[BaseMessage]:
     """
@@ -10,4 +11,14 @@ def get_trimmed_messages(messages: List[BaseMessage], config_name: str = "defaul
     
     For now, just return the last 50 messages
     """
-    return messages[-50:]
\ No newline at end of file
+    return messages[-50:]
+
+
+def as_generation_chunk(message: BaseMessage) -> ChatGenerationChunk:
+    """
+    Chunk of a wrapped model's stream - a model that doesn't stream yields its
+    whole reply as one full AIMessage, which a stream can't carry as is
+    """
+    if not isinstance(message, BaseMessageChunk):
+        message = AIMessageChunk(**message.model_dump(exclude={"type"}))
+    return ChatGenerationChunk(message=message)
@@ -2,29 +2,78 @@
 Model factory for creating properly configured LLM instances
 Ensures tool calling is properly supported
 """
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
+from typing import Callable, Optional
 from app.config import get_settings
 from app.utils.simple_logger import get_logger
 
 logger = get_logger("model_factory")
 
+# langchain_openai / langchain_anthropic are imported when the first model is
+# built - they're most of the cold-start import time
 
-def create_openai_model(model_name: str = None, temperature: float = 0.0):
+# Replaces ChatOpenAI everywhere when set (local stand-ins, benchmarks).
+# Must be installed before the first model is built - SmartRouter builds its model on first use.
+_model_override: Optional[Callable[..., object]] = None
+
+
+def set_model_override(factory: Optional[Callable[..., object]]) -> None:
+    """Route create_openai_model through factory(model_name=..., temperature=...); None restores OpenAI"""
+    global _model_override
+    _model_override = factory
+
+
+def create_openai_model(model_name: str = None, temperature: float = 0.0, task: Optional[str] = None):
     """
     Create a properly configured ChatOpenAI instance
     This ensures tool calling works correctly
+    
+    With a task (router, maria, carlos, sofia, summarizer) and no explicit
+    model_name, the task's model tiers are used instead - see model_tiers.py.
+    Calls of a task are hedged when LLM_HEDGING_ENABLED is set - see hedging.py
+    OpenAI calls go through the shared "openai" circuit breaker - see circuit_breaker.py
     """
     settings = get_settings()
-    model = model_name or settings.openai_model
     
-    # Create explicit ChatOpenAI instance
-    llm = ChatOpenAI(
+    def build(model: str, max_tokens: Optional[int] = None):
+        llm = _build_model(model, temperature, max_tokens)
+        if task and settings.llm_hedging_enabled:
+            from app.utils.hedging import hedged
+            return hedged(llm, f"{task}:{model}")
+        return llm
+    
+    if task and not model_name and settings.model_tiering_enabled:
+        from app.utils.model_tiers import create_tiered_model
+        return create_tiered_model(task, build)
+    return build(model_name or settings.openai_model)
+
+
+def _build_model(model: str, temperature: float, max_tokens: Optional[int] = None):
+    settings = get_settings()
+    
+    if _model_override is not None:
+        return _model_override(model_name=model, temperature=temperature)
+    
+    # Recorded responses keyed by prompt hash (no network in replay)
+    if settings.llm_backend == "replay":
+        from app.utils.replay_model import create_replay_model
+        logger.info(f"Created replay model from {settings.llm_cassette_path}")
+        return create_replay_model()
+    
+    # Create explicit ChatOpenAI instance, failing fast while OpenAI is known to be down
+    from langchain_openai import ChatOpenAI
+    from app.utils.circuit_breaker import guarded
+    llm = guarded(ChatOpenAI(
         model=model,
         temperature=temperature,
+        max_tokens=max_tokens,
         max_retries=3,
         timeout=30
-    )
+    ), "openai")
+    
+    if settings.llm_backend == "record":
+        from app.utils.replay_model import create_replay_model
+        logger.info(f"Recording {model} responses to {settings.llm_cassette_path}")
+        return create_replay_model(inner=llm, record=True)
     
     logger.info(f"Created ChatOpenAI model: {model} (temp={temperature})")
     return llm
@@ -39,7 +88,7 @@ def create_model_for_agent(provider: str = "openai", **kwargs):
         return create_openai_model(**kwargs)
     elif provider == "anthropic":
         # Alternative that's known to work well with tools
-        settings = get_settings()
+        from langchain_anthropic import ChatAnthropic
         return ChatAnthropic(
             model="claude-3-opus-20240229",
             temperature=kwargs.get("temperature", 0.0),
@@ -0,0 +1,300 @@
+"""
+Latency-Tiered Model Selection
+Each LLM task (router, maria, carlos, sofia, summarizer) has an ordered list
+of models - preferred first, fastest last - with a p95 latency budget and a
+max_tokens cap
+
+- Every call is timed per (task, model); once a model has min_samples calls
+  in its window and its p95 is over the task's budget, the task falls back to
+  the next model for model_tier_cooldown seconds, then tries it again
+- A call that fails (timeout, deadline cutoff, API error) is recorded at its
+  elapsed time or twice the budget, whichever is longer, so a model that
+  keeps failing is demoted like one that answers slowly
+- Switches are logged, and each reply carries response_metadata["model_tier"]
+  (task, model, latency, budget) so quality can be compared against speed
+  per tier in traces and checkpoints
+
+Configured with MODEL_TIERS, a JSON object merged over DEFAULT_TASK_PROFILES:
+    MODEL_TIERS='{"router": {"models": ["gpt-4o-mini"], "budget_ms": 1200}}'
+"""
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+
+from app.utils.message_utils import as_generation_chunk
+from app.utils.simple_logger import get_logger
+
+logger = get_logger("model_tiers")
+
+# None stands for settings.openai_model
+DEFAULT_TASK_PROFILES: Dict[str, Dict[str, Any]] = {
+    "router": {"models": ["gpt-4o-mini"], "budget_ms": 1500, "max_tokens": 500},
+    "maria": {"models": [None, "gpt-4o-mini"], "budget_ms": 3000, "max_tokens": 600},
+    "carlos": {"models": [None, "gpt-4o-mini"], "budget_ms": 4000, "max_tokens": 600},
+    "sofia": {"models": [None, "gpt-4o-mini"], "budget_ms": 4000, "max_tokens": 600},
+    "summarizer": {"models": ["gpt-4o-mini"], "budget_ms": 3000, "max_tokens": 400},
+}
+
+
+@dataclass
+class TaskProfile:
+    task: str
+    models: List[str]
+    budget_ms: float
+    max_tokens: Optional[int] = None
+
+
+def load_profiles(default_model: str, overrides: str = "") -> Dict[str, TaskProfile]:
+    """DEFAULT_TASK_PROFILES with the MODEL_TIERS JSON merged over it"""
+    merged = {task: dict(profile) for task, profile in DEFAULT_TASK_PROFILES.items()}
+    for task, profile in (json.loads(overrides) if overrides else {}).items():
+        merged.setdefault(task, {"models": [None], "budget_ms": 5000}).update(profile)
+    return {
+        task: TaskProfile(
+            task=task,
+            models=[model or default_model for model in profile["models"]],
+            budget_ms=float(profile["budget_ms"]),
+            max_tokens=profile.get("max_tokens"),
+        )
+        for task, profile in merged.items()
+    }
+
+
+@dataclass
+class _Window:
+    samples: Deque[float]
+    calls: int = 0
+    demoted_until: float = 0.0
+
+    def p95(self) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+
+class TierSelector:
+    """
+    Live p95 per (task, model), and which tier each task should use
+
+    Args:
+        window: Latest calls kept per (task, model)
+        min_samples: Calls needed before a p95 can demote a model
+        cooldown: Seconds a demoted model is skipped before it's tried again
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20, cooldown: float = 300.0):
+        self.window = window
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self._windows: Dict[Tuple[str, str], _Window] = {}
+        self._lock = threading.Lock()
+        self.fallbacks = 0
+
+    def _window(self, task: str, model: str) -> _Window:
+        key = (task, model)
+        if key not in self._windows:
+            self._windows[key] = _Window(deque(maxlen=self.window))
+        return self._windows[key]
+
+    def choose(self, profile: TaskProfile) -> int:
+        """Index of the first model of the task that isn't demoted (the last one always qualifies)"""
+        now = time.monotonic()
+        with self._lock:
+            for index, model in enumerate(profile.models[:-1]):
+                window = self._window(profile.task, model)
+                if window.demoted_until > now:
+                    continue
+                if window.demoted_until:
+                    # Cooldown over - judge it on fresh samples
+                    window.demoted_until = 0.0
+                    window.samples.clear()
+                    logger.info(f"Model tier {profile.task}: trying {model} again after cooldown")
+                return index
+        return len(profile.models) - 1
+
+    def record(self, profile: TaskProfile, index: int, latency_ms: float) -> None:
+        model = profile.models[index]
+        with self._lock:
+            window = self._window(profile.task, model)
+            window.samples.append(latency_ms)
+            window.calls += 1
+            if index == len(profile.models) - 1 or len(window.samples) < self.min_samples:
+                return
+            p95 = window.p95()
+            if p95 > profile.budget_ms and not window.demoted_until:
+                window.demoted_until = time.monotonic() + self.cooldown
+                self.fallbacks += 1
+                logger.warning(
+                    f"Model tier {profile.task}: {model} p95 {p95:.0f}ms over the {profile.budget_ms:.0f}ms budget, "
+                    f"falling back to {profile.models[index + 1]} for {self.cooldown:.0f}s"
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                f"{task}:{model}": {
+                    "calls": window.calls,
+                    "p95_ms": round(window.p95(), 1) if window.samples else None,
+                    "demoted_for_s": round(max(0.0, window.demoted_until - now), 1),
+                }
+                for (task, model), window in self._windows.items()
+            }
+
+
+class TieredChatModel(BaseChatModel):
+    """
+    Chat model that picks one of its tiers per call and times it
+
+    Args:
+        profile: Task, model names (one per tier), budget
+        tiers: One chat model per entry of profile.models
+        selector: Shared latency tracker
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    profile: Any
+    tiers: List[Any]
+    selector: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "tiered"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "TieredChatModel":
+        return self.model_copy(update={"tiers": [tier.bind_tools(tools, **kwargs) for tier in self.tiers]})
+
+    def _tier_metadata(self, index: int, latency_ms: float) -> Dict[str, Any]:
+        return {
+            "task": self.profile.task,
+            "model": self.profile.models[index],
+            "tier": index,
+            "latency_ms": round(latency_ms, 1),
+            "budget_ms": self.profile.budget_ms,
+        }
+
+    def _result(self, message: Any, index: int, latency_ms: float) -> ChatResult:
+        self.selector.record(self.profile, index, latency_ms)
+        message.response_metadata["model_tier"] = self._tier_metadata(index, latency_ms)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        index = self.selector.choose(self.profile)
+        start = time.perf_counter()
+        try:
+            message = self.tiers[index].invoke(messages, stop=stop, **kwargs)
+        except Exception:
+            self._record_failure(index, start)
+            raise
+        return self._result(message, index, (time.perf_counter() - start) * 1e3)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        index = self.selector.choose(self.profile)
+        start = time.perf_counter()
+        try:
+            message = await self.tiers[index].ainvoke(messages, stop=stop, **kwargs)
+        except Exception:
+            self._record_failure(index, start)
+            raise
+        return self._result(message, index, (time.perf_counter() - start) * 1e3)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        index = self.selector.choose(self.profile)
+        start = time.perf_counter()
+        try:
+            for chunk in self.tiers[index].stream(messages, stop=stop, **kwargs):
+                generation = as_generation_chunk(chunk)
+                if run_manager:
+                    run_manager.on_llm_new_token(generation.text, chunk=generation)
+                yield generation
+        except Exception:
+            self._record_failure(index, start)
+            raise
+        yield self._last_chunk(index, (time.perf_counter() - start) * 1e3)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        index = self.selector.choose(self.profile)
+        start = time.perf_counter()
+        try:
+            async for chunk in self.tiers[index].astream(messages, stop=stop, **kwargs):
+                generation = as_generation_chunk(chunk)
+                if run_manager:
+                    await run_manager.on_llm_new_token(generation.text, chunk=generation)
+                yield generation
+        except Exception:
+            self._record_failure(index, start)
+            raise
+        yield self._last_chunk(index, (time.perf_counter() - start) * 1e3)
+
+    def _record_failure(self, index: int, start: float) -> None:
+        """A failed call counts as over budget however fast it failed"""
+        elapsed_ms = (time.perf_counter() - start) * 1e3
+        self.selector.record(self.profile, index, max(elapsed_ms, 2 * self.profile.budget_ms))
+
+    def _last_chunk(self, index: int, latency_ms: float) -> ChatGenerationChunk:
+        """Empty chunk closing a stream - its latency recorded and its tier in the merged metadata"""
+        self.selector.record(self.profile, index, latency_ms)
+        return ChatGenerationChunk(message=AIMessageChunk(
+            content="", response_metadata={"model_tier": self._tier_metadata(index, latency_ms)}
+        ))
+
+
+_selector: Optional[TierSelector] = None
+_profiles: Optional[Dict[str, TaskProfile]] = None
+
+
+def get_tier_selector() -> TierSelector:
+    global _selector
+    if _selector is None:
+        from app.config import get_settings
+        settings = get_settings()
+        _selector = TierSelector(
+            window=settings.model_tier_window,
+            min_samples=settings.model_tier_min_samples,
+            cooldown=settings.model_tier_cooldown,
+        )
+    return _selector
+
+
+def get_task_profile(task: str) -> TaskProfile:
+    global _profiles
+    if _profiles is None:
+        from app.config import get_settings
+        settings = get_settings()
+        _profiles = load_profiles(settings.openai_model, settings.model_tiers)
+    if task not in _profiles:
+        raise ValueError(f"Unknown model task: {task}")
+    return _profiles[task]
+
+
+def create_tiered_model(task: str, build: Callable[[str, Optional[int]], Any]) -> TieredChatModel:
+    """One model per tier of the task via build(model_name, max_tokens), behind the shared selector"""
+    profile = get_task_profile(task)
+    return TieredChatModel(
+        profile=profile,
+        tiers=[build(model, profile.max_tokens) for model in profile.models],
+        selector=get_tier_selector(),
+    )
+
+
+# Export
+__all__ = [
+    "DEFAULT_TASK_PROFILES",
+    "TaskProfile",
+    "TierSelector",
+    "TieredChatModel",
+    "create_tiered_model",
+    "get_task_profile",
+    "get_tier_selector",
+    "load_profiles",
+]
@@ -0,0 +1,320 @@
+"""
+Outbound Send Queue
+Takes agent replies off the graph's critical path: the responder enqueues,
+per-contact workers deliver the chunks to GHL in order
+
+- One FIFO per contact, so the parts of a reply (and consecutive replies)
+  arrive in the order they were written
+- Different contacts send in parallel, up to outbound_max_concurrency at once
+- Every chunk has an idempotency key (contact, turn, part); a key that was
+  already delivered or is still queued is not sent again, so a retried turn
+  doesn't message the lead twice
+- Failed sends are retried with exponential backoff; after
+  outbound_max_attempts the chunk and the rest of its reply go to the
+  dead-letter store instead of arriving out of context
+"""
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from app.utils.deadline import detached_context
+from app.utils.simple_logger import get_logger
+
+logger = get_logger("outbound_queue")
+
+MAX_CHUNK_LENGTH = 300
+DELIVERED_KEYS_LIMIT = 10000
+
+
+def split_message(message: str, max_length: int = MAX_CHUNK_LENGTH) -> List[str]:
+    """Split a reply into WhatsApp-sized chunks on sentence boundaries"""
+    if len(message) <= max_length:
+        return [message]
+
+    chunks = []
+    current = ""
+
+    for sentence in message.split(". "):
+        if len(current) + len(sentence) + 2 <= max_length:
+            current += sentence + ". "
+        else:
+            if current:
+                chunks.append(current.strip())
+            current = sentence + ". "
+
+    if current:
+        chunks.append(current.strip())
+
+    return chunks
+
+
+def idempotency_key(contact_id: str, turn_id: str, part: int, body: str) -> str:
+    data = json.dumps([contact_id, turn_id, part, body], ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:24]
+
+
+@dataclass
+class OutboundMessage:
+    """One chunk waiting to be sent"""
+    contact_id: str
+    body: str
+    message_type: str
+    key: str
+    turn_id: str
+    part: int
+    parts: int
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.time)
+    last_error: Optional[str] = None
+
+
+Sender = Callable[[OutboundMessage], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class DeadLetterStore:
+    """Sends that ran out of retries - kept in memory and appended to a JSONL file"""
+
+    def __init__(self, path: Optional[str] = None, limit: int = 1000):
+        self.path = Path(path) if path else None
+        self.entries: Deque[Dict[str, Any]] = deque(maxlen=limit)
+
+    def add(self, message: OutboundMessage, reason: str) -> None:
+        entry = {**asdict(message), "reason": reason, "failed_at": datetime.now().isoformat()}
+        self.entries.append(entry)
+        logger.error(f"Dead-lettered message {message.key} for {message.contact_id}: {reason}")
+        if self.path is not None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            except OSError as e:
+                logger.warning(f"Could not write dead letter to {self.path}: {e}")
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+async def send_via_ghl(message: OutboundMessage) -> Optional[Dict[str, Any]]:
+    """
+    Default sender: one POST /conversations/messages per chunk, one attempt -
+    the dispatcher owns the retries (the POST isn't idempotent, so nested
+    retry loops multiply the copies a timed-out send can leave behind)
+    """
+    from app.tools.ghl_client import ghl_client
+    return await ghl_client.send_message_chunk(
+        message.contact_id, message.body, message.message_type, max_retries=1
+    )
+
+
+class OutboundDispatcher:
+    """
+    Per-contact ordered, cross-contact parallel delivery of outbound messages
+
+    Args:
+        send: Coroutine delivering one chunk; a falsy result or an exception is a failure
+        max_attempts: Tries per chunk before it is dead-lettered
+        backoff: Seconds before the first retry, doubled on each further one
+        max_concurrency: Contacts sending at the same time
+        dead_letters: Where failed chunks go
+    """
+
+    def __init__(
+        self,
+        send: Optional[Sender] = None,
+        max_attempts: Optional[int] = None,
+        backoff: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        dead_letters: Optional[DeadLetterStore] = None,
+    ):
+        if None in (max_attempts, backoff, max_concurrency, dead_letters):
+            # Only read settings for what wasn't given - standalone webhook servers pass everything
+            from app.config import get_settings
+            settings = get_settings()
+            max_attempts = settings.outbound_max_attempts if max_attempts is None else max_attempts
+            backoff = settings.outbound_retry_backoff if backoff is None else backoff
+            max_concurrency = settings.outbound_max_concurrency if max_concurrency is None else max_concurrency
+            if dead_letters is None:
+                dead_letters = DeadLetterStore(settings.outbound_dead_letter_path)
+        self.send = send or send_via_ghl
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_concurrency = max_concurrency
+        self.dead_letters = dead_letters
+
+        self._queues: Dict[str, Deque[OutboundMessage]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._queued_keys: set = set()
+        self._delivered: "OrderedDict[str, float]" = OrderedDict()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.sent = 0
+        self.retried = 0
+        self.duplicates = 0
+
+    # ---- producer side ----
+    def enqueue(
+        self,
+        contact_id: str,
+        message: str,
+        message_type: str = "WhatsApp",
+        turn_id: Optional[str] = None,
+    ) -> List[OutboundMessage]:
+        """
+        Queue a reply for delivery and return immediately
+
+        Args:
+            contact_id: GHL contact
+            message: Full reply; split into chunks here
+            message_type: GHL message type
+            turn_id: Identifies the turn that produced the reply - part of each
+                chunk's idempotency key. Only replies with a turn_id are
+                deduplicated; without one every call is a new turn
+
+        Returns:
+            The chunks queued (duplicates of queued or delivered chunks are skipped)
+        """
+        self._bind_loop()
+        chunks = split_message(message)
+        # The same text can be a new reply ("¡Perfecto!"), so it never identifies a turn on its own
+        turn_id = turn_id or uuid.uuid4().hex[:16]
+        queue = self._queues.setdefault(contact_id, deque())
+        queued = []
+        for part, body in enumerate(chunks):
+            key = idempotency_key(contact_id, turn_id, part, body)
+            if key in self._delivered or key in self._queued_keys:
+                self.duplicates += 1
+                logger.info(f"Skipping duplicate outbound chunk {key} for {contact_id}")
+                continue
+            item = OutboundMessage(contact_id, body, message_type, key, turn_id, part, len(chunks))
+            queue.append(item)
+            self._queued_keys.add(key)
+            queued.append(item)
+        if not queue:
+            del self._queues[contact_id]
+        elif contact_id not in self._workers:
+            # Delivery outlives the turn that queued it - no turn deadline, own retries
+            self._workers[contact_id] = asyncio.create_task(self._run(contact_id), context=detached_context())
+        return queued
+
+    def _bind_loop(self) -> None:
+        """Workers and the semaphore belong to one event loop; restart them on a new one"""
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        self._loop = loop
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._workers = {}
+        for contact_id, queue in self._queues.items():
+            if queue:
+                self._workers[contact_id] = asyncio.create_task(self._run(contact_id), context=detached_context())
+
+    # ---- delivery ----
+    async def _run(self, contact_id: str) -> None:
+        queue = self._queues[contact_id]
+        try:
+            while queue:
+                message = queue[0]
+                delivered = await self._deliver(message)
+                queue.popleft()
+                self._queued_keys.discard(message.key)
+                if delivered:
+                    self._remember(message.key)
+                else:
+                    self._dead_letter_rest_of_turn(queue, message)
+        finally:
+            if self._workers.get(contact_id) is asyncio.current_task():
+                del self._workers[contact_id]
+            if not queue:
+                self._queues.pop(contact_id, None)
+
+    async def _deliver(self, message: OutboundMessage) -> bool:
+        while message.attempts < self.max_attempts:
+            if message.attempts:
+                self.retried += 1
+                await asyncio.sleep(self.backoff * 2 ** (message.attempts - 1))
+            message.attempts += 1
+            try:
+                async with self._slots:
+                    result = await self.send(message)
+                if result:
+                    self.sent += 1
+                    return True
+                message.last_error = "no result from GHL"
+            except Exception as e:
+                message.last_error = str(e)
+            logger.warning(f"Send {message.key} to {message.contact_id} failed "
+                           f"(attempt {message.attempts}/{self.max_attempts}): {message.last_error}")
+        return False
+
+    def _dead_letter_rest_of_turn(self, queue: Deque[OutboundMessage], failed: OutboundMessage) -> None:
+        self.dead_letters.add(failed, failed.last_error or "send failed")
+        # Later parts of the same reply make no sense without this one
+        while queue and queue[0].turn_id == failed.turn_id:
+            skipped = queue.popleft()
+            self._queued_keys.discard(skipped.key)
+            self.dead_letters.add(skipped, f"earlier part {failed.key} failed")
+
+    def _remember(self, key: str) -> None:
+        self._delivered[key] = time.time()
+        while len(self._delivered) > DELIVERED_KEYS_LIMIT:
+            self._delivered.popitem(last=False)
+
+    # ---- lifecycle ----
+    async def drain(self, contact_id: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """Wait until one contact's (or every) queue is delivered; False on timeout"""
+        async def wait() -> None:
+            while True:
+                workers = [self._workers[contact_id]] if contact_id in self._workers else (
+                    [] if contact_id else list(self._workers.values()))
+                if not workers:
+                    return
+                await asyncio.gather(*workers, return_exceptions=True)
+
+        try:
+            await asyncio.wait_for(wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        oldest = min((q[0].enqueued_at for q in self._queues.values() if q), default=None)
+        return {
+            "contacts_pending": len(self._queues),
+            "messages_pending": sum(len(q) for q in self._queues.values()),
+            "oldest_pending_seconds": round(now - oldest, 3) if oldest else 0.0,
+            "sent": self.sent,
+            "retried": self.retried,
+            "duplicates_skipped": self.duplicates,
+            "dead_letters": len(self.dead_letters),
+        }
+
+
+_dispatcher: Optional[OutboundDispatcher] = None
+
+
+def get_outbound_dispatcher() -> OutboundDispatcher:
+    """Process-wide dispatcher sending through GHLClient, created on first use"""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = OutboundDispatcher()
+    return _dispatcher
+
+
+# Export
+__all__ = [
+    "DeadLetterStore",
+    "OutboundDispatcher",
+    "OutboundMessage",
+    "get_outbound_dispatcher",
+    "idempotency_key",
+    "send_via_ghl",
+    "split_message",
+]
@@ -0,0 +1,213 @@
+"""
+Record/Replay Chat Model - deterministic LLM backend for benchmarks and tests
+
+Responses are stored in a JSONL cassette keyed by a hash of the prompt (message
+roles, names, content and tool calls, plus the names of bound tools). In
+record mode every call goes to the real model and is appended to the cassette;
+in replay mode calls are served from it, with optional synthetic latency
+(time to first token + tokens/sec), so full-graph runs need no network and
+produce the same routing on every run.
+
+Selected with LLM_BACKEND=record|replay, see create_openai_model.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict, Field
+
+from app.utils.simple_logger import get_logger
+
+logger = get_logger("replay_model")
+
+# Tag on calls to the inner (live) model, so callbacks can tell them from the replay run
+LIVE_CALL_TAG = "replay_model:live"
+
+
+def prompt_key(messages: Sequence[BaseMessage], tool_names: Sequence[str] = ()) -> str:
+    """
+    Stable hash of a prompt
+
+    Message ids and tool call ids are left out - they are random per run and
+    don't change what the model is asked.
+    """
+    payload = [
+        sorted(tool_names),
+        [
+            [
+                msg.type,
+                msg.name or "",
+                msg.content,
+                [[call["name"], call["args"]] for call in getattr(msg, "tool_calls", None) or []],
+            ]
+            for msg in messages
+        ],
+    ]
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:32]
+
+
+class Cassette:
+    """Recorded responses for one JSONL file, shared by every model using it"""
+
+    _open: Dict[str, "Cassette"] = {}
+    _open_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.responses: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.responses[entry["key"]] = entry["response"]
+
+    @classmethod
+    def open(cls, path: str) -> "Cassette":
+        with cls._open_lock:
+            cassette = cls._open.get(path)
+            if cassette is None:
+                cassette = cls._open[path] = cls(path)
+            return cassette
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        response = self.responses.get(key)
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    def record(self, key: str, message: AIMessage, prompt: Sequence[BaseMessage]) -> None:
+        response = {
+            "content": message.content,
+            "tool_calls": [
+                {"name": call["name"], "args": call["args"], "id": call.get("id")}
+                for call in message.tool_calls
+            ],
+            "usage": dict(message.usage_metadata or {}),
+        }
+        preview = str(prompt[-1].content)[:120] if prompt else ""
+        with self._lock:
+            if key in self.responses:
+                return
+            self.responses[key] = response
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "prompt": preview, "response": response}, ensure_ascii=False) + "\n")
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Chat model served from a Cassette
+
+    Args:
+        cassette: Recorded responses
+        inner: Real model - called and recorded when record=True, or
+            asked on a cassette miss in replay mode (if given)
+        record: Record mode
+        latency_ms: Synthetic time to first token in replay
+        tokens_per_sec: Synthetic generation rate in replay (0 = instant)
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    cassette: Any
+    inner: Optional[Any] = None
+    record: bool = False
+    latency_ms: float = 0.0
+    tokens_per_sec: float = 0.0
+    tool_names: List[str] = Field(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "ReplayChatModel":
+        names = [convert_to_openai_tool(tool)["function"]["name"] for tool in tools]
+        inner = self.inner.bind_tools(tools, **kwargs) if self.inner is not None else None
+        return self.model_copy(update={"tool_names": names, "inner": inner})
+
+    def _delay(self, message: AIMessage) -> float:
+        seconds = self.latency_ms / 1000
+        if self.tokens_per_sec:
+            tokens = (message.usage_metadata or {}).get("output_tokens")
+            if not tokens:
+                text = str(message.content) + json.dumps([c["args"] for c in message.tool_calls])
+                tokens = max(1, len(text) // 4)
+            seconds += tokens / self.tokens_per_sec
+        return seconds
+
+    @staticmethod
+    def _to_message(response: Dict[str, Any]) -> AIMessage:
+        tool_calls = [
+            {"name": call["name"], "args": call["args"], "id": call.get("id") or f"call_{i}", "type": "tool_call"}
+            for i, call in enumerate(response.get("tool_calls", []))
+        ]
+        return AIMessage(content=response.get("content", ""), tool_calls=tool_calls)
+
+    def _miss(self, key: str, messages: List[BaseMessage]) -> None:
+        if self.inner is None:
+            preview = str(messages[-1].content)[:80] if messages else ""
+            raise LookupError(
+                f"No recorded LLM response for prompt {key} ({preview!r}); "
+                f"record it with LLM_BACKEND=record"
+            )
+        logger.warning(f"Cassette miss for prompt {key}, falling back to inner model")
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        key = prompt_key(messages, self.tool_names)
+        response = None if self.record else self.cassette.get(key)
+        if response is None:
+            if not self.record:
+                self._miss(key, messages)
+            message = self.inner.invoke(messages, {"tags": [LIVE_CALL_TAG]}, stop=stop, **kwargs)
+            if self.record:
+                self.cassette.record(key, message, messages)
+        else:
+            message = self._to_message(response)
+            time.sleep(self._delay(message))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        key = prompt_key(messages, self.tool_names)
+        response = None if self.record else self.cassette.get(key)
+        if response is None:
+            if not self.record:
+                self._miss(key, messages)
+            message = await self.inner.ainvoke(messages, {"tags": [LIVE_CALL_TAG]}, stop=stop, **kwargs)
+            if self.record:
+                self.cassette.record(key, message, messages)
+        else:
+            message = self._to_message(response)
+            await asyncio.sleep(self._delay(message))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def create_replay_model(inner: Optional[BaseChatModel] = None, record: bool = False, path: Optional[str] = None) -> ReplayChatModel:
+    """Build a ReplayChatModel from settings (cassette path, synthetic latency and token rate)"""
+    from app.config import get_settings
+    settings = get_settings()
+    return ReplayChatModel(
+        cassette=Cassette.open(path or settings.llm_cassette_path),
+        inner=inner,
+        record=record,
+        latency_ms=settings.llm_replay_latency_ms,
+        tokens_per_sec=settings.llm_replay_tokens_per_sec,
+    )
+
+
+# Export
+__all__ = ["Cassette", "LIVE_CALL_TAG", "ReplayChatModel", "create_replay_model", "prompt_key"]
@@ -0,0 +1,112 @@
+"""
+Scripted Chat Model - keyword-driven LLM stand-in for benchmarks and tests
+
+- ScriptedChatModel: deterministic chat model (installed via
+  set_model_override) that answers the smart router with analysis JSON and
+  agents with a short reply, counting every call
+- LLMStandIn: set_model_override factory sharing one call counter
+
+Unlike replay_model it needs no cassette. GoHighLevel is simulated by
+benchmarks/ghl_simulator.py.
+"""
+import asyncio
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+# ============ LLM ============
+ROUTER_MARKER = "lead qualification"
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic chat model with call counting
+
+    Router prompts get analysis JSON whose lead_score follows simple keyword
+    rules (so turns spread across maria / carlos / sofia), capped at
+    max_score; everything else gets a short Spanish reply with no tool
+    calls, ending the agent loop.
+    """
+
+    latency_ms: float = 0.0
+    max_score: int = 10
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        return self
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        prompt = str(messages[-1].content) if messages else ""
+        if ROUTER_MARKER in prompt:
+            analysis = self._analysis(prompt)
+            analysis["lead_score"] = min(analysis["lead_score"], self.max_score)
+            return AIMessage(content=json.dumps(analysis))
+        return AIMessage(content="¡Perfecto! Cuéntame un poco más sobre tu negocio para ayudarte mejor.")
+
+    @staticmethod
+    def _analysis(prompt: str) -> Dict[str, Any]:
+        match = re.search(r"Current message: (.*)", prompt)
+        message = (match.group(1) if match else "").lower()
+        if any(word in message for word in ("cita", "agendar", "martes", "jueves", "demo")):
+            score, intent = 8, "appointment_interest"
+        elif any(word in message for word in ("restaurante", "clientes", "tienda", "clínica", "presupuesto")):
+            score, intent = 6, "information_provided"
+        else:
+            score, intent = 3, "greeting"
+        return {
+            "lead_score": score,
+            "score_reason": "scripted",
+            "extracted_data": {},
+            "intent": intent,
+            "urgency": "medium",
+            "sentiment": "positive",
+            "problem_match": "yes",
+        }
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+
+class LLMStandIn:
+    """Factory for set_model_override that shares one call counter"""
+
+    def __init__(self, latency_ms: float = 0.0, max_score: int = 10):
+        self.latency_ms = latency_ms
+        self.max_score = max_score
+        self.models: List[ScriptedChatModel] = []
+
+    def __call__(self, model_name: str = "", temperature: float = 0.0) -> ScriptedChatModel:
+        model = ScriptedChatModel(latency_ms=self.latency_ms, max_score=self.max_score)
+        self.models.append(model)
+        return model
+
+    @property
+    def total_calls(self) -> int:
+        return sum(model.calls for model in self.models)
+
+
+# Export
+__all__ = [
+    "LLMStandIn",
+    "ROUTER_MARKER",
+    "ScriptedChatModel",
+]
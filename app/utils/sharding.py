@@ -0,0 +1,402 @@
+"""
+Conversation-Sharded Worker Pool
+The checkpointer and the per-contact caches live in process memory, so a
+conversation has to keep landing on the same process. A supervisor starts N
+uvicorn worker processes and a front router sends every inbound webhook to
+the worker that owns its conversation.
+
+- Ownership is a consistent-hash ring (virtual nodes per worker) over
+  conversationId, falling back to contactId; adding or removing a worker only
+  moves roughly 1/N of the conversations
+- A crashed worker is restarted under the same name, so it keeps its shard;
+  with the in-memory checkpointer it comes back without its conversations
+- Resharding a running pool (scale() once workers are in the ring) moves
+  conversations to workers that don't have their state, so it is refused
+  unless state is shared (CHECKPOINTER_BACKEND=redis with REDIS_URL)
+- Every worker gets its own job queue file (WEBHOOK_JOB_DB with the worker
+  name appended), so a worker only claims jobs of its own conversations; a
+  restarted worker picks up its file again
+- Removed workers leave the ring first and are stopped once their in-flight
+  requests are done
+- Scaling at runtime (POST /shards/scale) needs the admin token in the
+  X-Admin-Token header and is capped at max_workers; without a token it's off
+"""
+import asyncio
+import bisect
+import hashlib
+import hmac
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+
+from app.utils.simple_logger import get_logger
+
+logger = get_logger("sharding")
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes"""
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 160):
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        self.nodes: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove(self, node: str) -> None:
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        self._points = [p for p in self._points if self._owners[p] != node]
+        self._owners = {p: self._owners[p] for p in self._points}
+
+    def node_for(self, key: str) -> str:
+        if not self._points:
+            raise LookupError("Hash ring has no nodes")
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+    def copy(self) -> "HashRing":
+        ring = HashRing(vnodes=self.vnodes)
+        ring.nodes = list(self.nodes)
+        ring._points = list(self._points)
+        ring._owners = dict(self._owners)
+        return ring
+
+
+def shard_key(payload: Dict[str, Any]) -> str:
+    """Conversation a webhook belongs to"""
+    message = payload.get("message") if isinstance(payload.get("message"), dict) else {}
+    return str(
+        payload.get("conversationId") or message.get("conversationId")
+        or payload.get("contactId") or payload.get("contact_id") or ""
+    )
+
+
+@dataclass
+class WorkerProcess:
+    """One uvicorn worker and its bookkeeping"""
+    name: str
+    port: int
+    process: Optional[subprocess.Popen] = None
+    restarts: int = 0
+    in_flight: int = 0
+    started_at: float = 0.0
+    routed: int = 0
+    draining: bool = field(default=False)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+
+class ShardSupervisor:
+    """
+    Starts, watches and routes to conversation-sharded workers
+
+    Args:
+        app: Worker ASGI app as "module:attribute" (e.g. "local_webhook_server:app")
+        workers: Number of worker processes
+        base_port: Worker i listens on base_port + i
+        webhook_path: Path the worker serves webhooks on
+        health_path: Path answering 200 once a worker is warm (503 while warming up)
+        spawn: False to route to workers started elsewhere (tests, containers)
+        forward_timeout: Seconds to wait for a worker's answer
+        max_workers: Upper bound for scale()
+        admin_token: Secret required by the router's scale endpoint (None disables it)
+        shared_state: Workers keep conversation state outside their memory, so
+            resharding is safe (default: CHECKPOINTER_BACKEND=redis and REDIS_URL set)
+    """
+
+    def __init__(
+        self,
+        app: str = "local_webhook_server:app",
+        workers: int = 2,
+        base_port: int = 9100,
+        webhook_path: str = "/webhook/ghl",
+        health_path: str = "/ready",
+        spawn: bool = True,
+        forward_timeout: float = 30.0,
+        client: Optional[httpx.AsyncClient] = None,
+        max_workers: int = 16,
+        admin_token: Optional[str] = None,
+        shared_state: Optional[bool] = None,
+    ):
+        self.app = app
+        self.base_port = base_port
+        self.webhook_path = webhook_path
+        self.health_path = health_path
+        self.spawn = spawn
+        self.forward_timeout = forward_timeout
+        self.client = client
+        self.max_workers = max_workers
+        self.admin_token = admin_token
+        if shared_state is None:
+            # Same check as the workers' checkpointer factory, which needs both
+            shared_state = os.getenv("CHECKPOINTER_BACKEND", "memory") == "redis" and bool(os.getenv("REDIS_URL"))
+        self.shared_state = shared_state
+        self.workers: Dict[str, WorkerProcess] = {}
+        self.ring = HashRing()
+        self._monitor: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._target = workers
+        # Two concurrent scale() calls would both launch the same worker-N
+        self._scaling = asyncio.Lock()
+
+    # ---- lifecycle ----
+    async def start(self) -> None:
+        if self.client is None:
+            self.client = httpx.AsyncClient(timeout=self.forward_timeout)
+        self._stopping = False
+        await self.scale(self._target)
+        if self.spawn:
+            self._monitor = asyncio.create_task(self._watch())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        self._stopping = True
+        if self._monitor is not None:
+            self._monitor.cancel()
+        await asyncio.gather(*(self._retire(w, timeout) for w in list(self.workers.values())))
+        self.workers.clear()
+        await self.client.aclose()
+
+    def _launch(self, worker: WorkerProcess) -> None:
+        if not self.spawn:
+            return
+        job_db, ext = os.path.splitext(os.getenv("WEBHOOK_JOB_DB", "data/webhook_jobs.db"))
+        env = {
+            **os.environ,
+            "SHARD_WORKER": worker.name,
+            "PORT": str(worker.port),
+            "WEBHOOK_JOB_DB": f"{job_db}.{worker.name}{ext or '.db'}",
+        }
+        worker.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", self.app, "--host", "127.0.0.1",
+             "--port", str(worker.port), "--log-level", "warning"],
+            env=env,
+        )
+        worker.started_at = time.time()
+        logger.info(f"Started {worker.name} (pid {worker.process.pid}) on port {worker.port}")
+
+    async def _wait_ready(self, worker: WorkerProcess, timeout: float = 60.0) -> bool:
+        if not self.spawn:
+            return True
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and worker.alive:
+            try:
+                response = await self.client.get(worker.url + self.health_path, timeout=1.0)
+                if response.status_code < 500:
+                    return True
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+        logger.error(f"{worker.name} did not become ready")
+        return False
+
+    async def _watch(self, interval: float = 1.0) -> None:
+        """Restart crashed workers under the same name, keeping their shard"""
+        while not self._stopping:
+            await asyncio.sleep(interval)
+            for worker in list(self.workers.values()):
+                if not worker.alive and not worker.draining:
+                    worker.restarts += 1
+                    logger.warning(f"{worker.name} exited ({worker.process.returncode}), restarting")
+                    if not self.shared_state:
+                        logger.warning(f"{worker.name} lost the in-memory state of its conversations")
+                    await asyncio.sleep(min(30.0, 0.5 * 2 ** min(worker.restarts, 6)))
+                    self._launch(worker)
+                    await self._wait_ready(worker)
+
+    async def scale(self, workers: int) -> Dict[str, Any]:
+        """
+        Add or remove workers, moving as few conversations as possible
+
+        Returns:
+            Workers added, removed, and started but never ready (not in the ring)
+
+        Raises:
+            ValueError: Out of bounds, or resharding without shared state
+        """
+        if not 1 <= workers <= self.max_workers:
+            raise ValueError(f"workers must be between 1 and {self.max_workers}")
+        async with self._scaling:
+            return await self._scale(workers)
+
+    async def _scale(self, workers: int) -> Dict[str, Any]:
+        names = [f"worker-{i}" for i in range(workers)]
+        added = [n for n in names if n not in self.workers]
+        removed = [n for n in self.workers if n not in names]
+        if self.ring.nodes and (added or removed) and not self.shared_state:
+            raise ValueError(
+                "Resharding moves conversations away from the worker holding their state; "
+                "set CHECKPOINTER_BACKEND=redis first"
+            )
+        self._target = workers
+
+        for name in added:
+            worker = WorkerProcess(name=name, port=self.base_port + int(name.rsplit("-", 1)[1]))
+            self.workers[name] = worker
+            self._launch(worker)
+        ready = await asyncio.gather(*(self._wait_ready(self.workers[n]) for n in added))
+        failed = [name for name, ok in zip(added, ready) if not ok]
+        for name, ok in zip(added, ready):
+            # Joins the ring only once it can answer
+            if ok:
+                self.ring.add(name)
+        # The next scale() call tries the ones that never got ready again
+        await asyncio.gather(*(self._retire(self.workers.pop(n), timeout=0) for n in failed))
+        added = [name for name in added if name not in failed]
+
+        for name in removed:
+            self.ring.remove(name)
+        await asyncio.gather(*(self._retire(self.workers.pop(n)) for n in removed))
+
+        if added or removed:
+            logger.info(f"Scaled to {workers} workers (added {added}, removed {removed})")
+        return {"workers": len(self.workers), "added": added, "removed": removed, "failed": failed}
+
+    async def _retire(self, worker: WorkerProcess, timeout: float = 30.0) -> None:
+        worker.draining = True
+        deadline = time.monotonic() + timeout
+        while worker.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if worker.alive:
+            worker.process.terminate()
+            try:
+                await asyncio.to_thread(worker.process.wait, 10)
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+
+    # ---- routing ----
+    def worker_for(self, key: str) -> WorkerProcess:
+        return self.workers[self.ring.node_for(key)]
+
+    async def forward(self, body: bytes, key: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """
+        Send a webhook to the worker owning its conversation
+
+        While that worker restarts the request waits for it (up to
+        forward_timeout) rather than going to another worker, which doesn't
+        have the conversation's state
+        """
+        worker = self.worker_for(key)
+        worker.in_flight += 1
+        worker.routed += 1
+        deadline = time.monotonic() + self.forward_timeout
+        try:
+            while True:
+                try:
+                    return await self.client.post(
+                        worker.url + self.webhook_path,
+                        content=body,
+                        headers={"content-type": "application/json", **(headers or {})},
+                    )
+                except httpx.TransportError:
+                    if time.monotonic() >= deadline:
+                        raise
+                    await asyncio.sleep(0.2)
+        finally:
+            worker.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": {
+                w.name: {
+                    "port": w.port,
+                    "pid": w.process.pid if w.process else None,
+                    "alive": w.alive if self.spawn else True,
+                    "restarts": w.restarts,
+                    "in_flight": w.in_flight,
+                    "routed": w.routed,
+                }
+                for w in self.workers.values()
+            },
+            "ring_nodes": len(self.ring.nodes),
+        }
+
+
+def create_router_app(supervisor: ShardSupervisor):
+    """Front door: accepts webhooks and forwards each to its conversation's worker"""
+    import json
+    from contextlib import asynccontextmanager
+
+    from fastapi import FastAPI, Header, Request
+    from fastapi.responses import JSONResponse, Response
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await supervisor.start()
+        yield
+        await supervisor.stop()
+
+    app = FastAPI(title="Sharded Webhook Router", lifespan=lifespan)
+
+    @app.post(supervisor.webhook_path)
+    async def route_webhook(request: Request):
+        body = await request.body()
+        try:
+            key = shard_key(json.loads(body or b"{}"))
+        except (ValueError, AttributeError):
+            return JSONResponse(status_code=400, content={"error": "Invalid JSON"})
+        try:
+            response = await supervisor.forward(body, key)
+        except httpx.HTTPError as e:
+            # GHL retries non-2xx deliveries, so the message isn't lost
+            logger.error(f"Worker for {key} unavailable: {e}")
+            return JSONResponse(status_code=503, content={"error": "Worker unavailable"})
+        return Response(content=response.content, status_code=response.status_code,
+                        media_type=response.headers.get("content-type"))
+
+    @app.get("/shards")
+    async def shards():
+        return supervisor.stats()
+
+    @app.post("/shards/scale")
+    async def scale(workers: int, x_admin_token: str = Header(default="")):
+        # The router is the public webhook entry point - only admins may spawn processes
+        if not supervisor.admin_token or not hmac.compare_digest(x_admin_token, supervisor.admin_token):
+            return JSONResponse(status_code=403, content={"error": "Admin token required"})
+        try:
+            return await supervisor.scale(workers)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+
+    @app.get("/shards/route/{key}")
+    async def route(key: str):
+        return {"key": key, "worker": supervisor.ring.node_for(key)}
+
+    return app
+
+
+# Export
+__all__ = [
+    "HashRing",
+    "ShardSupervisor",
+    "WorkerProcess",
+    "create_router_app",
+    "shard_key",
+]
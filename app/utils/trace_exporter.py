@@ -0,0 +1,336 @@
+"""
+Background Trace Exporter
+Moves debug/trace events off the request path: callers enqueue, a daemon
+thread ships batches to a pluggable sink (LangSmith, local JSONL, null)
+"""
+import atexit
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import IntEnum
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+from app.utils.simple_logger import get_logger
+
+logger = get_logger("trace_exporter")
+
+
+class EventPriority(IntEnum):
+    """Priority used for backpressure - lower priorities are dropped first"""
+    LOW = 0      # State snapshots, node entry/exit bookkeeping
+    NORMAL = 1   # Routing decisions, API call results, workflow milestones
+    HIGH = 2     # Errors and anything we must not lose
+
+
+@dataclass
+class TraceEvent:
+    """A single metadata event captured on the hot path"""
+    name: str
+    metadata: Dict[str, Any]
+    priority: EventPriority = EventPriority.NORMAL
+    timestamp: float = field(default_factory=time.time)
+    run_tree: Any = None  # LangSmith RunTree active when the event was created
+
+    @property
+    def run_id(self) -> Optional[str]:
+        run_id = getattr(self.run_tree, "id", None)
+        return str(run_id) if run_id else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "priority": self.priority.name.lower(),
+            "timestamp": datetime.fromtimestamp(self.timestamp).isoformat(),
+            "run_id": self.run_id,
+            "metadata": self.metadata,
+        }
+
+
+# ============ SINKS ============
+class TraceSink:
+    """Destination for exported batches"""
+
+    name = "base"
+
+    def export(self, events: List[TraceEvent]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class NullSink(TraceSink):
+    """Discards everything - used when tracing is disabled"""
+
+    name = "null"
+
+    def export(self, events: List[TraceEvent]) -> None:
+        return None
+
+
+class JSONLFileSink(TraceSink):
+    """Appends one JSON object per event to a local file"""
+
+    name = "jsonl"
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, events: List[TraceEvent]) -> None:
+        lines = [json.dumps(event.to_dict(), default=str) for event in events]
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+class LangSmithSink(TraceSink):
+    """
+    Attaches event metadata to the LangSmith run that was active when the
+    event was recorded. Open runs are updated in memory (shipped with the
+    run's own patch); runs that already finished get one update_run call
+    per run per batch.
+    """
+
+    name = "langsmith"
+
+    def __init__(self):
+        self._client = None
+
+    @property
+    def client(self):
+        # Created lazily so importing the debug helpers never builds a client
+        if self._client is None:
+            from langsmith import Client
+            self._client = Client()
+        return self._client
+
+    def export(self, events: List[TraceEvent]) -> None:
+        finished_runs: Dict[str, Dict[str, Any]] = {}
+
+        for event in events:
+            run_tree = event.run_tree
+            if run_tree is None:
+                continue
+
+            if getattr(run_tree, "end_time", None) is None and hasattr(run_tree, "add_metadata"):
+                run_tree.add_metadata({event.name: event.metadata})
+                continue
+
+            run_id = event.run_id
+            if not run_id:
+                continue
+            if run_id not in finished_runs:
+                finished_runs[run_id] = dict(getattr(run_tree, "metadata", None) or {})
+            finished_runs[run_id][event.name] = event.metadata
+
+        for run_id, metadata in finished_runs.items():
+            try:
+                self.client.update_run(run_id, extra={"metadata": metadata})
+            except Exception as e:
+                logger.warning(f"LangSmith update_run failed for {run_id}: {e}")
+
+
+def create_sink(kind: str, path: Optional[str] = None) -> TraceSink:
+    """Build a sink from its config name"""
+    kind = (kind or "null").lower()
+    if kind == "langsmith":
+        return LangSmithSink()
+    if kind == "jsonl":
+        return JSONLFileSink(path or "logs/trace_events.jsonl")
+    if kind == "null":
+        return NullSink()
+    raise ValueError(f"Unknown trace sink: {kind}")
+
+
+# ============ EXPORTER ============
+class TraceExporter:
+    """
+    Bounded, priority-aware in-memory queue drained by a daemon thread.
+
+    submit() is O(1) and never blocks on I/O. When the queue is full the
+    oldest event of a lower priority is evicted to make room; if nothing
+    lower is queued the incoming event is dropped.
+    """
+
+    def __init__(
+        self,
+        sink: TraceSink,
+        max_queue_size: int = 2000,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+    ):
+        self.sink = sink
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queues: Dict[EventPriority, Deque[TraceEvent]] = {
+            priority: deque() for priority in EventPriority
+        }
+        self._size = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            "submitted": 0,
+            "exported": 0,
+            "batches": 0,
+            "export_errors": 0,
+            "dropped": {priority.name.lower(): 0 for priority in EventPriority},
+        }
+
+    # ---- producer side ----
+    def submit(self, event: TraceEvent) -> bool:
+        """Enqueue an event. Returns False if it was dropped."""
+        with self._cond:
+            if self._closed:
+                return False
+            self.stats["submitted"] += 1
+
+            if self._size >= self.max_queue_size and not self._evict_below(event.priority):
+                self.stats["dropped"][event.priority.name.lower()] += 1
+                return False
+
+            self._queues[event.priority].append(event)
+            self._size += 1
+            if self._size >= self.batch_size:
+                self._cond.notify()
+
+        self._ensure_worker()
+        return True
+
+    def _evict_below(self, priority: EventPriority) -> bool:
+        """Drop the oldest queued event with a lower priority (lock held)"""
+        for lower in EventPriority:
+            if lower >= priority:
+                break
+            if self._queues[lower]:
+                self._queues[lower].popleft()
+                self._size -= 1
+                self.stats["dropped"][lower.name.lower()] += 1
+                return True
+        return False
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is not None or self._closed:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="trace-exporter", daemon=True
+            )
+            self._thread.start()
+
+    # ---- consumer side ----
+    def _take_batch(self) -> List[TraceEvent]:
+        """Pop up to batch_size events, highest priority first (lock held)"""
+        batch: List[TraceEvent] = []
+        for priority in sorted(EventPriority, reverse=True):
+            queue = self._queues[priority]
+            while queue and len(batch) < self.batch_size:
+                batch.append(queue.popleft())
+        self._size -= len(batch)
+        return batch
+
+    def _export(self, batch: List[TraceEvent]) -> None:
+        try:
+            self.sink.export(batch)
+            self.stats["exported"] += len(batch)
+            self.stats["batches"] += 1
+        except Exception as e:
+            self.stats["export_errors"] += 1
+            logger.warning(f"Trace export to {self.sink.name} failed: {e}")
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if self._size < self.batch_size and not self._closed:
+                    self._cond.wait(timeout=self.flush_interval)
+                batch = self._take_batch()
+                closed = self._closed and self._size == 0
+            if batch:
+                self._export(batch)
+            if closed:
+                return
+
+    def flush(self) -> None:
+        """Synchronously export everything currently queued"""
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if not batch:
+                return
+            self._export(batch)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the worker after draining the queue"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self.flush()
+        self.sink.close()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._size
+
+
+# ============ SINGLETON ============
+_exporter: Optional[TraceExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_trace_exporter() -> TraceExporter:
+    """Get or create the process-wide exporter configured from settings"""
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                from app.config import get_settings
+                settings = get_settings()
+                sink_kind = settings.trace_export_sink
+                if sink_kind == "langsmith" and not settings.langchain_tracing_v2:
+                    sink_kind = "null"
+                _exporter = TraceExporter(
+                    sink=create_sink(sink_kind, settings.trace_export_path),
+                    max_queue_size=settings.trace_export_queue_size,
+                    batch_size=settings.trace_export_batch_size,
+                    flush_interval=settings.trace_export_flush_interval,
+                )
+                atexit.register(_exporter.close)
+                logger.info(f"Trace exporter started with {sink_kind} sink")
+    return _exporter
+
+
+def set_trace_exporter(exporter: Optional[TraceExporter]) -> None:
+    """Replace the process-wide exporter (tests, benchmarks, custom sinks)"""
+    global _exporter
+    with _exporter_lock:
+        previous, _exporter = _exporter, exporter
+    if previous is not None and previous is not exporter:
+        previous.close()
+
+
+# Export
+__all__ = [
+    "EventPriority",
+    "TraceEvent",
+    "TraceSink",
+    "NullSink",
+    "JSONLFileSink",
+    "LangSmithSink",
+    "create_sink",
+    "TraceExporter",
+    "get_trace_exporter",
+    "set_trace_exporter",
+]
@@ -4,22 +4,26 @@ LangSmith tracing configuration for monitoring and debugging
 import os
 import time
 import functools
-from typing import Dict, Any, Optional, TypeVar, Callable
-from langsmith import Client
-from langchain_core.tracers.context import tracing_v2_enabled
+from typing import TYPE_CHECKING, Dict, Any, Optional, TypeVar, Callable
 from app.utils.simple_logger import get_logger
 from app.config import get_settings
 
+if TYPE_CHECKING:
+    from langsmith import Client  # langsmith.client is slow to import - loaded on first use
+
+# langchain_core.tracers imports langsmith.client too, so tracing_v2_enabled is imported where used
+
 logger = get_logger("tracing")
 
 T = TypeVar('T')
 
 
-def setup_langsmith_tracing():
+def setup_langsmith_tracing(verify: bool = True):
     """
     Configure LangSmith tracing for all LangChain/LangGraph operations
     
-    This should be called once at application startup
+    This should be called once at application startup. verify=False only sets
+    the environment - no client, no network call
     """
     settings = get_settings()
     
@@ -43,9 +47,12 @@ def setup_langsmith_tracing():
     os.environ["LANGCHAIN_ENDPOINT"] = "https://api.smith.langchain.com"
     
     logger.info(f"LangSmith tracing enabled for project: {os.environ['LANGSMITH_PROJECT']}")
+    if not verify:
+        return True
     
     try:
         # Verify connection
+        from langsmith import Client
         client = Client()
         # Test the connection
         client.list_projects(limit=1)
@@ -190,6 +197,7 @@ def trace_operation_context(
         for key, value in metadata.items():
             tags.append(f"{key}:{value}")
     
+    from langchain_core.tracers.context import tracing_v2_enabled
     return tracing_v2_enabled(
         project_name=os.getenv("LANGSMITH_PROJECT", "ghl-langgraph-agent"),
         tags=tags
@@ -220,12 +228,13 @@ class TracedOperation:
 _langsmith_client = None
 
 
-def get_langsmith_client() -> Optional[Client]:
+def get_langsmith_client() -> Optional["Client"]:
     """Get or create LangSmith client instance"""
     global _langsmith_client
     
     if _langsmith_client is None:
         try:
+            from langsmith import Client
             _langsmith_client = Client()
         except Exception as e:
             logger.error(f"Failed to create LangSmith client: {e}")
@@ -265,8 +274,8 @@ def log_feedback(
         logger.error(f"Failed to log feedback: {e}")
 
 
-# Auto-setup on import
-_tracing_enabled = setup_langsmith_tracing()
+# Auto-setup on import - environment only, the connection check would block cold start
+_tracing_enabled = setup_langsmith_tracing(verify=False)
 
 
 def is_tracing_enabled() -> bool:
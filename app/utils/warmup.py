@@ -0,0 +1,205 @@
+"""
+Startup Warmup
+Pays the first-turn costs before traffic arrives, so the first webhook after
+a deploy isn't the slow one
+
+- agents: import the agents, compile the graph, build the LLM clients
+- dns: resolve the GHL and OpenAI hosts
+- pools: open the shared connection pools (TLS handshakes to GHL and OpenAI)
+- conversations: load the most recently active conversations into the archive cache
+
+Only the agents step is required for readiness - a network step that fails
+is reported but the instance can still serve (it just pays the handshake on
+the first turn). Servers run it from the lifespan and answer /ready with 503
+until it's done, so load balancers only route to warm instances.
+"""
+import asyncio
+import socket
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from app.utils.simple_logger import get_logger
+
+logger = get_logger("warmup")
+
+
+@dataclass
+class WarmupStep:
+    name: str
+    run: Callable[[], Awaitable[Any]]
+    required: bool = False
+
+
+class Warmup:
+    """
+    Runs the warmup steps once per start (or admin request) and tracks readiness
+
+    Args:
+        steps: What to warm; required steps run first, the rest concurrently
+        timeout: Seconds each step may take before it counts as failed
+    """
+
+    def __init__(self, steps: List[WarmupStep], timeout: float = 20.0):
+        self.steps = steps
+        self.timeout = timeout
+        self.ready = False
+        self.running = False
+        self.runs = 0
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> asyncio.Task:
+        """Run in the background (lifespan); a run already in progress is reused"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def run(self) -> Dict[str, Any]:
+        """Run now and wait for it (admin endpoint)"""
+        return await self.start()
+
+    async def _run(self) -> Dict[str, Any]:
+        self.running = True
+        started = time.perf_counter()
+        try:
+            for step in (s for s in self.steps if s.required):
+                await self._run_step(step)
+            await asyncio.gather(*(self._run_step(s) for s in self.steps if not s.required))
+        finally:
+            self.running = False
+        self.runs += 1
+        self.seconds = round(time.perf_counter() - started, 3)
+        self.ready = all(self.results[s.name]["status"] == "ok" for s in self.steps if s.required)
+        failed = [name for name, r in self.results.items() if r["status"] != "ok"]
+        log = logger.info if self.ready else logger.error
+        log(f"Warmup {'done' if self.ready else 'failed'} in {self.seconds}s"
+            + (f" - failed: {', '.join(failed)}" if failed else ""))
+        return self.report()
+
+    async def _run_step(self, step: WarmupStep) -> None:
+        started = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(step.run(), self.timeout)
+            result = {"status": "ok", "detail": detail}
+        except asyncio.TimeoutError:
+            result = {"status": "failed", "error": f"timed out after {self.timeout}s"}
+        except Exception as e:
+            result = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        result["required"] = step.required
+        self.results[step.name] = result
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "running": self.running,
+            "runs": self.runs,
+            "seconds": self.seconds,
+            "steps": dict(self.results),
+        }
+
+
+# ---- default steps ----
+
+def _build_agents() -> Dict[str, Any]:
+    from app.agents.smart_router import get_smart_router
+    from app.workflow import get_workflow
+
+    workflow = get_workflow()
+    get_smart_router().model
+    return {"nodes": len(workflow.get_graph().nodes)}
+
+
+async def warm_agents() -> Dict[str, Any]:
+    return await asyncio.to_thread(_build_agents)
+
+
+def _openai_client():
+    """The router model's OpenAI client, None for stand-ins and replay models"""
+    from app.agents.smart_router import get_smart_router
+    model = get_smart_router().model
+    model = getattr(model, "tiers", [model])[0]  # TieredChatModel - its preferred tier
+    while getattr(model, "inner", None) is not None:  # hedging, circuit breaker
+        model = model.inner
+    return getattr(model, "root_async_client", None), getattr(model, "model_name", None)
+
+
+def _hosts() -> List[str]:
+    from app.config import get_settings
+    hosts = [urlparse(get_settings().ghl_api_base_url).hostname]
+    client, _ = _openai_client()
+    if client is not None:
+        hosts.append(client.base_url.host)
+    return [h for h in hosts if h]
+
+
+async def warm_dns() -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    hosts = _hosts()
+    resolved = await asyncio.gather(*(loop.getaddrinfo(h, 443, type=socket.SOCK_STREAM) for h in hosts))
+    return {host: len(addresses) for host, addresses in zip(hosts, resolved)}
+
+
+async def warm_pools() -> Dict[str, Any]:
+    """One authenticated request per upstream - leaves a live TLS connection in each pool"""
+    from app.tools.ghl_client import GHLClient
+    client, model_name = _openai_client()
+
+    async def openai_ready() -> bool:
+        await client.models.retrieve(model_name)
+        return True
+
+    checks = {"ghl": GHLClient().verify_connection()}
+    if client is not None:
+        checks["openai"] = openai_ready()
+    results = await asyncio.gather(*checks.values(), return_exceptions=True)
+    failed = {name: repr(r) for name, r in zip(checks, results) if r is not True}
+    if failed:
+        raise RuntimeError(f"upstream not reachable: {failed}")
+    return {name: "connected" for name in checks}
+
+
+async def warm_conversations(limit: int) -> Dict[str, Any]:
+    from app.state.conversation_archive import get_conversation_archive
+    archive = get_conversation_archive()
+    # Only the backend reads run in the thread - the cache belongs to the loop
+    loaded = await asyncio.to_thread(archive.read_recent, limit)
+    return {"loaded": archive.fill(loaded)}
+
+
+def default_steps() -> List[WarmupStep]:
+    from app.config import get_settings
+    settings = get_settings()
+    if not settings.warmup_enabled:
+        return []
+    steps = [WarmupStep("agents", warm_agents, required=True)]
+    if settings.warmup_network:
+        steps += [WarmupStep("dns", warm_dns), WarmupStep("pools", warm_pools)]
+    if settings.conversation_archive_enabled and settings.warmup_preload_conversations > 0:
+        limit = settings.warmup_preload_conversations
+        steps.append(WarmupStep("conversations", lambda: warm_conversations(limit)))
+    return steps
+
+
+_warmup: Optional[Warmup] = None
+
+
+def get_warmup() -> Warmup:
+    """Process-wide warmup from settings"""
+    global _warmup
+    if _warmup is None:
+        from app.config import get_settings
+        _warmup = Warmup(default_steps(), timeout=get_settings().warmup_timeout)
+    return _warmup
+
+
+# Export
+__all__ = [
+    "Warmup",
+    "WarmupStep",
+    "default_steps",
+    "get_warmup",
+]
@@ -0,0 +1,180 @@
+"""
+Inbound Webhook De-duplication
+GHL redelivers a webhook when our handler is slow to answer; each redelivery
+would reload the conversation, call the LLM again and possibly reply twice.
+Handlers claim a key per inbound message before running the graph and drop
+any delivery whose key was already claimed.
+
+Keys:
+- messageId when GHL sends one (top level or under "message")
+- otherwise a hash of conversation, body and timestamp (dateAdded /
+  timestamp); without a timestamp the same text in the same conversation
+  can't be told apart from a new message, so those keys only live for
+  webhook_dedup_weak_ttl seconds
+
+Stores: an in-process LRU with per-key expiry, optionally backed by Redis
+(SET NX EX) so several workers or replicas see each other's claims.
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from app.utils.simple_logger import get_logger
+
+logger = get_logger("webhook_dedup")
+
+
+@dataclass(frozen=True)
+class DedupKey:
+    """Identity of one inbound message"""
+    value: str
+    strong: bool  # from messageId or a timestamp - safe to keep for the long TTL
+
+
+def webhook_key(payload: Dict[str, Any]) -> DedupKey:
+    """Dedup key for a GHL inbound message webhook"""
+    message = payload.get("message") if isinstance(payload.get("message"), dict) else {}
+    message_id = payload.get("messageId") or message.get("id") or message.get("messageId")
+    if message_id:
+        return DedupKey(f"msg:{message_id}", strong=True)
+
+    conversation = payload.get("conversationId") or payload.get("contactId") or ""
+    body = payload.get("body") or message.get("body") or ""
+    timestamp = payload.get("dateAdded") or payload.get("timestamp") or message.get("dateAdded") or ""
+    digest = hashlib.sha256(
+        json.dumps([conversation, body, str(timestamp)], ensure_ascii=False).encode("utf-8")
+    ).hexdigest()[:32]
+    return DedupKey(f"hash:{digest}", strong=bool(timestamp))
+
+
+class LRUDedupStore:
+    """Bounded in-process store; oldest keys are evicted first"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._expiry: "OrderedDict[str, float]" = OrderedDict()
+
+    def claim(self, key: str, ttl: float) -> bool:
+        """True if the key was free (and is now taken), False if it's a duplicate"""
+        now = time.monotonic()
+        expires = self._expiry.get(key)
+        if expires is not None and expires > now:
+            self._expiry.move_to_end(key)
+            return False
+        self._expiry[key] = now + ttl
+        self._expiry.move_to_end(key)
+        while len(self._expiry) > self.max_entries:
+            self._expiry.popitem(last=False)
+        return True
+
+    def release(self, key: str) -> None:
+        self._expiry.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+
+class RedisDedupStore:
+    """Shared store: one SET NX EX per claim"""
+
+    def __init__(self, url: str, prefix: str = "webhook-dedup:"):
+        import redis.asyncio as redis  # Optional dependency, only needed for the shared backend
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def claim(self, key: str, ttl: float) -> bool:
+        return bool(await self.client.set(self.prefix + key, 1, nx=True, ex=max(1, int(ttl))))
+
+    async def release(self, key: str) -> None:
+        await self.client.delete(self.prefix + key)
+
+
+class WebhookDeduplicator:
+    """
+    Claims inbound messages before they are processed
+
+    Args:
+        ttl: Seconds a messageId/timestamp key blocks redeliveries
+        weak_ttl: Seconds a key without either blocks them
+        max_entries: Size of the in-process LRU
+        shared: Optional shared store (RedisDedupStore); if it fails the
+            local answer is used
+    """
+
+    def __init__(
+        self,
+        ttl: float = 86400,
+        weak_ttl: float = 120,
+        max_entries: int = 10000,
+        shared: Optional[RedisDedupStore] = None,
+    ):
+        self.ttl = ttl
+        self.weak_ttl = weak_ttl
+        self.local = LRUDedupStore(max_entries)
+        self.shared = shared
+        self.duplicates = 0
+
+    async def claim(self, payload: Dict[str, Any]) -> Optional[DedupKey]:
+        """
+        Claim a webhook for processing
+
+        Returns:
+            The key if this is the first delivery, None for a duplicate
+        """
+        key = webhook_key(payload)
+        ttl = self.ttl if key.strong else self.weak_ttl
+        first = self.local.claim(key.value, ttl)
+        if first and self.shared is not None:
+            try:
+                first = await self.shared.claim(key.value, ttl)
+            except Exception as e:
+                logger.warning(f"Shared dedup store unavailable, using local result: {e}")
+        if not first:
+            self.duplicates += 1
+            logger.info(f"Duplicate webhook {key.value} for contact {payload.get('contactId')}, skipping")
+            return None
+        return key
+
+    async def release(self, key: DedupKey) -> None:
+        """Forget a claim whose processing failed, so a redelivery is handled"""
+        self.local.release(key.value)
+        if self.shared is not None:
+            try:
+                await self.shared.release(key.value)
+            except Exception as e:
+                logger.warning(f"Could not release {key.value} in shared dedup store: {e}")
+
+
+_deduplicator: Optional[WebhookDeduplicator] = None
+
+
+def get_webhook_deduplicator() -> WebhookDeduplicator:
+    """Process-wide deduplicator from settings, created on first use"""
+    global _deduplicator
+    if _deduplicator is None:
+        from app.config import get_settings
+        settings = get_settings()
+        shared = None
+        if settings.webhook_dedup_backend == "redis" and settings.redis_url:
+            shared = RedisDedupStore(settings.redis_url)
+        _deduplicator = WebhookDeduplicator(
+            ttl=settings.webhook_dedup_ttl,
+            weak_ttl=settings.webhook_dedup_weak_ttl,
+            max_entries=settings.webhook_dedup_max_entries,
+            shared=shared,
+        )
+    return _deduplicator
+
+
+# Export
+__all__ = [
+    "DedupKey",
+    "LRUDedupStore",
+    "RedisDedupStore",
+    "WebhookDeduplicator",
+    "get_webhook_deduplicator",
+    "webhook_key",
+]
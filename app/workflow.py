@@ -2,32 +2,33 @@
 Production-Ready Workflow with Redis Persistence
 Fixed version with proper checkpoint configuration
 """
-from typing import Dict, Any, Literal, TypedDict, Annotated, List, Union
+from typing import Dict, Any, Literal, TypedDict, Annotated, List, Optional
+from contextlib import nullcontext
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import AIMessage, HumanMessage, BaseMessage
-from langchain_openai import ChatOpenAI
-from app.utils.langsmith_debug import log_to_langsmith, debugger
-import os
+from langchain_core.messages import BaseMessage
+from app.config import get_settings
+from app.state.message_channel import AppendOnlyMessages
 import logging
+import threading
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Logging is configured by the entry point (server, script), not on import
 logger = logging.getLogger(__name__)
 
 # Production State Definition
 class ProductionState(TypedDict):
-    messages: Annotated[List[BaseMessage], lambda x, y: x + y]
+    messages: Annotated[List[BaseMessage], AppendOnlyMessages]  # Append-only, O(1) amortized writes
     current_agent: str
     lead_score: int
     contact_id: str
     conversation_id: str
     location_id: str
     next_agent: str
+    booking_ready: bool  # set by the router - a 7 with an email asking to book is Sofia's
     agent_task: str
     router_complete: bool
     needs_escalation: bool
     escalation_reason: str
-    routing_attempts: int
+    routing_attempts: int  # escalation hops this turn, reset by the router
     should_end: bool
     contact_name: str
     email: str
@@ -54,21 +55,12 @@ class ProductionState(TypedDict):
     # Responder outputs
     last_sent_message: str
     message_sent: bool
+    message_queued: bool  # handed to the outbound queue, delivered in the background
     final_response: str
     responder_complete: bool
     agent_complete: bool
 
 
-# Import all agent nodes
-from app.agents.thread_id_mapper import thread_id_mapper_node
-from app.agents.receptionist_agent import receptionist_node
-from app.agents.smart_router import smart_router_node
-from app.agents.maria_agent import maria_node
-from app.agents.carlos_agent import carlos_node
-from app.agents.sofia_agent import sofia_node
-from app.agents.responder_agent import responder_node
-
-
 def route_from_smart_router(state: ProductionState) -> Literal["maria", "carlos", "sofia", "responder", "end"]:
     """Route based on smart router decision"""
     if state.get("should_end", False):
@@ -80,6 +72,13 @@ def route_from_smart_router(state: ProductionState) -> Literal["maria", "carlos"
     next_agent = state.get("next_agent")
     
     if next_agent in ["maria", "carlos", "sofia"]:
+        # An agent outside its score range would only bounce the turn - go to the one that owns it
+        from app.agents.escalation import agent_for_score, get_escalation_stats
+        owner = agent_for_score(state.get("lead_score", 0), state.get("booking_ready", False))
+        if owner != next_agent:
+            logger.info(f"Lead score {state.get('lead_score', 0)} belongs to {owner}, not {next_agent}")
+            get_escalation_stats().boundary_skipped()
+            return owner
         return next_agent
     elif next_agent == "responder":
         return "responder"
@@ -87,81 +86,182 @@ def route_from_smart_router(state: ProductionState) -> Literal["maria", "carlos"
         return "end"
 
 
-def route_from_agent(state: ProductionState) -> Literal["responder", "smart_router"]:
-    """Route from agent - either to responder or back to smart_router"""
-    if state.get("needs_escalation", False):
-        logger.info("Escalating back to smart_router")
-        return "smart_router"
-    
-    return "responder"
-
-
-# Create the workflow
-workflow_graph = StateGraph(ProductionState)
-
-# Add all nodes
-workflow_graph.add_node("thread_mapper", thread_id_mapper_node)
-workflow_graph.add_node("receptionist", receptionist_node)  
-workflow_graph.add_node("smart_router", smart_router_node)
-workflow_graph.add_node("maria", maria_node)
-workflow_graph.add_node("carlos", carlos_node)
-workflow_graph.add_node("sofia", sofia_node)
-workflow_graph.add_node("responder", responder_node)  
-
-# Set entry point
-workflow_graph.set_entry_point("thread_mapper")
-
-# Define edges
-workflow_graph.add_edge("thread_mapper", "receptionist")
-workflow_graph.add_edge("receptionist", "smart_router")
-
-# Smart router routing
-workflow_graph.add_conditional_edges(
-    "smart_router",
-    route_from_smart_router,
-    {
-        "maria": "maria",
-        "carlos": "carlos",
-        "sofia": "sofia",
-        "responder": "responder",
-        "end": END
-    }
-)
-
-# Agent routing
-for agent in ["maria", "carlos", "sofia"]:
+def route_from_agent(state: ProductionState) -> Literal["responder", "maria", "carlos", "sofia"]:
+    """
+    Route from agent - to responder, or on escalation straight to the next agent
+    The router's analysis (lead score) is already in state, so it isn't run again
+    """
+    if not state.get("needs_escalation", False):
+        return "responder"
+    
+    from app.agents.escalation import get_escalation_stats, reroute
+    stats = get_escalation_stats()
+    attempts = state.get("routing_attempts", 0)
+    if attempts > get_settings().max_escalation_hops:
+        logger.warning(f"Escalation loop capped after {attempts} hops ({state.get('current_agent')})")
+        stats.capped()
+        return "responder"
+    
+    next_agent = reroute(state)
+    if next_agent is None:
+        logger.warning(f"{state.get('current_agent')} escalated ({state.get('escalation_reason')}) "
+                       f"but owns lead score {state.get('lead_score', 0)} - ending at responder")
+        stats.capped()
+        return "responder"
+    
+    logger.info(f"Escalating {state.get('current_agent')} -> {next_agent} ({state.get('escalation_reason')})")
+    stats.rerouted()
+    return next_agent
+
+
+def build_workflow(checkpointer=None):
+    """
+    Import the agents and compile the production graph
+    
+    The agents pull in the LLM clients, tools and tracing, so this is what
+    cold start pays for - run_workflow calls it (through get_workflow) on the
+    first turn unless a warmup already has
+    """
+    from app.agents.thread_id_mapper import thread_id_mapper_node
+    from app.agents.receptionist_agent import receptionist_node
+    from app.agents.smart_router import smart_router_node
+    from app.agents.maria_agent import maria_node
+    from app.agents.carlos_agent import carlos_node
+    from app.agents.sofia_agent import sofia_node
+    from app.agents.responder_agent import responder_node
+    
+    # Create the workflow
+    workflow_graph = StateGraph(ProductionState)
+    
+    # Add all nodes
+    workflow_graph.add_node("thread_mapper", thread_id_mapper_node)
+    workflow_graph.add_node("receptionist", receptionist_node)  
+    workflow_graph.add_node("smart_router", smart_router_node)
+    workflow_graph.add_node("maria", maria_node)
+    workflow_graph.add_node("carlos", carlos_node)
+    workflow_graph.add_node("sofia", sofia_node)
+    workflow_graph.add_node("responder", responder_node)  
+    
+    # Set entry point
+    workflow_graph.set_entry_point("thread_mapper")
+    
+    # Define edges
+    workflow_graph.add_edge("thread_mapper", "receptionist")
+    workflow_graph.add_edge("receptionist", "smart_router")
+    
+    # Smart router routing
     workflow_graph.add_conditional_edges(
-        agent,
-        route_from_agent,
+        "smart_router",
+        route_from_smart_router,
         {
+            "maria": "maria",
+            "carlos": "carlos",
+            "sofia": "sofia",
             "responder": "responder",
-            "smart_router": "smart_router"
+            "end": END
         }
     )
+    
+    # Agent routing - escalations go agent to agent, not back through the router
+    for agent in ["maria", "carlos", "sofia"]:
+        workflow_graph.add_conditional_edges(
+            agent,
+            route_from_agent,
+            {
+                "responder": "responder",
+                "maria": "maria",
+                "carlos": "carlos",
+                "sofia": "sofia"
+            }
+        )
+    
+    # Responder ends
+    workflow_graph.add_edge("responder", END)
+    
+    if checkpointer is None:
+        checkpointer = _create_checkpointer()
+    compiled = workflow_graph.compile(checkpointer=checkpointer)
+    logger.info(f"Production workflow compiled with {type(checkpointer).__name__}")
+    return compiled
+
+
+def _create_checkpointer():
+    """
+    Memory checkpointer by default - GHL stores the messages. Content-addressed so each
+    message is serialized once per thread, not once per super-step. Redis keeps threads
+    across restarts and lets several workers serve the same conversation
+    """
+    settings = get_settings()
+    if settings.checkpointer_backend == "redis" and settings.redis_url:
+        from app.state.redis_checkpointer import RedisSaver
+        return RedisSaver(settings.redis_url, ttl=settings.checkpoint_ttl)
+    from app.state.checkpointer import ContentAddressedSaver
+    return ContentAddressedSaver(ttl=settings.checkpoint_ttl)
+
+
+_workflow = None
+_workflow_lock = threading.Lock()
 
-# Responder ends
-workflow_graph.add_edge("responder", END)
 
-# Use simple memory checkpointer - Redis is overkill since GHL stores messages
-from langgraph.checkpoint.memory import MemorySaver
-checkpointer = MemorySaver()
+def get_workflow():
+    """The compiled production graph, built on first use"""
+    global _workflow
+    if _workflow is None:
+        with _workflow_lock:
+            if _workflow is None:
+                # Nodes' state dumps log through the debug queue listener, whatever the root level
+                from app.utils.debug_helpers import configure_debug_logging
+                configure_debug_logging()
+                _workflow = build_workflow()
+    return _workflow
 
-# Compile workflow
-workflow = workflow_graph.compile(checkpointer=checkpointer)
 
-logger.info("Production workflow compiled with memory checkpointer")
+def __getattr__(name: str):
+    # `from app.workflow import workflow` keeps working - it compiles on access
+    if name == "workflow":
+        return get_workflow()
+    if name == "checkpointer":
+        return get_workflow().checkpointer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-async def run_workflow(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
+def _thread_lease(thread_id: str):
+    """Exclusive hold on a thread while a turn runs - only needed when workers share Redis"""
+    checkpointer = get_workflow().checkpointer
+    if hasattr(checkpointer, "lease"):
+        settings = get_settings()
+        return checkpointer.lease(thread_id, ttl=settings.thread_lease_ttl, wait=settings.thread_lease_wait)
+    return nullcontext()
+
+
+async def run_workflow(webhook_data: Dict[str, Any], deadline: Optional[float] = None) -> Dict[str, Any]:
     """
     Run workflow from webhook data
     
     Args:
         webhook_data: Data from GoHighLevel webhook
+        deadline: Epoch seconds the turn must be done by (set at ingress);
+            default TURN_DEADLINE_SECONDS from now - see app/utils/deadline.py
         
     Returns:
         Result dictionary with success status and response
     """
+    from app.utils.deadline import deadline_config
+    from app.utils.langsmith_debug import log_to_langsmith
+    from app.utils.webhook_dedup import get_webhook_deduplicator
+    
+    # Redeliveries of a webhook we already took stop here, before any GHL or LLM call
+    dedup_key = None
+    if get_settings().webhook_dedup_enabled:
+        dedup_key = await get_webhook_deduplicator().claim(webhook_data)
+        if dedup_key is None:
+            return {
+                "success": True,
+                "duplicate": True,
+                "contact_id": webhook_data.get("contactId", ""),
+                "message_sent": False
+            }
+    
     try:
         logger.info(f"Running workflow for contact: {webhook_data.get('contactId')}")
         
@@ -193,8 +293,8 @@ async def run_workflow(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
             "lead_score": 0
         }
         
-        # Run workflow with thread config
-        config = {"configurable": {"thread_id": thread_id}}
+        # Run workflow with thread config; the turn deadline rides along for every node and call
+        config = deadline_config({"configurable": {"thread_id": thread_id}}, deadline)
         
         # Log workflow start to LangSmith
         log_to_langsmith({
@@ -206,12 +306,14 @@ async def run_workflow(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
             "webhook_type": webhook_data.get("type", "unknown")
         }, "workflow_execution")
         
-        # Execute workflow
-        result = await workflow.ainvoke(initial_state, config=config)
+        # Execute workflow - one turn per thread at a time across workers
+        async with _thread_lease(thread_id):
+            result = await get_workflow().ainvoke(initial_state, config=config)
         
         # Extract response
         last_sent_message = result.get("last_sent_message", "")
         message_sent = result.get("message_sent", False)
+        message_queued = result.get("message_queued", False)
         
         # Log workflow completion to LangSmith
         log_to_langsmith({
@@ -221,6 +323,7 @@ async def run_workflow(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
             "final_agent": result.get("current_agent"),
             "lead_score": result.get("lead_score", 0),
             "message_sent": message_sent,
+            "message_queued": message_queued,
             "response_length": len(last_sent_message) if last_sent_message else 0,
             "total_messages": len(result.get("messages", []))
         }, "workflow_result")
@@ -230,6 +333,7 @@ async def run_workflow(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
             "contact_id": contact_id,
             "thread_id": thread_id,
             "message_sent": message_sent,
+            "message_queued": message_queued,
             "response": last_sent_message,
             "agent": result.get("current_agent"),
             "lead_score": result.get("lead_score", 0)
@@ -237,6 +341,9 @@ async def run_workflow(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
         
     except Exception as e:
         logger.error(f"Workflow error: {str(e)}", exc_info=True)
+        if dedup_key is not None:
+            # Let GHL's redelivery try again
+            await get_webhook_deduplicator().release(dedup_key)
         return {
             "success": False,
             "error": str(e),
@@ -245,4 +352,4 @@ async def run_workflow(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
 
 
 # Export everything needed
-__all__ = ["workflow", "run_workflow"]
\ No newline at end of file
+__all__ = ["workflow", "run_workflow", "get_workflow", "build_workflow"]
\ No newline at end of file
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark the availability bitmap against the slot-dict scan
+
+For growing numbers of calendars and weeks, times three queries both ways:
+- closest: the slot nearest a customer's request - find_matching_slot over
+  every calendar's slot dicts vs AvailabilityGrid.closest
+- earliest: the first 5 one-hour slots after a time on any calendar - sort
+  and filter the merged slot list vs AvailabilityGrid.earliest
+- joint: the first 5 hours where two calendars are both free - a set
+  intersection of start times vs mode="all"
+
+Calendars get the GHL-style hourly free slots on business days with a seeded
+share already booked. Grid build time is reported separately; in production
+the grid is rebuilt only when the cached free slots change.
+
+Usage:
+    python benchmarks/bench_availability_grid.py
+    python benchmarks/bench_availability_grid.py --calendars 1,5,20 --weeks 1,4,12 --queries 200
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.harness import quiet_logging  # before app
+
+import pytz
+
+from app.tools.availability_grid import AvailabilityGrid
+from app.tools.calendar_slots import find_matching_slot
+from benchmarks.metrics import write_results
+
+TZ = pytz.timezone("America/New_York")
+HOUR = timedelta(hours=1)
+REQUESTS = ["mañana a las 3pm", "el martes a las 10am", "el jueves a las 2pm", "pasado mañana a las 11am"]
+
+
+def build_calendars(calendars: int, weeks: int, booked: float, rng: random.Random, origin: datetime):
+    slots = {}
+    for c in range(calendars):
+        free = []
+        for day in range(weeks * 7):
+            date = origin + timedelta(days=day)
+            if date.weekday() >= 5:
+                continue
+            for hour in range(9, 18):
+                if rng.random() >= booked:
+                    start = date.replace(hour=hour)
+                    free.append({"startTime": start, "endTime": start + HOUR, "available": True})
+        slots[f"rep-{c}"] = free
+    return slots
+
+
+def per_query_us(fn, queries: int) -> float:
+    start = time.perf_counter()
+    for i in range(queries):
+        fn(i)
+    return (time.perf_counter() - start) / queries * 1e6
+
+
+def run_case(calendars: int, weeks: int, args: argparse.Namespace, rng: random.Random) -> dict:
+    origin = TZ.localize(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0))
+    slots = build_calendars(calendars, weeks, args.booked, rng, origin)
+    merged = [slot for free in slots.values() for slot in free]
+
+    start = time.perf_counter()
+    grid = AvailabilityGrid.from_slots(slots, origin, days=weeks * 7)
+    build_ms = (time.perf_counter() - start) * 1000
+    after = [origin + timedelta(hours=rng.randrange(weeks * 7 * 24)) for _ in range(args.queries)]
+    pair = list(slots)[:2] if calendars > 1 else list(slots)
+
+    def scan_earliest(i):
+        return sorted((s for s in merged if s["startTime"] >= after[i]), key=lambda s: s["startTime"])[:5]
+
+    def scan_joint(i):
+        common = set.intersection(*({s["startTime"] for s in slots[c]} for c in pair))
+        return sorted(t for t in common if t >= after[i])[:5]
+
+    timings = {
+        "closest_scan_us": per_query_us(lambda i: find_matching_slot(merged, REQUESTS[i % len(REQUESTS)]), args.queries),
+        "closest_grid_us": per_query_us(lambda i: grid.closest(after[i], HOUR, step=HOUR), args.queries),
+        "earliest_scan_us": per_query_us(scan_earliest, args.queries),
+        "earliest_grid_us": per_query_us(lambda i: grid.earliest(5, after[i], HOUR, step=HOUR), args.queries),
+        "joint_scan_us": per_query_us(scan_joint, args.queries),
+        "joint_grid_us": per_query_us(lambda i: grid.earliest(5, after[i], HOUR, mode="all", calendar_ids=pair, step=HOUR), args.queries),
+    }
+    return {"calendars": calendars, "weeks": weeks, "slots": len(merged), "grid_build_ms": round(build_ms, 2),
+            **{k: round(v, 1) for k, v in timings.items()}}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calendars", default="1,5,20", help="comma-separated calendar counts")
+    parser.add_argument("--weeks", default="1,4,12", help="comma-separated horizons in weeks")
+    parser.add_argument("--queries", type=int, default=200, help="queries per measurement")
+    parser.add_argument("--booked", type=float, default=0.3, help="share of hourly slots already taken")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/availability_grid-<sha>-<time>.json)")
+    args = parser.parse_args()
+    quiet_logging()
+    rng = random.Random(args.seed)
+
+    header = (f"{'cals':>5}{'weeks':>6}{'slots':>7}{'build ms':>10}"
+              f"{'closest scan/grid µs':>24}{'earliest scan/grid µs':>24}{'joint scan/grid µs':>22}")
+    print(header)
+    print("-" * len(header))
+    rows = []
+    for calendars in (int(c) for c in args.calendars.split(",")):
+        for weeks in (int(w) for w in args.weeks.split(",")):
+            row = run_case(calendars, weeks, args, rng)
+            rows.append(row)
+            print(f"{calendars:>5}{weeks:>6}{row['slots']:>7}{row['grid_build_ms']:>10.2f}"
+                  f"{row['closest_scan_us']:>14.1f} / {row['closest_grid_us']:<7.1f}"
+                  f"{row['earliest_scan_us']:>14.1f} / {row['earliest_grid_us']:<7.1f}"
+                  f"{row['joint_scan_us']:>12.1f} / {row['joint_grid_us']:<7.1f}")
+
+    config = {k: v for k, v in vars(args).items() if k != "output"}
+    print(f"results: {write_results('availability_grid', config, {'cases': rows}, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark checkpoint storage: InMemorySaver vs ContentAddressedSaver
+
+Replays turns through a graph with the production node chain
+(thread_mapper -> receptionist -> smart_router -> agent -> responder),
+each appending one message, and reports bytes stored, records serialized
+and average turn time.
+
+Usage:
+    python benchmarks/bench_checkpointer.py
+"""
+import os
+import sys
+import time
+from typing import Annotated, Any, Dict, List, TypedDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, StateGraph
+
+from app.state.checkpointer import ContentAddressedSaver
+from app.state.message_channel import AppendOnlyMessages
+
+NODES = ["thread_mapper", "receptionist", "smart_router", "agent", "responder"]
+TURNS = 300
+WEBHOOK = {"contactId": "c-1", "conversationId": "conv-1", "body": "Hola, tengo un restaurante", "locationId": "loc-1"}
+
+
+class BenchState(TypedDict):
+    messages: Annotated[List[BaseMessage], AppendOnlyMessages]
+    webhook_data: Dict[str, Any]
+
+
+def build_graph(saver):
+    builder = StateGraph(BenchState)
+    for name in NODES:
+        builder.add_node(name, lambda state, name=name: {"messages": [AIMessage(
+            content=f"{name}: respuesta número {len(state['messages'])} para el cliente",
+            name=name,
+            response_metadata={"model_name": "gpt-4-turbo", "token_usage": {"total_tokens": 1900}},
+        )]})
+    builder.set_entry_point(NODES[0])
+    for current, following in zip(NODES, NODES[1:]):
+        builder.add_edge(current, following)
+    builder.add_edge(NODES[-1], END)
+    return builder.compile(checkpointer=saver)
+
+
+def stored_bytes(saver) -> int:
+    if isinstance(saver, ContentAddressedSaver):
+        stores = list(saver.threads.values())
+        blobs = [blob for store in stores for blob in store.blobs.values()]
+        saved = [saved for store in stores for checkpoints in store.checkpoints.values() for saved in checkpoints.values()]
+    else:
+        blobs = list(saver.blobs.values())
+        saved = [saved for namespaces in saver.storage.values() for checkpoints in namespaces.values() for saved in checkpoints.values()]
+    total = sum(len(blob[1]) for blob in blobs) + sum(len(c[1]) + len(m[1]) for c, m, _ in saved)
+    for store in getattr(saver, "threads", {}).values():
+        total += sum(len(blob[1]) for blob in store.message_blobs.values())
+        total += sum(16 * (len(members) + 1) for members in store.chunk_index.values())
+    return total
+
+
+def run(saver):
+    graph = build_graph(saver)
+    config = {"configurable": {"thread_id": "bench"}}
+    start = time.perf_counter()
+    for turn in range(TURNS):
+        graph.invoke({"messages": [HumanMessage(content=f"mensaje {turn}")], "webhook_data": WEBHOOK}, config)
+    elapsed = (time.perf_counter() - start) / TURNS * 1e3
+    return stored_bytes(saver), elapsed
+
+
+def main():
+    history = TURNS * (len(NODES) + 1)
+    print(f"{TURNS} turns, {len(NODES)} nodes per turn, {history} messages in the thread")
+    header = f"{'saver':<24} {'stored KiB':>12} {'ms/turn':>10}"
+    print(header)
+    print("-" * len(header))
+    for saver in (InMemorySaver(), ContentAddressedSaver()):
+        size, elapsed = run(saver)
+        print(f"{type(saver).__name__:<24} {size / 1024:>12.1f} {elapsed:>10.2f}")
+        if hasattr(saver, "stats"):
+            print(f"  records serialized: {saver.stats['records_serialized']}, reused by identity: {saver.stats['records_reused']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-turn cost of debug instrumentation (log_state_transition + validate_state)
+
+Simulates one receptionist/thread-mapper turn (input + output instrumentation)
+for growing conversation lengths under each DEBUG_INSTRUMENTATION mode, and
+against the previous always-on implementation (eager f-strings, several passes).
+
+Usage:
+    python benchmarks/bench_debug_instrumentation.py
+    python -O benchmarks/bench_debug_instrumentation.py   # call sites compiled out
+"""
+import logging
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from app.utils.debug_helpers import (
+    debug_log,
+    log_state_transition,
+    set_instrumentation_mode,
+    should_instrument,
+    validate_state,
+)
+
+TURNS = 2000
+HISTORY_LENGTHS = [10, 100, 500]
+
+
+def build_state(history: int):
+    messages = []
+    for i in range(history):
+        cls = HumanMessage if i % 2 == 0 else AIMessage
+        messages.append(cls(content=f"message {i} " + "x" * 80))
+    return {
+        "messages": messages,
+        "thread_id": "conv-bench",
+        "contact_id": "contact-bench",
+        "webhook_data": {"body": "hola"},
+        "lead_score": 5,
+    }
+
+
+def legacy_validate_state(state, node_name, log):
+    """validate_state as it was before gating: eager, several passes"""
+    results = {"node": node_name, "valid": True, "issues": [], "metrics": {}}
+    messages = state.get('messages', [])
+    results["metrics"]["message_count"] = len(messages)
+    contents = []
+    for msg in messages:
+        if isinstance(msg, dict):
+            content = msg.get('content', '')
+        elif hasattr(msg, 'content'):
+            content = msg.content
+        else:
+            content = str(msg)
+        contents.append(content)
+    duplicates = len(contents) - len(set(contents))
+    results["metrics"]["duplicates"] = duplicates
+    if duplicates > 0:
+        results["valid"] = False
+        for content, count in Counter(contents).items():
+            if count > 1:
+                results["issues"].append(f"Message '{content[:50]}...' appears {count} times")
+    for i, msg in enumerate(messages):
+        if isinstance(msg, dict):
+            if not msg.get('type') and not msg.get('role'):
+                results["valid"] = False
+        elif not isinstance(msg, BaseMessage):
+            results["valid"] = False
+    error_count = sum(1 for c in contents if "Error" in c)
+    if error_count > 0:
+        results["metrics"]["error_messages"] = error_count
+    if not results["valid"]:
+        log.warning(f"State validation failed for {node_name}: {results['issues']}")
+    return results
+
+
+def legacy_log_state_transition(state, node_name, phase, log):
+    """log_state_transition as it was before gating: f-strings built unconditionally"""
+    log.info(f"=== {node_name.upper()} - {phase.upper()} ===")
+    messages = state.get('messages', [])
+    log.info(f"Messages: {len(messages)}")
+    log.info(f"Thread ID: {state.get('thread_id', 'None')}")
+    log.info(f"Contact ID: {state.get('contact_id', 'None')}")
+    if messages:
+        log.info("Message breakdown:")
+        human_msgs = sum(1 for m in messages if isinstance(m, HumanMessage) or (isinstance(m, dict) and m.get('role') == 'human'))
+        ai_msgs = sum(1 for m in messages if isinstance(m, AIMessage) or (isinstance(m, dict) and m.get('role') == 'ai'))
+        log.info(f"  Human messages: {human_msgs}")
+        log.info(f"  AI messages: {ai_msgs}")
+        log.info(f"  Other: {len(messages) - human_msgs - ai_msgs}")
+        log.info("Last 3 messages:")
+        for msg in messages[-3:]:
+            log.info(f"  [{msg.__class__.__name__}] {str(msg.content)[:100]}...")
+    other_keys = [k for k in state.keys() if k not in ['messages', 'thread_id', 'contact_id']]
+    if other_keys:
+        log.info(f"Other state keys: {other_keys[:5]}...")
+    log.info(f"=== END {node_name.upper()} - {phase.upper()} ===\n")
+
+
+def legacy_turn(state, log):
+    """The pre-change call-site pattern: always instrument input and output"""
+    legacy_log_state_transition(state, "bench", "input", log)
+    legacy_validate_state(state, "bench_input", log)
+    legacy_log_state_transition(state, "bench", "output", log)
+    legacy_validate_state(state, "bench", log)
+
+
+def instrumented_turn(state):
+    """The current call-site pattern used by the nodes"""
+    instrument = __debug__ and should_instrument()
+    if instrument:
+        log_state_transition(state, "bench", "input")
+        validate_state(state, "bench_input")
+        log_state_transition(state, "bench", "output")
+        validate_state(state, "bench")
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        fn(*args)
+    return (time.perf_counter() - start) / TURNS * 1e6  # microseconds per turn
+
+
+def main():
+    # Production-like logging: INFO records are handled but go nowhere
+    debug_log.handlers = [logging.NullHandler()]
+    debug_log.propagate = False
+    legacy_log = logging.getLogger("bench.legacy")
+    legacy_log.handlers = [logging.NullHandler()]
+    legacy_log.propagate = False
+
+    header = f"{'history':>8} {'level':>6} {'legacy':>10} {'full':>10} {'sampled':>10} {'off':>10}"
+    print(f"Per-turn overhead in µs ({TURNS} turns, __debug__={__debug__})")
+    print(header)
+    print("-" * len(header))
+
+    for level in (logging.INFO, logging.WARNING):
+        debug_log.setLevel(level)
+        legacy_log.setLevel(level)
+        for history in HISTORY_LENGTHS:
+            state = build_state(history)
+            row = [timed(legacy_turn, state, legacy_log)]
+            for mode, rate in (("full", 1.0), ("sampled", 0.05), ("off", 0.0)):
+                set_instrumentation_mode(mode, rate)
+                row.append(timed(instrumented_turn, state))
+            print(f"{history:>8} {logging.getLevelName(level):>6} " + " ".join(f"{v:>10.1f}" for v in row))
+
+    set_instrumentation_mode(None)
+
+
+if __name__ == "__main__":
+    main()
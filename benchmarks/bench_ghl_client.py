@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Load-test the GHL-facing code offline against the GHL simulator
+
+Runs N operations at a fixed concurrency for each target:
+- client: GHLClient.get_contact + get_conversation_messages + send_message
+- receptionist: receptionist_node (history + contact load)
+- responder: responder_node (queue the agent reply; sends are drained before counting requests)
+
+and reports latency percentiles, failures and HTTP requests per operation
+(retries on 429/5xx show up as extra requests).
+
+Usage:
+    python benchmarks/bench_ghl_client.py
+    python benchmarks/bench_ghl_client.py --latency lognormal:80,0.4 --rate-429 0.02 --rate-5xx 0.02
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+os.environ["LANGCHAIN_TRACING_V2"] = "false"
+os.environ.setdefault("TRACE_EXPORT_SINK", "null")
+os.environ.setdefault("DEBUG_INSTRUMENTATION", "off")
+for name in ("OPENAI_API_KEY", "GHL_API_TOKEN", "GHL_LOCATION_ID", "GHL_CALENDAR_ID",
+             "GHL_ASSIGNED_USER_ID", "SUPABASE_URL", "SUPABASE_KEY"):
+    os.environ.setdefault(name, "bench")
+
+import structlog
+from langchain_core.messages import AIMessage, HumanMessage
+
+from benchmarks.ghl_simulator import FaultConfig, GHLSimulator
+from benchmarks.metrics import percentiles, write_results
+
+HISTORY = ["Hola", "Tengo un restaurante", "Necesito más clientes", "¿Cuánto cuesta?"]
+
+
+def seed(simulator: GHLSimulator, contacts: int) -> None:
+    for i in range(contacts):
+        for body in HISTORY:
+            simulator.record_inbound({
+                "contactId": f"c{i}",
+                "conversationId": f"conv{i}",
+                "body": body,
+                "contact": {"firstName": f"Lead {i}"},
+            })
+
+
+def targets(contacts: int) -> Dict[str, Callable[[int], Awaitable[bool]]]:
+    from app.agents.receptionist_agent import receptionist_node
+    from app.agents.responder_agent import responder_node
+    from app.tools.ghl_client import GHLClient
+
+    client = GHLClient()
+
+    async def client_op(i: int) -> bool:
+        contact_id = f"c{i % contacts}"
+        contact = await client.get_contact(contact_id)
+        messages = await client.get_conversation_messages(f"conv{i % contacts}")
+        sent = await client.send_message(contact_id, "¡Gracias! Te escribo en un momento.")
+        return bool(contact and messages and sent)
+
+    async def receptionist_op(i: int) -> bool:
+        result = await receptionist_node({
+            "contact_id": f"c{i % contacts}",
+            "conversation_id": f"conv{i % contacts}",
+            "webhook_data": {"body": HISTORY[-1]},
+            "messages": [],
+        })
+        return bool(result.get("messages"))
+
+    async def responder_op(i: int) -> bool:
+        result = await responder_node({
+            "contact_id": f"c{i % contacts}",
+            "current_agent": "maria",
+            "messages": [HumanMessage(content=HISTORY[-1]), AIMessage(content=f"Respuesta {i}", name="maria")],
+            "webhook_data": {"type": "WhatsApp"},
+        })
+        return bool(result.get("message_sent") or result.get("message_queued"))
+
+    return {"client": client_op, "receptionist": receptionist_op, "responder": responder_op}
+
+
+async def run_target(op: Callable[[int], Awaitable[bool]], simulator: GHLSimulator,
+                     operations: int, concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failures = 0
+    requests_before = simulator.total_calls
+
+    async def one(i: int) -> None:
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            ok = await op(i)
+            latencies.append((time.perf_counter() - start) * 1000)
+            failures += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(operations)))
+    wall = time.perf_counter() - start
+    # responder only queues the reply - count its sends once they're delivered
+    from app.utils.outbound_queue import get_outbound_dispatcher
+    await get_outbound_dispatcher().drain()
+    return {
+        "latency_ms": percentiles(latencies),
+        "failures": failures,
+        "ops_per_sec": round(operations / wall, 1),
+        "requests_per_op": round((simulator.total_calls - requests_before) / operations, 2),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.tools.ghl_client import GHLClient
+
+    simulator = GHLSimulator(
+        latency=args.latency,
+        faults=FaultConfig(rate_429=args.rate_429, rate_5xx=args.rate_5xx, retry_after=args.retry_after),
+        seed=args.seed,
+    )
+    seed(simulator, args.contacts)
+    GHLClient.transport = simulator.transport()
+
+    results = {}
+    for name, op in targets(args.contacts).items():
+        results[name] = await run_target(op, simulator, args.operations, args.concurrency)
+    results["faults_injected"] = {str(status): count for status, count in sorted(simulator.injected.items())}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--contacts", type=int, default=50)
+    parser.add_argument("--latency", default="lognormal:40,0.4", help="GHL latency distribution (ms)")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/ghl_client-<sha>-<time>.json)")
+    args = parser.parse_args()
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+    logging.disable(logging.CRITICAL)
+
+    results = asyncio.run(main_async(args))
+    header = f"{'target':<14}{'p50':>9}{'p95':>9}{'p99':>9}{'ops/s':>9}{'req/op':>8}{'fail':>6}"
+    print(f"{args.operations} ops @ concurrency {args.concurrency}, latency={args.latency}, "
+          f"429={args.rate_429:.1%}, 5xx={args.rate_5xx:.1%}")
+    print(header)
+    print("-" * len(header))
+    for name, stats in results.items():
+        if name == "faults_injected":
+            continue
+        lat = stats["latency_ms"]
+        print(f"{name:<14}{lat['p50']:>9.1f}{lat['p95']:>9.1f}{lat['p99']:>9.1f}"
+              f"{stats['ops_per_sec']:>9.1f}{stats['requests_per_op']:>8.2f}{stats['failures']:>6}")
+    print(f"injected faults: {results['faults_injected'] or 'none'}")
+    print(f"results: {write_results('ghl_client', vars(args), results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold-start import time, and fail when it regresses
+
+Imports the deployment entry point (graph.py, what langgraph.json loads) in
+fresh interpreters with `python -X importtime` and reports:
+- the median cumulative import time of the module
+- the heaviest top-level packages (self time summed over their submodules)
+- any module from the deferred list that was imported anyway
+
+The run fails (exit 1) when the median exceeds --budget-ms, when a deferred
+module shows up at import (LLM clients, agents and tools belong to the first
+turn or the warmup, not to import), or when it is more than --tolerance
+slower than a --baseline results file.
+
+Usage:
+    python benchmarks/bench_importtime.py
+    python benchmarks/bench_importtime.py --runs 10 --budget-ms 1500
+    python benchmarks/bench_importtime.py --baseline benchmarks/results/importtime-<sha>-<time>.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.metrics import ROOT, write_results
+
+# Imported by build_workflow() or on first use - never by importing the entry point
+DEFERRED = [
+    "langchain_openai",
+    "langchain_anthropic",
+    "openai",
+    "anthropic",
+    "pytz",
+    "app.agents",
+    "app.tools",
+]
+
+
+def import_once(module: str) -> Tuple[float, Dict[str, int]]:
+    """Cumulative ms for module, and self µs per imported module, from one fresh interpreter"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=os.environ.copy(), capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    total, self_us = None, {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if not own.strip().isdigit():
+            continue  # header
+        self_us[name.strip()] = int(own)
+        if name.strip() == module:
+            total = int(cumulative) / 1e3
+    if total is None:
+        sys.exit(f"{module} not in -X importtime output (already imported by site?)")
+    return total, self_us
+
+
+def deferred_hits(modules: List[str]) -> List[str]:
+    return sorted({d for d in DEFERRED for m in modules if m == d or m.startswith(d + ".")})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="graph")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="fail above this median")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs --baseline")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/importtime-<sha>-<time>.json)")
+    args = parser.parse_args()
+
+    import_once(args.module)  # warm the filesystem and bytecode caches
+    samples, packages = [], Counter()
+    for _ in range(args.runs):
+        total, self_us = import_once(args.module)
+        samples.append(total)
+        for name, us in self_us.items():
+            packages[name.split(".")[0]] += us / args.runs
+    median = statistics.median(samples)
+    deferred = deferred_hits(list(self_us))
+
+    print(f"import {args.module}: median {median:.0f} ms over {args.runs} runs "
+          f"(min {min(samples):.0f}, max {max(samples):.0f}), budget {args.budget_ms:.0f} ms")
+    print(f"{'package':<28} {'self ms':>8}")
+    for name, us in packages.most_common(args.top):
+        print(f"{name:<28} {us / 1e3:>8.1f}")
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"median {median:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    if deferred:
+        failures.append(f"imported at cold start: {', '.join(deferred)}")
+    if args.baseline:
+        before = json.loads(Path(args.baseline).read_text())["metrics"]["median_ms"]
+        if median > before * (1 + args.tolerance):
+            failures.append(f"median {median:.0f} ms vs {before:.0f} ms in {args.baseline} "
+                            f"(> {args.tolerance:.0%} slower)")
+
+    config = {"module": args.module, "runs": args.runs, "budget_ms": args.budget_ms}
+    metrics = {
+        "median_ms": round(median, 1),
+        "samples_ms": [round(s, 1) for s in samples],
+        "top_packages_ms": {name: round(us / 1e3, 1) for name, us in packages.most_common(args.top)},
+        "deferred_imported": deferred,
+        "failures": failures,
+    }
+    print(f"results: {write_results('importtime', config, metrics, args.output)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark message writes: `lambda x, y: x + y` reducer vs AppendOnlyMessages
+
+Part 1 isolates the state layer: per turn, NODES writes of one message each
+plus one checkpoint snapshot, at growing history lengths.
+Part 2 runs a checkpointed graph shaped like the production flow. There the
+checkpointer serializing the full history dominates both variants.
+
+Usage:
+    python benchmarks/bench_message_channel.py
+"""
+import os
+import sys
+import time
+from typing import Annotated, List, TypedDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.channels.binop import BinaryOperatorAggregate
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, StateGraph
+
+from app.state.message_channel import AppendOnlyMessages
+
+NODES = 5
+HISTORY_LENGTHS = [100, 1000, 5000, 20000]
+CHANNEL_TURNS = 200
+GRAPH_TURNS = 200
+REPORT_EVERY = 50
+
+
+class ConcatState(TypedDict):
+    messages: Annotated[List[BaseMessage], lambda x, y: x + y]
+
+
+class ChannelState(TypedDict):
+    messages: Annotated[List[BaseMessage], AppendOnlyMessages]
+
+
+# ============ PART 1: CHANNEL ONLY ============
+def time_channel(channel, history: int) -> float:
+    channel.update([[HumanMessage(content=f"m{i}") for i in range(history)]])
+    reply = [AIMessage(content="reply")]
+    start = time.perf_counter()
+    for _ in range(CHANNEL_TURNS):
+        for _ in range(NODES):
+            channel.update([reply])
+        channel.checkpoint()
+    return (time.perf_counter() - start) / CHANNEL_TURNS * 1e6
+
+
+# ============ PART 2: CHECKPOINTED GRAPH ============
+def build_graph(state_cls):
+    builder = StateGraph(state_cls)
+    names = [f"node_{i}" for i in range(NODES)]
+    for name in names:
+        builder.add_node(name, lambda state, name=name: {"messages": [AIMessage(content=name)]})
+    builder.set_entry_point(names[0])
+    for current, following in zip(names, names[1:]):
+        builder.add_edge(current, following)
+    builder.add_edge(names[-1], END)
+    return builder.compile(checkpointer=MemorySaver())
+
+
+def time_graph(state_cls):
+    graph = build_graph(state_cls)
+    config = {"configurable": {"thread_id": "bench"}}
+    timings = []
+    window_start = time.perf_counter()
+    for turn in range(1, GRAPH_TURNS + 1):
+        graph.invoke({"messages": [HumanMessage(content=f"turn {turn}")]}, config)
+        if turn % REPORT_EVERY == 0:
+            timings.append((turn * (NODES + 1), (time.perf_counter() - window_start) / REPORT_EVERY * 1e3))
+            window_start = time.perf_counter()
+    return timings
+
+
+def main():
+    header = f"{'history':>8} {'x + y µs/turn':>14} {'channel µs/turn':>16}"
+    print(f"State layer only: {NODES} writes + 1 snapshot per turn")
+    print(header)
+    print("-" * len(header))
+    for history in HISTORY_LENGTHS:
+        old = time_channel(BinaryOperatorAggregate(list, lambda x, y: x + y), history)
+        new = time_channel(AppendOnlyMessages(list), history)
+        print(f"{history:>8} {old:>14.1f} {new:>16.1f}")
+
+    header = f"{'history':>8} {'x + y ms/turn':>14} {'channel ms/turn':>16}"
+    print(f"\nCheckpointed graph: {NODES} appending nodes, MemorySaver")
+    print(header)
+    print("-" * len(header))
+    for (history, old), (_, new) in zip(time_graph(ConcatState), time_graph(ChannelState)):
+        print(f"{history:>8} {old:>14.2f} {new:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: LangChain messages vs compact MessageRecords on 1k-message threads
+
+Builds threads shaped like production history (GHL-loaded human/AI turns
+with app kwargs, agent replies carrying OpenAI response metadata and names)
+and reports, per thread:
+  - Python heap held by the history (tracemalloc): standalone records, and
+    the live AppendOnlyMessages channel, which keeps the messages nodes read
+    *and* the encoded records of its snapshots - the real in-process cost
+  - Serialized checkpoint size with LangGraph's JsonPlusSerializer
+
+Usage:
+    python benchmarks/bench_message_records.py
+"""
+import os
+import sys
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from app.state.message_channel import AppendOnlyMessages
+from app.state.message_record import MessageRecord
+
+THREAD_LENGTH = 1000
+THREADS = 20
+AGENTS = ["maria", "carlos", "sofia"]
+
+
+def build_thread(n: int):
+    messages = []
+    for i in range(n):
+        if i % 2 == 0:
+            messages.append(HumanMessage(
+                content=f"Hola, tengo un restaurante y necesito ayuda con WhatsApp #{i}",
+                id=str(uuid.uuid4()),
+                additional_kwargs={"message_id": f"ghl-{i}", "timestamp": "2026-10-18T10:00:00Z", "source": "ghl_api"},
+            ))
+        else:
+            messages.append(AIMessage(
+                content=f"¡Perfecto! Cuéntame más sobre tu negocio y cuántos mensajes recibes al día. #{i}",
+                id=str(uuid.uuid4()),
+                name="".join(AGENTS[i % 3]),  # Fresh string per message, as the LLM client builds them
+                additional_kwargs={"refusal": None},
+                response_metadata={
+                    "token_usage": {"completion_tokens": 38, "prompt_tokens": 1870, "total_tokens": 1908},
+                    "model_name": "gpt-4-turbo-2024-04-09",
+                    "system_fingerprint": "fp_5c95a4634e",
+                    "finish_reason": "stop",
+                    "logprobs": None,
+                },
+                usage_metadata={"input_tokens": 1870, "output_tokens": 38, "total_tokens": 1908},
+            ))
+    return messages
+
+
+def heap_bytes(factory) -> int:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    held = factory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del held
+    return size
+
+
+def live_channel(messages):
+    """Channel as a running graph holds it: messages plus the records of its last snapshot"""
+    channel = AppendOnlyMessages(list)
+    channel.update([messages])
+    channel.checkpoint()
+    return channel
+
+
+def checkpoint_bytes(messages, compact: bool, serde: JsonPlusSerializer) -> int:
+    if compact:
+        channel = AppendOnlyMessages(list)
+        channel.update([messages])
+        value = channel.checkpoint()
+    else:
+        value = messages
+    return len(serde.dumps_typed(value)[1])
+
+
+def main():
+    serde = JsonPlusSerializer()
+
+    messages_heap = heap_bytes(lambda: [build_thread(THREAD_LENGTH) for _ in range(THREADS)])
+    records_heap = heap_bytes(lambda: [
+        [MessageRecord.from_message(m, strip_metadata=True) for m in build_thread(THREAD_LENGTH)]
+        for _ in range(THREADS)
+    ])
+    records_full_heap = heap_bytes(lambda: [
+        [MessageRecord.from_message(m) for m in build_thread(THREAD_LENGTH)]
+        for _ in range(THREADS)
+    ])
+
+    channel_heap = heap_bytes(lambda: [live_channel(build_thread(THREAD_LENGTH)) for _ in range(THREADS)])
+
+    thread = build_thread(THREAD_LENGTH)
+    old_bytes = checkpoint_bytes(thread, compact=False, serde=serde)
+    new_bytes = checkpoint_bytes(thread, compact=True, serde=serde)
+
+    print(f"{THREADS} threads x {THREAD_LENGTH} messages")
+    print(f"{'representation':<34} {'heap KiB/thread':>16}")
+    print("-" * 51)
+    print(f"{'LangChain messages':<34} {messages_heap / THREADS / 1024:>16.1f}")
+    print(f"{'MessageRecord (full metadata)':<34} {records_full_heap / THREADS / 1024:>16.1f}")
+    print(f"{'MessageRecord (sent, stripped)':<34} {records_heap / THREADS / 1024:>16.1f}")
+    print(f"{'live channel (messages + records)':<34} {channel_heap / THREADS / 1024:>16.1f}")
+    print()
+    print(f"{'checkpoint':<34} {'KiB/thread':>16}")
+    print("-" * 51)
+    print(f"{'list of LangChain messages':<34} {old_bytes / 1024:>16.1f}")
+    print(f"{'chunked compact records':<34} {new_bytes / 1024:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark RedisSaver against a local Redis
+
+Replays turns through the production-shaped node chain of
+bench_checkpointer.py (five super-steps per turn) with the async graph API,
+as run_workflow does, and compares:
+- memory: ContentAddressedSaver, the in-process baseline
+- redis-unpipelined: RedisSaver writing every put_writes on its own
+- redis: RedisSaver with task writes batched into the checkpoint pipeline
+- redis+lease: the same, holding the per-thread lease around each turn
+
+Reported per turn: wall time (p50/p95), Redis round-trips and bytes sent,
+and the Redis memory the thread occupies at the end.
+
+Needs a Redis server (docker compose up redis); uses database 15 by default
+and deletes its threads afterwards.
+
+Usage:
+    python benchmarks/bench_redis_checkpointer.py
+    python benchmarks/bench_redis_checkpointer.py --url redis://localhost:6379/15 --turns 200
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.harness import quiet_logging  # before app
+
+from langchain_core.messages import HumanMessage
+
+from app.state.checkpointer import ContentAddressedSaver
+from app.state.redis_checkpointer import RedisSaver
+from benchmarks.bench_checkpointer import NODES, WEBHOOK, build_graph
+from benchmarks.metrics import percentiles, write_results
+
+
+async def run(name: str, saver, turns: int, lease: bool) -> dict:
+    graph = build_graph(saver)
+    thread_id = f"bench-{name}-{uuid.uuid4().hex[:8]}"
+    config = {"configurable": {"thread_id": thread_id}}
+    samples = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        if lease:
+            async with saver.lease(thread_id):
+                await graph.ainvoke({"messages": [HumanMessage(content=f"mensaje {turn}")], "webhook_data": WEBHOOK}, config)
+        else:
+            await graph.ainvoke({"messages": [HumanMessage(content=f"mensaje {turn}")], "webhook_data": WEBHOOK}, config)
+        samples.append((time.perf_counter() - start) * 1e3)
+
+    row = {"saver": name, "ms_per_turn": percentiles(samples)}
+    if isinstance(saver, RedisSaver):
+        keys = [key async for key in saver.aclient.scan_iter(match=saver._key(thread_id, "*"))]
+        try:
+            memory = sum([await saver.aclient.memory_usage(key) or 0 for key in keys])
+        except Exception:
+            memory = None  # MEMORY USAGE isn't available on every Redis-compatible server
+        row.update({
+            "round_trips_per_turn": round(saver.stats["round_trips"] / turns, 2),
+            "kib_sent_per_turn": round(saver.stats["bytes_written"] / turns / 1024, 2),
+            "redis_kib": round(memory / 1024, 1) if memory is not None else "-",
+            "chunks_written": saver.stats["chunks_written"],
+        })
+        await saver.adelete_thread(thread_id)
+    return row
+
+
+async def main_async(args: argparse.Namespace) -> list:
+    probe = RedisSaver(args.url)
+    try:
+        await probe.aclient.ping()
+    except Exception as e:
+        sys.exit(f"Redis not reachable at {args.url}: {e}")
+
+    cases = [
+        ("memory", ContentAddressedSaver(), False),
+        ("redis-unpipelined", RedisSaver(args.url, pipeline_writes=False), False),
+        ("redis", RedisSaver(args.url), False),
+        ("redis+lease", RedisSaver(args.url), True),
+    ]
+    return [await run(name, saver, args.turns, lease) for name, saver, lease in cases]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="redis://localhost:6379/15")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/redis_checkpointer-<sha>-<time>.json)")
+    args = parser.parse_args()
+    quiet_logging()
+
+    rows = asyncio.run(main_async(args))
+
+    print(f"{args.turns} turns, {len(NODES)} super-steps per turn")
+    header = f"{'saver':<20} {'p50 ms':>8} {'p95 ms':>8} {'RTT/turn':>9} {'KiB/turn':>9} {'Redis KiB':>10}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        ms = row["ms_per_turn"]
+        print(f"{row['saver']:<20} {ms['p50']:>8.2f} {ms['p95']:>8.2f} "
+              f"{row.get('round_trips_per_turn', '-'):>9} {row.get('kib_sent_per_turn', '-'):>9} {row.get('redis_kib', '-'):>10}")
+
+    config = {"url": args.url, "turns": args.turns, "nodes": len(NODES)}
+    print(f"results: {write_results('redis_checkpointer', config, {'cases': rows}, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
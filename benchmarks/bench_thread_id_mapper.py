@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark thread_id_mapper_node cost against conversation length
+
+The mapper only reads a handful of identifiers, so its per-turn cost should
+stay flat as the message history grows. For reference the script also times
+copy.deepcopy(state), which the node used to do on every turn.
+
+Usage:
+    DEBUG_INSTRUMENTATION=off python benchmarks/bench_thread_id_mapper.py
+"""
+import asyncio
+import copy
+import logging
+import os
+import sys
+import time
+
+import structlog
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.agents.thread_id_mapper import thread_id_mapper_node
+from app.utils.debug_helpers import set_instrumentation_mode
+
+TURNS = 500
+HISTORY_LENGTHS = [0, 10, 100, 500, 2000]
+
+
+def build_state(history: int):
+    messages = []
+    for i in range(history):
+        cls = HumanMessage if i % 2 == 0 else AIMessage
+        messages.append(cls(content=f"message {i} " + "x" * 200, additional_kwargs={"i": i}))
+    return {
+        "messages": messages,
+        "contact_id": "contact-bench",
+        "webhook_data": {"contactId": "contact-bench", "conversationId": "conv-bench", "body": "hola"},
+        "thread_id": "cloud-thread-uuid",
+        "__config__": {"configurable": {"thread_id": "cloud-thread-uuid", "checkpoint_ns": ""}},
+    }
+
+
+async def time_node(state) -> float:
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        await thread_id_mapper_node(state)
+    return (time.perf_counter() - start) / TURNS * 1e6
+
+
+def time_deepcopy(state) -> float:
+    turns = max(1, TURNS // 10)
+    start = time.perf_counter()
+    for _ in range(turns):
+        copy.deepcopy(state)
+    return (time.perf_counter() - start) / turns * 1e6
+
+
+async def main():
+    # Measure the mapping itself, not log output or sampled instrumentation
+    logging.disable(logging.CRITICAL)
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+    set_instrumentation_mode("off")
+
+    header = f"{'history':>8} {'mapper µs/turn':>16} {'deepcopy µs (old)':>18}"
+    print(header)
+    print("-" * len(header))
+    for history in HISTORY_LENGTHS:
+        state = build_state(history)
+        print(f"{history:>8} {await time_node(state):>16.1f} {time_deepcopy(state):>18.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
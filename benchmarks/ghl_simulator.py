@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Local GoHighLevel API simulator
+
+Implements the endpoints GHLClient uses (contacts, notes, conversation search
+and messages, send message, free slots, appointments, locations) over
+in-memory data, with configurable latency and fault injection:
+
+- latency: "fixed:40", "uniform:20,80", "normal:60,15", "lognormal:60,0.5"
+  (milliseconds; lognormal takes the median and sigma), globally or per
+  endpoint
+- faults: a share of requests answered with 429 (with Retry-After) or 5xx
+
+The same simulator is served two ways:
+- in process: GHLClient.transport = simulator.transport()
+- as a server: python benchmarks/ghl_simulator.py --port 8765, then
+  GHL_API_BASE_URL=http://127.0.0.1:8765
+
+Usage:
+    python benchmarks/ghl_simulator.py --port 8765 --latency lognormal:60,0.5 --rate-429 0.02
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import httpx
+
+Reply = Tuple[int, Dict[str, Any], Dict[str, str]]
+
+SLOT_HOURS = (10, 14, 16)
+
+
+# ============ Latency ============
+class LatencyModel:
+    """Samples per-request latency in seconds from a simple distribution"""
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, kind: str = "fixed", *params: float):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.kind = kind
+        self.params = params or (0.0,)
+
+    @classmethod
+    def parse(cls, spec: Optional[Union[str, float, "LatencyModel"]]) -> "LatencyModel":
+        """Build from "kind:a,b" (ms), a plain number of ms, or None for no latency"""
+        if isinstance(spec, LatencyModel):
+            return spec
+        if spec is None or spec == "":
+            return cls()
+        if isinstance(spec, (int, float)):
+            return cls("fixed", float(spec))
+        kind, _, args = str(spec).partition(":")
+        if not args:
+            return cls("fixed", float(kind))
+        return cls(kind, *(float(a) for a in args.split(",")))
+
+    def sample(self, rng: random.Random) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            ms = p[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            ms = rng.gauss(p[0], p[1])
+        else:
+            ms = rng.lognormvariate(math.log(p[0]), p[1]) if p[0] > 0 else 0.0
+        return max(ms, 0.0) / 1000
+
+    def __repr__(self) -> str:
+        return f"{self.kind}:{','.join(f'{v:g}' for v in self.params)}"
+
+
+@dataclass
+class FaultConfig:
+    """Share of requests that fail, and how"""
+
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    retry_after: int = 1  # seconds; GHLClient sleeps exactly this long
+    status_5xx: Tuple[int, ...] = (500, 502, 503)
+
+
+# ============ Simulator ============
+class GHLSimulator:
+    """
+    In-memory GoHighLevel API with latency and fault injection
+
+    Data follows GHL's response shapes closely enough for GHLClient, the
+    receptionist and the responder: contacts wrapped in {"contact": ...},
+    messages nested as {"messages": {"messages": [...]}}, free slots keyed by
+    date, and booked slots removed from later availability.
+    """
+
+    def __init__(
+        self,
+        latency: Optional[Union[str, float, LatencyModel]] = None,
+        faults: Optional[FaultConfig] = None,
+        endpoint_latency: Optional[Dict[str, Union[str, float, LatencyModel]]] = None,
+        seed: Optional[int] = None,
+    ):
+        self.latency = LatencyModel.parse(latency)
+        self.endpoint_latency = {k: LatencyModel.parse(v) for k, v in (endpoint_latency or {}).items()}
+        self.faults = faults or FaultConfig()
+        self.rng = random.Random(seed)
+        self.contacts: Dict[str, Dict[str, Any]] = {}
+        self.conversations: Dict[str, Dict[str, Any]] = {}
+        self.notes: Dict[str, List[Dict[str, Any]]] = {}
+        self.appointments: List[Dict[str, Any]] = []
+        self.booked: set = set()
+        self.calls: Counter = Counter()  # "METHOD /route" -> requests
+        self.injected: Counter = Counter()  # status -> injected faults
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    # ---- data ----
+    def add_contact(self, contact_id: str, **fields: Any) -> Dict[str, Any]:
+        contact = self.contacts.setdefault(contact_id, {
+            "id": contact_id,
+            "firstName": "",
+            "lastName": "",
+            "email": "",
+            "phone": "",
+            "customFields": {},
+            "tags": [],
+        })
+        contact.update({k: v for k, v in fields.items() if v is not None})
+        return contact
+
+    def record_inbound(self, webhook: Dict[str, Any]) -> None:
+        """Store an inbound message the way GHL does before firing the webhook"""
+        contact_id = webhook.get("contactId", "")
+        contact = webhook.get("contact", {})
+        if contact_id not in self.contacts:
+            self.add_contact(
+                contact_id,
+                firstName=contact.get("firstName", ""),
+                lastName=contact.get("lastName", ""),
+                email=contact.get("email", ""),
+                phone=contact.get("phone", ""),
+            )
+        conversation_id = webhook.get("conversationId") or f"conv-{contact_id}"
+        self._append(conversation_id, contact_id, webhook.get("body", ""), "inbound")
+
+    def _append(self, conversation_id: str, contact_id: str, body: str, direction: str) -> Dict[str, Any]:
+        conversation = self.conversations.setdefault(conversation_id, {
+            "id": conversation_id,
+            "contactId": contact_id,
+            "messages": [],
+        })
+        message = {
+            "id": uuid.uuid4().hex[:20],
+            "conversationId": conversation_id,
+            "contactId": contact_id,
+            "body": body,
+            "direction": direction,
+            "dateAdded": datetime.now(timezone.utc).isoformat(),
+            "messageType": "TYPE_WHATSAPP",
+        }
+        conversation["messages"].append(message)
+        return message
+
+    def _conversation_for(self, contact_id: str) -> str:
+        for conversation in self.conversations.values():
+            if conversation["contactId"] == contact_id:
+                return conversation["id"]
+        return f"conv-{contact_id}"
+
+    # ---- request handling ----
+    @staticmethod
+    def route_key(method: str, path: str) -> str:
+        """Collapse ids so counts and per-endpoint latency group by endpoint"""
+        parts = path.strip("/").split("/")
+        if len(parts) >= 2 and (
+            parts[0] in ("contacts", "calendars", "locations")
+            or (parts[0] == "conversations" and len(parts) == 3)
+        ):
+            parts[1] = "{id}"
+        return f"{method} /" + "/".join(parts)
+
+    async def dispatch(self, method: str, path: str, params: Dict[str, str], body: Dict[str, Any]) -> Reply:
+        """Serve one request: latency, then maybe a fault, then the endpoint"""
+        route = self.route_key(method, path)
+        self.calls[route] += 1
+
+        delay = self.endpoint_latency.get(route, self.latency).sample(self.rng)
+        if delay:
+            await asyncio.sleep(delay)
+
+        roll = self.rng.random()
+        if roll < self.faults.rate_429:
+            self.injected[429] += 1
+            return 429, {"message": "Too many requests"}, {"Retry-After": str(self.faults.retry_after)}
+        if roll < self.faults.rate_429 + self.faults.rate_5xx:
+            status = self.rng.choice(self.faults.status_5xx)
+            self.injected[status] += 1
+            return status, {"message": "Simulated server error"}, {}
+
+        return self._serve(method, path, params, body)
+
+    def _serve(self, method: str, path: str, params: Dict[str, str], body: Dict[str, Any]) -> Reply:
+        if match := re.fullmatch(r"/contacts/([^/]+)/notes", path):
+            note = {"id": uuid.uuid4().hex[:20], "body": body.get("body", ""),
+                    "dateAdded": datetime.now(timezone.utc).isoformat()}
+            self.notes.setdefault(match.group(1), []).append(note)
+            return 201, {"note": note}, {}
+
+        if match := re.fullmatch(r"/contacts/([^/]+)", path):
+            contact_id = match.group(1)
+            if method == "GET":
+                if contact_id not in self.contacts:
+                    return 404, {"message": "Contact not found"}, {}
+                return 200, {"contact": self.contacts[contact_id]}, {}
+            contact = self.add_contact(contact_id)
+            custom_fields = body.get("customFields")
+            contact.update({k: v for k, v in body.items() if k != "customFields"})
+            if isinstance(custom_fields, dict):
+                contact["customFields"].update(custom_fields)
+            elif isinstance(custom_fields, list):
+                contact["customFields"].update({f["id"]: f.get("value") for f in custom_fields if "id" in f})
+            return 200, {"contact": contact}, {}
+
+        if path == "/conversations/search":
+            contact_id = params.get("contactId")
+            found = [
+                {"id": c["id"], "contactId": c["contactId"], "lastMessageBody": c["messages"][-1]["body"] if c["messages"] else ""}
+                for c in self.conversations.values() if c["contactId"] == contact_id
+            ]
+            return 200, {"conversations": found, "total": len(found)}, {}
+
+        if path == "/conversations/messages" and method == "POST":
+            contact_id = body.get("contactId", "")
+            message = self._append(self._conversation_for(contact_id), contact_id, body.get("message", ""), "outbound")
+            return 200, {"messageId": message["id"], "conversationId": message["conversationId"]}, {}
+
+        if match := re.fullmatch(r"/conversations/([^/]+)/messages", path):
+            conversation = self.conversations.get(match.group(1))
+            if conversation is None:
+                return 404, {"message": "Conversation not found"}, {}
+            return 200, {"messages": {"messages": list(conversation["messages"]), "nextPage": False}}, {}
+
+        if re.fullmatch(r"/calendars/[^/]+/free-slots", path) or path == "/appointments/slots":
+            return 200, self._free_slots(params), {}
+
+        if path in ("/calendars/events/appointments", "/appointments") and method == "POST":
+            start = body.get("startTime")
+            if start in self.booked:
+                return 400, {"message": "The slot you have selected is no longer available"}, {}
+            self.booked.add(start)
+            appointment = {"id": uuid.uuid4().hex[:20], **body}
+            self.appointments.append(appointment)
+            return 201, appointment, {}
+
+        if match := re.fullmatch(r"/locations/([^/]+)", path):
+            return 200, {"location": {"id": match.group(1), "name": "Simulated location"}}, {}
+
+        return 404, {"message": f"Not found: {method} {path}"}, {}
+
+    def _free_slots(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """Three daily slots between startDate and endDate (ms), minus booked ones"""
+        now = datetime.now()
+        start = self._from_millis(params.get("startDate")) or now
+        end = self._from_millis(params.get("endDate")) or start + timedelta(days=7)
+        start = max(start, now).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        slots: Dict[str, Any] = {}
+        day = start
+        while day <= end:
+            if day.weekday() < 5:
+                free = [
+                    iso for iso in (day.replace(hour=hour).isoformat() for hour in SLOT_HOURS)
+                    if iso not in self.booked and datetime.fromisoformat(iso) > now
+                ]
+                if free:
+                    slots[day.strftime("%Y-%m-%d")] = {"slots": free}
+            day += timedelta(days=1)
+        slots["traceId"] = uuid.uuid4().hex
+        return slots
+
+    @staticmethod
+    def _from_millis(value: Optional[str]) -> Optional[datetime]:
+        try:
+            return datetime.fromtimestamp(int(value) / 1000)
+        except (TypeError, ValueError):
+            return None
+
+    # ---- transports ----
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content) if request.content else {}
+        status, payload, headers = await self.dispatch(
+            request.method, request.url.path, dict(request.url.params), body
+        )
+        return httpx.Response(status, json=payload, headers=headers)
+
+    def transport(self) -> httpx.AsyncBaseTransport:
+        """In-process transport for GHLClient.transport"""
+        return httpx.MockTransport(self.handle)
+
+    def asgi_app(self):
+        """ASGI app serving the simulator over HTTP"""
+        from starlette.applications import Starlette
+        from starlette.requests import Request
+        from starlette.responses import JSONResponse
+        from starlette.routing import Route
+
+        async def endpoint(request: Request) -> JSONResponse:
+            raw = await request.body()
+            status, payload, headers = await self.dispatch(
+                request.method, request.url.path, dict(request.query_params), json.loads(raw) if raw else {}
+            )
+            return JSONResponse(payload, status_code=status, headers=headers)
+
+        async def stats(request: Request) -> JSONResponse:
+            return JSONResponse({"calls": dict(self.calls), "injected": {str(k): v for k, v in self.injected.items()}})
+
+        return Starlette(routes=[
+            Route("/_simulator/stats", stats),
+            Route("/{path:path}", endpoint, methods=["GET", "POST", "PUT", "DELETE"]),
+        ])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default=None, help='e.g. "lognormal:60,0.5" (ms)')
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    simulator = GHLSimulator(
+        latency=args.latency,
+        faults=FaultConfig(rate_429=args.rate_429, rate_5xx=args.rate_5xx, retry_after=args.retry_after),
+        seed=args.seed,
+    )
+    print(f"GHL simulator on http://{args.host}:{args.port} (latency={simulator.latency}, "
+          f"429={args.rate_429:.1%}, 5xx={args.rate_5xx:.1%}); stats at /_simulator/stats")
+    uvicorn.run(simulator.asgi_app(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
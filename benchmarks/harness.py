@@ -0,0 +1,89 @@
+"""
+Shared setup for benchmarks that run the workflow offline
+
+Importing this module prepares the environment for a local-only run: no
+tracing uploads, no sampled debug output, and placeholder credentials -
+nothing leaves the process. Import it before anything from app.
+"""
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ["LANGCHAIN_TRACING_V2"] = "false"
+os.environ.setdefault("TRACE_EXPORT_SINK", "null")
+os.environ.setdefault("DEBUG_INSTRUMENTATION", "off")
+for name in ("OPENAI_API_KEY", "GHL_API_TOKEN", "GHL_LOCATION_ID", "GHL_CALENDAR_ID",
+             "GHL_ASSIGNED_USER_ID", "SUPABASE_URL", "SUPABASE_KEY"):
+    os.environ.setdefault(name, "offline")
+
+import structlog
+
+from app.utils.scripted_model import LLMStandIn
+from benchmarks.ghl_simulator import FaultConfig, GHLSimulator
+
+DEFAULT_CASSETTE = ROOT / "benchmarks" / "fixtures" / "llm_cassette.jsonl"
+
+
+def add_stand_in_args(parser: argparse.ArgumentParser) -> None:
+    """GHL simulator and LLM flags shared by the offline benchmarks"""
+    group = parser.add_argument_group("stand-ins")
+    group.add_argument("--ghl-latency", default=None, help='GHL latency, e.g. "lognormal:80,0.4" (ms)')
+    group.add_argument("--ghl-rate-429", type=float, default=0.0)
+    group.add_argument("--ghl-rate-5xx", type=float, default=0.0)
+    group.add_argument("--ghl-retry-after", type=int, default=1)
+    group.add_argument("--seed", type=int, default=None)
+    group.add_argument("--llm", choices=("scripted", "replay", "record"), default="scripted")
+    group.add_argument("--cassette", default=str(DEFAULT_CASSETTE), help="recorded LLM responses for --llm replay/record")
+    group.add_argument("--llm-latency-ms", type=float, default=0.0, help="synthetic time to first token")
+    group.add_argument("--llm-tokens-per-sec", type=float, default=0.0, help="synthetic generation rate (replay)")
+    group.add_argument("--max-score", type=int, default=10, help="cap scripted lead scores")
+
+
+def install_stand_ins(args: argparse.Namespace) -> GHLSimulator:
+    """
+    Point GHLClient at a fresh simulator and select the LLM backend
+
+    Must run before app.workflow is imported - agents build their models at import.
+    """
+    if args.llm != "scripted":
+        os.environ.update({
+            "LLM_BACKEND": args.llm,
+            "LLM_CASSETTE_PATH": args.cassette,
+            "LLM_REPLAY_LATENCY_MS": str(args.llm_latency_ms),
+            "LLM_REPLAY_TOKENS_PER_SEC": str(args.llm_tokens_per_sec),
+        })
+        from app.config import get_settings
+        get_settings.cache_clear()  # Loaded by app/__init__ tracing setup before the flags were read
+
+    from app.tools.ghl_client import GHLClient
+    from app.utils.model_factory import set_model_override
+
+    ghl = GHLSimulator(
+        latency=args.ghl_latency,
+        faults=FaultConfig(rate_429=args.ghl_rate_429, rate_5xx=args.ghl_rate_5xx, retry_after=args.ghl_retry_after),
+        seed=args.seed,
+    )
+    GHLClient.transport = ghl.transport()
+    if args.llm == "scripted":
+        set_model_override(LLMStandIn(latency_ms=args.llm_latency_ms, max_score=args.max_score))
+    return ghl
+
+
+def cassette_stats(args: argparse.Namespace) -> dict:
+    if args.llm == "scripted":
+        return {}
+    from app.utils.replay_model import Cassette
+    cassette = Cassette.open(args.cassette)
+    return {"cassette_hits": cassette.hits, "cassette_misses": cassette.misses, "cassette_size": len(cassette.responses)}
+
+
+def quiet_logging() -> None:
+    """Drop application logging so it doesn't dominate the measurement"""
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+    logging.disable(logging.CRITICAL)
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Synthetic WhatsApp conversation load generator
+
+Simulates concurrent leads that walk the qualification funnel: greeting
+(Maria), business details (Carlos), booking interest and a booking attempt
+(Sofia). Leads think between replies and sometimes send bursts of two or
+three messages back to back, which GHL delivers as separate webhooks.
+
+For each concurrency level in --ramp, that many leads run at once for
+--duration seconds (a finished lead is replaced by a new one). The output is
+a latency-vs-concurrency table with the saturation point: the first level
+where throughput grows by less than --saturation-gain over the previous one,
+or median latency grows by more than --saturation-latency times.
+
+Targets:
+- workflow: run_workflow in process, against the GHL simulator and a local
+  LLM (see benchmarks/harness.py for the --ghl-* / --llm flags)
+- production: POST {url}/webhook, the api/webhook_production.py payload
+- local: POST {url}/webhook/ghl, the local_webhook_server.py payload (it
+  acknowledges before processing, so this measures ingestion only)
+
+For the HTTP targets, start the server with GHL_API_BASE_URL pointing at
+benchmarks/ghl_simulator.py.
+
+Usage:
+    python benchmarks/loadgen.py --ramp 1,2,4,8,16 --duration 10
+    python benchmarks/loadgen.py --llm-latency-ms 800 --think-time lognormal:3000,0.5
+    python benchmarks/loadgen.py --target production --url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.harness import add_stand_in_args, cassette_stats, install_stand_ins, quiet_logging  # before app
+
+from benchmarks.ghl_simulator import GHLSimulator, LatencyModel
+from benchmarks.metrics import peak_rss_mb, percentiles, write_results
+
+LOCATION_ID = "loadgen-location"
+FIRST_NAMES = ["Ana", "Luis", "Rosa", "Jorge", "Carmen", "Diego", "Lucía", "Pablo"]
+BUSINESSES = ["un restaurante", "una tienda de ropa", "una clínica dental", "un salón de belleza", "un gimnasio"]
+
+# Funnel stages; the scripted LLM scores greetings ~3 (Maria), business
+# details ~6 (Carlos) and booking language ~8 (Sofia)
+SCRIPT = [
+    ["Hola", "Buenas tardes", "Hola, ¿cómo están?"],
+    ["Me llamo {name}"],
+    ["Tengo {business}", "Soy dueña de {business}", "Manejo {business}"],
+    ["Estoy perdiendo clientes porque no contesto a tiempo", "Necesito más clientes", "Mi presupuesto es de 500 al mes"],
+    ["¿Podemos agendar una demo?", "Quiero agendar una cita", "Me interesa una demo"],
+    ["El martes a las 10 me funciona", "El jueves en la tarde", "Mañana a las 2pm"],
+]
+
+
+@dataclass
+class Level:
+    """Results for one concurrency level"""
+
+    concurrency: int
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    conversations: int = 0
+    bookings: int = 0
+    wall: float = 0.0
+
+    def row(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "messages": len(self.latencies),
+            "errors": self.errors,
+            "conversations": self.conversations,
+            "booking_attempts": self.bookings,
+            "throughput_msgs_per_sec": round(len(self.latencies) / self.wall, 2) if self.wall else 0.0,
+            "latency_ms": percentiles(self.latencies),
+        }
+
+
+class Lead:
+    """One synthetic WhatsApp conversation"""
+
+    def __init__(self, rng: random.Random, burst_prob: float):
+        self.rng = rng
+        self.contact_id = f"lead-{rng.getrandbits(40):010x}"
+        self.conversation_id = f"conv-{self.contact_id}"
+        self.name = rng.choice(FIRST_NAMES)
+        business = rng.choice(BUSINESSES)
+        self.messages = [rng.choice(stage).format(name=self.name, business=business) for stage in SCRIPT]
+        self.burst_prob = burst_prob
+
+    def turns(self) -> List[List[str]]:
+        """Messages grouped into bursts sent without waiting for a reply"""
+        turns: List[List[str]] = []
+        for message in self.messages:
+            if turns and len(turns[-1]) < 3 and self.rng.random() < self.burst_prob:
+                turns[-1].append(message)
+            else:
+                turns.append([message])
+        return turns
+
+    def webhook(self, body: str) -> Dict[str, Any]:
+        return {
+            "type": "InboundMessage",
+            "locationId": LOCATION_ID,
+            "contactId": self.contact_id,
+            "conversationId": self.conversation_id,
+            "body": body,
+            "direction": "inbound",
+            "messageType": "WhatsApp",
+            "contact": {"firstName": self.name, "lastName": "Load", "phone": "+13055550000"},
+        }
+
+
+# ============ Targets ============
+Send = Callable[[Dict[str, Any]], Awaitable[bool]]
+
+
+async def workflow_target(ghl: GHLSimulator) -> Send:
+    from app.utils.outbound_queue import get_outbound_dispatcher
+    from app.workflow import run_workflow
+
+    async def send(webhook: Dict[str, Any]) -> bool:
+        ghl.record_inbound(webhook)
+        result = await run_workflow(webhook)
+        # Latency is until the reply reaches GHL, not just until it's queued
+        await get_outbound_dispatcher().drain(webhook["contactId"])
+        return bool(result.get("success"))
+
+    return send
+
+
+def http_target(client: Any, url: str, target: str) -> Send:
+    async def send(webhook: Dict[str, Any]) -> bool:
+        if target == "production":
+            payload = {**webhook, "message": {"body": webhook["body"], "type": 1}}
+            response = await client.post(f"{url}/webhook", json=payload)
+        else:
+            response = await client.post(f"{url}/webhook/ghl", json=webhook)
+        return response.status_code == 200
+
+    return send
+
+
+# ============ Load ============
+async def run_level(send: Send, concurrency: int, args: argparse.Namespace, rng: random.Random) -> Level:
+    level = Level(concurrency)
+    think = LatencyModel.parse(args.think_time)
+    burst_gap = LatencyModel.parse(args.burst_gap)
+    deadline = time.perf_counter() + args.duration
+
+    async def deliver(webhook: Dict[str, Any]) -> None:
+        start = time.perf_counter()
+        try:
+            ok = await asyncio.wait_for(send(webhook), timeout=args.timeout)
+        except Exception:
+            ok = False
+        level.latencies.append((time.perf_counter() - start) * 1000)
+        level.errors += not ok
+
+    async def lead_loop() -> None:
+        while time.perf_counter() < deadline:
+            lead = Lead(rng, args.burst_prob)
+            level.conversations += 1
+            for burst in lead.turns():
+                if time.perf_counter() >= deadline:
+                    return
+                # A burst is delivered as separate webhooks a moment apart
+                pending = []
+                for i, body in enumerate(burst):
+                    if i:
+                        await asyncio.sleep(burst_gap.sample(rng))
+                    level.bookings += body in SCRIPT[-1]
+                    pending.append(asyncio.create_task(deliver(lead.webhook(body))))
+                await asyncio.gather(*pending)
+                await asyncio.sleep(think.sample(rng))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(lead_loop() for _ in range(concurrency)))
+    level.wall = time.perf_counter() - start
+    return level
+
+
+def saturation_point(rows: List[Dict[str, Any]], min_gain: float, max_latency_growth: float) -> Optional[int]:
+    """First concurrency that adds little throughput, or mostly adds queueing, over the previous level"""
+    for previous, current in zip(rows, rows[1:]):
+        before = previous["throughput_msgs_per_sec"]
+        if before and (current["throughput_msgs_per_sec"] - before) / before < min_gain:
+            return current["concurrency"]
+        p50_before = previous["latency_ms"].get("p50")
+        if p50_before and current["latency_ms"].get("p50", 0) > p50_before * max_latency_growth:
+            return current["concurrency"]
+    return None
+
+
+def print_table(rows: List[Dict[str, Any]], saturation: Optional[int]) -> None:
+    header = f"{'conc':>5}{'msgs':>7}{'msg/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        lat = row["latency_ms"]
+        marker = "  <- saturation" if row["concurrency"] == saturation else ""
+        print(f"{row['concurrency']:>5}{row['messages']:>7}{row['throughput_msgs_per_sec']:>8.1f}"
+              f"{lat.get('p50', 0):>9.1f}{lat.get('p95', 0):>9.1f}{lat.get('p99', 0):>9.1f}{row['errors']:>8}{marker}")
+    if saturation is None:
+        print("no saturation within the ramp - extend --ramp")
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    extra: Dict[str, Any] = {}
+    client = None
+    if args.target == "workflow":
+        ghl = install_stand_ins(args)
+        send = await workflow_target(ghl)
+    else:
+        import httpx
+        client = httpx.AsyncClient(timeout=args.timeout)
+        send = http_target(client, args.url.rstrip("/"), args.target)
+
+    rows = []
+    try:
+        for concurrency in (int(c) for c in args.ramp.split(",")):
+            level = await run_level(send, concurrency, args, rng)
+            rows.append(level.row())
+            print(f"  {concurrency:>4} leads: {len(level.latencies)} messages, "
+                  f"{rows[-1]['throughput_msgs_per_sec']} msg/s", flush=True)
+    finally:
+        if client is not None:
+            await client.aclose()
+
+    if args.target == "workflow":
+        extra = {"ghl_calls": ghl.total_calls, **cassette_stats(args)}
+    return {"levels": rows, **extra, "peak_rss_mb": peak_rss_mb()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("workflow", "production", "local"), default="workflow")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="server for the HTTP targets")
+    parser.add_argument("--ramp", default="1,2,4,8,16", help="comma-separated concurrent leads per level")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per level")
+    parser.add_argument("--think-time", default="uniform:100,400", help="pause between a reply and the next message (ms)")
+    parser.add_argument("--burst-prob", type=float, default=0.25, help="chance a message joins the previous burst")
+    parser.add_argument("--burst-gap", default="uniform:200,800", help="gap between messages in a burst (ms)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-message timeout (s)")
+    parser.add_argument("--saturation-gain", type=float, default=0.10, help="throughput gain below which a level counts as saturated")
+    parser.add_argument("--saturation-latency", type=float, default=2.0, help="p50 growth factor above which a level counts as saturated")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/loadgen-<sha>-<time>.json)")
+    parser.add_argument("--verbose", action="store_true", help="keep application logging")
+    add_stand_in_args(parser)
+    args = parser.parse_args()
+
+    if not args.verbose:
+        quiet_logging()
+
+    print(f"target={args.target} ramp={args.ramp} duration={args.duration}s think={args.think_time}")
+    metrics = asyncio.run(main_async(args))
+    saturation = saturation_point(metrics["levels"], args.saturation_gain, args.saturation_latency)
+    metrics["saturation_concurrency"] = saturation
+    print_table(metrics["levels"], saturation)
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "verbose")}
+    print(f"results: {write_results('loadgen', config, metrics, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
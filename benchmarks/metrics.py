@@ -0,0 +1,77 @@
+"""
+Shared result helpers for the benchmark scripts - percentiles, run metadata
+and JSON result files under benchmarks/results/
+"""
+import json
+import platform
+import resource
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """count, mean, p50, p95, p99 and max of samples (nearest rank)"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def peak_rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def git_sha() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip() or "nogit"
+    except OSError:
+        return "nogit"
+
+
+def write_results(benchmark: str, config: Dict[str, Any], metrics: Dict[str, Any], output: Optional[str] = None) -> Path:
+    """Save a run as JSON; default name is <benchmark>-<sha>-<time>.json"""
+    sha = git_sha()
+    result = {
+        "benchmark": benchmark,
+        "git_sha": sha,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": config,
+        "metrics": metrics,
+    }
+    path = Path(output) if output else RESULTS_DIR / f"{benchmark}-{sha}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n")
+    return path
+
+
+def load_results(path: Optional[str]) -> Dict[str, Any]:
+    """Metrics of a previous run, or {} when no path is given"""
+    if not path:
+        return {}
+    return json.loads(Path(path).read_text()).get("metrics", {})
+
+
+def delta(value: float, previous: Optional[float]) -> str:
+    """ (+x.x%) against a previous value, or an empty string"""
+    if not previous:
+        return ""
+    return f" ({(value - previous) / previous * 100:+.1f}%)"
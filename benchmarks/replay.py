@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+End-to-end replay benchmark
+
+Replays recorded inbound webhooks through run_workflow against the GHL
+simulator (benchmarks/ghl_simulator.py) and a local LLM, so results measure
+our own code path: thread mapping, GHL round trips, routing, agents,
+checkpointing.
+
+LLM modes (--llm):
+- scripted: keyword-driven stand-in (app/utils/scripted_model.py), no setup
+- replay: recorded responses from a cassette (app/utils/replay_model.py),
+  including tool calls; a prompt missing from the cassette fails the turn
+- record: live OpenAI, appending every response to the cassette
+
+Reports per-node and end-to-end p50/p95/p99, throughput at a fixed
+concurrency, GHL and LLM calls per turn, router passes saved on escalations
+and peak RSS, and writes them as JSON
+to benchmarks/results/ for comparison over time.
+
+Turns of one conversation are replayed in order; conversations run in
+parallel up to --concurrency. --copies replays the fixture several times
+under distinct contact ids to get more concurrent threads.
+
+Usage:
+    python benchmarks/replay.py
+    python benchmarks/replay.py --concurrency 8 --copies 10 --llm-latency-ms 300
+    python benchmarks/replay.py --ghl-latency lognormal:80,0.4 --ghl-rate-5xx 0.02
+    OPENAI_API_KEY=... python benchmarks/replay.py --llm record --cassette /tmp/c.jsonl
+    python benchmarks/replay.py --llm replay --cassette /tmp/c.jsonl --llm-tokens-per-sec 60
+    python benchmarks/replay.py --compare benchmarks/results/<previous>.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.harness import ROOT, add_stand_in_args, cassette_stats, install_stand_ins, quiet_logging  # before app
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+from app.utils.replay_model import LIVE_CALL_TAG
+from benchmarks.metrics import delta, load_results, peak_rss_mb, percentiles, write_results
+
+DEFAULT_FIXTURE = ROOT / "benchmarks" / "fixtures" / "webhooks.jsonl"
+
+
+# ============ Per-node timing ============
+class NodeTimer(AsyncCallbackHandler):
+    """Times top-level graph nodes from LangGraph chain callbacks and counts LLM calls"""
+
+    def __init__(self):
+        self.started: Dict[Any, tuple] = {}
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+        self.llm_calls = 0
+
+    async def on_chat_model_start(self, serialized, messages, *, tags=None, **kwargs):
+        # A recording model calls the live one inside its own run - count once
+        if LIVE_CALL_TAG not in (tags or []):
+            self.llm_calls += 1
+
+    async def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, name=None, **kwargs):
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        # Top-level tasks have a single-segment namespace ("node:task_id")
+        if node and name == node and "|" not in metadata.get("langgraph_checkpoint_ns", "|"):
+            self.started[run_id] = (node, time.perf_counter())
+
+    async def _finish(self, run_id) -> None:
+        entry = self.started.pop(run_id, None)
+        if entry:
+            self.durations[entry[0]].append((time.perf_counter() - entry[1]) * 1000)
+
+    async def on_chain_end(self, outputs, *, run_id, **kwargs):
+        await self._finish(run_id)
+
+    async def on_chain_error(self, error, *, run_id, **kwargs):
+        await self._finish(run_id)
+
+
+node_timer_var: ContextVar[Optional[NodeTimer]] = ContextVar("replay_node_timer", default=None)
+register_configure_hook(node_timer_var, inheritable=True)
+
+
+# ============ Helpers ============
+def load_webhooks(path: Path) -> List[Dict[str, Any]]:
+    """Read one webhook per line; also accepts a single {"webhook_data": {...}} file"""
+    text = path.read_text()
+    if path.suffix == ".json":
+        data = json.loads(text)
+        return [data.get("webhook_data", data)]
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def group_conversations(webhooks: List[Dict[str, Any]], copies: int) -> List[List[Dict[str, Any]]]:
+    by_contact: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for webhook in webhooks:
+        by_contact[webhook["contactId"]].append(webhook)
+    conversations = []
+    for copy in range(copies):
+        for turns in by_contact.values():
+            conversations.append([
+                {
+                    **turn,
+                    "contactId": f"{turn['contactId']}-r{copy}",
+                    "conversationId": f"{turn.get('conversationId') or turn['contactId']}-r{copy}",
+                }
+                for turn in turns
+            ])
+    return conversations
+
+
+# ============ Replay ============
+async def replay(args: argparse.Namespace) -> Dict[str, Any]:
+    ghl = install_stand_ins(args)
+    from app.agents.escalation import get_escalation_stats
+    from app.utils.outbound_queue import get_outbound_dispatcher
+    from app.workflow import run_workflow
+
+    conversations = group_conversations(load_webhooks(Path(args.fixture)), args.copies)
+    timer = NodeTimer()
+    node_timer_var.set(timer)
+    turn_ms: List[float] = []
+    failures = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run_conversation(turns: List[Dict[str, Any]]) -> None:
+        nonlocal failures
+        async with semaphore:
+            for webhook in turns:
+                ghl.record_inbound(webhook)
+                start = time.perf_counter()
+                result = await run_workflow(webhook)
+                turn_ms.append((time.perf_counter() - start) * 1000)
+                failures += not result.get("success")
+                # The reply is sent in the background; the lead answers after it arrives
+                await get_outbound_dispatcher().drain(webhook["contactId"])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_conversation(turns) for turns in conversations))
+    wall = time.perf_counter() - start
+
+    turns = len(turn_ms)
+    return {
+        "turns": turns,
+        "failures": failures,
+        "wall_seconds": round(wall, 3),
+        "throughput_turns_per_sec": round(turns / wall, 2) if wall else 0.0,
+        "end_to_end_ms": percentiles(turn_ms),
+        "nodes_ms": {node: percentiles(samples) for node, samples in sorted(timer.durations.items())},
+        "ghl_calls_per_turn": round(ghl.total_calls / turns, 2) if turns else 0.0,
+        "ghl_calls_by_endpoint": dict(sorted(ghl.calls.items())),
+        "ghl_faults_injected": {str(status): count for status, count in sorted(ghl.injected.items())},
+        "llm_calls_per_turn": round(timer.llm_calls / turns, 2) if turns else 0.0,
+        "escalations": get_escalation_stats().stats(),
+        **cassette_stats(args),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_report(metrics: Dict[str, Any], base: Dict[str, Any]) -> None:
+    e2e = metrics["end_to_end_ms"]
+    print(f"turns={metrics['turns']} failures={metrics['failures']} wall={metrics['wall_seconds']}s")
+    print(f"throughput: {metrics['throughput_turns_per_sec']} turns/s"
+          + delta(metrics["throughput_turns_per_sec"], base.get("throughput_turns_per_sec")))
+    header = f"{'':<16}{'p50':>10}{'p95':>10}{'p99':>10}{'count':>8}"
+    print(header)
+    print("-" * len(header))
+    rows = [("end_to_end", e2e, base.get("end_to_end_ms", {}))]
+    rows += [(node, stats, base.get("nodes_ms", {}).get(node, {})) for node, stats in metrics["nodes_ms"].items()]
+    for name, stats, previous in rows:
+        print(f"{name:<16}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['p99']:>10.2f}{stats['count']:>8}"
+              + (f"  p95{delta(stats['p95'], previous.get('p95'))}" if previous.get("p95") else ""))
+    print(f"GHL calls/turn: {metrics['ghl_calls_per_turn']}" + delta(metrics["ghl_calls_per_turn"], base.get("ghl_calls_per_turn"))
+          + (f"  injected faults: {metrics['ghl_faults_injected']}" if metrics["ghl_faults_injected"] else ""))
+    print(f"LLM calls/turn: {metrics['llm_calls_per_turn']}" + delta(metrics["llm_calls_per_turn"], base.get("llm_calls_per_turn")))
+    if "escalations" in metrics:
+        esc = metrics["escalations"]
+        print(f"escalations: {esc['rerouted']} rerouted, {esc['boundary_hops_skipped']} boundary hops skipped, "
+              f"{esc['loops_capped']} capped - saved {esc['router_llm_calls_saved']} router LLM calls, "
+              f"{esc['super_steps_saved']} super-steps")
+    if "cassette_hits" in metrics:
+        print(f"cassette: {metrics['cassette_hits']} hits, {metrics['cassette_misses']} misses, "
+              f"{metrics['cassette_size']} recorded prompts")
+    print(f"peak RSS: {metrics['peak_rss_mb']} MB" + delta(metrics["peak_rss_mb"], base.get("peak_rss_mb")))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixture", default=str(DEFAULT_FIXTURE), help="webhooks .jsonl (or test_input.json-style .json)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--copies", type=int, default=3, help="replay the fixture N times under distinct contacts")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/replay-<sha>-<time>.json)")
+    parser.add_argument("--compare", help="previous results file to diff against")
+    parser.add_argument("--verbose", action="store_true", help="keep application logging")
+    add_stand_in_args(parser)
+    args = parser.parse_args()
+
+    if not args.verbose:
+        quiet_logging()
+
+    metrics = asyncio.run(replay(args))
+    print_report(metrics, load_results(args.compare))
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare", "verbose")}
+    path = write_results("replay", config, metrics, args.output)
+    print(f"results: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,17 @@
 """
 Root level graph entry point for LangGraph deployment
 """
-# Import the main workflow with run_workflow function
-from app.workflow import workflow, run_workflow
+# run_workflow is cheap to import; the graph compiles when it's first accessed
+from app.workflow import get_workflow, run_workflow
 
-# Export as 'agent' which is what langgraph.json expects
-agent = workflow
 
-# Also export as graph for compatibility
-graph = workflow
+def __getattr__(name: str):
+    # Export as 'agent' which is what langgraph.json expects, 'graph' and
+    # 'workflow' for compatibility
+    if name in ("agent", "graph", "workflow"):
+        return get_workflow()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Export run_workflow so webhook can call it
-__all__ = ["agent", "graph", "workflow", "run_workflow"]
\ No newline at end of file
+__all__ = ["agent", "graph", "workflow", "run_workflow"]
@@ -6,21 +6,40 @@ Works with the existing workflow without LangSmith dependency
 import asyncio
 import json
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from fastapi import FastAPI, Request, Response, BackgroundTasks
 from fastapi.responses import JSONResponse
 import uvicorn
 from langgraph_sdk import get_client
 
 # Import your existing workflow
-from app.workflow import workflow, ProductionState
+from app.workflow import get_workflow, ProductionState
+from app.config import get_settings
+from app.utils.deadline import deadline_config, new_deadline
 from app.utils.simple_logger import get_logger
-from app.utils.debug_helpers import log_state_transition, validate_state
+from app.utils.warmup import get_warmup
+from app.utils.webhook_dedup import DedupKey, get_webhook_deduplicator
+from app.utils.debug_helpers import configure_debug_logging, log_state_transition, validate_state
 
 logger = get_logger("local_webhook")
 
-app = FastAPI(title="Local LangGraph Webhook Server")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up in the background - /ready answers 503 until it's done"""
+    from app.tools.ghl_client import GHLClient
+    # State dumps are formatted and written on the listener thread, not in the handlers
+    configure_debug_logging()
+    get_warmup().start()
+    # GHL writes deferred during an outage before the last shutdown
+    GHLClient.schedule_replay()
+    yield
+    await GHLClient.close_pool()
+
+
+app = FastAPI(title="Local LangGraph Webhook Server", lifespan=lifespan)
 
 # In-memory message storage for testing
 message_history = {}
@@ -32,6 +51,42 @@ async def health():
     return {"status": "healthy", "service": "local-langgraph-webhook"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness - 200 once agents, pools and caches are warm"""
+    warmup = get_warmup()
+    return JSONResponse(status_code=200 if warmup.ready else 503, content=warmup.report())
+
+
+@app.post("/admin/warmup")
+async def admin_warmup():
+    """Run the warmup again (or wait for the one in progress) and report"""
+    report = await get_warmup().run()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """Model tier latencies and fallbacks, hedging counters, router calls saved on escalations"""
+    from app.agents.escalation import get_escalation_stats
+    from app.utils.hedging import get_hedger
+    from app.utils.model_tiers import get_tier_selector
+    selector = get_tier_selector()
+    return {
+        "tiers": selector.stats(),
+        "tier_fallbacks": selector.fallbacks,
+        "hedging": get_hedger().stats(),
+        "escalations": get_escalation_stats().stats(),
+    }
+
+
+@app.get("/breakers")
+async def breakers():
+    """Circuit breaker states and the GHL writes waiting for a recovery"""
+    from app.utils.circuit_breaker import breaker_stats, get_deferred_queue
+    return {"breakers": breaker_stats(), "deferred": get_deferred_queue().stats()}
+
+
 @app.post("/webhook/ghl")
 async def ghl_webhook(request: Request, background_tasks: BackgroundTasks):
     """
@@ -57,13 +112,25 @@ async def ghl_webhook(request: Request, background_tasks: BackgroundTasks):
         # Create thread ID
         thread_id = f"conv-{conversation_id}" if conversation_id else f"contact-{contact_id}"
         
+        # Acknowledge redeliveries without running the workflow again
+        dedup_key = None
+        if get_settings().webhook_dedup_enabled:
+            dedup_key = await get_webhook_deduplicator().claim(webhook_data)
+            if dedup_key is None:
+                return JSONResponse(
+                    status_code=200,
+                    content={"status": "duplicate", "thread_id": thread_id}
+                )
+        
         # Process in background
         background_tasks.add_task(
             process_message_locally,
             webhook_data=webhook_data,
             thread_id=thread_id,
             contact_id=contact_id,
-            message_body=message_body
+            message_body=message_body,
+            dedup_key=dedup_key,
+            deadline=new_deadline()  # the turn's budget starts when the webhook arrives
         )
         
         return JSONResponse(
@@ -83,10 +150,12 @@ async def process_message_locally(
     webhook_data: Dict[str, Any],
     thread_id: str,
     contact_id: str,
-    message_body: str
+    message_body: str,
+    dedup_key: Optional[DedupKey] = None,
+    deadline: Optional[float] = None
 ):
     """
-    Process message through local workflow
+    Process message through local workflow, within the turn deadline set at ingress
     """
     logger.info(f"Processing message for thread: {thread_id}")
     
@@ -103,25 +172,24 @@ async def process_message_locally(
             "lead_score": 0
         }
         
-        # Log initial state
-        log_state_transition(initial_state, "webhook", "input")
-        
-        # Validate initial state
-        validation = validate_state(initial_state, "webhook_initial")
-        if not validation["valid"]:
-            logger.warning(f"Initial state issues: {validation['issues']}")
+        # Log and validate initial state (local server always instruments)
+        if __debug__:
+            log_state_transition(initial_state, "webhook", "input")
+            validation = validate_state(initial_state, "webhook_initial")
+            if not validation["valid"]:
+                logger.warning(f"Initial state issues: {validation['issues']}")
         
         # Configure workflow execution
-        config = {
+        config = deadline_config({
             "configurable": {
                 "thread_id": thread_id
             },
             "recursion_limit": 10
-        }
+        }, deadline)
         
         # Execute workflow
         logger.info("Executing workflow...")
-        result = await workflow.ainvoke(initial_state, config)
+        result = await get_workflow().ainvoke(initial_state, config)
         
         # Log result
         logger.info(f"Workflow completed. Final messages: {len(result.get('messages', []))}")
@@ -147,6 +215,9 @@ async def process_message_locally(
         
     except Exception as e:
         logger.error(f"Processing error: {str(e)}", exc_info=True)
+        if dedup_key is not None:
+            # Let a redelivery try again
+            await get_webhook_deduplicator().release(dedup_key)
         message_history[thread_id] = {
             "timestamp": datetime.now().isoformat(),
             "error": str(e)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Sharded Webhook Server
+Runs N worker processes of a webhook app behind a router that keeps every
+conversation on the same worker (see app/utils/sharding.py)
+
+Usage:
+    python sharded_server.py --workers 4
+    python sharded_server.py --app api.webhook_production:app --webhook-path /webhook --health-path /health
+
+Each worker gets its own job queue file (data/webhook_jobs.worker-N.db for
+api.webhook_production), so jobs stay on the worker owning their conversation
+
+Scale at runtime (needs SHARD_ADMIN_TOKEN set and CHECKPOINTER_BACKEND=redis,
+since moved conversations would otherwise lose their state; up to --max-workers):
+    curl -X POST -H "X-Admin-Token: $SHARD_ADMIN_TOKEN" "http://localhost:8000/shards/scale?workers=6"
+"""
+import argparse
+import os
+
+import uvicorn
+
+from app.utils.sharding import ShardSupervisor, create_router_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversation-sharded webhook server")
+    parser.add_argument("--app", default=os.getenv("SHARD_APP", "local_webhook_server:app"))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SHARD_WORKERS", "2")))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--base-port", type=int, default=int(os.getenv("SHARD_BASE_PORT", "9100")))
+    parser.add_argument("--webhook-path", default=os.getenv("SHARD_WEBHOOK_PATH", "/webhook/ghl"))
+    parser.add_argument("--health-path", default=os.getenv("SHARD_HEALTH_PATH", "/ready"))
+    parser.add_argument("--max-workers", type=int, default=int(os.getenv("SHARD_MAX_WORKERS", "16")))
+    args = parser.parse_args()
+
+    supervisor = ShardSupervisor(
+        app=args.app,
+        workers=args.workers,
+        base_port=args.base_port,
+        webhook_path=args.webhook_path,
+        health_path=args.health_path,
+        max_workers=args.max_workers,
+        # Read from the environment only - a command line argument would show up in ps
+        admin_token=os.getenv("SHARD_ADMIN_TOKEN") or None,
+    )
+
+    print(f"🚀 Starting {args.workers} workers of {args.app}")
+    print(f"📍 Webhook URL: http://localhost:{args.port}{args.webhook_path}")
+    print(f"📊 Shards: http://localhost:{args.port}/shards")
+
+    uvicorn.run(create_router_app(supervisor), host="0.0.0.0", port=args.port, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Test the availability grid - bitmap set operations, duration fit and searches
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.tools.availability_grid import AvailabilityGrid
+
+MONDAY = datetime(2030, 3, 4)
+
+
+def at(hour: int, minute: int = 0, day: int = 0) -> datetime:
+    return MONDAY + timedelta(days=day, hours=hour, minutes=minute)
+
+
+def free(start: datetime, end: datetime):
+    return {"startTime": start, "endTime": end}
+
+
+@pytest.fixture
+def grid():
+    # ana: 9-12 and 14-15; luis: 11-13
+    return AvailabilityGrid.from_slots(
+        {"ana": [free(at(9), at(12)), free(at(14), at(15))], "luis": [free(at(11), at(13))]},
+        origin=MONDAY, days=2,
+    )
+
+
+class TestAvailabilityGrid:
+    """Test vectorized multi-calendar availability"""
+
+    def test_union_and_intersection(self, grid):
+        """Any-free covers both reps' hours, all-free only the overlap"""
+        both = np.flatnonzero(grid.intersection())
+
+        assert grid.time_of(both[0]) == grid._aware(at(11))
+        assert grid.time_of(both[-1] + 1) == grid._aware(at(12))
+        assert grid.union().sum() == (3 + 1 + 2 - 1) * 4
+
+    def test_duration_fit(self, grid):
+        """A 90 minute meeting only fits in blocks at least that long"""
+        starts = grid.earliest(10, after=at(0), duration=timedelta(minutes=90), step=timedelta(minutes=30))
+
+        assert [(s["startTime"].hour, s["startTime"].minute) for s in starts] == [
+            (9, 0), (9, 30), (10, 0), (10, 30), (11, 0), (11, 30)]
+        assert starts[0]["calendarIds"] == ["ana"]
+        assert starts[-1]["calendarIds"] == ["luis"]
+
+    def test_earliest_after_and_all_mode(self, grid):
+        """Earliest joint slot after a time; partial cells don't count as free"""
+        joint = grid.earliest(3, after=at(10, 5), mode="all", duration=timedelta(minutes=30))
+        grid.book("ana", at(11, 10), timedelta(minutes=20))
+
+        assert [s["startTime"].minute for s in joint] == [0, 15, 30]
+        assert [s["calendarIds"] for s in joint] == [["ana", "luis"]] * 3
+        assert grid.earliest(1, after=at(11), mode="all", duration=timedelta(minutes=30))[0]["startTime"].hour == 11
+        assert grid.earliest(1, after=at(11), mode="all", duration=timedelta(minutes=30))[0]["startTime"].minute == 30
+
+    def test_closest(self, grid):
+        """Nearest fitting start on the hour, and None when nothing fits"""
+        slot = grid.closest(at(13, 40), duration=timedelta(hours=1), step=timedelta(hours=1))
+
+        assert slot["startTime"].hour == 14
+        assert slot["calendarIds"] == ["ana"]
+        assert grid.closest(at(13), duration=timedelta(hours=4)) is None
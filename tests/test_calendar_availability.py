@@ -0,0 +1,109 @@
+"""
+Test the calendar availability cache - closest-slot lookup, shared fetches,
+refresh ahead and our own bookings
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from app.tools.calendar_availability import CalendarAvailability, CalendarFetchError, SlotIndex
+
+TZ = pytz.timezone("America/New_York")
+MONDAY = datetime(2030, 3, 4)
+
+
+def day_slots(day: datetime, hours=(10, 14, 16)):
+    return [
+        {"startTime": day.replace(hour=h), "endTime": day.replace(hour=h) + timedelta(hours=1), "available": True}
+        for h in hours
+    ]
+
+
+class FakeCalendar:
+    """Fetcher returning a fixed week, counting calls"""
+
+    def __init__(self, delay: float = 0.0):
+        self.slots = day_slots(MONDAY) + day_slots(MONDAY + timedelta(days=1))
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self, calendar_id, start, end, timezone):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return list(self.slots)
+
+
+class TestCalendarAvailability:
+    """Test cached free slots and interval lookups"""
+
+    def test_closest_slot(self):
+        """Nearest start wins, naive GHL times read as calendar local"""
+        index = SlotIndex.build(day_slots(MONDAY))
+
+        assert index.closest(TZ.localize(MONDAY.replace(hour=11)))["startTime"].hour == 10
+        assert index.closest(MONDAY.replace(hour=13))["startTime"].hour == 14
+        assert index.closest(MONDAY.replace(hour=23))["startTime"].hour == 16
+        assert index.closest(MONDAY.replace(hour=23), max_distance=timedelta(hours=2)) is None
+        assert [s["startTime"].hour for s in index.after(MONDAY.replace(hour=11), 5)] == [14, 16]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_lookups_share_one_fetch(self):
+        """A cold cache is fetched once however many callers arrive"""
+        calendar = FakeCalendar(delay=0.01)
+        availability = CalendarAvailability(fetch=calendar, ttl=60, refresh_after=30)
+
+        results = await asyncio.gather(*(availability.closest_slot(MONDAY.replace(hour=15)) for _ in range(10)))
+        await availability.slots()
+
+        assert calendar.calls == 1
+        assert {r["startTime"].hour for r in results} == {14}
+
+    @pytest.mark.asyncio
+    async def test_refresh_ahead_serves_cached_index(self):
+        """Past refresh_after the cached index answers while a new one loads"""
+        calendar = FakeCalendar()
+        availability = CalendarAvailability(fetch=calendar, ttl=60, refresh_after=0)
+        await availability.slots()
+        calendar.slots = calendar.slots[:1]
+
+        stale = await availability.slots()
+        await asyncio.sleep(0.01)
+        fresh = await availability.slots()
+
+        assert len(stale) == 6
+        assert len(fresh) == 1
+        assert calendar.calls >= 2
+
+    @pytest.mark.asyncio
+    async def test_booked_slot_survives_inflight_refresh(self):
+        """A fetch started before our booking doesn't bring the slot back"""
+        calendar = FakeCalendar(delay=0.01)
+        availability = CalendarAvailability(fetch=calendar, ttl=60, refresh_after=30)
+        booked = MONDAY.replace(hour=10)
+
+        availability.prefetch()
+        availability.mark_booked(booked)
+        slots = await availability.slots()
+
+        assert booked.hour not in [s["startTime"].hour for s in slots if s["startTime"].day == MONDAY.day]
+        assert (await availability.closest_slot(booked))["startTime"].hour == 14
+
+    @pytest.mark.asyncio
+    async def test_failed_fetch_is_not_cached(self):
+        """A GHL error keeps the previous index instead of caching 'no slots' for the whole TTL"""
+        calendar = FakeCalendar()
+        availability = CalendarAvailability(fetch=calendar, ttl=0, refresh_after=0)
+        assert len(await availability.slots()) == 6
+
+        async def down(*args):
+            raise CalendarFetchError("GHL 503")
+
+        availability._fetch = down
+        assert len(await availability.slots()) == 6
+
+        availability.invalidate()
+        assert await availability.slots() == []
+        availability._fetch = calendar
+        assert len(await availability.slots()) == 6
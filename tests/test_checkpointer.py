@@ -0,0 +1,81 @@
+"""
+Test Checkpointer - content-addressed message storage across checkpoints
+"""
+import time
+from typing import Annotated, Any, Dict, List, TypedDict
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.graph import END, StateGraph
+
+from app.state.checkpointer import ContentAddressedSaver
+from app.state.message_channel import AppendOnlyMessages
+
+
+class CheckpointState(TypedDict):
+    messages: Annotated[List[BaseMessage], AppendOnlyMessages]
+    webhook_data: Dict[str, Any]
+
+
+def build_graph(saver, nodes=("receptionist", "router", "agent")):
+    builder = StateGraph(CheckpointState)
+    for name in nodes:
+        builder.add_node(name, lambda state, name=name: {"messages": [AIMessage(content=f"{name} {len(state['messages'])}", name=name)]})
+    builder.set_entry_point(nodes[0])
+    for current, following in zip(nodes, nodes[1:]):
+        builder.add_edge(current, following)
+    builder.add_edge(nodes[-1], END)
+    return builder.compile(checkpointer=saver)
+
+
+class TestContentAddressedSaver:
+    """Test that messages are stored once and history still reads back"""
+    
+    def test_each_message_serialized_once(self):
+        saver = ContentAddressedSaver()
+        graph = build_graph(saver)
+        config = {"configurable": {"thread_id": "cas"}}
+        
+        for i in range(30):
+            result = graph.invoke({"messages": [HumanMessage(content=f"turn {i}")], "webhook_data": {"body": "x"}}, config)
+        
+        assert len(result["messages"]) == 120
+        # Frozen chunks re-encode AI messages once without provider metadata;
+        # these carry none, so every message is serialized exactly once
+        assert saver.stats["records_serialized"] == 120
+        assert len(saver.threads["cas"].message_blobs) == 120
+    
+    def test_history_and_delete(self):
+        saver = ContentAddressedSaver()
+        graph = build_graph(saver)
+        config = {"configurable": {"thread_id": "cas-history"}}
+        
+        for i in range(25):
+            graph.invoke({"messages": [HumanMessage(content=f"turn {i}")], "webhook_data": {}}, config)
+        
+        history = list(graph.get_state_history(config))
+        assert [m.content for m in history[0].values["messages"][-2:]] == ["router 98", "agent 99"]
+        assert len(history[4].values["messages"]) == 96
+        assert history[0].values["messages"][-1].name == "agent"
+        
+        saver.delete_thread("cas-history")
+        assert "cas-history" not in saver.threads
+        assert graph.get_state(config).values == {}
+
+    def test_idle_threads_expire_and_caches_are_bounded(self, monkeypatch):
+        """Record caches are kept for the latest threads only; idle threads are dropped after the ttl"""
+        saver = ContentAddressedSaver(ttl=60, max_cached_threads=2)
+        graph = build_graph(saver)
+        for thread in ("a", "b", "c"):
+            graph.invoke({"messages": [HumanMessage(content="hola")], "webhook_data": {}},
+                         {"configurable": {"thread_id": thread}})
+        assert list(saver._caches) == ["b", "c"]
+
+        # A thread whose caches were evicted still reads back and takes new turns
+        config = {"configurable": {"thread_id": "a"}}
+        result = graph.invoke({"messages": [HumanMessage(content="sigo")], "webhook_data": {}}, config)
+        assert [m.content for m in result["messages"]][-4:] == ["sigo", "receptionist 5", "router 6", "agent 7"]
+
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+        assert graph.get_state(config).values == {}
+        assert not saver.threads and saver.stats["threads_expired"] == 3
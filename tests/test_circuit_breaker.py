@@ -0,0 +1,108 @@
+"""
+Test the circuit breakers - state transitions, the instant fallback reply
+while the LLM is down, and GHL writes deferred and replayed after an outage
+"""
+import time
+
+import httpx
+import pytest
+from langchain_core.messages import HumanMessage
+
+from app.agents import maria_agent
+from app.agents.base_agent import FALLBACK_REPLY
+from app.tools.ghl_client import GHLClient
+from app.utils import circuit_breaker
+from app.utils.circuit_breaker import BreakerChatModel, CircuitBreaker, CircuitOpenError, is_outage
+from app.utils.job_queue import DurableJobQueue
+from app.utils.scripted_model import ScriptedChatModel
+
+
+class TestCircuitBreaker:
+    """Test that a failing dependency is cut off and probed back in"""
+
+    def test_open_half_open_closed(self):
+        """Consecutive failures open it; after the reset timeout one probe decides"""
+        breaker = CircuitBreaker("openai", failure_threshold=3, reset_timeout=0.05, half_open_max=1)
+        for _ in range(2):
+            assert breaker.allow()
+            breaker.record_failure()
+        assert breaker.state == "closed"
+        breaker.record_failure()
+        assert breaker.state == "open" and not breaker.allow()
+
+        time.sleep(0.06)
+        assert breaker.state == "half_open"
+        assert breaker.allow() and not breaker.allow()  # one probe at a time
+        breaker.record_failure()
+        assert breaker.state == "open"
+
+        time.sleep(0.06)
+        assert breaker.allow()
+        assert breaker.record_success() is True
+        assert breaker.state == "closed" and breaker.stats()["opened"] == 2
+
+        assert is_outage(httpx.ConnectTimeout("slow")) and is_outage(httpx.HTTPStatusError(
+            "503", request=httpx.Request("GET", "/"), response=httpx.Response(503)
+        ))
+        assert not is_outage(ValueError("unparseable reply")) and not is_outage(KeyError("id"))
+
+    @pytest.mark.asyncio
+    async def test_agent_answers_with_fallback_while_llm_is_down(self, monkeypatch):
+        """An open breaker raises before the model is called; Maria sends the fallback reply"""
+        breaker = CircuitBreaker("openai", failure_threshold=1, reset_timeout=60)
+        breaker.record_failure()
+        scripted = ScriptedChatModel(latency_ms=5000)
+        model = BreakerChatModel(inner=scripted, breaker=breaker)
+        with pytest.raises(CircuitOpenError):
+            await model.ainvoke("hola")
+        with pytest.raises(CircuitOpenError):
+            async for _ in model.astream("hola"):
+                pass
+
+        monkeypatch.setattr(maria_agent, "create_openai_model", lambda **kwargs: model)
+        started = time.perf_counter()
+        result = await maria_agent.maria_node({"messages": [HumanMessage(content="hola")], "lead_score": 2})
+
+        assert time.perf_counter() - started < 1.0
+        assert result["messages"][-1].content == FALLBACK_REPLY
+        assert result["messages"][-1].name == "maria"
+        assert scripted.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_ghl_writes_deferred_and_replayed(self, monkeypatch, tmp_path):
+        """While GHL is down reads fail fast and writes wait; the first success replays them in order"""
+        breaker = CircuitBreaker("ghl", failure_threshold=1, reset_timeout=0.05)
+        monkeypatch.setattr(circuit_breaker, "_breakers", {"ghl": breaker})
+        monkeypatch.setattr(circuit_breaker, "_deferred", DurableJobQueue(str(tmp_path / "deferred.db")))
+        sent, up = [], {"value": False}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if not up["value"]:
+                return httpx.Response(503)
+            sent.append((request.method, request.url.path))
+            return httpx.Response(200, json={"ok": True})
+
+        monkeypatch.setattr(GHLClient, "transport", httpx.MockTransport(handler))
+        client = GHLClient()
+        try:
+            assert await client.api_call("GET", "/contacts/c1") is None
+            assert breaker.state == "open"
+
+            started = time.perf_counter()
+            assert await client.get_contact("c1") is None
+            assert (await client.send_message_chunk("c1", "hola"))["deferred"]
+            assert (await client.update_contact("c1", {"tags": ["x"]}))["deferred"]
+            assert await client.create_appointment({"contactId": "c1"}) is None  # never booked blind later
+            assert time.perf_counter() - started < 0.05
+            assert sent == [] and circuit_breaker.get_deferred_queue().stats()["depth"] == 2
+
+            up["value"] = True
+            time.sleep(0.06)
+            await client.api_call("GET", "/contacts/c1")  # the probe closes it and schedules the replay
+            await GHLClient._replay_task
+        finally:
+            await GHLClient.close_pool()
+
+        assert breaker.state == "closed"
+        assert sent == [("GET", "/contacts/c1"), ("POST", "/conversations/messages"), ("PUT", "/contacts/c1")]
+        assert circuit_breaker.get_deferred_queue().stats()["depth"] == 0
@@ -0,0 +1,37 @@
+"""
+Test cold start - the entry point imports without the agents or LLM clients,
+and the graph compiles once, on first use
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DEFERRED = ["langchain_openai", "langchain_anthropic", "app.agents", "app.tools"]
+
+
+def loaded_after(code: str) -> list:
+    """Deferred modules in sys.modules after running code in a fresh interpreter"""
+    script = f"{code}\nimport sys\nprint(' '.join(m for m in {DEFERRED!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=os.environ.copy(),
+                          capture_output=True, text=True, check=True)
+    return proc.stdout.splitlines()[-1].split()  # app logs go to stdout too
+
+
+class TestColdStart:
+    """Test that importing is cheap and compiling is deferred"""
+
+    def test_entry_point_import_is_lazy(self):
+        """graph.py loads without agents, tools or LLM clients; accessing the graph loads them"""
+        assert loaded_after("import graph") == []
+        assert set(loaded_after("import graph; graph.agent")) >= {"app.agents", "app.tools"}
+
+    def test_workflow_compiles_once(self):
+        """The module attribute, get_workflow() and graph.py share one compiled graph"""
+        import graph
+        from app.workflow import get_workflow, workflow
+
+        assert workflow is get_workflow() is graph.agent
+        assert set(workflow.get_graph().nodes) >= {"receptionist", "smart_router", "responder"}
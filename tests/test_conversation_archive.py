@@ -0,0 +1,76 @@
+"""
+Test the conversation archive - batched persistence, GHL sync epochs and
+time-bounded reads
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.state.conversation_archive import (
+    ArchivedMessage,
+    ConversationArchive,
+    ConversationMeta,
+    SQLiteArchiveBackend,
+    from_ghl,
+)
+
+
+def open_archive(tmp_path, **kwargs) -> ConversationArchive:
+    return ConversationArchive(SQLiteArchiveBackend(str(tmp_path / "conversations.db")), **kwargs)
+
+
+class TestConversationArchive:
+    """Test that recent history comes from memory and survives a restart"""
+
+    @pytest.mark.asyncio
+    async def test_writes_are_batched(self, tmp_path):
+        """A turn's messages are readable at once and written in one flush"""
+        archive = open_archive(tmp_path, flush_interval=0.05)
+        archive.record("v1", "human", "Hola", contact_id="c1")
+        archive.record("v1", "ai", "¡Hola! ¿En qué te ayudo?")
+
+        assert [m.content for m in archive.recent("v1")] == ["Hola", "¡Hola! ¿En qué te ayudo?"]
+        assert archive.stats["flushes"] == 0
+
+        await asyncio.sleep(0.2)
+        assert archive.stats == {**archive.stats, "flushes": 1, "written": 2}
+        await archive.close()
+
+    @pytest.mark.asyncio
+    async def test_survives_restart(self, tmp_path):
+        """A new process reads the history back, unflushed writes included after close"""
+        archive = open_archive(tmp_path, cache_messages=3)
+        for i in range(5):
+            archive.record("v1", "human" if i % 2 == 0 else "ai", f"mensaje {i}", contact_id="c1")
+        await archive.close()
+
+        reopened = open_archive(tmp_path, cache_messages=3)
+        assert [m.content for m in reopened.recent("v1")] == ["mensaje 2", "mensaje 3", "mensaje 4"]
+        assert reopened.recent("v1", limit=1)[0].contact_id == "c1"
+        assert len(reopened.history("v1")) == 5
+
+    def test_ghl_import_starts_fresh_epoch(self, tmp_path):
+        """An import replaces what came before and is trusted for max_age"""
+        archive = open_archive(tmp_path, max_age=60)
+        archive.record("v1", "human", "local only")
+        assert not archive.is_fresh("v1")
+
+        archive.import_history("v1", "c1", from_ghl([
+            {"direction": "outbound", "body": "¿En qué te ayudo?", "dateAdded": "2026-01-01T10:00:05Z"},
+            {"direction": "inbound", "body": "Hola", "dateAdded": "2026-01-01T10:00:00Z"},
+        ]))
+        assert archive.is_fresh("v1")
+        assert [(m.role, m.content) for m in archive.recent("v1")] == [("human", "Hola"), ("ai", "¿En qué te ayudo?")]
+        assert not open_archive(tmp_path, max_age=0).is_fresh("v1")
+
+    def test_history_since(self, tmp_path):
+        """Time-bounded reads only return newer messages of the current epoch"""
+        backend = SQLiteArchiveBackend(str(tmp_path / "conversations.db"))
+        now = time.time()
+        backend.write([
+            ArchivedMessage("v1", "human", f"mensaje {i}", created_at=now - 100 + i * 10) for i in range(10)
+        ], [ConversationMeta("v1", "c1")])
+
+        meta, messages = backend.read("v1", limit=100, since=now - 25)
+        assert [m.content for m in messages] == ["mensaje 8", "mensaje 9"]
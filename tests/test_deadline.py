@@ -0,0 +1,77 @@
+"""
+Test the per-turn deadline - carried in the run config, read back by the
+code running inside the turn, and degrading the turn when it runs low
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.agents import maria_agent
+from app.agents.base_agent import FALLBACK_REPLY
+from app.tools.ghl_client import GHLClient
+from app.utils import circuit_breaker, deadline
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.scripted_model import ScriptedChatModel
+
+
+async def in_turn(func, budget: float):
+    """Run func the way a node runs - inside a runnable whose config carries the deadline"""
+    async def node(_):
+        return await func()
+    return await RunnableLambda(node).ainvoke(None, config=deadline.deadline_config({}, time.time() + budget))
+
+
+class TestTurnDeadline:
+    """Test that one budget bounds the whole turn"""
+
+    @pytest.mark.asyncio
+    async def test_budget_follows_the_run_config(self):
+        """Inside a turn timeouts are capped at what's left; outside there's no deadline"""
+        async def inside():
+            return deadline.remaining(), deadline.timeout(30), deadline.timeout(30, floor=5)
+
+        left, capped, floored = await in_turn(inside, budget=2.0)
+        assert 1.5 < left <= 2.0 and 1.5 < capped <= 2.0 and floored == 5
+        assert deadline.remaining() is None and deadline.timeout(30) == 30
+
+        started = time.perf_counter()
+        with pytest.raises(deadline.TurnDeadlineExceeded):
+            await in_turn(lambda: deadline.bounded(asyncio.sleep(5)), budget=0.1)
+        assert time.perf_counter() - started < 1.0
+
+    @pytest.mark.asyncio
+    async def test_ghl_retries_stop_at_the_deadline(self, monkeypatch):
+        """A failing GHL call gives up when the next retry pause won't fit, instead of 1s + 2s of retries"""
+        monkeypatch.setattr(circuit_breaker, "_breakers", {"ghl": CircuitBreaker("ghl", failure_threshold=0)})
+        attempts = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            attempts.append(request.url.path)
+            return httpx.Response(503)
+
+        monkeypatch.setattr(GHLClient, "transport", httpx.MockTransport(handler))
+        try:
+            started = time.perf_counter()
+            result = await in_turn(lambda: GHLClient().api_call("GET", "/contacts/c1"), budget=0.5)
+        finally:
+            await GHLClient.close_pool()
+
+        assert result is None and len(attempts) == 1
+        assert time.perf_counter() - started < 0.5
+
+    @pytest.mark.asyncio
+    async def test_agent_sends_fallback_when_budget_is_low(self, monkeypatch):
+        """With less than turn_deadline_llm_seconds left Maria doesn't start the LLM"""
+        scripted = ScriptedChatModel()
+        monkeypatch.setattr(maria_agent, "create_openai_model", lambda **kwargs: scripted)
+        state = {"messages": [HumanMessage(content="hola")], "lead_score": 2}
+
+        result = await in_turn(lambda: maria_agent.maria_node(state), budget=1.0)
+        assert result["messages"][-1].content == FALLBACK_REPLY and scripted.calls == 0
+
+        result = await in_turn(lambda: maria_agent.maria_node(state), budget=30.0)
+        assert result["messages"][-1].content != FALLBACK_REPLY and scripted.calls == 1
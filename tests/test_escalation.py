@@ -0,0 +1,117 @@
+"""
+Test escalation routing - escalated turns go straight to the next agent from
+the analysis already in state, and a turn can't bounce between agents forever
+"""
+import pytest
+from langchain_core.messages import HumanMessage
+
+from app.agents import carlos_agent, maria_agent, sofia_agent
+from app.agents.escalation import get_escalation_stats
+from app.config import get_settings
+from app.utils import model_factory
+from app.utils.scripted_model import LLMStandIn, ScriptedChatModel
+from app.workflow import route_from_agent, route_from_smart_router
+
+
+def saved(before, after, name):
+    return after[name] - before[name]
+
+
+class TestEscalation:
+    """Test that escalations don't re-run the router"""
+
+    def test_router_pick_outside_score_range_goes_to_owner(self):
+        """Sofia picked for a 7 would only bounce the turn - Carlos gets it directly"""
+        before = get_escalation_stats().stats()
+        state = {"router_complete": True, "next_agent": "sofia", "lead_score": 7}
+
+        assert route_from_smart_router(state) == "carlos"
+        assert route_from_smart_router({**state, "lead_score": 9}) == "sofia"
+
+        after = get_escalation_stats().stats()
+        assert saved(before, after, "boundary_hops_skipped") == 1
+        assert saved(before, after, "super_steps_saved") == 2
+
+    @pytest.mark.asyncio
+    async def test_score_7_ready_to_book_stays_with_sofia(self, monkeypatch):
+        """The router's booking rule (7 + email + appointment intent) holds through routing and Sofia's range"""
+        from app.agents.smart_router import SmartRouter
+        ready = {"extracted_data": {"email": "ana@example.com"}, "intent": "appointment_interest"}
+        assert SmartRouter._determine_routing(None, 7, ready)["next_agent"] == "sofia"
+        assert SmartRouter._determine_routing(None, 7, {**ready, "intent": "information_provided"})["next_agent"] == "carlos"
+
+        before = get_escalation_stats().stats()
+        state = {"router_complete": True, "next_agent": "sofia", "lead_score": 7, "booking_ready": True}
+        assert route_from_smart_router(state) == "sofia"
+        assert saved(before, get_escalation_stats().stats(), "boundary_hops_skipped") == 0
+
+        scripted = ScriptedChatModel()
+        monkeypatch.setattr(sofia_agent, "create_openai_model", lambda **kwargs: scripted)
+        monkeypatch.setattr(sofia_agent, "get_calendar_availability", lambda: type("Cal", (), {"prefetch": lambda self: None})())
+        kept = await sofia_agent.sofia_node({**state, "messages": [HumanMessage(content="Agendemos")], "routing_attempts": 0})
+        assert not kept.get("needs_escalation") and scripted.calls == 1
+        escalated = await carlos_agent.carlos_node({**state, "messages": [HumanMessage(content="Agendemos")], "routing_attempts": 0})
+        assert escalated["needs_escalation"] and route_from_agent({**state, **escalated}) == "sofia"
+
+    @pytest.mark.asyncio
+    async def test_hot_lead_does_not_loop_back_to_router(self):
+        """The router sends a score of 8+ to Sofia without flagging the turn for escalation"""
+        from app.agents.smart_router import SmartRouter
+
+        model_factory.set_model_override(LLMStandIn())
+        try:
+            router = SmartRouter()
+        finally:
+            model_factory.set_model_override(None)
+        state = {
+            "messages": [HumanMessage(content="Quiero agendar una cita")],
+            "webhook_data": {"body": "Quiero agendar una cita"},
+            "contact_id": "c1",
+            "lead_score": 6,
+        }
+        result = await router.analyze_and_route(state)
+
+        assert result["lead_score"] >= 8 and result["next_agent"] == "sofia"
+        assert result["needs_escalation"] is False
+        assert route_from_agent({**state, **result}) == "responder"
+
+    @pytest.mark.asyncio
+    async def test_escalation_goes_straight_to_next_agent(self):
+        """Carlos escalating a 9 with an email hands the turn to Sofia, no router pass"""
+        before = get_escalation_stats().stats()
+        state = {
+            "messages": [HumanMessage(content="Mi email es ana@example.com, quiero la cita")],
+            "lead_score": 9,
+            "extracted_data": {"email": "ana@example.com"},
+            "current_agent": "carlos",
+            "routing_attempts": 0,
+        }
+        update = await carlos_agent.carlos_node(state)
+
+        assert update["needs_escalation"] and update["escalation_reason"] == "needs_appointment"
+        assert route_from_agent({**state, **update}) == "sofia"
+        assert route_from_agent({**state, "needs_escalation": False}) == "responder"
+
+        after = get_escalation_stats().stats()
+        assert saved(before, after, "rerouted") == 1
+        assert saved(before, after, "router_llm_calls_saved") == 1
+
+    @pytest.mark.asyncio
+    async def test_escalation_loop_is_capped(self, monkeypatch):
+        """Out of hops, an out-of-range agent answers; past the cap the turn ends at the responder"""
+        hops = get_settings().max_escalation_hops
+        scripted = ScriptedChatModel()
+        monkeypatch.setattr(maria_agent, "create_openai_model", lambda **kwargs: scripted)
+        state = {"messages": [HumanMessage(content="hola")], "lead_score": 9, "current_agent": "carlos"}
+
+        escalated = await maria_agent.maria_node({**state, "routing_attempts": 0})
+        assert escalated["needs_escalation"] and escalated["routing_attempts"] == 1 and scripted.calls == 0
+
+        answered = await maria_agent.maria_node({**state, "routing_attempts": hops})
+        assert answered["needs_escalation"] is False and scripted.calls == 1
+
+        before = get_escalation_stats().stats()
+        looping = {**state, "needs_escalation": True, "current_agent": "sofia", "escalation_reason": "error"}
+        assert route_from_agent({**looping, "routing_attempts": hops + 1}) == "responder"
+        assert route_from_agent({**looping, "routing_attempts": 1}) == "responder"  # sofia owns a 9 already
+        assert saved(before, get_escalation_stats().stats(), "loops_capped") == 2
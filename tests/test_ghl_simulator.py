@@ -0,0 +1,80 @@
+"""
+Test the GHL simulator - GHLClient against the in-process transport,
+fault injection and latency models
+"""
+import random
+
+import pytest
+
+from app.tools.ghl_client import GHLClient
+from benchmarks.ghl_simulator import FaultConfig, GHLSimulator, LatencyModel
+
+
+@pytest.fixture
+def simulator():
+    sim = GHLSimulator(seed=1)
+    GHLClient.transport = sim.transport()
+    yield sim
+    GHLClient.transport = None
+
+
+class TestGHLSimulator:
+    """Test that GHLClient can run offline against the simulator"""
+
+    @pytest.mark.asyncio
+    async def test_ghl_client_uses_transport(self, simulator):
+        """Every GHLClient request goes through the class-level transport"""
+        simulator.record_inbound({"contactId": "c1", "conversationId": "conv1", "body": "Hola",
+                                  "contact": {"firstName": "Ana"}})
+        client = GHLClient()
+
+        contact = await client.get_contact("c1")
+        messages = await client.get_conversation_messages("conv1")
+        sent = await client.send_message("c1", "¡Hola Ana!")
+
+        assert contact["firstName"] == "Ana"
+        assert [m["body"] for m in messages] == ["Hola"]
+        assert sent["conversationId"] == "conv1"
+        assert simulator.calls == {
+            "GET /contacts/{id}": 1,
+            "GET /conversations/{id}/messages": 1,
+            "POST /conversations/messages": 1,
+        }
+
+    @pytest.mark.asyncio
+    async def test_booked_slot_leaves_availability(self, simulator):
+        """A booked slot is no longer offered and can't be booked twice"""
+        client = GHLClient()
+        slots = await client.check_calendar_availability()
+        first = slots[0]["startTime"]
+        appointment = {"contactId": "c1", "startTime": first.isoformat(), "endTime": slots[0]["endTime"].isoformat()}
+
+        booked = await client.create_appointment(appointment)
+        again = await client.create_appointment(appointment)
+        remaining = await client.check_calendar_availability()
+
+        assert booked["contactId"] == "c1"
+        assert again is None
+        assert first not in [slot["startTime"] for slot in remaining]
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_honours_retry_after(self, simulator):
+        """429 responses carry Retry-After and GHLClient retries on them"""
+        simulator.faults = FaultConfig(rate_429=1.0, retry_after=0)
+
+        contact = await GHLClient().get_contact("c1")
+
+        assert contact is None
+        assert simulator.calls["GET /contacts/{id}"] == 3
+        assert simulator.injected[429] == 3
+
+    def test_latency_models(self):
+        """Latency specs parse to distributions sampled in seconds"""
+        rng = random.Random(3)
+
+        assert LatencyModel.parse(None).sample(rng) == 0.0
+        assert LatencyModel.parse(40).sample(rng) == pytest.approx(0.04)
+        assert 0.02 <= LatencyModel.parse("uniform:20,80").sample(rng) <= 0.08
+        assert LatencyModel.parse("lognormal:60,0.5").sample(rng) > 0
+        with pytest.raises(ValueError):
+            LatencyModel.parse("pareto:1")
@@ -0,0 +1,92 @@
+"""
+Test hedged LLM requests - a slow call is raced by a second one, the loser is
+cancelled and the budget caps how many hedges are sent
+"""
+import asyncio
+from typing import Any, List
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.utils import model_factory
+from app.utils.hedging import HedgedChatModel, Hedger
+from app.utils.model_tiers import TieredChatModel
+from app.utils.scripted_model import LLMStandIn
+
+
+class SequencedModel(BaseChatModel):
+    """Answers after the next latency of its list; remembers cancelled calls"""
+
+    latencies_ms: List[float]
+    calls: int = 0
+    cancelled: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "sequenced"
+
+    def _generate(self, *args: Any, **kwargs: Any) -> ChatResult:
+        raise NotImplementedError
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        latency = self.latencies_ms[min(self.calls, len(self.latencies_ms) - 1)]
+        self.calls += 1
+        try:
+            await asyncio.sleep(latency / 1000)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"after {latency:.0f}ms"))])
+
+
+async def warm(model: HedgedChatModel, calls: int) -> None:
+    for _ in range(calls):
+        await model.ainvoke([HumanMessage(content="hola")])
+
+
+class TestHedging:
+    """Test that slow calls are hedged within the budget"""
+
+    @pytest.mark.asyncio
+    async def test_slow_call_is_hedged_and_loser_cancelled(self):
+        """Past the p90 of the key a second request goes out and the faster answer wins"""
+        inner = SequencedModel(latencies_ms=[5] * 10 + [500, 5])
+        hedger = Hedger(min_samples=10, min_delay_ms=20, budget=1.0)
+        model = HedgedChatModel(inner=inner, key="router:gpt-4o-mini", hedger=hedger)
+        await warm(model, 10)
+
+        reply = await model.ainvoke([HumanMessage(content="hola")])
+        await asyncio.sleep(0)
+
+        assert reply.content == "after 5ms"
+        assert inner.calls == 12 and inner.cancelled == 1
+        assert hedger.stats()["hedged"] == 1 and hedger.stats()["hedge_won"] == 1
+
+    @pytest.mark.asyncio
+    async def test_budget_caps_hedges(self):
+        """With the budget spent, slow calls just wait for their answer"""
+        inner = SequencedModel(latencies_ms=[5] * 10 + [60])
+        hedger = Hedger(min_samples=10, min_delay_ms=20, budget=0.0)
+        hedger._tokens = 0.0
+        model = HedgedChatModel(inner=inner, key="maria:gpt-4-turbo", hedger=hedger)
+        await warm(model, 10)
+
+        reply = await model.ainvoke([HumanMessage(content="hola")])
+        assert reply.content == "after 60ms"
+        assert hedger.stats()["hedged"] == 0 and hedger.stats()["over_budget"] == 1
+
+    def test_factory_hedges_each_tier(self, monkeypatch):
+        """Opt-in: every tier of a task is wrapped, keyed by task and model"""
+        from app.config import get_settings
+        monkeypatch.setattr(get_settings(), "llm_hedging_enabled", True)
+        model_factory.set_model_override(LLMStandIn())
+        try:
+            model = model_factory.create_openai_model(task="sofia")
+        finally:
+            model_factory.set_model_override(None)
+
+        assert isinstance(model, TieredChatModel)
+        assert all(isinstance(tier, HedgedChatModel) for tier in model.tiers)
+        assert model.tiers[-1].key == "sofia:gpt-4o-mini"
@@ -0,0 +1,136 @@
+"""
+Test the durable webhook job queue - ordering, retries, crash recovery and the worker pool
+"""
+import asyncio
+import os
+
+import pytest
+
+from app.utils.job_queue import DurableJobQueue, JobWorkerPool
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = DurableJobQueue(str(tmp_path / "jobs.db"), max_attempts=2, backoff=0.0)
+    yield queue
+    queue.close()
+
+
+class TestJobQueue:
+    """Test that acknowledged webhooks are processed exactly once, in conversation order"""
+
+    def test_conversation_order(self, queue):
+        """A conversation's next job waits for the previous one; other conversations don't"""
+        first = queue.enqueue({"body": "Hola"}, ordering_key="conv1")
+        queue.enqueue({"body": "¿Sigues ahí?"}, ordering_key="conv1")
+        other = queue.enqueue({"body": "Hola"}, ordering_key="conv2")
+
+        assert queue.claim().id == first
+        assert queue.claim().id == other
+        assert queue.claim() is None
+        assert queue.stats()["depth"] == 1
+        assert queue.stats()["in_flight"] == 2
+
+    def test_retry_then_dead(self, queue):
+        """Failed jobs are retried until max_attempts, then kept as dead"""
+        queue.enqueue({"body": "Hola"}, ordering_key="conv1")
+
+        job = queue.claim()
+        assert queue.fail(job, "LangGraph down")
+        job = queue.claim()
+        assert job.attempts == 2
+        assert not queue.fail(job, "LangGraph down")
+
+        assert queue.claim() is None
+        assert queue.stats()["dead"] == 1
+        assert queue.dead_jobs()[0]["last_error"] == "LangGraph down"
+
+    def test_survives_crash(self, tmp_path):
+        """Jobs claimed by a process that died are requeued when the queue is reopened"""
+        path = str(tmp_path / "jobs.db")
+        crashed = DurableJobQueue(path)
+        crashed.owner = "999999999"  # a pid that doesn't exist
+        job_id = crashed.enqueue({"body": "Hola"}, ordering_key="conv1")
+        crashed.claim()
+        crashed.close()
+
+        restarted = DurableJobQueue(path)
+        assert restarted.claim() is None
+        assert restarted.recover() == 1
+        job = restarted.claim()
+        assert job.id == job_id
+        assert job.payload == {"body": "Hola"}
+
+        # A container restart often hands out the same pid again - the boot token tells them apart
+        restarted.owner = f"{os.getpid()}:previous-boot"
+        restarted.enqueue({"body": "Hola"}, ordering_key="conv2")
+        restarted.claim()
+        rebooted = DurableJobQueue(path)
+        assert rebooted.recover() == 1  # conv2 only - conv1 is still ours
+        rebooted.close()
+        restarted.close()
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_takeover(self, tmp_path):
+        """A running handler keeps its lease; once it's lost, the stale worker can't undo the new claim"""
+        path = str(tmp_path / "jobs.db")
+        slow = DurableJobQueue(path, lease_seconds=0.06)
+        other = DurableJobQueue(path, lease_seconds=0.06)
+        other.owner = "other-worker"
+        claims = []
+
+        async def handler(job):
+            for _ in range(5):
+                await asyncio.sleep(0.03)
+                claims.append(other.claim())
+
+        pool = JobWorkerPool(slow, handler, workers=1, poll_interval=0.01)
+        await pool.start()
+        slow.enqueue({"body": "Hola"}, ordering_key="conv1")
+        pool.notify()
+        for _ in range(100):
+            if pool.processed:
+                break
+            await asyncio.sleep(0.01)
+        await pool.stop()
+        assert claims == [None] * 5 and pool.processed == 1  # 0.15s handler, renewed 0.06s lease
+
+        slow.enqueue({"body": "¿Sigues ahí?"}, ordering_key="conv1")
+        stale = slow.claim()
+        await asyncio.sleep(0.07)
+        taken = other.claim()
+        assert taken.id == stale.id and taken.attempts == 2
+        assert not slow.renew(stale) and not slow.complete(stale)
+        assert slow.fail(stale, "late") and slow.stats()["in_flight"] == 1
+        assert other.complete(taken) and other.stats()["in_flight"] == 0
+        slow.close()
+        other.close()
+
+    @pytest.mark.asyncio
+    async def test_worker_pool_drains(self, queue):
+        """The pool processes everything in order and retries a failure"""
+        handled = []
+        failures = {"left": 1}
+
+        async def handler(job):
+            if job.payload["n"] == 0 and failures["left"]:
+                failures["left"] -= 1
+                raise RuntimeError("timeout")
+            handled.append((job.ordering_key, job.payload["n"]))
+
+        pool = JobWorkerPool(queue, handler, workers=3, poll_interval=0.01)
+        await pool.start()
+        for n in range(3):
+            queue.enqueue({"n": n}, ordering_key="conv1")
+            queue.enqueue({"n": n}, ordering_key="conv2")
+        pool.notify()
+        for _ in range(200):
+            if pool.processed == 6:
+                break
+            await asyncio.sleep(0.01)
+        await pool.stop()
+
+        assert [n for key, n in handled if key == "conv1"] == [0, 1, 2]
+        assert [n for key, n in handled if key == "conv2"] == [0, 1, 2]
+        assert pool.stats()["depth"] == 0
+        assert pool.stats()["failed_attempts"] == 1
@@ -0,0 +1,34 @@
+"""
+Test the load generator - lead scripts and saturation detection
+"""
+import random
+
+from benchmarks.loadgen import SCRIPT, Lead, saturation_point
+
+
+def level(concurrency, throughput, p50):
+    return {"concurrency": concurrency, "throughput_msgs_per_sec": throughput, "latency_ms": {"p50": p50}}
+
+
+class TestLoadgen:
+    """Test synthetic conversations and the latency-vs-concurrency analysis"""
+
+    def test_lead_walks_the_funnel_in_bursts(self):
+        """Every stage is sent once, in order, grouped into bursts of at most three"""
+        lead = Lead(random.Random(5), burst_prob=0.5)
+        turns = lead.turns()
+
+        assert [m for burst in turns for m in burst] == lead.messages
+        assert len(lead.messages) == len(SCRIPT)
+        assert all(1 <= len(burst) <= 3 for burst in turns)
+        assert lead.messages[-1] in SCRIPT[-1]
+
+    def test_saturation_point(self):
+        """Saturation is where throughput stalls or median latency jumps"""
+        stalls = [level(1, 10, 20), level(2, 19, 22), level(4, 20, 40)]
+        queues = [level(1, 10, 20), level(2, 19, 22), level(4, 30, 60)]
+        scales = [level(1, 10, 20), level(2, 19, 22), level(4, 35, 30)]
+
+        assert saturation_point(stalls, 0.10, 2.0) == 4
+        assert saturation_point(queues, 0.10, 2.0) == 4
+        assert saturation_point(scales, 0.10, 2.0) is None
@@ -0,0 +1,134 @@
+"""
+Test Message Channel - append-only messages channel and its checkpoints
+"""
+from typing import Annotated, List, TypedDict
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, StateGraph
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from app.state.message_channel import CHUNK_SIZE, AppendOnlyMessages
+from app.state.message_record import MessageRecord, compact_messages, expand_messages
+
+
+class ChannelState(TypedDict):
+    messages: Annotated[List[BaseMessage], AppendOnlyMessages]
+
+
+class TestAppendOnlyMessages:
+    """Test channel semantics directly"""
+    
+    def test_accepts_lists_and_single_messages(self):
+        channel = AppendOnlyMessages(list)
+        channel.update([[HumanMessage(content="Hola")], AIMessage(content="Hi"), None])
+        
+        assert [m.content for m in channel.get()] == ["Hola", "Hi"]
+        assert isinstance(channel.get(), list)
+    
+    def test_checkpoint_is_isolated_from_later_appends(self):
+        channel = AppendOnlyMessages(list)
+        channel.update([[HumanMessage(content=str(i)) for i in range(CHUNK_SIZE + 3)]])
+        snapshot = channel.checkpoint()
+        
+        channel.update([AIMessage(content="later")])
+        restored = channel.from_checkpoint(snapshot)
+        
+        assert len(restored.get()) == CHUNK_SIZE + 3
+        assert len(channel.get()) == CHUNK_SIZE + 4
+        # Full chunks are reused across snapshots instead of being copied
+        assert channel.checkpoint()["chunks"][0] is snapshot["chunks"][0]
+    
+    def test_copy_on_write(self):
+        channel = AppendOnlyMessages(list)
+        channel.update([[HumanMessage(content="Hola")]])
+        twin = channel.copy()
+        
+        twin.update([AIMessage(content="twin only")])
+        
+        assert len(channel.get()) == 1
+        assert len(twin.get()) == 2
+    
+    def test_restores_legacy_list_checkpoint(self):
+        restored = AppendOnlyMessages(list).from_checkpoint([HumanMessage(content="old")])
+        assert [m.content for m in restored.get()] == ["old"]
+
+
+class TestMessageRecord:
+    """Test compact records used in checkpoints"""
+    
+    def test_round_trip_keeps_routing_fields(self):
+        ai = AIMessage(
+            content="Hola!",
+            name="maria",
+            id="msg-1",
+            additional_kwargs={"source": "ghl_api", "refusal": None},
+            response_metadata={"model_name": "gpt-4-turbo", "token_usage": {"total_tokens": 42}},
+            tool_calls=[{"name": "escalate_to_router", "args": {"reason": "x"}, "id": "call_1"}],
+        )
+        
+        restored = expand_messages(compact_messages([ai]))[0]
+        
+        assert isinstance(restored, AIMessage)
+        assert (restored.content, restored.name, restored.id) == ("Hola!", "maria", "msg-1")
+        assert restored.tool_calls[0]["id"] == "call_1"
+        assert restored.response_metadata["model_name"] == "gpt-4-turbo"
+
+        broken = AIMessage(content="", invalid_tool_calls=[
+            {"name": "book_appointment", "args": "{bad json", "id": "call_2", "error": "parse"}
+        ])
+        failed = ToolMessage(content="GHL down", tool_call_id="call_1", status="error", artifact={"http": 503})
+        broken, failed = expand_messages(compact_messages([broken, failed], strip_metadata=True))
+        assert broken.invalid_tool_calls[0]["args"] == "{bad json"
+        assert (failed.status, failed.artifact) == ("error", {"http": 503})
+    
+    def test_strip_metadata_keeps_app_kwargs(self):
+        ai = AIMessage(
+            content="Hola!",
+            additional_kwargs={"source": "ghl_api", "refusal": None},
+            response_metadata={"model_name": "gpt-4-turbo"},
+        )
+        
+        restored = MessageRecord.from_message(ai, strip_metadata=True).to_message()
+        
+        assert restored.additional_kwargs == {"source": "ghl_api"}
+        assert restored.response_metadata == {}
+    
+    def test_roles_and_names_are_interned(self):
+        first = MessageRecord.from_message(AIMessage(content="a", name="".join(["ma", "ria"])))
+        second = MessageRecord.from_message(AIMessage(content="b", name="".join(["mar", "ia"])))
+        assert first.name is second.name
+    
+    def test_checkpoint_survives_serializer(self):
+        channel = AppendOnlyMessages(list)
+        channel.update([[HumanMessage(content=str(i), additional_kwargs={"source": "webhook"}) for i in range(CHUNK_SIZE + 2)]])
+        serde = JsonPlusSerializer()
+        
+        restored = channel.from_checkpoint(serde.loads_typed(serde.dumps_typed(channel.checkpoint())))
+        
+        assert [m.content for m in restored.get()] == [m.content for m in channel.get()]
+        assert restored.get()[0].additional_kwargs == {"source": "webhook"}
+
+
+class TestChannelInGraph:
+    """Test the channel through a checkpointed graph"""
+    
+    def test_history_accumulates_across_turns(self):
+        def agent(state):
+            return {"messages": [AIMessage(content=f"reply {len(state['messages'])}")]}
+        
+        builder = StateGraph(ChannelState)
+        builder.add_node("agent", agent)
+        builder.set_entry_point("agent")
+        builder.add_edge("agent", END)
+        graph = builder.compile(checkpointer=MemorySaver())
+        config = {"configurable": {"thread_id": "channel-test"}}
+        
+        for i in range(40):
+            result = graph.invoke({"messages": [HumanMessage(content=f"msg {i}")]}, config)
+        
+        assert len(result["messages"]) == 80
+        assert result["messages"][-1].content == "reply 79"
+        history = list(graph.get_state_history(config))
+        assert len(history[2].values["messages"]) == 78
@@ -1,11 +1,21 @@
 """
 Test Message Duplication - Integration tests to prevent message duplication
 """
+import logging
+import logging.handlers
+
 import pytest
 from typing import Dict, Any, List
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 from app.state.message_manager import MessageManager
-from app.utils.debug_helpers import validate_state, analyze_message_accumulation
+from app.utils.debug_helpers import (
+    validate_state,
+    analyze_message_accumulation,
+    configure_debug_logging,
+    debug_log,
+    set_instrumentation_mode,
+    should_instrument,
+)
 
 
 class TestMessageManager:
@@ -122,6 +132,35 @@ class TestStateValidation:
         assert any("missing type/role" in issue for issue in result["issues"])
 
 
+class TestInstrumentationMode:
+    """Test per-turn debug instrumentation gating"""
+    
+    def teardown_method(self):
+        set_instrumentation_mode(None)
+    
+    def test_full_and_off_modes(self):
+        """Full always instruments, off never does"""
+        set_instrumentation_mode("full")
+        assert all(should_instrument() for _ in range(50))
+        
+        set_instrumentation_mode("off")
+        assert not any(should_instrument() for _ in range(50))
+    
+    def test_unknown_mode_rejected(self):
+        """Invalid modes fail loudly instead of silently disabling checks"""
+        with pytest.raises(ValueError):
+            set_instrumentation_mode("verbose")
+    
+    def test_dumps_logged_whatever_the_root_level(self, monkeypatch):
+        """Once configured, state dumps go to the queue listener even with the root logger at WARNING"""
+        monkeypatch.setattr(logging.getLogger(), "level", logging.WARNING)
+        listener = configure_debug_logging()
+        
+        assert configure_debug_logging() is listener
+        assert debug_log.isEnabledFor(logging.INFO) and not debug_log.propagate
+        assert any(isinstance(h, logging.handlers.QueueHandler) for h in debug_log.handlers)
+
+
 class TestMessageAccumulation:
     """Test message accumulation analysis"""
     
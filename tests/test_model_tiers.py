@@ -0,0 +1,90 @@
+"""
+Test latency-tiered model selection - p95 fallback, retry after cooldown and
+per-task profiles through the model factory
+"""
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from app.utils import model_factory
+from app.utils.model_tiers import TaskProfile, TieredChatModel, TierSelector, load_profiles
+from app.utils.scripted_model import LLMStandIn, ScriptedChatModel
+
+PROFILE = TaskProfile(task="maria", models=["slow-model", "fast-model"], budget_ms=20)
+
+
+def tiered(selector: TierSelector) -> TieredChatModel:
+    return TieredChatModel(profile=PROFILE, selector=selector, tiers=[
+        ScriptedChatModel(latency_ms=40), ScriptedChatModel(latency_ms=1)
+    ])
+
+
+class TestModelTiers:
+    """Test that a task falls back to a faster model when its p95 is over budget"""
+
+    @pytest.mark.asyncio
+    async def test_falls_back_when_p95_over_budget(self):
+        """After min_samples slow calls the task moves to the next tier, and replies say which tier served them"""
+        selector = TierSelector(min_samples=5, cooldown=60)
+        model = tiered(selector)
+
+        replies = [await model.ainvoke([HumanMessage(content="hola")]) for _ in range(8)]
+        tiers = [reply.response_metadata["model_tier"]["model"] for reply in replies]
+
+        assert tiers == ["slow-model"] * 5 + ["fast-model"] * 3
+        assert selector.fallbacks == 1
+        assert selector.stats()["maria:slow-model"]["demoted_for_s"] > 0
+        assert replies[-1].response_metadata["model_tier"]["latency_ms"] < PROFILE.budget_ms
+
+    @pytest.mark.asyncio
+    async def test_retries_preferred_model_after_cooldown(self):
+        """A demoted model gets a fresh window once the cooldown is over"""
+        selector = TierSelector(min_samples=2, cooldown=0.05)
+        model = tiered(selector)
+        for _ in range(3):
+            await model.ainvoke([HumanMessage(content="hola")])
+        assert selector.choose(PROFILE) == 1
+
+        time.sleep(0.06)
+        assert selector.choose(PROFILE) == 0
+        assert selector.stats()["maria:slow-model"]["p95_ms"] is None
+
+    @pytest.mark.asyncio
+    async def test_failed_calls_count_against_the_tier(self):
+        """Timeouts are recorded as over budget, streamed or not, so a failing model gets demoted too"""
+
+        class TimingOut(ScriptedChatModel):
+            async def _agenerate(self, *args, **kwargs):
+                raise TimeoutError("deadline")
+
+        selector = TierSelector(min_samples=4, cooldown=60)
+        model = TieredChatModel(profile=PROFILE, selector=selector, tiers=[TimingOut(), ScriptedChatModel()])
+        for _ in range(2):
+            with pytest.raises(TimeoutError):
+                await model.ainvoke([HumanMessage(content="hola")])
+            with pytest.raises(TimeoutError):
+                [chunk async for chunk in model.astream([HumanMessage(content="hola")])]
+
+        assert selector.fallbacks == 1
+        assert selector.stats()["maria:slow-model"]["p95_ms"] >= 2 * PROFILE.budget_ms
+        reply = await model.ainvoke([HumanMessage(content="hola")])
+        assert reply.response_metadata["model_tier"]["model"] == "fast-model"
+
+    def test_task_profiles_from_settings(self):
+        """Router gets its own small model and token cap; bound tools keep the tiers"""
+        profiles = load_profiles("gpt-4-turbo", '{"router": {"budget_ms": 800}, "sofia": {"models": ["gpt-4o", null]}}')
+        assert profiles["router"].models == ["gpt-4o-mini"] and profiles["router"].budget_ms == 800
+        assert profiles["maria"].models == ["gpt-4-turbo", "gpt-4o-mini"]
+        assert profiles["sofia"].models == ["gpt-4o", "gpt-4-turbo"]
+
+        stand_in = LLMStandIn()
+        model_factory.set_model_override(stand_in)
+        try:
+            model = model_factory.create_openai_model(temperature=0.3, task="carlos")
+            plain = model_factory.create_openai_model(temperature=0.3)
+        finally:
+            model_factory.set_model_override(None)
+        assert isinstance(model, TieredChatModel) and len(model.tiers) == 2
+        assert isinstance(model.bind_tools([]), TieredChatModel)
+        assert isinstance(plain, ScriptedChatModel)
@@ -0,0 +1,125 @@
+"""
+Test the outbound send queue - per-contact order, cross-contact parallelism,
+idempotent retries and dead letters
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.tools.ghl_client import GHLClient
+from app.utils import circuit_breaker
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.outbound_queue import DeadLetterStore, OutboundDispatcher, send_via_ghl
+
+LONG_REPLY = ". ".join(f"Frase número {i} con bastante texto para llenar el mensaje" for i in range(12))
+
+
+class RecordingSender:
+    """Fake GHL: records deliveries, optionally slow or failing"""
+
+    def __init__(self, delay: float = 0.0, fail_times: int = 0):
+        self.delay = delay
+        self.fail_times = fail_times
+        self.delivered = []
+        self.attempts = 0
+        self.active = 0
+        self.peak = 0
+
+    async def __call__(self, message):
+        self.attempts += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail_times:
+                self.fail_times -= 1
+                return None
+            self.delivered.append((message.contact_id, message.body))
+            return {"messageId": message.key}
+        finally:
+            self.active -= 1
+
+
+def dispatcher(send, **kwargs) -> OutboundDispatcher:
+    options = dict(max_attempts=3, backoff=0.0, max_concurrency=10, dead_letters=DeadLetterStore())
+    options.update(kwargs)
+    return OutboundDispatcher(send=send, **options)
+
+
+class TestOutboundQueue:
+    """Test background delivery of agent replies"""
+
+    @pytest.mark.asyncio
+    async def test_order_per_contact_parallel_across_contacts(self):
+        """Chunks keep their order within a contact while contacts send concurrently"""
+        sender = RecordingSender(delay=0.01)
+        outbound = dispatcher(sender)
+
+        parts = outbound.enqueue("c1", LONG_REPLY)
+        outbound.enqueue("c1", "¿Te parece bien?")
+        for i in range(2, 6):
+            outbound.enqueue(f"c{i}", "Hola")
+        assert await outbound.drain(timeout=5)
+
+        c1 = [body for contact, body in sender.delivered if contact == "c1"]
+        assert len(parts) > 1
+        assert c1 == [part.body for part in parts] + ["¿Te parece bien?"]
+        assert sender.peak > 1
+        assert outbound.stats()["messages_pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_retry_keeps_idempotency_key(self):
+        """A failed send is retried; re-enqueueing the same turn doesn't send again, repeating a text does"""
+        sender = RecordingSender(fail_times=2)
+        outbound = dispatcher(sender)
+
+        first = outbound.enqueue("c1", "Hola Ana", turn_id="t1")
+        await outbound.drain("c1", timeout=5)
+        again = outbound.enqueue("c1", "Hola Ana", turn_id="t1")
+
+        assert sender.delivered == [("c1", "Hola Ana")]
+        assert sender.attempts == 3
+        assert first[0].attempts == 3
+        assert again == []
+        assert outbound.stats()["duplicates_skipped"] == 1
+
+        # Without a turn_id the same text is a new reply, not a duplicate
+        assert outbound.enqueue("c1", "¡Perfecto!") and outbound.enqueue("c1", "¡Perfecto!")
+        await outbound.drain("c1", timeout=5)
+        assert sender.delivered[-2:] == [("c1", "¡Perfecto!")] * 2
+
+    @pytest.mark.asyncio
+    async def test_ghl_sends_retried_by_dispatcher_only(self, monkeypatch):
+        """The GHL sender makes one attempt per try - no client retries nested in the dispatcher's"""
+        monkeypatch.setattr(circuit_breaker, "_breakers", {"ghl": CircuitBreaker("ghl", failure_threshold=0)})
+        posts = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            posts.append(request.url.path)
+            return httpx.Response(503)
+
+        monkeypatch.setattr(GHLClient, "transport", httpx.MockTransport(handler))
+        outbound = dispatcher(send_via_ghl, max_attempts=2)
+        try:
+            outbound.enqueue("c1", "Hola Ana", turn_id="t1")
+            await outbound.drain(timeout=5)
+        finally:
+            await GHLClient.close_pool()
+
+        assert posts == ["/conversations/messages"] * 2
+        assert len(outbound.dead_letters) == 1
+
+    @pytest.mark.asyncio
+    async def test_dead_letter_drops_rest_of_reply(self):
+        """After max attempts the part and the rest of its reply are dead-lettered; the next reply still goes"""
+        sender = RecordingSender(fail_times=2)
+        outbound = dispatcher(sender, max_attempts=2)
+
+        parts = outbound.enqueue("c1", LONG_REPLY, turn_id="t1")
+        outbound.enqueue("c1", "Seguimos mañana", turn_id="t2")
+        await outbound.drain(timeout=5)
+
+        assert len(outbound.dead_letters) == len(parts)
+        assert outbound.dead_letters.entries[0]["key"] == parts[0].key
+        assert sender.delivered == [("c1", "Seguimos mañana")]
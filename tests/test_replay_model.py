@@ -0,0 +1,65 @@
+"""
+Test the record/replay chat model - cassette round trip, prompt keys and misses
+"""
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.tools import tool
+
+from app.utils.replay_model import Cassette, ReplayChatModel, prompt_key
+
+
+@tool
+def book_appointment(start_time: str) -> str:
+    """Book a demo"""
+    return "booked"
+
+
+PROMPT = [SystemMessage(content="Eres Sofia"), HumanMessage(content="El martes a las 10")]
+
+
+class TestReplayModel:
+    """Test deterministic LLM responses from a cassette"""
+
+    @pytest.mark.asyncio
+    async def test_record_then_replay_with_tool_calls(self, tmp_path):
+        """A recorded response, tool calls included, is served back without the real model"""
+        path = str(tmp_path / "cassette.jsonl")
+        recorded = AIMessage(
+            content="",
+            tool_calls=[{"name": "book_appointment", "args": {"start_time": "10:00"}, "id": "call_abc"}],
+        )
+        live = GenericFakeChatModel(messages=iter([recorded]))
+        recorder = ReplayChatModel(cassette=Cassette(path), inner=live, record=True, tool_names=["book_appointment"])
+        await recorder.ainvoke(PROMPT)
+
+        player = ReplayChatModel(cassette=Cassette(path)).bind_tools([book_appointment])
+        reply = await player.ainvoke(PROMPT)
+
+        assert reply.tool_calls[0]["name"] == "book_appointment"
+        assert reply.tool_calls[0]["args"] == {"start_time": "10:00"}
+        assert reply.tool_calls[0]["id"] == "call_abc"
+        assert player.cassette.hits == 1
+
+    def test_key_ignores_ids_but_not_tools(self):
+        """Random message ids don't change the key; bound tools do"""
+        with_ids = [SystemMessage(content="Eres Sofia", id="a"), HumanMessage(content="El martes a las 10", id="b")]
+
+        assert prompt_key(PROMPT) == prompt_key(with_ids)
+        assert prompt_key(PROMPT) != prompt_key(PROMPT, ["book_appointment"])
+        assert prompt_key(PROMPT) != prompt_key(PROMPT[:1])
+
+    def test_miss_without_inner_raises(self, tmp_path):
+        """Replay never silently goes to the network"""
+        model = ReplayChatModel(cassette=Cassette(str(tmp_path / "empty.jsonl")))
+
+        with pytest.raises(LookupError, match="LLM_BACKEND=record"):
+            model.invoke(PROMPT)
+        assert model.cassette.misses == 1
+
+    def test_synthetic_latency(self, tmp_path):
+        """Delay is time to first token plus output tokens at the configured rate"""
+        model = ReplayChatModel(cassette=Cassette(str(tmp_path / "c.jsonl")), latency_ms=200, tokens_per_sec=50)
+        reply = AIMessage(content="hola", usage_metadata={"input_tokens": 10, "output_tokens": 25, "total_tokens": 35})
+
+        assert model._delay(reply) == pytest.approx(0.7)
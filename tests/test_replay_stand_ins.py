@@ -0,0 +1,24 @@
+"""
+Test the replay benchmark LLM hook - model factory override
+"""
+from app.utils import model_factory
+from app.utils.scripted_model import LLMStandIn
+
+
+class TestReplayStandIns:
+    """Test that LLM calls can be served locally"""
+
+    def test_model_override(self):
+        """create_openai_model returns the override's model while one is set"""
+        llm = LLMStandIn(max_score=7)
+        model_factory.set_model_override(llm)
+        try:
+            model = model_factory.create_openai_model(temperature=0.3)
+        finally:
+            model_factory.set_model_override(None)
+
+        reply = model.invoke("Analyze this message for lead qualification.\nCurrent message: quiero agendar una cita")
+
+        assert model.bind_tools([]) is model
+        assert '"lead_score": 7' in reply.content
+        assert llm.total_calls == 1
@@ -0,0 +1,119 @@
+"""
+Test conversation sharding - ring balance, minimal movement and sticky routing
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.utils.sharding import HashRing, ShardSupervisor, create_router_app, shard_key
+
+KEYS = [f"conv-{i}" for i in range(5000)]
+
+
+def owners(ring: HashRing) -> dict:
+    return {key: ring.node_for(key) for key in KEYS}
+
+
+class TestSharding:
+    """Test that conversations stay on one worker and rebalancing moves few of them"""
+
+    def test_ring_balance(self):
+        """Each worker owns a fair share of conversations"""
+        ring = HashRing([f"worker-{i}" for i in range(4)])
+        counts = {}
+        for node in owners(ring).values():
+            counts[node] = counts.get(node, 0) + 1
+
+        assert len(counts) == 4
+        assert max(counts.values()) < 1.3 * len(KEYS) / 4
+
+    def test_minimal_movement(self):
+        """Adding a worker moves ~1/N conversations, all to the new worker; removing it restores the rest"""
+        ring = HashRing([f"worker-{i}" for i in range(4)])
+        before = owners(ring)
+
+        grown = ring.copy()
+        grown.add("worker-4")
+        after = owners(grown)
+        moved = [key for key in KEYS if before[key] != after[key]]
+        assert len(moved) < 0.3 * len(KEYS)
+        assert all(after[key] == "worker-4" for key in moved)
+
+        grown.remove("worker-4")
+        assert owners(grown) == before
+
+    def test_shard_key(self):
+        """Conversation first, contact as fallback"""
+        assert shard_key({"conversationId": "v1", "contactId": "c1"}) == "v1"
+        assert shard_key({"contactId": "c1"}) == "c1"
+
+    @pytest.mark.asyncio
+    async def test_sticky_forwarding(self):
+        """Every webhook of a conversation reaches the same worker"""
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append((request.url.port, json.loads(request.content)["conversationId"]))
+            return httpx.Response(200, json={"status": "processing"})
+
+        supervisor = ShardSupervisor(workers=3, spawn=False, shared_state=True,
+                                     client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        await supervisor.start()
+        for turn in range(3):
+            for conv in ("v1", "v2", "v3", "v4"):
+                body = json.dumps({"conversationId": conv, "body": f"mensaje {turn}"}).encode()
+                await supervisor.forward(body, conv)
+        await supervisor.scale(4)
+        ports = {conv: {port for port, c in seen if c == conv} for conv in ("v1", "v2", "v3", "v4")}
+        await supervisor.stop()
+
+        assert all(len(p) == 1 for p in ports.values())
+        assert len(supervisor.workers) == 0
+
+    @pytest.mark.asyncio
+    async def test_scale_needs_admin_and_readiness(self, monkeypatch):
+        """Scaling is admin-only and bounded; a worker that never gets ready stays out of the ring"""
+        supervisor = ShardSupervisor(workers=1, spawn=False, max_workers=4, admin_token="s3cret", shared_state=True,
+                                     client=httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(200))))
+        router = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_router_app(supervisor)), base_url="http://router")
+
+        async def ready(worker, timeout=60.0):
+            return worker.name != "worker-2"
+
+        monkeypatch.setattr(supervisor, "_wait_ready", ready)
+        await supervisor.start()
+        assert (await router.post("/shards/scale", params={"workers": 3})).status_code == 403
+        admin = {"X-Admin-Token": "s3cret"}
+        assert (await router.post("/shards/scale", params={"workers": 500}, headers=admin)).status_code == 400
+
+        result = (await router.post("/shards/scale", params={"workers": 3}, headers=admin)).json()
+        assert result["added"] == ["worker-1"] and result["failed"] == ["worker-2"]
+        assert sorted(supervisor.ring.nodes) == ["worker-0", "worker-1"] and "worker-2" not in supervisor.workers
+        await router.aclose()
+        await supervisor.stop()
+
+    @pytest.mark.asyncio
+    async def test_resharding_needs_shared_state(self, monkeypatch):
+        """In-memory state refuses resharding; concurrent scale() calls launch each worker once"""
+        client = httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(200)))
+        supervisor = ShardSupervisor(workers=1, spawn=False, shared_state=False, client=client)
+        await supervisor.start()
+        with pytest.raises(ValueError, match="CHECKPOINTER_BACKEND"):
+            await supervisor.scale(2)
+        assert supervisor.ring.nodes == ["worker-0"]
+        assert (await supervisor.scale(1))["added"] == []
+
+        async def slow_ready(worker, timeout=60.0):
+            await asyncio.sleep(0.05)
+            return True
+
+        supervisor.shared_state = True
+        monkeypatch.setattr(supervisor, "_wait_ready", slow_ready)
+        results = await asyncio.gather(supervisor.scale(2), supervisor.scale(1))
+
+        assert [r["added"] for r in results] == [["worker-1"], []]
+        assert results[1]["removed"] == ["worker-1"]
+        assert supervisor.ring.nodes == list(supervisor.workers) == ["worker-0"]
+        await supervisor.stop()
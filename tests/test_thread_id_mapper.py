@@ -0,0 +1,39 @@
+"""
+Test Thread ID Mapper - mapping is computed without copying or mutating state
+"""
+import pytest
+from langchain_core.messages import HumanMessage
+
+from app.agents.thread_id_mapper import thread_id_mapper_node
+
+
+class TestThreadIdMapper:
+    """Test thread_id mapping output and input isolation"""
+    
+    @pytest.mark.asyncio
+    async def test_config_override_does_not_mutate_input(self):
+        """Overriding the config thread_id must leave the caller's config untouched"""
+        config = {"configurable": {"thread_id": "cloud-uuid", "checkpoint_ns": ""}, "tags": ["x"]}
+        state = {
+            "messages": [HumanMessage(content="Hola")],
+            "webhook_data": {"contactId": "c1", "conversationId": "conv1", "body": "Hola"},
+            "thread_id": "cloud-uuid",
+            "__config__": config,
+        }
+        
+        result = await thread_id_mapper_node(state)
+        
+        assert result["thread_id"] == "conv-conv1"
+        assert result["original_thread_id"] == "cloud-uuid"
+        assert result["__config__"]["configurable"] == {"thread_id": "conv-conv1", "checkpoint_ns": ""}
+        assert result["__config__"]["tags"] == ["x"]
+        assert config["configurable"]["thread_id"] == "cloud-uuid"
+        assert "messages" not in result
+    
+    @pytest.mark.asyncio
+    async def test_injects_config_when_missing(self):
+        """Without __config__ a fresh one is injected for the contact thread"""
+        result = await thread_id_mapper_node({"contact_id": "c2", "messages": []})
+        
+        assert result["thread_id"] == "contact-c2"
+        assert result["__config__"] == {"configurable": {"thread_id": "contact-c2"}}
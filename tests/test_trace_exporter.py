@@ -0,0 +1,89 @@
+"""
+Test Trace Exporter - backpressure and batching of debug metadata
+"""
+import json
+
+from app.utils.trace_exporter import (
+    EventPriority,
+    JSONLFileSink,
+    TraceEvent,
+    TraceExporter,
+    TraceSink,
+)
+
+
+class RecordingSink(TraceSink):
+    """Sink that keeps every exported batch in memory"""
+
+    name = "recording"
+
+    def __init__(self):
+        self.batches = []
+
+    def export(self, events):
+        self.batches.append(list(events))
+
+
+class TestBackpressure:
+    """Full queues should shed low-priority events first"""
+
+    def test_low_priority_dropped_when_full(self):
+        exporter = TraceExporter(RecordingSink(), max_queue_size=2, batch_size=10)
+        exporter._ensure_worker = lambda: None  # Keep events queued for inspection
+
+        assert exporter.submit(TraceEvent("a", {}, EventPriority.LOW))
+        assert exporter.submit(TraceEvent("b", {}, EventPriority.LOW))
+        assert not exporter.submit(TraceEvent("c", {}, EventPriority.LOW))
+
+        assert exporter.queue_depth == 2
+        assert exporter.stats["dropped"]["low"] == 1
+
+    def test_high_priority_evicts_oldest_low(self):
+        exporter = TraceExporter(RecordingSink(), max_queue_size=2, batch_size=10)
+        exporter._ensure_worker = lambda: None
+
+        exporter.submit(TraceEvent("old_low", {}, EventPriority.LOW))
+        exporter.submit(TraceEvent("normal", {}, EventPriority.NORMAL))
+        assert exporter.submit(TraceEvent("error", {}, EventPriority.HIGH))
+
+        exporter.flush()
+        exported = [event.name for event in exporter.sink.batches[0]]
+        assert exported == ["error", "normal"]
+        assert exporter.stats["dropped"]["low"] == 1
+
+    def test_high_priority_dropped_when_nothing_lower(self):
+        exporter = TraceExporter(RecordingSink(), max_queue_size=1, batch_size=10)
+        exporter._ensure_worker = lambda: None
+
+        exporter.submit(TraceEvent("first", {}, EventPriority.HIGH))
+        assert not exporter.submit(TraceEvent("second", {}, EventPriority.HIGH))
+        assert exporter.stats["dropped"]["high"] == 1
+
+
+class TestExport:
+    """Background worker and sinks"""
+
+    def test_worker_ships_batches_on_close(self):
+        sink = RecordingSink()
+        exporter = TraceExporter(sink, batch_size=3, flush_interval=0.01)
+
+        for i in range(7):
+            exporter.submit(TraceEvent(f"event_{i}", {"i": i}))
+        exporter.close()
+
+        exported = [event.name for batch in sink.batches for event in batch]
+        assert sorted(exported) == sorted(f"event_{i}" for i in range(7))
+        assert all(len(batch) <= 3 for batch in sink.batches)
+        assert exporter.stats["exported"] == 7
+
+    def test_jsonl_sink_writes_one_line_per_event(self, tmp_path):
+        path = tmp_path / "events.jsonl"
+        exporter = TraceExporter(JSONLFileSink(str(path)), batch_size=10)
+
+        exporter.submit(TraceEvent("routing_decision", {"to": "carlos"}))
+        exporter.submit(TraceEvent("ghl_api_error", {"status": 500}, EventPriority.HIGH))
+        exporter.close()
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert {line["name"] for line in lines} == {"routing_decision", "ghl_api_error"}
+        assert all(line["run_id"] is None for line in lines)
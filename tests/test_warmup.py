@@ -0,0 +1,73 @@
+"""
+Test the startup warmup - readiness rules, step timeouts, the /ready gate
+and conversation preloading
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.state.conversation_archive import ConversationArchive, SQLiteArchiveBackend
+from app.utils.warmup import Warmup, WarmupStep
+
+
+def step(name: str, seconds: float = 0.0, error: Exception = None, required: bool = False) -> WarmupStep:
+    async def run():
+        await asyncio.sleep(seconds)
+        if error:
+            raise error
+        return {"done": name}
+    return WarmupStep(name, run, required=required)
+
+
+class TestWarmup:
+    """Test that an instance only reports ready once its required steps are warm"""
+
+    @pytest.mark.asyncio
+    async def test_only_required_steps_gate_readiness(self):
+        """A failed network step is reported but doesn't block; a failed required step does"""
+        warmup = Warmup([step("agents", required=True), step("pools", error=OSError("no route")),
+                         step("dns", seconds=1.0)], timeout=0.2)
+        report = await warmup.run()
+
+        assert report["ready"]
+        assert report["steps"]["agents"]["status"] == "ok"
+        assert "no route" in report["steps"]["pools"]["error"]
+        assert "timed out" in report["steps"]["dns"]["error"]
+
+        broken = Warmup([step("agents", error=ImportError("langchain_openai"), required=True)])
+        assert not (await broken.run())["ready"]
+
+    @pytest.mark.asyncio
+    async def test_ready_endpoint(self, monkeypatch):
+        """/ready answers 503 while warming up, 200 after; the admin run reuses the one in progress"""
+        import local_webhook_server
+        warmup = Warmup([step("agents", seconds=0.1, required=True)])
+        monkeypatch.setattr(local_webhook_server, "get_warmup", lambda: warmup)
+
+        transport = httpx.ASGITransport(app=local_webhook_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://worker") as client:
+            task = warmup.start()
+            assert (await client.get("/ready")).status_code == 503
+            response = await client.post("/admin/warmup")
+            assert response.status_code == 200
+            assert warmup.runs == 1 and task.done()
+            assert (await client.get("/ready")).json()["ready"]
+
+    def test_preload_hot_conversations(self, tmp_path):
+        """A restarted process has the most recently active conversations cached; newer writes survive the fill"""
+        path = str(tmp_path / "conversations.db")
+        archive = ConversationArchive(SQLiteArchiveBackend(path))
+        for i in range(5):
+            archive.record(f"v{i}", "human", f"hola {i}")
+        archive.flush_sync()
+
+        restarted = ConversationArchive(SQLiteArchiveBackend(path))
+        loaded = restarted.read_recent(3)
+        assert len(restarted._cache) == 0
+        restarted.record("v3", "human", "sigo aqui")  # a webhook between the read and the fill
+        assert restarted.fill(loaded) == 2
+        assert [m.content for m in restarted.recent("v3")] == ["hola 3", "sigo aqui"]
+        misses = restarted.stats["misses"]
+        assert [m.content for m in restarted.recent("v4")] == ["hola 4"]
+        assert restarted.stats["misses"] == misses
@@ -0,0 +1,69 @@
+"""
+Test inbound webhook de-duplication - keys, TTL store and the workflow short-circuit
+"""
+import time
+
+import pytest
+
+from app.utils.webhook_dedup import LRUDedupStore, WebhookDeduplicator, get_webhook_deduplicator, webhook_key
+
+WEBHOOK = {"type": "InboundMessage", "contactId": "c1", "conversationId": "conv1", "body": "Hola"}
+
+
+class FailingSharedStore:
+    async def claim(self, key, ttl):
+        raise ConnectionError("redis down")
+
+    async def release(self, key):
+        raise ConnectionError("redis down")
+
+
+class TestWebhookDedup:
+    """Test that GHL redeliveries are dropped before the graph runs"""
+
+    def test_keys(self):
+        """messageId wins; otherwise conversation + body + timestamp, weak without a timestamp"""
+        assert webhook_key({**WEBHOOK, "messageId": "m1"}).value == "msg:m1"
+        assert webhook_key({**WEBHOOK, "message": {"id": "m1", "body": "Hola"}}).value == "msg:m1"
+        assert webhook_key({**WEBHOOK, "dateAdded": "2030-03-04T10:00:00Z"}).strong
+        assert not webhook_key(WEBHOOK).strong
+        assert webhook_key(WEBHOOK) == webhook_key(dict(WEBHOOK))
+        assert webhook_key(WEBHOOK) != webhook_key({**WEBHOOK, "body": "Hola!"})
+
+    def test_lru_expiry_and_bound(self):
+        """Keys expire after their TTL and the oldest are evicted past max_entries"""
+        store = LRUDedupStore(max_entries=2)
+
+        assert store.claim("a", ttl=60)
+        assert not store.claim("a", ttl=60)
+        assert store.claim("b", ttl=0.01)
+        time.sleep(0.02)
+        assert store.claim("b", ttl=60)
+        store.claim("c", ttl=60)
+        assert len(store) == 2
+        assert store.claim("a", ttl=60)
+
+    @pytest.mark.asyncio
+    async def test_claim_release_and_shared_failure(self):
+        """A released claim can be taken again; a broken shared store falls back to local"""
+        dedup = WebhookDeduplicator(shared=FailingSharedStore())
+        webhook = {**WEBHOOK, "messageId": "m-release"}
+
+        key = await dedup.claim(webhook)
+        assert key is not None
+        assert await dedup.claim(webhook) is None
+        await dedup.release(key)
+        assert await dedup.claim(webhook) is not None
+        assert dedup.duplicates == 1
+
+    @pytest.mark.asyncio
+    async def test_run_workflow_skips_duplicates(self):
+        """A redelivered webhook returns without invoking the graph"""
+        from app.workflow import run_workflow
+        webhook = {**WEBHOOK, "messageId": f"m-{time.time_ns()}"}
+        await get_webhook_deduplicator().claim(webhook)
+
+        result = await run_workflow(webhook)
+
+        assert result["duplicate"] is True
+        assert result["message_sent"] is False